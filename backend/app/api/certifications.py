@@ -421,10 +421,7 @@ async def run_expiry_check(
 
     Updates status of expired certifications and sends alerts.
     """
-    # This would call the database function
     service = get_certification_service()
-
-    # In production, this would call the Supabase function
-    # await service.supabase.rpc("check_certification_expiry").execute()
+    await service.run_expiry_check()
 
     return {"status": "expiry check completed"}
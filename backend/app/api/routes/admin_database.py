@@ -24,9 +24,10 @@ async def table_rows(
     offset: int = Query(default=0, ge=0),
     search: str | None = None,
     order_by: str | None = None,
+    cursor: str | None = None,
     current_user_id: str = Depends(get_current_user_id_from_session),
 ):
-    return admin_db.get_table_rows(current_user_id, table_name, limit, offset, search, order_by)
+    return admin_db.get_table_rows(current_user_id, table_name, limit, offset, search, order_by, cursor)
 
 
 @router.post('/migration-draft')
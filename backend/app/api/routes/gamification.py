@@ -193,6 +193,7 @@ async def claim_reward(
 async def get_leaderboard(
     period: str = Query("monthly", regex="^(all_time|monthly|weekly)$"),
     limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     user: Optional[dict] = Depends(get_optional_user),
 ):
     """
@@ -205,6 +206,7 @@ async def get_leaderboard(
         period=period,
         limit=limit,
         current_user_id=current_user_id,
+        offset=offset,
     )
 
 
@@ -4,9 +4,25 @@ Health check endpoint for monitoring database and Supabase connections
 from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import JSONResponse
 
+from app.core.cache import get_cache_stats
 from app.core.config import get_settings
-from app.core.db import get_connection
+from app.core.db import get_connection, get_pool_stats
 from app.core.supabase import supabase_admin
+from app.utils.geoip import get_geoip_stats
+from app.services import (
+    anomaly_stream,
+    auth_events,
+    benchmark_snapshots,
+    import_pipeline,
+    leaderboards,
+    notification_delivery,
+    qr_render_cache,
+    qr_resolution,
+    region_index,
+    scan_ingestion,
+    sessions,
+    telegram_broadcast,
+)
 
 router = APIRouter(prefix='/api/health', tags=['health'])
 
@@ -158,3 +174,27 @@ async def supabase_health():
 
 
 
+
+
+@router.get('/metrics')
+async def runtime_metrics():
+    """
+    In-process counters for hot-path caches and background pipelines
+    """
+    return {
+        'anomaly_stream': anomaly_stream.get_anomaly_stream_stats(),
+        'auth_events': auth_events.get_auth_event_stats(),
+        'benchmark_snapshots': benchmark_snapshots.get_benchmark_snapshot_stats(),
+        'bulk_imports': import_pipeline.get_import_stats(),
+        'db_pools': get_pool_stats(),
+        'geoip': get_geoip_stats(),
+        'leaderboards': leaderboards.get_leaderboard_stats(),
+        'notification_delivery': notification_delivery.get_delivery_stats(),
+        'qr_render_cache': qr_render_cache.get_render_cache_stats(),
+        'qr_resolution_cache': qr_resolution.get_cache_stats(),
+        'region_index': region_index.get_region_index_stats(),
+        'scan_ingestion': scan_ingestion.buffer.get_stats(),
+        'session_cache': sessions.get_session_cache_stats(),
+        'telegram_broadcasts': telegram_broadcast.get_broadcaster_stats(),
+        'ttl_caches': get_cache_stats(),
+    }
@@ -36,13 +36,14 @@ async def get_public_leaderboard(
         description="Период: all_time, monthly, weekly"
     ),
     limit: int = Query(default=20, ge=5, le=100),
+    offset: int = Query(default=0, ge=0),
 ) -> LeaderboardResponse:
     """
     Получить таблицу лидеров по баллам.
 
     Публичный эндпоинт для отображения лидерборда на главной странице.
     """
-    return await run_in_threadpool(get_leaderboard, period, limit, None)
+    return await run_in_threadpool(get_leaderboard, period, limit, None, offset)
 
 
 # ==================== Authenticated Endpoints ====================
@@ -84,6 +85,7 @@ async def get_leaderboard_with_rank(
         pattern="^(all_time|monthly|weekly)$",
     ),
     limit: int = Query(default=20, ge=5, le=100),
+    offset: int = Query(default=0, ge=0),
     current_user_id: str = Depends(get_current_user_id_from_session),
 ) -> LeaderboardResponse:
     """
@@ -91,7 +93,7 @@ async def get_leaderboard_with_rank(
 
     Включает позицию текущего пользователя в рейтинге.
     """
-    return await run_in_threadpool(get_leaderboard, period, limit, current_user_id)
+    return await run_in_threadpool(get_leaderboard, period, limit, current_user_id, offset)
 
 
 # ==================== Review Voting ====================
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.concurrency import run_in_threadpool
 
 from app.schemas.auth import OrganizationProfile, OrganizationProfileUpdate, PublicOrganizationProfile
@@ -55,7 +55,7 @@ async def test_search():
     logger = logging.getLogger(__name__)
     try:
         logger.info("Test endpoint called")
-        items, total = await run_in_threadpool(
+        items, total, _ = await run_in_threadpool(
             search_public_organizations,
             None, None, None, False, 5, 0, False
         )
@@ -77,6 +77,7 @@ async def public_search(
     include_non_public: bool = Query(default=False),  # Admin can use this
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ) -> PublicOrganizationsResponse:
     import logging
     import traceback
@@ -85,7 +86,7 @@ async def public_search(
     logger.info(f"public_search called: q={q}, country={country}, category={category}, verified_only={verified_only}, limit={limit}, offset={offset}")
     
     try:
-        items, total = await run_in_threadpool(
+        items, total, next_cursor = await run_in_threadpool(
             search_public_organizations,
             q,
             country,
@@ -94,15 +95,18 @@ async def public_search(
             limit,
             offset,
             include_non_public,
+            cursor,
         )
         logger.info(f"public_search success: total={total}, items_count={len(items)}")
-        return PublicOrganizationsResponse(items=items, total=total)
+        return PublicOrganizationsResponse(items=items, total=total, next_cursor=next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = str(e)
         error_traceback = traceback.format_exc()
         logger.error(f"Error in public_search: {error_msg}")
         logger.error(f"Traceback: {error_traceback}")
-        from fastapi import HTTPException, status
+        from fastapi import status
         # Return error details in development, but keep it safe for production
         detail = f"Failed to search organizations: {error_msg}"
         raise HTTPException(
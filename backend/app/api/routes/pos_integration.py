@@ -12,7 +12,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.concurrency import run_in_threadpool
 from psycopg.rows import dict_row
 
-from app.core.db import get_connection
+from app.core.db import get_async_connection, get_connection
 from app.core.session_deps import get_current_user_id_from_session
 from app.core.config import get_settings
 from app.schemas.pos_integration import (
@@ -68,192 +68,189 @@ async def process_pos_webhook(
     Called by POS systems when a transaction is completed.
     Creates transaction record and generates digital receipt token.
     """
-    def _process_webhook():
-        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-            # Verify store exists and get POS integration
-            cur.execute(
-                """
-                SELECT pi.*, rs.name as store_name
-                FROM pos_integrations pi
-                JOIN retail_stores rs ON rs.id = pi.store_id
-                WHERE pi.store_id = %s AND pi.is_active = true
-                """,
-                (request.store_id,),
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        # Verify store exists and get POS integration
+        await cur.execute(
+            """
+            SELECT pi.*, rs.name as store_name
+            FROM pos_integrations pi
+            JOIN retail_stores rs ON rs.id = pi.store_id
+            WHERE pi.store_id = %s AND pi.is_active = true
+            """,
+            (request.store_id,),
+        )
+        integration = await cur.fetchone()
+
+        if not integration:
+            return POSWebhookResponse(
+                success=False,
+                error="Store not configured for POS integration",
             )
-            integration = cur.fetchone()
-
-            if not integration:
-                return POSWebhookResponse(
-                    success=False,
-                    error="Store not configured for POS integration",
-                )
 
-            # Verify signature if provided
-            if request.signature and integration.get('api_key'):
-                # In production, verify against the actual payload
-                pass
+        # Verify signature if provided
+        if request.signature and integration.get('api_key'):
+            # In production, verify against the actual payload
+            pass
+
+        # Check for duplicate transaction
+        await cur.execute(
+            """
+            SELECT id FROM purchase_transactions
+            WHERE external_transaction_id = %s AND store_id = %s
+            """,
+            (request.external_transaction_id, request.store_id),
+        )
+        if await cur.fetchone():
+            return POSWebhookResponse(
+                success=False,
+                error="Transaction already processed",
+            )
 
-            # Check for duplicate transaction
-            cur.execute(
+        # Find customer by phone/email if provided
+        customer_user_id = None
+        if request.customer_phone or request.customer_email:
+            await cur.execute(
                 """
-                SELECT id FROM purchase_transactions
-                WHERE external_transaction_id = %s AND store_id = %s
+                SELECT id FROM app_profiles
+                WHERE phone = %s OR email = %s
+                LIMIT 1
                 """,
-                (request.external_transaction_id, request.store_id),
+                (request.customer_phone, request.customer_email),
             )
-            if cur.fetchone():
-                return POSWebhookResponse(
-                    success=False,
-                    error="Transaction already processed",
-                )
-
-            # Find customer by phone/email if provided
-            customer_user_id = None
-            if request.customer_phone or request.customer_email:
-                cur.execute(
+            customer = await cur.fetchone()
+            if customer:
+                customer_user_id = customer['id']
+
+        # Create transaction
+        purchased_at = request.purchased_at or datetime.utcnow()
+        await cur.execute(
+            """
+            INSERT INTO purchase_transactions (
+                store_id, external_transaction_id, customer_phone,
+                customer_email, customer_user_id, purchased_at
+            )
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id
+            """,
+            (
+                request.store_id,
+                request.external_transaction_id,
+                request.customer_phone,
+                request.customer_email,
+                customer_user_id,
+                purchased_at,
+            ),
+        )
+        transaction = await cur.fetchone()
+        transaction_id = transaction['id']
+
+        # Process line items
+        verified_count = 0
+        for item in request.items:
+            # Look up product by barcode
+            product_id = None
+            status_level = None
+            is_verified = False
+
+            if item.barcode:
+                await cur.execute(
                     """
-                    SELECT id FROM app_profiles
-                    WHERE phone = %s OR email = %s
+                    SELECT p.id, sl.status_level
+                    FROM products p
+                    LEFT JOIN organizations o ON o.id = p.organization_id
+                    LEFT JOIN status_levels sl ON sl.organization_id = o.id
+                    WHERE p.barcode = %s OR p.sku = %s
                     LIMIT 1
                     """,
-                    (request.customer_phone, request.customer_email),
+                    (item.barcode, item.barcode),
                 )
-                customer = cur.fetchone()
-                if customer:
-                    customer_user_id = customer['id']
+                product = await cur.fetchone()
+                if product:
+                    product_id = product['id']
+                    status_level = product.get('status_level')
+                    is_verified = status_level is not None
+                    verified_count += 1
 
-            # Create transaction
-            purchased_at = request.purchased_at or datetime.utcnow()
-            cur.execute(
+            await cur.execute(
                 """
-                INSERT INTO purchase_transactions (
-                    store_id, external_transaction_id, customer_phone,
-                    customer_email, customer_user_id, purchased_at
+                INSERT INTO purchase_line_items (
+                    transaction_id, product_id, barcode, product_name,
+                    status_level, is_verified, quantity, unit_price_cents
                 )
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 """,
                 (
-                    request.store_id,
-                    request.external_transaction_id,
-                    request.customer_phone,
-                    request.customer_email,
-                    customer_user_id,
-                    purchased_at,
+                    transaction_id,
+                    product_id,
+                    item.barcode,
+                    item.product_name,
+                    status_level,
+                    is_verified,
+                    item.quantity,
+                    item.unit_price_cents,
                 ),
             )
-            transaction = cur.fetchone()
-            transaction_id = transaction['id']
 
-            # Process line items
-            verified_count = 0
-            for item in request.items:
-                # Look up product by barcode
-                product_id = None
-                status_level = None
-                is_verified = False
-
-                if item.barcode:
-                    cur.execute(
-                        """
-                        SELECT p.id, sl.status_level
-                        FROM products p
-                        LEFT JOIN organizations o ON o.id = p.organization_id
-                        LEFT JOIN status_levels sl ON sl.organization_id = o.id
-                        WHERE p.barcode = %s OR p.sku = %s
-                        LIMIT 1
-                        """,
-                        (item.barcode, item.barcode),
-                    )
-                    product = cur.fetchone()
-                    if product:
-                        product_id = product['id']
-                        status_level = product.get('status_level')
-                        is_verified = status_level is not None
-                        verified_count += 1
+        # Generate receipt token if digital receipts enabled
+        receipt_token = None
+        if integration.get('digital_receipts') and (request.customer_phone or request.customer_email):
+            receipt_token = _generate_receipt_token()
+            delivery_method = 'email' if request.customer_email else 'sms'
+            expires_at = datetime.utcnow() + timedelta(hours=RECEIPT_TOKEN_HOURS)
 
-                cur.execute(
-                    """
-                    INSERT INTO purchase_line_items (
-                        transaction_id, product_id, barcode, product_name,
-                        status_level, is_verified, quantity, unit_price_cents
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        transaction_id,
-                        product_id,
-                        item.barcode,
-                        item.product_name,
-                        status_level,
-                        is_verified,
-                        item.quantity,
-                        item.unit_price_cents,
-                    ),
-                )
-
-            # Generate receipt token if digital receipts enabled
-            receipt_token = None
-            if integration.get('digital_receipts') and (request.customer_phone or request.customer_email):
-                receipt_token = _generate_receipt_token()
-                delivery_method = 'email' if request.customer_email else 'sms'
-                expires_at = datetime.utcnow() + timedelta(hours=RECEIPT_TOKEN_HOURS)
-
-                cur.execute(
-                    """
-                    INSERT INTO receipt_tokens (
-                        transaction_id, token, delivery_method, expires_at
-                    )
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (transaction_id, receipt_token, delivery_method, expires_at),
-                )
-
-            # Award loyalty points if customer identified
-            loyalty_points = 0
-            if customer_user_id and verified_count > 0:
-                # 1 point per verified item
-                loyalty_points = verified_count
-                cur.execute(
-                    """
-                    UPDATE purchase_transactions
-                    SET loyalty_points_earned = %s
-                    WHERE id = %s
-                    """,
-                    (loyalty_points, transaction_id),
-                )
-                # Award points through loyalty system
-                cur.execute(
-                    """
-                    INSERT INTO loyalty_transactions (
-                        user_id, points, transaction_type, description, reference_id
-                    )
-                    VALUES (%s, %s, 'purchase', 'Points for verified products', %s)
-                    ON CONFLICT DO NOTHING
-                    """,
-                    (customer_user_id, loyalty_points, str(transaction_id)),
+            await cur.execute(
+                """
+                INSERT INTO receipt_tokens (
+                    transaction_id, token, delivery_method, expires_at
                 )
+                VALUES (%s, %s, %s, %s)
+                """,
+                (transaction_id, receipt_token, delivery_method, expires_at),
+            )
 
-            # Update integration last sync
-            cur.execute(
+        # Award loyalty points if customer identified
+        loyalty_points = 0
+        if customer_user_id and verified_count > 0:
+            # 1 point per verified item
+            loyalty_points = verified_count
+            await cur.execute(
                 """
-                UPDATE pos_integrations
-                SET last_sync_at = NOW()
+                UPDATE purchase_transactions
+                SET loyalty_points_earned = %s
                 WHERE id = %s
                 """,
-                (integration['id'],),
+                (loyalty_points, transaction_id),
             )
-
-            conn.commit()
-
-            return POSWebhookResponse(
-                success=True,
-                transaction_id=str(transaction_id),
-                receipt_token=receipt_token,
-                verified_items_count=verified_count,
+            # Award points through loyalty system
+            await cur.execute(
+                """
+                INSERT INTO loyalty_transactions (
+                    user_id, points, transaction_type, description, reference_id
+                )
+                VALUES (%s, %s, 'purchase', 'Points for verified products', %s)
+                ON CONFLICT DO NOTHING
+                """,
+                (customer_user_id, loyalty_points, str(transaction_id)),
             )
 
-    return await run_in_threadpool(_process_webhook)
+        # Update integration last sync
+        await cur.execute(
+            """
+            UPDATE pos_integrations
+            SET last_sync_at = NOW()
+            WHERE id = %s
+            """,
+            (integration['id'],),
+        )
+
+        await conn.commit()
+
+        return POSWebhookResponse(
+            success=True,
+            transaction_id=str(transaction_id),
+            receipt_token=receipt_token,
+            verified_items_count=verified_count,
+        )
 
 
 # ==================== Product Lookup for POS ====================
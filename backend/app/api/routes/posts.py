@@ -126,15 +126,17 @@ async def public_list_posts(
     slug: str,
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ) -> PublicOrganizationPostsResponse:
     """Список опубликованных постов организации (публичный API)."""
-    items, total = await run_in_threadpool(
+    items, total, next_cursor = await run_in_threadpool(
         list_public_organization_posts,
         slug,
         limit,
         offset,
+        cursor,
     )
-    return PublicOrganizationPostsResponse(items=items, total=total)
+    return PublicOrganizationPostsResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @public_router.get('/{organization_id}/posts', response_model=PublicOrganizationPostsResponse)
@@ -142,16 +144,18 @@ async def public_list_posts_by_id(
     organization_id: str,
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ) -> PublicOrganizationPostsResponse:
     """Список опубликованных постов организации по ID (публичный API)."""
     from app.services.posts import list_public_organization_posts_by_id
-    items, total = await run_in_threadpool(
+    items, total, next_cursor = await run_in_threadpool(
         list_public_organization_posts_by_id,
         organization_id,
         limit,
         offset,
+        cursor,
     )
-    return PublicOrganizationPostsResponse(items=items, total=total)
+    return PublicOrganizationPostsResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @public_router.get('/by-slug/{slug}/posts/{post_slug}', response_model=PublicOrganizationPost)
@@ -30,7 +30,7 @@ async def get_product_by_slug(slug: str) -> PublicProductPage:
     Returns full product information including organization details,
     journey summary, and engagement stats. No authentication required.
     """
-    return journey_service.get_public_product_page(slug)
+    return await journey_service.get_public_product_page(slug)
 
 
 # =====================
@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, Request, Query, HTTPException
 from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse, Response, StreamingResponse
-import zipfile
-import io
 
 from app.core.session_deps import get_current_user_id_from_session
 from app.core.config import get_settings
 from app.schemas.qr import QRCode, QRCodeCreate, QRCodeStats, QRCodeDetailedStats, QRCodeTimeline, QRCustomizationSettings, QRCustomizationUpdate, QRBulkCreateRequest
 from app.services import qr as qr_service
-from app.services.qr_generator import generate_qr_image, generate_etag
+from app.services import qr_render_cache
+from app.services.qr_generator import MAX_PRINT_SIZE, generate_etag
+from app.services.qr_render_cache import RenderSpec
 
 router = APIRouter(prefix='/api', tags=['qr'])
 redirect_router = APIRouter(tags=['qr'])
@@ -147,7 +147,11 @@ async def bulk_create_qr_codes(
 
     Requires: manager+ role
     """
-    return await run_in_threadpool(qr_service.bulk_create_qr_codes, organization_id, current_user_id, payload.labels)
+    settings = get_settings()
+    qr_codes = await run_in_threadpool(qr_service.bulk_create_qr_codes, organization_id, current_user_id, payload.labels)
+    # Warm the render cache so the first image views and exports are served from it
+    qr_render_cache.schedule_prerender([f"{settings.frontend_base}/q/{qr_code.code}" for qr_code in qr_codes])
+    return qr_codes
 
 
 @router.get('/organizations/{organization_id}/qr-codes/export')
@@ -155,16 +159,20 @@ async def export_qr_codes(
     request: Request,
     organization_id: str,
     qr_ids: str = Query(..., description="Comma-separated QR code IDs"),
+    size: int = Query(default=500, ge=100, le=MAX_PRINT_SIZE),
+    error_correction: str = Query(default="M", regex="^(L|M|Q|H)$"),
     current_user_id: str = Depends(get_current_user_id_from_session),
 ):
     """
     Export multiple QR codes as a ZIP file containing PNG images.
 
     Query Parameters:
-    - qr_ids: Comma-separated list of QR code UUIDs (max 100)
+    - qr_ids: Comma-separated list of QR code UUIDs (max 500)
+    - size: Image size in pixels, 100-8000 for print (default: 500)
+    - error_correction: "L", "M", "Q", or "H" (default: M)
 
     Returns:
-    - ZIP file with QR code images named by label
+    - ZIP file with QR code images named by label, streamed while rendering
 
     Requires: viewer+ role
     """
@@ -176,36 +184,26 @@ async def export_qr_codes(
     if not qr_id_list:
         raise HTTPException(status_code=400, detail="No QR code IDs provided")
 
-    if len(qr_id_list) > 100:
-        raise HTTPException(status_code=400, detail="Maximum 100 QR codes per export")
+    if len(qr_id_list) > 500:
+        raise HTTPException(status_code=400, detail="Maximum 500 QR codes per export")
 
     # Get QR codes (validates ownership)
     qr_codes = await run_in_threadpool(qr_service.get_multiple_qr_codes, organization_id, current_user_id, qr_id_list)
+    customizations = await run_in_threadpool(qr_service.get_qr_customizations, [str(qr.id) for qr in qr_codes])
+
+    entries = []
+    for qr_code in qr_codes:
+        # Create filename from label or code
+        filename = (qr_code.label or qr_code.code).replace(' ', '-').replace('/', '-')
+        spec = RenderSpec(
+            f"{settings.frontend_base}/q/{qr_code.code}", 'png', size, error_correction,
+            qr_render_cache.customization_options(customizations.get(str(qr_code.id))),
+        )
+        entries.append((f"{filename}.png", spec))
 
-    # Create ZIP in memory
-    zip_buffer = io.BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for qr_code in qr_codes:
-            # Build target URL
-            target_url = f"{settings.frontend_base}/q/{qr_code.code}"
-
-            # Generate QR image
-            image_data = await run_in_threadpool(generate_qr_image, target_url, 'png', 500, 'M')
-
-            # Create filename from label or code
-            filename = (qr_code.label or qr_code.code).replace(' ', '-').replace('/', '-')
-            filename = f"{filename}.png"
-
-            # Add to ZIP
-            zip_file.writestr(filename, image_data)
-
-    # Rewind buffer
-    zip_buffer.seek(0)
-
-    # Return as streaming response
+    # Images are rendered in parallel and written to the response as they complete
     return StreamingResponse(
-        zip_buffer,
+        qr_render_cache.stream_zip(entries),
         media_type="application/zip",
         headers={
             "Content-Disposition": f"attachment; filename=qr-codes-export.zip"
@@ -248,8 +246,14 @@ async def generate_qr_code_image(
     # Build target URL
     target_url = f"{settings.frontend_base}/q/{qr_code.code}"
 
+    # Colors and logo from the code's customization settings
+    customization = await run_in_threadpool(
+        qr_service.get_qr_customization, organization_id, qr_code_id, current_user_id
+    )
+    options = qr_render_cache.customization_options(customization)
+
     # Generate ETag for caching
-    etag = generate_etag(qr_code.code, format, size, error_correction)
+    etag = generate_etag(qr_code.code, format, size, error_correction, options)
 
     # Check If-None-Match header for cache validation
     if_none_match = request.headers.get("if-none-match")
@@ -259,7 +263,7 @@ async def generate_qr_code_image(
     # Generate QR image
     try:
         image_data = await run_in_threadpool(
-            generate_qr_image, target_url, format, size, error_correction
+            qr_render_cache.cache.get_or_render, RenderSpec(target_url, format, size, error_correction, options)
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -289,8 +293,7 @@ async def qr_redirect(request: Request, code: str):
     user_agent = request.headers.get('user-agent')
     referer = request.headers.get('referer')
     raw_query = request.url.query or None
-    target = await run_in_threadpool(
-        qr_service.log_event_and_get_redirect,
+    target = await qr_service.log_event_and_get_redirect(
         code,
         client_ip,
         user_agent,
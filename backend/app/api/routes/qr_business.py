@@ -9,7 +9,9 @@ from fastapi.responses import RedirectResponse, Response
 from app.core.session_deps import get_current_user_id_from_session
 from app.core.config import get_settings
 from app.services.qr_business import get_business_public_url, get_business_qr_url_for_admin, log_qr_scan_event
-from app.services.qr_generator import generate_qr_image, generate_etag
+from app.services import qr_render_cache
+from app.services.qr_generator import generate_etag
+from app.services.qr_render_cache import RenderSpec
 
 settings = get_settings()
 
@@ -75,7 +77,7 @@ async def generate_business_qr_image(
     # Generate QR image
     try:
         image_data = await run_in_threadpool(
-            generate_qr_image, target_url, format, size, error_correction
+            qr_render_cache.cache.get_or_render, RenderSpec(target_url, format, size, error_correction)
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -10,7 +10,7 @@ from fastapi import APIRouter, HTTPException, status
 from fastapi.concurrency import run_in_threadpool
 from psycopg.rows import dict_row
 
-from app.core.db import get_connection
+from app.core.db import get_async_connection, get_connection
 from app.schemas.kiosk import (
     KioskAuthRequest,
     KioskAuthResponse,
@@ -33,6 +33,16 @@ router = APIRouter(prefix='/api/kiosk', tags=['kiosk'])
 KIOSK_SESSION_HOURS = 24
 
 
+_VALIDATE_SESSION_SQL = """
+    SELECT ks.*, rk.store_id, rk.device_code, rk.config
+    FROM kiosk_sessions ks
+    JOIN retail_kiosks rk ON rk.id = ks.kiosk_id
+    WHERE ks.session_token = %s
+      AND ks.ended_at IS NULL
+      AND ks.started_at > NOW() - INTERVAL '%s hours'
+"""
+
+
 def _generate_session_token() -> str:
     """Generate a secure session token for kiosk."""
     return secrets.token_urlsafe(32)
@@ -41,20 +51,17 @@ def _generate_session_token() -> str:
 def _validate_session(session_token: str) -> dict | None:
     """Validate kiosk session token and return session data."""
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT ks.*, rk.store_id, rk.device_code, rk.config
-            FROM kiosk_sessions ks
-            JOIN retail_kiosks rk ON rk.id = ks.kiosk_id
-            WHERE ks.session_token = %s
-              AND ks.ended_at IS NULL
-              AND ks.started_at > NOW() - INTERVAL '%s hours'
-            """,
-            (session_token, KIOSK_SESSION_HOURS),
-        )
+        cur.execute(_VALIDATE_SESSION_SQL, (session_token, KIOSK_SESSION_HOURS))
         return cur.fetchone()
 
 
+async def _validate_session_async(session_token: str) -> dict | None:
+    """Validate kiosk session token on the async pool (scan hot path)."""
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(_VALIDATE_SESSION_SQL, (session_token, KIOSK_SESSION_HOURS))
+        return await cur.fetchone()
+
+
 # ==================== Kiosk Authentication ====================
 
 @router.post('/authenticate', response_model=KioskAuthResponse)
@@ -196,152 +203,149 @@ async def process_kiosk_scan(
 
     Accepts either a barcode or QR code and returns product trust information.
     """
-    def _process_scan():
-        session = _validate_session(request.session_token)
-        if not session:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired session",
-            )
-
-        if not request.barcode and not request.qr_code:
-            return KioskScanResponse(
-                success=False,
-                error="Either barcode or qr_code is required",
-            )
-
-        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-            # Find product by barcode or QR code
-            if request.barcode:
-                cur.execute(
-                    """
-                    SELECT p.*, o.name as org_name, sl.status_level
-                    FROM products p
-                    JOIN organizations o ON o.id = p.organization_id
-                    LEFT JOIN status_levels sl ON sl.organization_id = o.id
-                    WHERE p.barcode = %s OR p.sku = %s
-                    LIMIT 1
-                    """,
-                    (request.barcode, request.barcode),
-                )
-            else:
-                # Extract product ID from QR code URL
-                # Assuming QR contains: https://chestno.ru/p/{product_id}
-                product_id = request.qr_code.split('/')[-1] if request.qr_code else None
-                cur.execute(
-                    """
-                    SELECT p.*, o.name as org_name, sl.status_level
-                    FROM products p
-                    JOIN organizations o ON o.id = p.organization_id
-                    LEFT JOIN status_levels sl ON sl.organization_id = o.id
-                    WHERE p.id::text = %s OR p.public_id = %s
-                    LIMIT 1
-                    """,
-                    (product_id, product_id),
-                )
+    session = await _validate_session_async(request.session_token)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired session",
+        )
 
-            product = cur.fetchone()
-            if not product:
-                return KioskScanResponse(
-                    success=False,
-                    error="Product not found",
-                )
+    if not request.barcode and not request.qr_code:
+        return KioskScanResponse(
+            success=False,
+            error="Either barcode or qr_code is required",
+        )
 
-            # Log scan event
-            cur.execute(
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        # Find product by barcode or QR code
+        if request.barcode:
+            await cur.execute(
                 """
-                INSERT INTO store_scan_events (
-                    store_id, product_id, organization_id, scan_source
-                )
-                VALUES (%s, %s, %s, 'kiosk')
-                RETURNING id
+                SELECT p.*, o.name as org_name, sl.status_level
+                FROM products p
+                JOIN organizations o ON o.id = p.organization_id
+                LEFT JOIN status_levels sl ON sl.organization_id = o.id
+                WHERE p.barcode = %s OR p.sku = %s
+                LIMIT 1
                 """,
-                (session['store_id'], product['id'], product['organization_id']),
+                (request.barcode, request.barcode),
             )
-
-            # Update session scan count
-            cur.execute(
+        else:
+            # Extract product ID from QR code URL
+            # Assuming QR contains: https://chestno.ru/p/{product_id}
+            product_id = request.qr_code.split('/')[-1] if request.qr_code else None
+            await cur.execute(
                 """
-                UPDATE kiosk_sessions
-                SET products_scanned = products_scanned + 1
-                WHERE id = %s
+                SELECT p.*, o.name as org_name, sl.status_level
+                FROM products p
+                JOIN organizations o ON o.id = p.organization_id
+                LEFT JOIN status_levels sl ON sl.organization_id = o.id
+                WHERE p.id::text = %s OR p.public_id = %s
+                LIMIT 1
                 """,
-                (session['id'],),
+                (product_id, product_id),
             )
 
-            conn.commit()
-
-            # Get certifications
-            cur.execute(
-                """
-                SELECT c.name
-                FROM product_certifications pc
-                JOIN certifications c ON c.id = pc.certification_id
-                WHERE pc.product_id = %s
-                """,
-                (product['id'],),
+        product = await cur.fetchone()
+        if not product:
+            return KioskScanResponse(
+                success=False,
+                error="Product not found",
             )
-            certs = [r['name'] for r in cur.fetchall()]
 
-            # Get reviews summary
-            cur.execute(
-                """
-                SELECT
-                    AVG(rating)::float as avg_rating,
-                    COUNT(*) as total
-                FROM reviews
-                WHERE product_id = %s AND status = 'approved'
-                """,
-                (product['id'],),
+        # Log scan event
+        await cur.execute(
+            """
+            INSERT INTO store_scan_events (
+                store_id, product_id, organization_id, scan_source
             )
-            review_stats = cur.fetchone()
+            VALUES (%s, %s, %s, 'kiosk')
+            RETURNING id
+            """,
+            (session['store_id'], product['id'], product['organization_id']),
+        )
 
-            # Recent reviews
-            cur.execute(
-                """
-                SELECT r.text, r.rating, r.created_at
-                FROM reviews r
-                WHERE r.product_id = %s AND r.status = 'approved'
-                ORDER BY r.created_at DESC
-                LIMIT 3
-                """,
-                (product['id'],),
-            )
-            recent_reviews = [
-                {
-                    'text': r['text'][:200] if r['text'] else '',
-                    'rating': r['rating'],
-                    'date': r['created_at'].isoformat(),
-                }
-                for r in cur.fetchall()
-            ]
+        # Update session scan count
+        await cur.execute(
+            """
+            UPDATE kiosk_sessions
+            SET products_scanned = products_scanned + 1
+            WHERE id = %s
+            """,
+            (session['id'],),
+        )
 
-            product_info = KioskProductInfo(
-                product_id=str(product['id']),
-                name=product['name'],
-                brand=product.get('brand'),
-                status_level=product.get('status_level'),
-                trust_score=product.get('trust_score'),
-                verification_date=product.get('verified_at'),
-                certifications=certs,
-                origin=product.get('origin_country'),
-                ingredients=product.get('ingredients'),
-                image_url=product.get('image_url'),
-            )
+        await conn.commit()
 
-            reviews = KioskReviews(
-                average_rating=review_stats['avg_rating'],
-                total_reviews=review_stats['total'] or 0,
-                recent_reviews=recent_reviews,
-            )
+        # Get certifications
+        await cur.execute(
+            """
+            SELECT c.name
+            FROM product_certifications pc
+            JOIN certifications c ON c.id = pc.certification_id
+            WHERE pc.product_id = %s
+            """,
+            (product['id'],),
+        )
+        certs = [r['name'] for r in await cur.fetchall()]
 
-            return KioskScanResponse(
-                success=True,
-                product=product_info,
-                reviews=reviews,
-            )
+        # Get reviews summary
+        await cur.execute(
+            """
+            SELECT
+                AVG(rating)::float as avg_rating,
+                COUNT(*) as total
+            FROM reviews
+            WHERE product_id = %s AND status = 'approved'
+            """,
+            (product['id'],),
+        )
+        review_stats = await cur.fetchone()
+
+        # Recent reviews
+        await cur.execute(
+            """
+            SELECT r.text, r.rating, r.created_at
+            FROM reviews r
+            WHERE r.product_id = %s AND r.status = 'approved'
+            ORDER BY r.created_at DESC
+            LIMIT 3
+            """,
+            (product['id'],),
+        )
+        recent_reviews = [
+            {
+                'text': r['text'][:200] if r['text'] else '',
+                'rating': r['rating'],
+                'date': r['created_at'].isoformat(),
+            }
+            for r in await cur.fetchall()
+        ]
+
+        product_info = KioskProductInfo(
+            product_id=str(product['id']),
+            name=product['name'],
+            brand=product.get('brand'),
+            status_level=product.get('status_level'),
+            trust_score=product.get('trust_score'),
+            verification_date=product.get('verified_at'),
+            certifications=certs,
+            origin=product.get('origin_country'),
+            ingredients=product.get('ingredients'),
+            image_url=product.get('image_url'),
+        )
 
-    return await run_in_threadpool(_process_scan)
+        reviews = KioskReviews(
+            average_rating=review_stats['avg_rating'],
+            total_reviews=review_stats['total'] or 0,
+            recent_reviews=recent_reviews,
+        )
+
+        return KioskScanResponse(
+            success=True,
+            product=product_info,
+            reviews=reviews,
+        )
 
 
 # ==================== Product Lookup ====================
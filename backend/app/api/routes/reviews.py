@@ -183,17 +183,21 @@ async def public_list_reviews(
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
     order: str = Query(default='newest', pattern='^(newest|highest_rating)$'),
+    cursor: str | None = Query(default=None),
 ) -> PublicReviewsResponse:
     """Список опубликованных отзывов организации (публичный API)."""
-    items, total, avg_rating = await run_in_threadpool(
+    items, total, avg_rating, next_cursor = await run_in_threadpool(
         list_public_organization_reviews,
         slug,
         product_slug,
         limit,
         offset,
         order,
+        cursor,
+    )
+    return PublicReviewsResponse(
+        items=items, total=total, average_rating=avg_rating, next_cursor=next_cursor,
     )
-    return PublicReviewsResponse(items=items, total=total, average_rating=avg_rating)
 
 
 @public_router.get('/{organization_id}/reviews', response_model=PublicReviewsResponse)
@@ -203,18 +207,22 @@ async def public_list_reviews_by_id(
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
     order: str = Query(default='newest', pattern='^(newest|highest_rating)$'),
+    cursor: str | None = Query(default=None),
 ) -> PublicReviewsResponse:
     """Список опубликованных отзывов организации по ID (публичный API)."""
     from app.services.reviews import list_public_organization_reviews_by_id
-    items, total, avg_rating = await run_in_threadpool(
+    items, total, avg_rating, next_cursor = await run_in_threadpool(
         list_public_organization_reviews_by_id,
         organization_id,
         product_id,
         limit,
         offset,
         order,
+        cursor,
+    )
+    return PublicReviewsResponse(
+        items=items, total=total, average_rating=avg_rating, next_cursor=next_cursor,
     )
-    return PublicReviewsResponse(items=items, total=total, average_rating=avg_rating)
 
 
 @public_router.post('/by-slug/{slug}/reviews', response_model=Review, status_code=201)
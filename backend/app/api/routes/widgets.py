@@ -5,11 +5,11 @@ Public endpoints for embeddable trust widgets that businesses can add to their w
 Supports multiple sizes, themes, and customization options with proper CORS and caching.
 """
 import logging
-from typing import Optional
+import re
+from typing import Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from fastapi.responses import HTMLResponse, PlainTextResponse
-from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
 from app.schemas.widgets import (
@@ -20,13 +20,12 @@ from app.schemas.widgets import (
     WidgetTheme,
 )
 from app.services.widgets import (
-    calculate_etag,
+    WidgetKind,
+    cached_widget_etag,
     generate_cache_headers,
     generate_embed_code,
-    generate_widget_javascript,
-    get_organization_for_widget,
-    render_iframe_html,
-    render_widget_html,
+    record_widget_request,
+    render_widget,
 )
 
 logger = logging.getLogger(__name__)
@@ -37,6 +36,8 @@ router = APIRouter(prefix='/api/v1/widgets', tags=['widgets'])
 # Authenticated routes for widget configuration
 config_router = APIRouter(prefix='/api/organizations', tags=['widget-config'])
 
+HEX_COLOR_RE = re.compile(r'#[0-9a-fA-F]{6}')
+
 
 def get_cors_headers() -> dict:
     """Get CORS headers for widget embedding."""
@@ -48,6 +49,38 @@ def get_cors_headers() -> dict:
     }
 
 
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Whether the If-None-Match header names the given ETag."""
+    if_none_match = request.headers.get("If-None-Match")
+    return bool(etag and if_none_match and if_none_match.strip('"') == etag)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={**get_cors_headers(), **generate_cache_headers(etag)}
+    )
+
+
+async def serve_widget(kind: WidgetKind, org_slug: str, request: Request, config: WidgetConfig) -> Tuple[Optional[str], str]:
+    """
+    Rendered widget body and ETag; the body is None when the client copy is current.
+
+    If-None-Match is checked against the cached version token first, so
+    repeat requests from partner sites are answered without database access.
+    """
+    etag = cached_widget_etag(kind, org_slug, config)
+    if etag_matches(request, etag):
+        record_widget_request(kind, org_slug, config)
+        return None, etag
+
+    body, etag = await render_widget(kind, org_slug, config)
+    record_widget_request(kind, org_slug, config)
+    if etag_matches(request, etag):
+        return None, etag
+    return body, etag
+
+
 def parse_widget_config(
     size: str = "medium",
     theme: str = "light",
@@ -77,7 +110,7 @@ def parse_widget_config(
         color = color.strip()
         if not color.startswith('#'):
             color = f"#{color}"
-        if len(color) == 7:  # #RRGGBB format
+        if HEX_COLOR_RE.fullmatch(color):  # #RRGGBB format
             primary_color = color.upper()
 
     # Validate language
@@ -148,6 +181,8 @@ async def get_widget_badge(
 
     **Caching:**
     Response includes ETag header. Widget is cached for 5 minutes.
+    Rendered widgets are cached server-side; a matching If-None-Match is
+    answered with 304 from the cached version token.
 
     **CORS:**
     Full CORS support for cross-origin embedding.
@@ -156,27 +191,10 @@ async def get_widget_badge(
         # Parse configuration
         config = parse_widget_config(size, theme, color, logo, reviews, rating, lang, radius)
 
-        # Fetch organization data
-        org_data = await run_in_threadpool(get_organization_for_widget, org_slug)
-
-        # Generate JavaScript
-        js_content = await run_in_threadpool(
-            generate_widget_javascript,
-            org_slug,
-            org_data,
-            config
-        )
-
-        # Calculate ETag for caching
-        etag = calculate_etag(js_content)
-
-        # Check If-None-Match header for caching
-        if_none_match = request.headers.get("If-None-Match")
-        if if_none_match and if_none_match.strip('"') == etag:
-            return Response(
-                status_code=304,
-                headers={**get_cors_headers(), **generate_cache_headers(etag)}
-            )
+        # Cached render, or 304 straight from the version token
+        js_content, etag = await serve_widget('badge', org_slug, request, config)
+        if js_content is None:
+            return not_modified(etag)
 
         # Return JavaScript response
         return Response(
@@ -236,22 +254,10 @@ async def get_widget_iframe(
         # Parse configuration
         config = parse_widget_config(size, theme, color, logo, reviews, rating, lang, radius)
 
-        # Fetch organization data
-        org_data = await run_in_threadpool(get_organization_for_widget, org_slug)
-
-        # Generate HTML
-        html_content = await run_in_threadpool(render_iframe_html, org_data, config)
-
-        # Calculate ETag
-        etag = calculate_etag(html_content)
-
-        # Check If-None-Match
-        if_none_match = request.headers.get("If-None-Match")
-        if if_none_match and if_none_match.strip('"') == etag:
-            return Response(
-                status_code=304,
-                headers={**get_cors_headers(), **generate_cache_headers(etag)}
-            )
+        # Cached render, or 304 straight from the version token
+        html_content, etag = await serve_widget('iframe', org_slug, request, config)
+        if html_content is None:
+            return not_modified(etag)
 
         return HTMLResponse(
             content=html_content,
@@ -293,8 +299,7 @@ async def get_widget_preview(
     """
     try:
         config = parse_widget_config(size, theme, color, logo, reviews, rating, lang, radius)
-        org_data = await run_in_threadpool(get_organization_for_widget, org_slug)
-        html_content = await run_in_threadpool(render_iframe_html, org_data, config)
+        html_content, _ = await render_widget('iframe', org_slug, config)
 
         return HTMLResponse(
             content=html_content,
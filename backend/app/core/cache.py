@@ -0,0 +1,203 @@
+"""
+Shared TTL cache.
+
+Services cache read-mostly results (status levels, product stories, widget
+data, public organization and product pages) in named TTLCache instances:
+- entries expire after a TTL and the cache is bounded with LRU eviction
+- entries carry tags such as organization_tag(id); invalidate_tags() drops
+  every entry with one of the tags, in all caches, through a tag index
+- hits, misses, evictions, expirations and invalidations are counted and
+  reported by get_cache_stats()
+
+Storage goes through a CacheBackend. MemoryBackend keeps entries in the
+worker process; a cross-process store can be swapped in with
+configure_backend().
+"""
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+MISSING = object()
+
+
+def organization_tag(organization_id) -> str:
+    return f'org:{organization_id}'
+
+
+def product_tag(product_id) -> str:
+    return f'product:{product_id}'
+
+
+def story_tag(story_id) -> str:
+    return f'story:{story_id}'
+
+
+class CacheBackend(ABC):
+    """Storage of one named cache"""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """The live value or MISSING"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str]) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop entries carrying any of the tags; returns the number dropped"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def get_stats(self) -> dict:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with per-entry expiry and a tag -> keys index"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, float, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._stats = {'evictions': 0, 'expirations': 0}
+
+    def _drop(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if time.monotonic() >= entry[1]:
+                self._drop(key)
+                self._stats['expirations'] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl_seconds, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'tags': len(self._tags)}
+
+
+def _memory_backend(name: str, max_entries: int) -> CacheBackend:
+    return MemoryBackend(max_entries)
+
+
+_backend_factory: Callable[[str, int], CacheBackend] = _memory_backend
+_caches: dict[str, 'TTLCache'] = {}
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    """A named cache; values of None are not cached"""
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: Optional[int] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries or settings.cache_max_entries
+        self.backend = _backend_factory(name, self.max_entries)
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        with _registry_lock:
+            _caches[name] = self
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def get(self, key: str) -> Any:
+        """The cached value or None"""
+        value = self.backend.get(key)
+        if value is MISSING:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl_seconds: Optional[float] = None) -> None:
+        if value is None:
+            return
+        self.backend.set(key, value, ttl_seconds if ttl_seconds is not None else self.ttl_seconds, tags)
+
+    def invalidate(self, *tags: str) -> int:
+        dropped = self.backend.invalidate_tags(tags)
+        self._count('invalidations', dropped)
+        return dropped
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {**stats, **self.backend.get_stats()}
+
+
+def invalidate_tags(*tags: str) -> int:
+    """Drop entries with any of the tags from every cache"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return sum(cache.invalidate(*tags) for cache in caches)
+
+
+def configure_backend(factory: Callable[[str, int], CacheBackend]) -> None:
+    """Use another storage for all caches, e.g. a store shared by workers"""
+    global _backend_factory
+    with _registry_lock:
+        _backend_factory = factory
+        for cache in _caches.values():
+            cache.backend = factory(cache.name, cache.max_entries)
+
+
+def get_cache_stats() -> dict:
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.get_stats() for cache in caches}
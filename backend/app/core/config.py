@@ -10,6 +10,14 @@ class Settings(BaseSettings):
     supabase_anon_key: str
     supabase_jwt_secret: str  # Secret used to verify JWT tokens
     database_url: str
+    # Connection pools
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 8
+    db_pool_timeout: float = 10
+    db_async_pool_min_size: int = 2
+    db_async_pool_max_size: int = 20
+    db_async_pool_timeout: float = 10
+    db_async_statement_timeout_ms: int = 5000
     backend_host: str = '0.0.0.0'
     backend_port: int = 8000
     allowed_origins: str | List[str] = 'http://localhost:5173,http://localhost:5174'
@@ -24,6 +32,11 @@ class Settings(BaseSettings):
     environment: str = 'development'
     session_cookie_name: str = 'session_id'
     session_max_age: int = 86400  # 24 hours
+    # Validated sessions (with profile) cached per process; last_used_at is
+    # written in batches at most once per session per touch interval
+    session_cache_ttl_seconds: int = 30
+    session_cache_max_entries: int = 10000
+    session_touch_interval_seconds: int = 300
     # Email (SMTP) settings
     smtp_host: str | None = None
     smtp_port: int = 587
@@ -35,12 +48,91 @@ class Settings(BaseSettings):
     # Telegram Bot settings
     telegram_bot_token: str | None = None
     telegram_default_chat_id: str | None = None
+    # Telegram broadcasts: Telegram allows ~30 msg/s per bot and ~1 msg/s per chat
+    telegram_broadcast_rate_per_second: float = 25.0
+    telegram_broadcast_per_chat_interval_seconds: float = 1.0
+    telegram_broadcast_batch_size: int = 500
+    telegram_broadcast_concurrency: int = 25
+    telegram_broadcast_max_retries: int = 3
+    telegram_broadcast_lease_seconds: int = 120  # running broadcasts without a heartbeat are resumed
     # Web Push (VAPID) settings
     vapid_public_key: str | None = None
     vapid_private_key: str | None = None
     vapid_subject: str = 'mailto:noreply@chestno.ru'
+    # Notification delivery workers
+    notification_delivery_batch_size: int = 100
+    notification_delivery_max_batches_per_run: int = 10
+    notification_claim_timeout_seconds: int = 300  # reclaim rows stuck in 'sending'
+    notification_email_concurrency: int = 1  # sends share one SMTP connection per batch
+    notification_telegram_concurrency: int = 10
+    notification_push_concurrency: int = 10
+    # Content moderation: compiled pattern set version check interval
+    moderation_patterns_check_interval_seconds: int = 30
+    # Streaming anomaly evaluation (app.services.anomaly_stream)
+    anomaly_stream_max_codes: int = 20000  # QR codes with in-memory window state
+    anomaly_rules_cache_seconds: int = 60
+    anomaly_state_resync_seconds: int = 300  # rebuild from scan_fingerprints
+    # Shared TTL cache (app.core.cache)
+    cache_max_entries: int = 10000  # per named cache, LRU beyond
+    # Widget render cache (app.services.widgets)
+    widget_render_cache_ttl_seconds: int = 60
+    widget_warm_limit: int = 200  # most requested widgets rendered at startup
+    # In-memory leaderboards (app.services.leaderboards)
+    leaderboard_reload_seconds: int = 300  # also reloaded when the date changes
+    # Auth rate limits (app.core.rate_limit) and the auth_events audit buffer
+    rate_limit_max_keys: int = 200000  # counters kept in memory, LRU beyond
+    auth_events_flush_seconds: int = 5
+    auth_events_buffer_max: int = 50000  # unwritten events kept; oldest dropped beyond
+    # Certificate registry verification (app.services.cert_verification_scheduler)
+    cert_verification_concurrency: int = 8  # concurrent checks per registry
+    cert_verification_batch_size: int = 500  # certifications read per cron query
+    cert_registry_max_connections: int = 20  # pooled HTTP client shared by adapters
+    cert_registry_cache_ttl_seconds: int = 21600  # registry answers by certificate number
+    cert_registry_cache_max_entries: int = 50000
+    # Keyset pagination (app.core.pagination): cached list totals
+    pagination_totals_ttl_seconds: int = 300  # reviews and posts, also dropped on changes
+    organization_search_totals_ttl_seconds: int = 60
+    # Category benchmark snapshots (app.services.benchmark_snapshots)
+    benchmark_snapshot_refresh_seconds: int = 3600  # full reload
+    benchmark_snapshot_sync_seconds: int = 60  # re-read organizations changed since last sync
+    benchmark_snapshot_max_categories: int = 500
+    # Authorized region index for geographic anomaly checks
+    geo_region_index_ttl_seconds: int = 300  # other workers see region edits after this
+    geo_region_index_max_organizations: int = 2000
     # GeoIP settings
     geoip_db_path: str | None = None  # Path to GeoLite2-City.mmdb
+    geoip_cache_max_entries: int = 50000  # per process, keyed by network prefix
+    # QR redirect resolution cache
+    qr_resolution_cache_ttl_seconds: int = 60
+    qr_resolution_cache_max_entries: int = 10000
+    # Bulk import pipeline: rows are validated in a process pool and written
+    # one chunk per transaction; jobs without a heartbeat for the lease are resumed
+    import_chunk_size: int = 5000
+    import_validation_workers: int = 4  # 1 validates inline in the import thread
+    import_lease_seconds: int = 300
+    # Import image ingestion worker (app.cron.image_ingestion_worker)
+    image_ingest_batch_size: int = 200
+    image_ingest_concurrency: int = 32
+    image_ingest_per_host_limit: int = 8
+    image_ingest_processes: int = 2  # thumbnail rendering; 1 renders in a thread
+    image_ingest_timeout_seconds: float = 30.0
+    image_ingest_max_retries: int = 3
+    image_ingest_retry_delay_seconds: float = 30.0  # doubled per retry
+    image_ingest_claim_timeout_seconds: int = 600  # reclaim rows stuck in 'downloading'
+    # QR scan rollups: qr_events ids folded into hourly/daily rollups per run
+    qr_rollup_max_events_per_run: int = 200000
+    # QR image render cache (app.services.qr_render_cache)
+    qr_render_cache_memory_mb: int = 64
+    qr_render_cache_dir: str | None = None  # defaults to <tmp>/chestno-qr-render-cache
+    qr_render_cache_disk_mb: int = 1024
+    qr_render_processes: int = 4  # bulk renders; 1 renders in threads
+    qr_render_max_in_flight: int = 16
+    # QR scan ingestion buffer
+    scan_ingest_batch_size: int = 500
+    scan_ingest_flush_interval_ms: int = 250
+    scan_ingest_max_queue: int = 20000
+    # Failed flushes after which an event is dropped
+    scan_ingest_max_attempts: int = 10
     # YooKassa (Payment) settings
     yukassa_shop_id: str | None = None
     yukassa_secret_key: str | None = None
@@ -1,8 +1,8 @@
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
 
-from psycopg_pool import ConnectionPool
-from psycopg import Connection
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+from psycopg import AsyncConnection, Connection
 
 from .config import get_settings
 
@@ -10,9 +10,24 @@ settings = get_settings()
 
 pool = ConnectionPool(
     conninfo=settings.database_url,
-    min_size=1,
-    max_size=8,
-    timeout=10,
+    min_size=settings.db_pool_min_size,
+    max_size=settings.db_pool_max_size,
+    timeout=settings.db_pool_timeout,
+)
+
+# Native asyncio pool for public hot paths. Opened from the FastAPI lifespan
+# (or lazily on first use) because it needs a running event loop.
+async_pool = AsyncConnectionPool(
+    conninfo=settings.database_url,
+    min_size=settings.db_async_pool_min_size,
+    max_size=settings.db_async_pool_max_size,
+    timeout=settings.db_async_pool_timeout,
+    kwargs=(
+        {'options': f'-c statement_timeout={settings.db_async_statement_timeout_ms}'}
+        if settings.db_async_statement_timeout_ms > 0
+        else None
+    ),
+    open=False,
 )
 
 
@@ -21,3 +36,28 @@ def get_connection() -> Iterator[Connection]:
     with pool.connection() as conn:  # type: Connection
         yield conn
 
+
+@asynccontextmanager
+async def get_async_connection() -> AsyncIterator[AsyncConnection]:
+    if async_pool.closed:
+        await async_pool.open()
+    async with async_pool.connection() as conn:  # type: AsyncConnection
+        yield conn
+
+
+async def open_async_pool() -> None:
+    await async_pool.open()
+
+
+async def close_async_pool() -> None:
+    await async_pool.close()
+
+
+def get_pool_stats() -> dict:
+    """Pool sizing and wait counters (requests_wait_ms, requests_waiting, ...)."""
+    stats = {'sync': pool.get_stats()}
+    stats['async'] = async_pool.get_stats() if not async_pool.closed else {'closed': True}
+    for pool_stats in stats.values():
+        if pool_stats.get('requests_num'):
+            pool_stats['avg_wait_ms'] = round(pool_stats.get('requests_wait_ms', 0) / pool_stats['requests_num'], 2)
+    return stats
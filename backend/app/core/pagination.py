@@ -0,0 +1,82 @@
+"""
+Keyset pagination.
+
+Public lists (reviews, posts, organization search) and the admin table
+browser are read page by page with
+
+    WHERE (sort columns..., id) < (values of the last row shown)
+    ORDER BY sort columns... DESC, id DESC
+    LIMIT n + 1
+
+so the database seeks straight to the page through an index instead of
+reading and discarding `offset` rows, and deep pages cost the same as the
+first one. The id makes the order total, so rows with equal sort values are
+neither skipped nor repeated.
+
+The values of the last row go to the client as an opaque cursor (urlsafe
+base64 of JSON) that also names the ordering it was issued for; a cursor from
+another ordering is rejected. One extra row is fetched to tell whether a next
+page exists. Lists still accept offset for older clients; a cursor, when
+given, takes precedence.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(ordering: str, values: Sequence[Any]) -> str:
+    payload = json.dumps({'o': ordering, 'k': list(values)}, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, ordering: str, size: int) -> list[Any]:
+    """Sort key values of a cursor issued for `ordering`"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['k']
+        valid = payload['o'] == ordering and isinstance(values, list) and len(values) == size
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Некорректный курсор')
+    return values
+
+
+def keyset_condition(columns: Sequence[str], descending: bool = True) -> str:
+    """Rows after the cursor: a row comparison over the sort columns"""
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"({', '.join(columns)}) {'<' if descending else '>'} ({placeholders})"
+
+
+def keyset_order(columns: Sequence[str], descending: bool = True) -> str:
+    direction = ' DESC' if descending else ''
+    return ', '.join(f'{column}{direction}' for column in columns)
+
+
+def page_rows(
+    rows: list[Any],
+    limit: int,
+    ordering: str,
+    key: Callable[[Any], Sequence[Any]],
+) -> tuple[list[Any], Optional[str]]:
+    """Trim a fetch of limit + 1 rows to the page and the cursor of the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(ordering, key(rows[-1]))
@@ -0,0 +1,156 @@
+"""
+Sliding-window rate limits.
+
+Limits such as "5 login attempts per email per minute" are counted in
+fixed buckets (window_seconds / buckets long). The count for the last
+window_seconds is the sum of the buckets inside the window plus the
+overlapping share of the oldest bucket, an approximation of a true sliding
+window that needs a handful of counters per key instead of a timestamp per
+request.
+
+Counters live in a RateLimitBackend. MemoryBackend keeps them in the worker
+process; a store shared by workers (INCR/EXPIRE/MGET style) can be swapped in
+with configure_backend() so limits hold across a multi-worker deployment.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class RateLimitBackend(ABC):
+    """Counter and value storage with per-key expiry"""
+
+    @abstractmethod
+    def incr(self, key: str, ttl_seconds: float, amount: int = 1) -> int:
+        """Add to a counter, creating it with the TTL; returns the new value"""
+        pass
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> list[int]:
+        """Counter values, 0 for missing keys"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """A value stored with set(), or None"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        pass
+
+
+class MemoryBackend(RateLimitBackend):
+    """In-process store with wall-clock expiry, bounded with LRU eviction"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def _live(self, key: str, now: float) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now >= entry[1]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    def incr(self, key: str, ttl_seconds: float, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry[1]:
+                value, expires_at = amount, now + ttl_seconds
+            else:
+                value, expires_at = entry[0] + amount, entry[1]
+            self._store(key, value, expires_at)
+            return value
+
+    def get_many(self, keys: list[str]) -> list[int]:
+        now = time.time()
+        with self._lock:
+            return [self._live(key, now) or 0 for key in keys]
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._live(key, time.time())
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._store(key, value, time.time() + ttl_seconds)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_backend: RateLimitBackend = MemoryBackend(settings.rate_limit_max_keys)
+
+
+def get_backend() -> RateLimitBackend:
+    return _backend
+
+
+def configure_backend(backend: RateLimitBackend) -> None:
+    """Use another store for all limits, e.g. one shared by workers"""
+    global _backend
+    _backend = backend
+
+
+class SlidingWindowLimit:
+    """At most `limit` hits per key in any window_seconds"""
+
+    def __init__(self, name: str, limit: int, window_seconds: int, buckets: int = 6):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+
+    def _key(self, key: str, bucket: int) -> str:
+        return f'rl:{self.name}:{key}:{bucket}'
+
+    def hit(self, key: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        # Kept until the bucket has left the window entirely
+        get_backend().incr(self._key(key, bucket), ttl_seconds=self.window_seconds + self.bucket_seconds)
+
+    def count(self, key: str, now: Optional[float] = None) -> float:
+        """Approximate number of hits in the last window_seconds"""
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        counts = get_backend().get_many(
+            [self._key(key, bucket) for bucket in range(current - self.buckets, current + 1)]
+        )
+        # The oldest bucket only partly overlaps the window
+        overlap = 1 - (now % self.bucket_seconds) / self.bucket_seconds
+        return counts[0] * overlap + sum(counts[1:])
+
+    def exceeded(self, key: str, now: Optional[float] = None) -> bool:
+        return self.count(key, now) >= self.limit
@@ -6,6 +6,7 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 logger = logging.getLogger(__name__)
@@ -57,12 +58,91 @@ async def process_push_deliveries_job():
         logger.error(f'Error processing push deliveries: {e}')
 
 
+async def flush_session_touches_job():
+    """Job to write coalesced session last_used_at updates."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.sessions import flush_session_touches
+        await run_in_threadpool(flush_session_touches)
+    except Exception as e:
+        logger.error(f'Error flushing session touches: {e}')
+
+
+async def flush_widget_embed_counts_job():
+    """Job to write counted widget requests."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.widgets import flush_widget_embed_counts
+        await run_in_threadpool(flush_widget_embed_counts)
+    except Exception as e:
+        logger.error(f'Error flushing widget embed counts: {e}')
+
+
+async def flush_auth_events_job():
+    """Job to write buffered auth events for audit."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.auth_events import flush_auth_events
+        await run_in_threadpool(flush_auth_events)
+    except Exception as e:
+        logger.error(f'Error flushing auth events: {e}')
+
+
+async def resume_telegram_broadcasts_job():
+    """Job to start pending and abandoned Telegram broadcasts."""
+    try:
+        from app.services.telegram_broadcast import resume_broadcasts
+        started = await resume_broadcasts()
+        if started:
+            logger.info(f'Resumed {started} Telegram broadcasts')
+    except Exception as e:
+        logger.error(f'Error resuming Telegram broadcasts: {e}')
+
+
+async def resume_bulk_imports_job():
+    """Job to restart bulk imports interrupted mid-file."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.import_pipeline import resume_imports
+        started = await run_in_threadpool(resume_imports)
+        if started:
+            logger.info(f'Resumed {started} bulk imports')
+    except Exception as e:
+        logger.error(f'Error resuming bulk imports: {e}')
+
+
+async def roll_up_qr_scans_job():
+    """Job to fold new qr_events into the hourly/daily scan rollups."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.qr_rollups import roll_up_scans
+        for _ in range(10):
+            result = await run_in_threadpool(roll_up_scans)
+            if result['caught_up']:
+                break
+    except Exception as e:
+        logger.error(f'Error rolling up QR scans: {e}')
+
+
+async def recalculate_trust_scores_job(incremental: bool = True):
+    """Job to rescore organizations (changed ones, or all of them nightly)."""
+    try:
+        from fastapi.concurrency import run_in_threadpool
+        from app.services.trust_score import recalculate_all_trust_scores
+        await run_in_threadpool(recalculate_all_trust_scores, incremental)
+    except Exception as e:
+        logger.error(f'Error recalculating trust scores: {e}')
+
+
 def start_scheduler():
     """Start the scheduler with all jobs."""
     if scheduler.running:
         logger.warning('Scheduler already running')
         return
 
+    from app.core.config import get_settings
+    settings = get_settings()
+
     # Process reminders every minute
     scheduler.add_job(
         process_reminders_job,
@@ -99,6 +179,79 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    # Write lazy session last_used_at updates every minute
+    scheduler.add_job(
+        flush_session_touches_job,
+        IntervalTrigger(minutes=1),
+        id='flush_session_touches',
+        name='Flush session last_used_at updates',
+        replace_existing=True,
+    )
+
+    # Write widget request counts (used to warm the render cache) every minute
+    scheduler.add_job(
+        flush_widget_embed_counts_job,
+        IntervalTrigger(minutes=1),
+        id='flush_widget_embed_counts',
+        name='Flush widget embed counts',
+        replace_existing=True,
+    )
+
+    # Write buffered auth events (login attempts are not queried from the table)
+    scheduler.add_job(
+        flush_auth_events_job,
+        IntervalTrigger(seconds=settings.auth_events_flush_seconds),
+        id='flush_auth_events',
+        name='Flush auth events',
+        replace_existing=True,
+    )
+
+    # Resume interrupted Telegram broadcasts every minute
+    scheduler.add_job(
+        resume_telegram_broadcasts_job,
+        IntervalTrigger(minutes=1),
+        id='resume_telegram_broadcasts',
+        name='Resume Telegram broadcasts',
+        replace_existing=True,
+    )
+
+    # Resume interrupted bulk imports every minute
+    scheduler.add_job(
+        resume_bulk_imports_job,
+        IntervalTrigger(minutes=1),
+        id='resume_bulk_imports',
+        name='Resume bulk imports',
+        replace_existing=True,
+    )
+
+    # Roll up QR scans every minute
+    scheduler.add_job(
+        roll_up_qr_scans_job,
+        IntervalTrigger(minutes=1),
+        id='roll_up_qr_scans',
+        name='Roll up QR scan events',
+        replace_existing=True,
+    )
+
+    # Rescore organizations with changed inputs every 10 minutes
+    scheduler.add_job(
+        recalculate_trust_scores_job,
+        IntervalTrigger(minutes=10),
+        id='recalculate_changed_trust_scores',
+        name='Recalculate changed trust scores',
+        replace_existing=True,
+    )
+
+    # Rescore every organization nightly (tenure and freshness change daily)
+    scheduler.add_job(
+        recalculate_trust_scores_job,
+        CronTrigger(hour=3, minute=0),
+        kwargs={'incremental': False},
+        id='recalculate_all_trust_scores',
+        name='Recalculate all trust scores',
+        replace_existing=True,
+    )
+
     scheduler.start()
     logger.info('Scheduler started with notification processing jobs')
 
@@ -3,10 +3,8 @@ Session-based authentication dependencies.
 Uses httpOnly cookies instead of Bearer tokens.
 """
 from fastapi import Cookie, HTTPException, Request, status
-from psycopg.rows import dict_row
 
-from app.core.db import get_connection
-from app.services.sessions import get_session
+from app.services.sessions import get_session_user
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -36,33 +34,21 @@ async def get_current_user_from_session(
             detail='No session cookie',
         )
     
-    session = get_session(session_id)
+    # Session and profile come from the per-process session cache
+    session, user = get_session_user(session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Invalid or expired session',
         )
     
-    # Load user profile
-    with get_connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
-            cur.execute(
-                '''
-                SELECT id, email, role, display_name, avatar_url
-                FROM public.app_profiles
-                WHERE id = %s
-                ''',
-                (session['user_id'],)
-            )
-            user = cur.fetchone()
-            
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail='User profile not found',
-                )
-            
-            return user
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='User profile not found',
+        )
+    
+    return user
 
 
 async def get_current_user_id_from_session(
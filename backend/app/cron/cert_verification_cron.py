@@ -6,21 +6,99 @@ Scheduled tasks for automated certificate verification:
 2. Check and mark expired certifications (runs daily)
 3. Send expiry alerts (runs daily)
 4. Re-verify existing certifications (runs weekly)
+
+Verification runs through VerificationScheduler, concurrently per registry
+and within each registry's rate limit; certifications are read in keyset
+batches of cert_verification_batch_size.
 """
 
-import asyncio
 import logging
-from datetime import datetime, timedelta
+from typing import Optional
+
+from psycopg.rows import dict_row
 
+from ..core.config import get_settings
+from ..core.db import get_async_connection
 from ..services.cert_verification_api import (
     get_verification_service,
     VerificationRequest,
     VerificationResult,
 )
-from ..core.supabase import get_supabase_client
+from ..services.cert_verification_scheduler import VerificationJob, VerificationScheduler
+from ..services.certifications import get_certification_service
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+PENDING_QUERY = """
+    SELECT pc.id::text, pc.certificate_number, pc.issued_date, pc.expiry_date, ct.code
+    FROM producer_certifications pc
+    JOIN certification_types ct ON ct.id = pc.certification_type_id
+    WHERE pc.verification_status = 'pending'
+      AND ct.auto_verify_enabled
+      AND pc.certificate_number IS NOT NULL
+      AND pc.id > %s
+    ORDER BY pc.id
+    LIMIT %s
+"""
+
+# Results that are registry answers; errors and rate limits are retried next run
+ANSWERED_RESULTS = {
+    VerificationResult.VERIFIED,
+    VerificationResult.REVOKED,
+    VerificationResult.EXPIRED,
+    VerificationResult.NOT_FOUND,
+}
+
+# Auto-verified certifications not checked in the last 7 days
+REVERIFY_QUERY = """
+    SELECT pc.id::text, pc.certificate_number, pc.issued_date, pc.expiry_date, ct.code
+    FROM producer_certifications pc
+    JOIN certification_types ct ON ct.id = pc.certification_type_id
+    WHERE pc.verification_status = 'auto_verified'
+      AND pc.certificate_number IS NOT NULL
+      AND (pc.last_auto_check_at IS NULL OR pc.last_auto_check_at < now() - interval '7 days')
+      AND pc.id > %s
+    ORDER BY pc.id
+    LIMIT %s
+"""
+
+
+async def _fetch_batch(query: str, after_id: str) -> list[dict]:
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(query, (after_id, settings.cert_verification_batch_size))
+        return await cur.fetchall()
+
+
+async def _verify_in_batches(query: str, scheduler: Optional[VerificationScheduler] = None):
+    """
+    Verify certifications selected by query, a batch at a time.
+
+    Batches are read by id (keyset), so certifications the registry does not
+    know are not read again in the same run. Yields (batch ids, results).
+    """
+    scheduler = scheduler or VerificationScheduler()
+    after_id = '00000000-0000-0000-0000-000000000000'
+    while True:
+        rows = await _fetch_batch(query, after_id)
+        if not rows:
+            return
+        after_id = rows[-1]['id']
+        jobs = [
+            VerificationJob(
+                certification_id=row['id'],
+                request=VerificationRequest(
+                    certificate_number=row['certificate_number'],
+                    certification_type_code=row['code'],
+                    issued_date=row['issued_date'],
+                    expiry_date=row['expiry_date'],
+                ),
+            )
+            for row in rows
+        ]
+        yield [row['id'] for row in rows], await scheduler.run(jobs)
+
 
 async def auto_verify_pending_certifications():
     """
@@ -33,61 +111,24 @@ async def auto_verify_pending_certifications():
     - Have auto_verify_enabled = true for their type
     """
     logger.info("Starting auto-verification of pending certifications")
-    supabase = get_supabase_client()
-    verification_service = get_verification_service()
 
     try:
-        # Get pending certifications with auto-verify enabled types
-        result = (
-            supabase.table("producer_certifications")
-            .select("*, certification_types!inner(*)")
-            .eq("verification_status", "pending")
-            .eq("certification_types.auto_verify_enabled", True)
-            .is_not("certificate_number", "null")
-            .execute()
-        )
-
         verified_count = 0
         not_found_count = 0
         error_count = 0
 
-        async with verification_service:
-            for cert in result.data:
-                cert_id = cert["id"]
-                cert_type = cert["certification_types"]
-
-                # Build verification request
-                request = VerificationRequest(
-                    certificate_number=cert["certificate_number"],
-                    certification_type_code=cert_type["code"],
-                    organization_name=None,  # Would need to fetch from organizations table
-                    issued_date=cert.get("issued_date"),
-                    expiry_date=cert.get("expiry_date"),
-                )
-
-                # Verify
-                logger.info(f"Verifying certificate {cert_id}: {cert['certificate_number']}")
-                response = await verification_service.verify_certificate(
-                    certification_id=cert_id,
-                    request=request,
-                )
-
-                # Track results
+        async for _, results in _verify_in_batches(PENDING_QUERY):
+            for job, response in results:
+                number = job.request.certificate_number
                 if response.result == VerificationResult.VERIFIED:
                     verified_count += 1
-                    logger.info(f"✓ Verified: {cert['certificate_number']}")
+                    logger.info(f"✓ Verified: {number}")
                 elif response.result == VerificationResult.NOT_FOUND:
                     not_found_count += 1
-                    logger.warning(f"✗ Not found: {cert['certificate_number']}")
-                elif response.result == VerificationResult.RATE_LIMITED:
-                    logger.warning(f"⏳ Rate limited, will retry later")
-                    break  # Stop processing to avoid hammering API
-                else:
+                    logger.warning(f"✗ Not found: {number}")
+                elif response.result == VerificationResult.ERROR:
                     error_count += 1
-                    logger.error(f"⚠ Error verifying {cert['certificate_number']}: {response.error_message}")
-
-                # Small delay to be respectful to APIs
-                await asyncio.sleep(1)
+                    logger.error(f"⚠ Error verifying {number}: {response.error_message}")
 
         logger.info(
             f"Auto-verification complete: "
@@ -126,34 +167,22 @@ async def send_expiry_alerts():
     Sends alerts for certifications expiring in: 90, 60, 30, 14, 7, 1 days.
     """
     logger.info("Sending expiry alerts")
-    supabase = get_supabase_client()
+    cert_service = get_certification_service()
 
     try:
         # Get pending alerts scheduled for today or earlier
-        result = (
-            supabase.table("certification_expiry_alerts")
-            .select("*, producer_certifications!inner(*, certification_types(*)), organizations!inner(*)")
-            .is_("sent_at", "null")
-            .lte("scheduled_at", datetime.utcnow().isoformat())
-            .execute()
-        )
+        alerts = await cert_service.get_pending_expiry_alerts()
 
         sent_count = 0
-        for alert in result.data:
-            cert = alert["producer_certifications"]
-            org = alert["organizations"]
-            cert_type = cert.get("certification_types", {})
-
+        for alert in alerts:
             # Send notification (would integrate with notification service)
             logger.info(
-                f"Alert: {org['name']} - {cert_type.get('name_ru')} "
-                f"expires in {alert['alert_days_before']} days"
+                f"Alert: {alert.organization_id} - {alert.certification_type_name} "
+                f"expires in {alert.alert_days_before} days"
             )
 
             # Mark as sent
-            supabase.table("certification_expiry_alerts").update({
-                "sent_at": datetime.utcnow().isoformat()
-            }).eq("id", alert["id"]).execute()
+            await cert_service.mark_alert_sent(alert.id)
 
             sent_count += 1
 
@@ -171,56 +200,40 @@ async def reverify_existing_certifications():
     Checks if certificates are still valid in registry (detect revocations).
     """
     logger.info("Re-verifying existing certifications")
-    supabase = get_supabase_client()
-    verification_service = get_verification_service()
 
     try:
-        # Get auto-verified certifications not checked recently (>7 days)
-        week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-
-        result = (
-            supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .eq("verification_status", "auto_verified")
-            .or_(f"last_auto_check_at.is.null,last_auto_check_at.lt.{week_ago}")
-            .limit(100)  # Process in batches to avoid overload
-            .execute()
-        )
-
         reverified_count = 0
         revoked_count = 0
 
-        async with verification_service:
-            for cert in result.data:
-                cert_id = cert["id"]
-                cert_type = cert["certification_types"]
-
-                request = VerificationRequest(
-                    certificate_number=cert["certificate_number"],
-                    certification_type_code=cert_type["code"],
-                    issued_date=cert.get("issued_date"),
-                    expiry_date=cert.get("expiry_date"),
-                )
-
-                response = await verification_service.verify_certificate(
-                    certification_id=cert_id,
-                    request=request,
-                )
-
+        async for _, results in _verify_in_batches(REVERIFY_QUERY):
+            revoked_ids = []
+            checked_ids = [job.certification_id for job, response in results if response.result in ANSWERED_RESULTS]
+            for job, response in results:
                 if response.result == VerificationResult.VERIFIED:
                     reverified_count += 1
                 elif response.result == VerificationResult.REVOKED:
-                    revoked_count += 1
-                    # Mark as revoked
-                    supabase.table("producer_certifications").update({
-                        "verification_status": "revoked",
-                        "verification_notes": "Detected as revoked during re-verification",
-                        "updated_at": datetime.utcnow().isoformat(),
-                    }).eq("id", cert_id).execute()
-
-                    logger.warning(f"Certificate {cert['certificate_number']} was REVOKED")
-
-                await asyncio.sleep(2)  # Be extra respectful during re-verification
+                    revoked_ids.append(job.certification_id)
+                    logger.warning(f"Certificate {job.request.certificate_number} was REVOKED")
+            revoked_count += len(revoked_ids)
+
+            async with get_async_connection() as conn, conn.cursor() as cur:
+                # Mark as revoked
+                await cur.execute(
+                    """
+                    UPDATE producer_certifications
+                    SET verification_status = 'revoked',
+                        verification_notes = 'Detected as revoked during re-verification',
+                        updated_at = now()
+                    WHERE id = ANY(%s::uuid[])
+                    """,
+                    (revoked_ids,),
+                )
+                # Answered certifications wait another week, found or not
+                await cur.execute(
+                    "UPDATE producer_certifications SET last_auto_check_at = now() WHERE id = ANY(%s::uuid[])",
+                    (checked_ids,),
+                )
+                await conn.commit()
 
         logger.info(
             f"Re-verification complete: "
@@ -12,7 +12,6 @@ import asyncio
 from datetime import date, datetime, timedelta
 from typing import Optional
 
-from ..core.supabase import get_supabase_client
 from ..services.certifications import get_certification_service
 from ..services.notifications import get_notification_service  # Assumed existing
 
@@ -25,25 +24,17 @@ async def run_expiry_check():
     2. Processes pending expiry alerts
     3. Creates notifications for organization admins
     """
-    supabase = get_supabase_client()
     cert_service = get_certification_service()
 
     print(f"[{datetime.utcnow().isoformat()}] Starting certification expiry check...")
 
-    # Step 1: Run database function to update expired certs
+    # Steps 1-2: Run database functions to update expired certs and schedule new alerts
     try:
-        supabase.rpc("check_certification_expiry").execute()
-        print("  - Updated expired certification statuses")
+        await cert_service.run_expiry_check()
+        print("  - Updated expired certification statuses and scheduled new expiry alerts")
     except Exception as e:
         print(f"  - Error updating expired certs: {e}")
 
-    # Step 2: Schedule new expiry alerts
-    try:
-        supabase.rpc("schedule_expiry_alerts").execute()
-        print("  - Scheduled new expiry alerts")
-    except Exception as e:
-        print(f"  - Error scheduling alerts: {e}")
-
     # Step 3: Process pending alerts
     pending_alerts = await cert_service.get_pending_expiry_alerts()
     print(f"  - Found {len(pending_alerts)} pending alerts to send")
@@ -119,28 +110,16 @@ async def run_auto_verification():
     Checks with external APIs (Rosstandart, Roskachestvo, etc.)
     for certifications that have auto_verify_enabled.
     """
-    supabase = get_supabase_client()
     cert_service = get_certification_service()
 
     print(f"[{datetime.utcnow().isoformat()}] Starting auto-verification check...")
 
     # Get certifications due for auto-check
-    result = (
-        supabase.table("producer_certifications")
-        .select("*, certification_types!inner(*)")
-        .eq("certification_types.auto_verify_enabled", True)
-        .in_("verification_status", ["pending", "verified", "auto_verified"])
-        .or_(
-            "next_auto_check_at.is.null,"
-            f"next_auto_check_at.lte.{datetime.utcnow().isoformat()}"
-        )
-        .limit(50)  # Process in batches
-        .execute()
-    )
+    rows = await cert_service.list_due_for_auto_check(limit=50)  # Process in batches
 
-    print(f"  - Found {len(result.data)} certifications to verify")
+    print(f"  - Found {len(rows)} certifications to verify")
 
-    for row in result.data:
+    for row in rows:
         cert_id = row["id"]
         cert_number = row.get("certificate_number")
         cert_type_code = row["certification_types"]["code"]
@@ -170,14 +149,7 @@ async def run_auto_verification():
                 print(f"    - Verification failed for {cert_id}: {verification.details}")
 
             # Schedule next check (weekly)
-            supabase.table("producer_certifications").update(
-                {
-                    "last_auto_check_at": datetime.utcnow().isoformat(),
-                    "next_auto_check_at": (
-                        datetime.utcnow() + timedelta(days=7)
-                    ).isoformat(),
-                }
-            ).eq("id", cert_id).execute()
+            await cert_service.mark_auto_checked(cert_id, timedelta(days=7))
 
         except Exception as e:
             print(f"    - Error verifying {cert_id}: {e}")
@@ -0,0 +1,33 @@
+"""
+Defect Early Warning Cron Job.
+
+Runs the daily defect detection pipeline (review classification, daily
+topic stats, spike detection, alerts) for every organization with recent
+reviews, spread over parallel worker processes.
+
+Designed to run daily via Railway/Supabase cron or external scheduler:
+    python -m app.cron.defect_detection_cron [processes]
+"""
+import sys
+from datetime import datetime
+
+from ..services.defect_detection import run_daily_detection_all
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    print(f"[{datetime.utcnow().isoformat()}] Starting defect detection...")
+    results = run_daily_detection_all(processes=processes)
+
+    failed = [r for r in results if 'error' in r]
+    classified = sum(r.get('reviews_classified', 0) for r in results)
+    alerts = sum(r.get('alerts_created', 0) for r in results)
+    print(f"  - Organizations: {len(results)} ({len(failed)} failed)")
+    print(f"  - Reviews classified: {classified}")
+    print(f"  - Alerts created: {alerts}")
+    print(f"[{datetime.utcnow().isoformat()}] Defect detection complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Import Image Ingestion Worker.
+
+Downloads images queued by bulk imports (import_image_queue), stores each
+distinct image once and attaches it to its products. Several workers can
+run side by side; queue rows are claimed with SKIP LOCKED.
+
+Run after imports via Railway/Supabase cron or as a long-running process:
+    python -m app.cron.image_ingestion_worker [--forever]
+"""
+import asyncio
+import sys
+from datetime import datetime
+
+from ..core.db import close_async_pool
+from ..services.image_ingestion import run_worker
+
+
+async def _run(forever: bool) -> dict:
+    try:
+        return await run_worker(forever=forever)
+    finally:
+        await close_async_pool()
+
+
+def main():
+    forever = '--forever' in sys.argv[1:]
+
+    print(f"[{datetime.utcnow().isoformat()}] Starting image ingestion...")
+    stats = asyncio.run(_run(forever))
+
+    print(f"  - Claimed: {stats['claimed']}")
+    print(f"  - Completed: {stats['completed']} ({stats['images_per_second']}/s)")
+    print(f"  - Retried: {stats['retried']}")
+    print(f"  - Failed: {stats['failed']}")
+    print(f"  - Downloads: {stats['downloads']} ({stats['bytes_downloaded']} bytes)")
+    print(f"  - Dedupe hits: {stats['url_dedupe_hits']} by URL, {stats['content_dedupe_hits']} by content")
+    print(f"[{datetime.utcnow().isoformat()}] Image ingestion complete.")
+
+
+if __name__ == "__main__":
+    main()
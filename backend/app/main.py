@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 import time
@@ -11,7 +12,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from app.core.db import close_async_pool, open_async_pool
 from app.core.scheduler import start_scheduler, stop_scheduler
+from app.services import auth_events, qr_render_cache, scan_ingestion, sessions, widgets
 
 logging.basicConfig(level=logging.INFO)
 
@@ -88,9 +91,28 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger = logging.getLogger(__name__)
     logger.info("Starting background scheduler...")
     start_scheduler()
+    await open_async_pool()
+    scan_ingestion.buffer.start()
+    widget_warmup = asyncio.create_task(widgets.warm_widget_renders())
     yield
+    widget_warmup.cancel()
     logger.info("Stopping background scheduler...")
     stop_scheduler()
+    await scan_ingestion.buffer.stop()
+    qr_render_cache.shutdown_render_pool()
+    try:
+        sessions.flush_session_touches()
+    except Exception as e:
+        logger.error(f"Failed to flush session touches on shutdown: {e}")
+    try:
+        widgets.flush_widget_embed_counts()
+    except Exception as e:
+        logger.error(f"Failed to flush widget embed counts on shutdown: {e}")
+    try:
+        auth_events.flush_auth_events()
+    except Exception as e:
+        logger.error(f"Failed to flush auth events on shutdown: {e}")
+    await close_async_pool()
 
 
 def create_app() -> FastAPI:
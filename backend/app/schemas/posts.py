@@ -72,4 +72,5 @@ class OrganizationPostsResponse(BaseModel):
 class PublicOrganizationPostsResponse(BaseModel):
     items: list[PublicOrganizationPost]
     total: int
+    next_cursor: str | None = None
 
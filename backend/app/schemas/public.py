@@ -72,4 +72,5 @@ class PublicOrganizationDetails(BaseModel):
 class PublicOrganizationsResponse(BaseModel):
     items: List[PublicOrganizationSummary]
     total: int
+    next_cursor: str | None = None
 
@@ -85,6 +85,7 @@ class PublicReviewsResponse(BaseModel):
     items: list[PublicReview]
     total: int
     average_rating: float | None = None
+    next_cursor: str | None = None
 
 
 class ReviewStats(BaseModel):
@@ -100,6 +100,22 @@ class SendNotificationRequest(BaseModel):
     notification_type: str = 'general'
 
 
+class TelegramBroadcast(BaseModel):
+    """Fan-out of a notification to organization subscribers."""
+    id: str
+    organization_id: str
+    notification_type: str
+    status: str
+    total_recipients: int = 0
+    sent_count: int = 0
+    failed_count: int = 0
+    cursor_telegram_id: Optional[int] = None
+    last_error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+
+
 class BotStats(BaseModel):
     """Bot usage statistics."""
     total_users: int
@@ -9,10 +9,17 @@ from psycopg import sql
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.core.pagination import decode_cursor, page_rows
 from app.services.admin_guard import assert_platform_admin
 
 IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
 ALLOWED_COLUMN_TYPES = {'text', 'integer', 'bigint', 'numeric', 'uuid', 'boolean', 'timestamptz', 'jsonb'}
+# Column types whose values survive a round trip through a pagination cursor
+KEYSET_COLUMN_TYPES = {
+    'smallint', 'integer', 'bigint', 'numeric', 'boolean', 'uuid', 'date',
+    'text', 'character varying', 'character',
+    'timestamp with time zone', 'timestamp without time zone',
+}
 
 
 def _validate_identifier(value: str) -> str:
@@ -85,6 +92,38 @@ def get_table_columns(user_id: str, table_name: str) -> List[Dict[str, Any]]:
         return columns
 
 
+def _primary_key_columns(cur, table_name: str) -> List[str]:
+    cur.execute(
+        '''
+        SELECT pa.attname
+        FROM pg_constraint pc
+        JOIN LATERAL unnest(pc.conkey) WITH ORDINALITY AS k(attnum, position) ON true
+        JOIN pg_attribute pa ON pa.attrelid = pc.conrelid AND pa.attnum = k.attnum
+        WHERE pc.contype = 'p' AND pc.conrelid = to_regclass(format('public.%%I', %s))
+        ORDER BY k.position
+        ''',
+        (table_name,),
+    )
+    return [row['attname'] for row in cur.fetchall()]
+
+
+def _keyset_columns(
+    columns: Sequence[Dict[str, Any]],
+    primary_key: List[str],
+    order_by: str | None,
+) -> List[str]:
+    """Columns to page by, or [] when the table has to be paged by offset."""
+    if not primary_key:
+        return []
+    keyset = ([order_by] if order_by and order_by not in primary_key else []) + primary_key
+    by_name = {col['column_name']: col for col in columns}
+    for col_name in keyset:
+        col = by_name.get(col_name)
+        if not col or col['is_nullable'] or col['data_type'] not in KEYSET_COLUMN_TYPES:
+            return []
+    return keyset
+
+
 def get_table_rows(
     user_id: str,
     table_name: str,
@@ -92,7 +131,14 @@ def get_table_rows(
     offset: int = 0,
     search: str | None = None,
     order_by: str | None = None,
+    cursor: str | None = None,
 ) -> Dict[str, Any]:
+    """Rows of a table, by offset or by keyset cursor.
+
+    With a primary key the rows are ordered by (order_by, primary key) and a
+    next_cursor is returned; a NULL-able order_by column, or a column type the
+    cursor cannot encode (bytea, time, interval, ...), falls back to offset.
+    """
     assert_platform_admin(user_id)
     table_name = _validate_identifier(table_name)
     limit = min(max(limit, 1), 200)
@@ -101,7 +147,7 @@ def get_table_rows(
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
             '''
-            SELECT column_name, data_type
+            SELECT column_name, data_type, is_nullable = 'YES' AS is_nullable
             FROM information_schema.columns
             WHERE table_schema = 'public' AND table_name = %s
             ORDER BY ordinal_position
@@ -113,21 +159,45 @@ def get_table_rows(
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Table not found')
 
         text_columns = [col['column_name'] for col in columns if col['data_type'] in ('text', 'character varying')]
-        order_clause = sql.SQL('')
         if order_by:
             order_by = _validate_identifier(order_by)
             if order_by not in [col['column_name'] for col in columns]:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Unknown order column')
-            order_clause = sql.SQL('ORDER BY {}').format(sql.Identifier(order_by))
 
-        where_clause = sql.SQL('')
+        primary_key = _primary_key_columns(cur, table_name)
+        keyset = _keyset_columns(columns, primary_key, order_by)
+        ordering = f'admin:{table_name}:{order_by or ""}'
+
+        order_clause = sql.SQL('')
+        if keyset:
+            order_clause = sql.SQL(' ORDER BY ') + sql.SQL(', ').join(sql.Identifier(col) for col in keyset)
+        elif order_by:
+            order_clause = sql.SQL(' ORDER BY {}').format(sql.Identifier(order_by))
+
+        conditions: List[sql.Composable] = []
         params: List[Any] = []
         if search and text_columns:
-            conditions = [
+            matches = [
                 sql.SQL('{}::text ILIKE %s').format(sql.Identifier(col_name)) for col_name in text_columns
             ]
-            where_clause = sql.SQL('WHERE (') + sql.SQL(' OR ').join(conditions) + sql.SQL(')')
-            params.append(f'%{search}%')
+            conditions.append(sql.SQL('(') + sql.SQL(' OR ').join(matches) + sql.SQL(')'))
+            params.extend([f'%{search}%'] * len(text_columns))
+        if cursor:
+            if not keyset:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Cursor is not supported for this order')
+            values = decode_cursor(cursor, ordering, len(keyset))
+            conditions.append(
+                sql.SQL('({}) > ({})').format(
+                    sql.SQL(', ').join(sql.Identifier(col) for col in keyset),
+                    sql.SQL(', ').join(sql.Placeholder() * len(keyset)),
+                )
+            )
+            params.extend(values)
+            offset = 0
+
+        where_clause = sql.SQL('')
+        if conditions:
+            where_clause = sql.SQL('WHERE ') + sql.SQL(' AND ').join(conditions)
 
         query = (
             sql.SQL('SELECT * FROM {table} ').format(table=sql.Identifier('public', table_name))
@@ -136,15 +206,33 @@ def get_table_rows(
             + sql.SQL(' LIMIT %s OFFSET %s')
         )
         with conn.cursor(row_factory=dict_row) as data_cur:
-            data_cur.execute(query, (*params, limit, offset))
+            data_cur.execute(query, (*params, limit + 1, offset))
             rows = data_cur.fetchall()
 
+        next_cursor = None
+        if keyset:
+            rows, next_cursor = page_rows(rows, limit, ordering, lambda row: [row[col] for col in keyset])
+        else:
+            rows = rows[:limit]
+
+        # Planner estimate instead of COUNT(*); unfiltered tables only
+        approx_total = None
+        if not search:
+            cur.execute(
+                "SELECT GREATEST(reltuples, 0)::bigint AS approx FROM pg_class WHERE oid = to_regclass(format('public.%%I', %s))",
+                (table_name,),
+            )
+            row = cur.fetchone()
+            approx_total = row['approx'] if row else None
+
         return {
             'columns': [col['column_name'] for col in columns],
             'rows': rows,
             'limit': limit,
             'offset': offset,
             'count': len(rows),
+            'next_cursor': next_cursor,
+            'approx_total': approx_total,
         }
 
 
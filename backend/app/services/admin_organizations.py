@@ -5,6 +5,7 @@ Handles organization management for platform admins.
 from typing import Optional
 from psycopg.rows import dict_row
 
+from app.core.cache import invalidate_tags, organization_tag
 from app.core.db import get_connection
 from app.services.admin_guard import assert_platform_admin
 
@@ -187,6 +188,7 @@ def update_organization_status(
                 raise ValueError('Organization not found')
             
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
             
             return {
                 'id': str(row['id']),
@@ -248,6 +250,7 @@ def block_organization(
             )
             row = cur.fetchone()
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
             
             return {
                 'id': str(row['id']),
@@ -422,6 +425,7 @@ def update_organization_details(
                 )
             
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
             
             return get_organization_details(organization_id, admin_user_id)
 
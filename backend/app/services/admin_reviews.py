@@ -5,6 +5,7 @@ Handles global review moderation for platform admins.
 from typing import Optional
 from psycopg.rows import dict_row
 
+from app.core.cache import invalidate_tags, organization_tag
 from app.core.db import get_connection
 from app.schemas.reviews import Review, ReviewModeration
 from app.services.admin_guard import assert_platform_admin
@@ -160,6 +161,7 @@ def admin_moderate_review(
             )
             row = cur.fetchone()
             conn.commit()
+            invalidate_tags(organization_tag(row['organization_id']))
             
             return Review(
                 id=str(row['id']),
@@ -7,6 +7,7 @@ from psycopg.rows import dict_row
 
 from app.core.db import get_connection
 from app.services.admin_guard import assert_platform_admin
+from app.services.sessions import invalidate_user
 
 
 def list_all_users(
@@ -137,6 +138,7 @@ def update_user_role(
             platform_roles = [r['role'] for r in cur.fetchall()]
             
             conn.commit()
+            invalidate_user(target_user_id)
             
             return {
                 'id': str(row['id']),
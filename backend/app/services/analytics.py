@@ -7,6 +7,7 @@ from psycopg.rows import dict_row
 
 from app.core.db import get_connection
 from app.schemas.analytics import CountryMetric, DailyMetric, QROverviewResponse, SourceMetric
+from app.services.qr_rollups import scan_aggregate
 
 
 def _ensure_member(cur, organization_id: str, user_id: str) -> None:
@@ -23,69 +24,36 @@ def get_qr_overview(organization_id: str, user_id: str, days: int = 30) -> QROve
     start = end - timedelta(days=days)
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         _ensure_member(cur, organization_id, user_id)
-        cur.execute(
-            '''
-            SELECT
-                COUNT(*) AS total_scans,
-                MIN(qe.occurred_at) AS first_scan,
-                MAX(qe.occurred_at) AS last_scan
-            FROM qr_events qe
-            JOIN qr_codes qc ON qc.id = qe.qr_code_id
-            WHERE qc.organization_id = %s
-            ''',
-            (organization_id,),
-        )
-        totals = cur.fetchone()
+        totals = scan_aggregate(cur, organization_id=organization_id)[0]
 
-        cur.execute(
-            '''
-            SELECT date_trunc('day', qe.occurred_at) AS day, COUNT(*) AS count
-            FROM qr_events qe
-            JOIN qr_codes qc ON qc.id = qe.qr_code_id
-            WHERE qc.organization_id = %s
-              AND qe.occurred_at BETWEEN %s AND %s
-            GROUP BY day
-            ORDER BY day ASC
-            ''',
-            (organization_id, start, end),
-        )
-        daily = [DailyMetric(date=row['day'], count=row['count']) for row in cur.fetchall()]
+        daily_rows = scan_aggregate(cur, organization_id=organization_id, since=start, by_day=True, order_by='day ASC')
+        daily = [DailyMetric(date=row['day'], count=row['count']) for row in daily_rows]
 
         # Метрики по странам
-        cur.execute(
-            '''
-            SELECT qe.country, COUNT(*) AS count
-            FROM qr_events qe
-            JOIN qr_codes qc ON qc.id = qe.qr_code_id
-            WHERE qc.organization_id = %s
-              AND qe.occurred_at BETWEEN %s AND %s
-            GROUP BY qe.country
-            ORDER BY count DESC
-            LIMIT 10
-            ''',
-            (organization_id, start, end),
+        country_rows = scan_aggregate(
+            cur,
+            organization_id=organization_id,
+            since=start,
+            group_by=['country'],
+            order_by='count DESC',
+            limit=10,
         )
-        by_country = [CountryMetric(country=row['country'], count=row['count']) for row in cur.fetchall()]
+        by_country = [CountryMetric(country=row['country'], count=row['count']) for row in country_rows]
 
         # Метрики по источникам (utm_source)
-        cur.execute(
-            '''
-            SELECT qe.utm_source AS source, COUNT(*) AS count
-            FROM qr_events qe
-            JOIN qr_codes qc ON qc.id = qe.qr_code_id
-            WHERE qc.organization_id = %s
-              AND qe.occurred_at BETWEEN %s AND %s
-              AND qe.utm_source IS NOT NULL
-            GROUP BY qe.utm_source
-            ORDER BY count DESC
-            LIMIT 10
-            ''',
-            (organization_id, start, end),
+        source_rows = scan_aggregate(
+            cur,
+            organization_id=organization_id,
+            since=start,
+            group_by=['utm_source'],
+            where='utm_source IS NOT NULL',
+            order_by='count DESC',
+            limit=10,
         )
-        by_source = [SourceMetric(source=row['source'], count=row['count']) for row in cur.fetchall()]
+        by_source = [SourceMetric(source=row['utm_source'], count=row['count']) for row in source_rows]
 
     return QROverviewResponse(
-        total_scans=totals['total_scans'] or 0,
+        total_scans=totals['count'] or 0,
         first_scan_at=totals['first_scan'],
         last_scan_at=totals['last_scan'],
         daily=daily,
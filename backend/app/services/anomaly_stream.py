@@ -0,0 +1,422 @@
+"""
+Streaming anomaly rule evaluation for scan fingerprints.
+
+Keeps per-QR-code sliding-window state in memory and updates it as each
+fingerprint is recorded, so every active anomaly_rules row is evaluated in
+constant time per scan instead of running aggregate queries:
+- velocity: scans in the window
+- geographic_spread: consecutive located scans further apart than the limit
+  (same pairing as detect_geographic_impossibility())
+- device_diversity: distinct device_id_hash values in the window
+- network_anomaly: VPN/datacenter/Tor share of scans in the window
+- device_repetition: devices with more scans than the limit in the window
+
+State for a QR code is rebuilt from scan_fingerprints on first use, when
+its rules need a window it does not track, and every
+anomaly_state_resync_seconds so scans recorded by other worker processes
+are picked up. Work on one QR code, rebuilds included, is serialized by a
+striped per-code lock; the evaluator-wide lock only guards the shared maps
+and is never held during SQL.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+from app.schemas.anti_counterfeit import AnomalyCheckResult
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EARTH_RADIUS_KM = 6371
+LOCK_STRIPES = 64
+
+# window_hours used when a rule does not set it
+DEFAULT_WINDOW_HOURS = {
+    'velocity': 24,
+    'geographic_spread': 1,
+    'device_diversity': 24,
+    'network_anomaly': 24,
+    'device_repetition': 1,
+}
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Haversine distance, same formula as calculate_distance_km()"""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+@dataclass
+class Scan:
+    at: float  # epoch seconds
+    device: Optional[str] = None
+    is_vpn: bool = False
+    is_datacenter: bool = False
+    is_tor: bool = False
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> 'Scan':
+        created_at = row['created_at']
+        return cls(
+            at=created_at.timestamp() if isinstance(created_at, datetime) else float(created_at),
+            device=row.get('device_id_hash'),
+            is_vpn=bool(row.get('is_vpn')),
+            is_datacenter=bool(row.get('is_datacenter')),
+            is_tor=bool(row.get('is_tor')),
+            latitude=float(row['latitude']) if row.get('latitude') is not None else None,
+            longitude=float(row['longitude']) if row.get('longitude') is not None else None,
+        )
+
+
+class SlidingWindow:
+    """Counters over the scans of the last `seconds`, updated incrementally"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.scans: deque[Scan] = deque()
+        self.vpn = self.datacenter = self.tor = 0
+        self.devices: Counter[str] = Counter()
+        # device threshold -> devices with more scans than the threshold
+        self._over: dict[int, int] = {}
+        # Consecutive located scan pairs, by the earlier scan's time
+        self._pair_max: deque[tuple[float, float]] = deque()  # monotonic, largest distance first
+        self._far_pairs: dict[float, deque[float]] = {}  # distance limit -> earlier scan times
+        self._pairs: deque[tuple[float, float]] = deque()
+
+    @property
+    def total(self) -> int:
+        return len(self.scans)
+
+    def add(self, scan: Scan) -> None:
+        self.scans.append(scan)
+        self.vpn += scan.is_vpn
+        self.datacenter += scan.is_datacenter
+        self.tor += scan.is_tor
+        if scan.device:
+            count = self.devices[scan.device] + 1
+            self.devices[scan.device] = count
+            for threshold in self._over:
+                if count == threshold + 1:
+                    self._over[threshold] += 1
+
+    def add_pair(self, earlier_at: float, distance: float) -> None:
+        self._pairs.append((earlier_at, distance))
+        while self._pair_max and self._pair_max[-1][1] <= distance:
+            self._pair_max.pop()
+        self._pair_max.append((earlier_at, distance))
+        for limit, times in self._far_pairs.items():
+            if distance > limit:
+                times.append(earlier_at)
+
+    def expire(self, now: float) -> None:
+        cutoff = now - self.seconds
+        while self.scans and self.scans[0].at < cutoff:
+            scan = self.scans.popleft()
+            self.vpn -= scan.is_vpn
+            self.datacenter -= scan.is_datacenter
+            self.tor -= scan.is_tor
+            if scan.device:
+                count = self.devices[scan.device]
+                for threshold in self._over:
+                    if count == threshold + 1:
+                        self._over[threshold] -= 1
+                if count == 1:
+                    del self.devices[scan.device]
+                else:
+                    self.devices[scan.device] = count - 1
+        while self._pairs and self._pairs[0][0] < cutoff:
+            self._pairs.popleft()
+        while self._pair_max and self._pair_max[0][0] < cutoff:
+            self._pair_max.popleft()
+        for times in self._far_pairs.values():
+            while times and times[0] < cutoff:
+                times.popleft()
+
+    def devices_over(self, threshold: int) -> int:
+        if threshold not in self._over:
+            self._over[threshold] = sum(1 for count in self.devices.values() if count > threshold)
+        return self._over[threshold]
+
+    def far_pairs(self, limit: float) -> int:
+        if limit not in self._far_pairs:
+            self._far_pairs[limit] = deque(at for at, distance in self._pairs if distance > limit)
+        return len(self._far_pairs[limit])
+
+    def max_pair_distance(self) -> float:
+        return self._pair_max[0][1] if self._pair_max else 0
+
+
+@dataclass
+class QRState:
+    organization_id: str
+    windows: dict[float, SlidingWindow]
+    synced_at: float
+    last_located: Optional[Scan] = None
+    active_rules: set[str] = field(default_factory=set)
+
+    def add(self, scan: Scan) -> None:
+        for window in self.windows.values():
+            window.expire(scan.at)
+            window.add(scan)
+        if scan.latitude is not None and scan.longitude is not None:
+            previous = self.last_located
+            if previous is not None:
+                distance = distance_km(previous.latitude, previous.longitude, scan.latitude, scan.longitude)
+                for window in self.windows.values():
+                    window.add_pair(previous.at, distance)
+            self.last_located = scan
+
+
+def _parameters(rule: dict) -> dict:
+    params = rule.get('parameters') or {}
+    return json.loads(params) if isinstance(params, str) else params
+
+
+def _window_seconds(rule: dict) -> float:
+    params = _parameters(rule)
+    hours = params.get('window_hours', DEFAULT_WINDOW_HOURS.get(rule['rule_type'], 24))
+    return float(hours) * 3600
+
+
+def evaluate_rule(rule: dict, window: SlidingWindow) -> Optional[dict]:
+    """Details of the anomaly if the rule fires, else None"""
+    params = _parameters(rule)
+    rule_type = rule['rule_type']
+
+    if rule_type == 'velocity':
+        max_scans = params.get('max_scans', 100)
+        if window.total > max_scans:
+            return {'scan_count': window.total, 'threshold': max_scans}
+
+    elif rule_type == 'geographic_spread':
+        pairs = window.far_pairs(float(params.get('max_distance_km', 500)))
+        if pairs:
+            return {'max_distance_km': window.max_pair_distance(), 'impossible_pairs': pairs}
+
+    elif rule_type == 'device_diversity':
+        threshold = params.get('unique_devices_threshold', 50)
+        if len(window.devices) > threshold:
+            return {'unique_devices': len(window.devices), 'threshold': threshold}
+
+    elif rule_type == 'network_anomaly':
+        threshold_percent = params.get('threshold_percent', 20)
+        if window.total:
+            percent = (window.vpn + window.datacenter + window.tor) / window.total * 100
+            if percent > threshold_percent:
+                return {
+                    'suspicious_percent': round(percent, 1),
+                    'vpn_count': window.vpn,
+                    'datacenter_count': window.datacenter,
+                    'tor_count': window.tor,
+                }
+
+    elif rule_type == 'device_repetition':
+        max_per_device = params.get('max_scans_per_device', 10)
+        repetitive = window.devices_over(max_per_device)
+        if repetitive:
+            return {'repetitive_devices': repetitive, 'max_scans': max(window.devices.values())}
+
+    return None
+
+
+class AnomalyEvaluator:
+    """Per-process streaming evaluator; thread-safe"""
+
+    def __init__(self, max_codes: int, rules_ttl: float, resync_seconds: float):
+        self.max_codes = max_codes
+        self.rules_ttl = rules_ttl
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._code_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._states: OrderedDict[str, QRState] = OrderedDict()
+        self._rules: dict[str, tuple[float, list[dict]]] = {}
+        self._stats = {'scans': 0, 'rebuilds': 0, 'rule_loads': 0, 'alerts': 0}
+
+    # Rules
+
+    def rules_for(self, organization_id: str) -> list[dict]:
+        with self._lock:
+            cached = self._rules.get(organization_id)
+        if cached and time.monotonic() - cached[0] < self.rules_ttl:
+            return cached[1]
+        with get_connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    'SELECT * FROM anomaly_rules WHERE organization_id = %s AND is_active = true',
+                    (organization_id,),
+                )
+                rules = cur.fetchall()
+        with self._lock:
+            self._rules[organization_id] = (time.monotonic(), rules)
+            self._stats['rule_loads'] += 1
+        return rules
+
+    def invalidate_rules(self, organization_id: str) -> None:
+        with self._lock:
+            self._rules.pop(organization_id, None)
+
+    # State
+
+    def _organization_of(self, qr_code_id: str) -> Optional[str]:
+        with get_connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute('SELECT organization_id FROM qr_codes WHERE id = %s', (qr_code_id,))
+                row = cur.fetchone()
+        return str(row['organization_id']) if row else None
+
+    def _load_state(self, qr_code_id: str, organization_id: Optional[str], windows: set[float]) -> QRState:
+        """Rebuild a QR code's windows from scan_fingerprints"""
+        rows = []
+        if windows:
+            with get_connection() as conn:
+                with conn.cursor(row_factory=dict_row) as cur:
+                    cur.execute(
+                        '''
+                        SELECT created_at, device_id_hash, is_vpn, is_datacenter, is_tor, latitude, longitude
+                        FROM scan_fingerprints
+                        WHERE qr_code_id = %s AND created_at >= NOW() - make_interval(secs => %s)
+                        ORDER BY created_at
+                        ''',
+                        (qr_code_id, max(windows)),
+                    )
+                    rows = cur.fetchall()
+        state = QRState(
+            organization_id=organization_id,
+            windows={seconds: SlidingWindow(seconds) for seconds in windows},
+            synced_at=time.monotonic(),
+        )
+        for row in rows:
+            state.add(Scan.from_row(row))
+        with self._lock:
+            self._stats['rebuilds'] += 1
+        return state
+
+    def _code_lock(self, qr_code_id: str) -> threading.Lock:
+        return self._code_locks[hash(qr_code_id) % LOCK_STRIPES]
+
+    def _state(
+        self,
+        qr_code_id: str,
+        organization_id: Optional[str],
+        refresh: bool = False,
+    ) -> tuple[QRState, list[dict], bool]:
+        """
+        State and active rules for a QR code; the flag tells whether it was just rebuilt.
+
+        Called with the code's lock held; SQL runs outside the evaluator lock.
+        """
+        with self._lock:
+            state = self._states.get(qr_code_id)
+        organization_id = organization_id or (state.organization_id if state else None)
+        if organization_id is None:
+            organization_id = self._organization_of(qr_code_id)
+        rules = self.rules_for(organization_id) if organization_id else []
+        windows = {_window_seconds(rule) for rule in rules}
+
+        stale = (
+            state is None
+            or refresh
+            or not windows <= state.windows.keys()
+            or time.monotonic() - state.synced_at > self.resync_seconds
+        )
+        if stale:
+            active = state.active_rules if state else set()
+            state = self._load_state(qr_code_id, organization_id, windows)
+            state.active_rules = active
+        with self._lock:
+            self._states[qr_code_id] = state
+            self._states.move_to_end(qr_code_id)
+            while len(self._states) > self.max_codes:
+                self._states.popitem(last=False)
+        return state, rules, stale
+
+    def _evaluate(self, qr_code_id: str, state: QRState, rules: list[dict], now: float) -> AnomalyCheckResult:
+        anomalies = []
+        for window in state.windows.values():
+            window.expire(now)
+        for rule in rules:
+            details = evaluate_rule(rule, state.windows[_window_seconds(rule)])
+            if details is not None:
+                anomalies.append({
+                    'rule_id': str(rule['id']),
+                    'rule_name': rule['rule_name'],
+                    'rule_type': rule['rule_type'],
+                    'severity': rule['severity'],
+                    'details': details,
+                })
+        return AnomalyCheckResult(
+            qr_code_id=qr_code_id,
+            checked_at=datetime.now(timezone.utc),
+            rules_checked=len(rules),
+            anomalies_detected=len(anomalies),
+            anomalies=anomalies,
+            highest_severity=max((a['severity'] for a in anomalies), default=None),
+        )
+
+    def observe(self, qr_code_id: str, fingerprint: dict[str, Any]) -> tuple[AnomalyCheckResult, list[dict]]:
+        """
+        Add a just-recorded fingerprint row and evaluate all rules.
+
+        Returns the check result and the anomalies whose rule was not firing
+        before this scan, so callers can alert once per episode.
+        """
+        with self._code_lock(qr_code_id):
+            state, rules, rebuilt = self._state(qr_code_id, None)
+            if not rebuilt:
+                # A rebuilt state already contains the committed row
+                state.add(Scan.from_row(fingerprint))
+            with self._lock:
+                self._stats['scans'] += 1
+            result = self._evaluate(qr_code_id, state, rules, time.time())
+            firing = {a['rule_id'] for a in result.anomalies}
+            new = [a for a in result.anomalies if a['rule_id'] not in state.active_rules]
+            state.active_rules = firing
+            return result, new
+
+    def check(self, qr_code_id: str, organization_id: str, refresh: bool = False) -> AnomalyCheckResult:
+        with self._code_lock(qr_code_id):
+            state, rules, _ = self._state(qr_code_id, organization_id, refresh=refresh)
+            return self._evaluate(qr_code_id, state, rules, time.time())
+
+    def organization_for(self, qr_code_id: str) -> Optional[str]:
+        with self._lock:
+            state = self._states.get(qr_code_id)
+            return state.organization_id if state else None
+
+    def record_alert(self) -> None:
+        with self._lock:
+            self._stats['alerts'] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'tracked_codes': len(self._states)}
+
+
+evaluator = AnomalyEvaluator(
+    max_codes=settings.anomaly_stream_max_codes,
+    rules_ttl=settings.anomaly_rules_cache_seconds,
+    resync_seconds=settings.anomaly_state_resync_seconds,
+)
+
+
+def get_anomaly_stream_stats() -> dict:
+    return evaluator.get_stats()
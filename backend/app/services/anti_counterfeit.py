@@ -8,7 +8,8 @@ from __future__ import annotations
 
 import hashlib
 import json
-from datetime import datetime, timedelta, timezone
+import logging
+from datetime import timedelta
 from decimal import Decimal
 from typing import Any, Literal
 from uuid import UUID
@@ -39,6 +40,9 @@ from app.schemas.anti_counterfeit import (
     GeographicCluster,
     AlertStatistics,
 )
+from app.services import anomaly_stream
+
+logger = logging.getLogger(__name__)
 
 MANAGER_ROLES = ("owner", "admin", "manager")
 ANALYST_ROLES = ("owner", "admin", "manager", "analyst")
@@ -206,7 +210,21 @@ def record_scan_fingerprint(
             row = cur.fetchone()
             conn.commit()
 
-            return ScanFingerprint(**row)
+    _evaluate_scan(qr_code_id, row)
+    return ScanFingerprint(**row)
+
+
+def _evaluate_scan(qr_code_id: str, fingerprint: dict) -> None:
+    """Evaluate anomaly rules for a recorded scan; alert when a rule starts firing."""
+    try:
+        result, new_anomalies = anomaly_stream.evaluator.observe(qr_code_id, fingerprint)
+        if new_anomalies:
+            organization_id = anomaly_stream.evaluator.organization_for(qr_code_id)
+            if organization_id and auto_create_alert_if_needed(qr_code_id, organization_id, result):
+                anomaly_stream.evaluator.record_alert()
+    except Exception as e:
+        # Never fail the scan because of anomaly evaluation
+        logger.warning(f"Streaming anomaly check failed for {qr_code_id}: {e}")
 
 
 def get_fingerprints_for_qr(
@@ -250,154 +268,11 @@ def run_anomaly_check(qr_code_id: str, organization_id: str) -> AnomalyCheckResu
     """
     Run all active anomaly detection rules against a QR code.
 
-    Returns a summary of detected anomalies.
+    Returns a summary of detected anomalies. The streaming evaluator state
+    is resynced from scan_fingerprints first (one query for all rules), so
+    scans recorded by other worker processes are included.
     """
-    anomalies = []
-
-    with get_connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
-            # Get active rules for the organization
-            cur.execute(
-                """
-                SELECT * FROM anomaly_rules
-                WHERE organization_id = %s AND is_active = true
-                """,
-                (organization_id,),
-            )
-            rules = cur.fetchall()
-
-            for rule in rules:
-                rule_type = rule["rule_type"]
-                params = rule["parameters"]
-
-                detected = False
-                details = {}
-
-                if rule_type == "velocity":
-                    max_scans = params.get("max_scans", 100)
-                    window_hours = params.get("window_hours", 24)
-
-                    cur.execute(
-                        """
-                        SELECT COUNT(*) as count FROM scan_fingerprints
-                        WHERE qr_code_id = %s
-                          AND created_at >= NOW() - (%s || ' hours')::interval
-                        """,
-                        (qr_code_id, window_hours),
-                    )
-                    count = cur.fetchone()["count"]
-                    if count > max_scans:
-                        detected = True
-                        details = {"scan_count": count, "threshold": max_scans}
-
-                elif rule_type == "geographic_spread":
-                    max_distance_km = params.get("max_distance_km", 500)
-                    window_hours = params.get("window_hours", 1)
-
-                    cur.execute(
-                        """
-                        SELECT * FROM detect_geographic_impossibility(%s, %s, %s)
-                        """,
-                        (qr_code_id, max_distance_km, window_hours),
-                    )
-                    result = cur.fetchone()
-                    if result and result["is_anomaly"]:
-                        detected = True
-                        details = {
-                            "max_distance_km": float(result["max_distance"]) if result["max_distance"] else 0,
-                            "impossible_pairs": result["scan_pairs"],
-                        }
-
-                elif rule_type == "device_diversity":
-                    threshold = params.get("unique_devices_threshold", 50)
-                    window_hours = params.get("window_hours", 24)
-
-                    cur.execute(
-                        """
-                        SELECT * FROM get_device_diversity(%s, %s)
-                        """,
-                        (qr_code_id, window_hours),
-                    )
-                    result = cur.fetchone()
-                    if result and result["unique_devices"] > threshold:
-                        detected = True
-                        details = {
-                            "unique_devices": result["unique_devices"],
-                            "threshold": threshold,
-                        }
-
-                elif rule_type == "network_anomaly":
-                    threshold_percent = params.get("threshold_percent", 20)
-                    window_hours = params.get("window_hours", 24)
-
-                    cur.execute(
-                        """
-                        SELECT
-                            COUNT(*) as total,
-                            COUNT(*) FILTER (WHERE is_vpn = true) as vpn_count,
-                            COUNT(*) FILTER (WHERE is_datacenter = true) as datacenter_count,
-                            COUNT(*) FILTER (WHERE is_tor = true) as tor_count
-                        FROM scan_fingerprints
-                        WHERE qr_code_id = %s
-                          AND created_at >= NOW() - (%s || ' hours')::interval
-                        """,
-                        (qr_code_id, window_hours),
-                    )
-                    result = cur.fetchone()
-                    if result and result["total"] > 0:
-                        total = result["total"]
-                        suspicious = result["vpn_count"] + result["datacenter_count"] + result["tor_count"]
-                        percent = (suspicious / total) * 100
-                        if percent > threshold_percent:
-                            detected = True
-                            details = {
-                                "suspicious_percent": round(percent, 1),
-                                "vpn_count": result["vpn_count"],
-                                "datacenter_count": result["datacenter_count"],
-                                "tor_count": result["tor_count"],
-                            }
-
-                elif rule_type == "device_repetition":
-                    max_per_device = params.get("max_scans_per_device", 10)
-                    window_hours = params.get("window_hours", 1)
-
-                    cur.execute(
-                        """
-                        SELECT device_id_hash, COUNT(*) as count
-                        FROM scan_fingerprints
-                        WHERE qr_code_id = %s
-                          AND device_id_hash IS NOT NULL
-                          AND created_at >= NOW() - (%s || ' hours')::interval
-                        GROUP BY device_id_hash
-                        HAVING COUNT(*) > %s
-                        """,
-                        (qr_code_id, window_hours, max_per_device),
-                    )
-                    rows = cur.fetchall()
-                    if rows:
-                        detected = True
-                        details = {
-                            "repetitive_devices": len(rows),
-                            "max_scans": max(r["count"] for r in rows),
-                        }
-
-                if detected:
-                    anomalies.append({
-                        "rule_id": str(rule["id"]),
-                        "rule_name": rule["rule_name"],
-                        "rule_type": rule_type,
-                        "severity": rule["severity"],
-                        "details": details,
-                    })
-
-            return AnomalyCheckResult(
-                qr_code_id=qr_code_id,
-                checked_at=datetime.now(timezone.utc),
-                rules_checked=len(rules),
-                anomalies_detected=len(anomalies),
-                anomalies=anomalies,
-                highest_severity=max((a["severity"] for a in anomalies), default=None),
-            )
+    return anomaly_stream.evaluator.check(qr_code_id, organization_id, refresh=True)
 
 
 def auto_create_alert_if_needed(
@@ -506,6 +381,7 @@ def create_anomaly_rule(
             )
             row = cur.fetchone()
             conn.commit()
+            anomaly_stream.evaluator.invalidate_rules(organization_id)
             return AnomalyRule(**row)
 
 
@@ -555,6 +431,7 @@ def update_anomaly_rule(
             if not row:
                 raise HTTPException(status_code=404, detail="Rule not found")
             conn.commit()
+            anomaly_stream.evaluator.invalidate_rules(organization_id)
             return AnomalyRule(**row)
 
 
@@ -574,6 +451,7 @@ def delete_anomaly_rule(organization_id: str, rule_id: str, user_id: str) -> Non
             if cur.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Rule not found")
             conn.commit()
+            anomaly_stream.evaluator.invalidate_rules(organization_id)
 
 
 def initialize_default_rules(organization_id: str, user_id: str) -> list[AnomalyRule]:
@@ -584,6 +462,7 @@ def initialize_default_rules(organization_id: str, user_id: str) -> list[Anomaly
 
             cur.execute("SELECT create_default_anomaly_rules(%s)", (organization_id,))
             conn.commit()
+            anomaly_stream.evaluator.invalidate_rules(organization_id)
 
             # Return the created rules
             cur.execute(
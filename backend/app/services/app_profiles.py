@@ -9,6 +9,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.services.sessions import invalidate_user
 
 
 def ensure_app_profile(user_id: str, email: str, display_name: Optional[str] = None) -> dict:
@@ -42,6 +43,7 @@ def ensure_app_profile(user_id: str, email: str, display_name: Optional[str] = N
                     )
                     conn.commit()
                     profile['email'] = email
+                    invalidate_user(user_id)
                 
                 # Update display_name if provided and different
                 if display_name and profile['display_name'] != display_name:
@@ -51,6 +53,7 @@ def ensure_app_profile(user_id: str, email: str, display_name: Optional[str] = N
                     )
                     conn.commit()
                     profile['display_name'] = display_name
+                    invalidate_user(user_id)
                 
                 return dict(profile)
             else:
@@ -97,4 +100,5 @@ def update_profile_role(user_id: str, role: str) -> None:
                 (role, user_id)
             )
             conn.commit()
+    invalidate_user(user_id)
 
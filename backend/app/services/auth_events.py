@@ -1,14 +1,24 @@
 """
 Auth Events Service
 Logs authentication events for rate limiting and audit.
+
+Rate limits are checked against in-memory sliding-window counters
+(app.core.rate_limit), not against the auth_events table. Events are
+buffered and written to auth_events in batches by flush_auth_events(), so
+neither the check nor the logging costs a database round trip on login.
 """
-from datetime import datetime, timedelta, timezone
+import threading
+from collections import deque
+from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import Request
-from psycopg.rows import dict_row
 
+from app.core.config import get_settings
 from app.core.db import get_connection
+from app.core.rate_limit import SlidingWindowLimit
+
+settings = get_settings()
 
 EVENT_TYPES = {
     'login_attempt': 'login_attempt',
@@ -18,6 +28,19 @@ EVENT_TYPES = {
     'password_reset': 'password_reset',
 }
 
+# Events counted against the limits
+RATE_LIMITED_EVENTS = {'login_attempt', 'login_failure'}
+
+# Per-email limits: 5 per minute, 20 per hour
+EMAIL_MINUTE_LIMIT = SlidingWindowLimit('auth_email_minute', 5, 60)
+EMAIL_HOUR_LIMIT = SlidingWindowLimit('auth_email_hour', 20, 3600)
+# Per-IP limits: 10 per minute
+IP_MINUTE_LIMIT = SlidingWindowLimit('auth_ip_minute', 10, 60)
+
+_events_lock = threading.Lock()
+_pending_events: deque[tuple] = deque(maxlen=settings.auth_events_buffer_max)
+_stats = {'buffered': 0, 'written': 0, 'dropped': 0}
+
 
 def get_client_ip(request: Request) -> str:
     """Extract client IP from request."""
@@ -53,6 +76,9 @@ def log_auth_event(
 ) -> None:
     """
     Log an authentication event.
+
+    Login attempts and failures are counted against the rate limits right
+    away; the event itself is buffered and written by flush_auth_events().
     
     Args:
         event_type: One of EVENT_TYPES
@@ -72,16 +98,19 @@ def log_auth_event(
         ip = ip or 'unknown'
         user_agent = user_agent or 'unknown'
     
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                '''
-                INSERT INTO public.auth_events (user_id, event_type, email, ip, user_agent)
-                VALUES (%s, %s, %s, %s, %s)
-                ''',
-                (user_id, event_type, email, ip, user_agent)
-            )
-            conn.commit()
+    email_key = email.lower() if email else None
+    if event_type in RATE_LIMITED_EVENTS:
+        if email_key:
+            EMAIL_MINUTE_LIMIT.hit(email_key)
+            EMAIL_HOUR_LIMIT.hit(email_key)
+        if ip:
+            IP_MINUTE_LIMIT.hit(ip)
+
+    with _events_lock:
+        if len(_pending_events) == _pending_events.maxlen:
+            _stats['dropped'] += 1
+        _pending_events.append((user_id, event_type, email, ip, user_agent, datetime.now(timezone.utc)))
+        _stats['buffered'] += 1
 
 
 def check_rate_limit(email: Optional[str] = None, ip: Optional[str] = None) -> tuple[bool, Optional[int]]:
@@ -97,60 +126,49 @@ def check_rate_limit(email: Optional[str] = None, ip: Optional[str] = None) -> t
         is_blocked: True if rate limit exceeded
         retry_after_seconds: Seconds to wait before retry (if blocked)
     """
-    now = datetime.now(timezone.utc)
-    minute_ago = now - timedelta(minutes=1)
-    hour_ago = now - timedelta(hours=1)
-    
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            # Per-email limits: 5 per minute, 20 per hour
-            if email:
-                cur.execute(
-                    '''
-                    SELECT COUNT(*) as count
-                    FROM public.auth_events
-                    WHERE email = %s 
-                      AND event_type IN ('login_attempt', 'login_failure')
-                      AND created_at > %s
-                    ''',
-                    (email, minute_ago)
-                )
-                minute_count = cur.fetchone()[0]
-                
-                if minute_count >= 5:
-                    return True, 60  # Wait 1 minute
-                
-                cur.execute(
-                    '''
-                    SELECT COUNT(*) as count
-                    FROM public.auth_events
-                    WHERE email = %s 
-                      AND event_type IN ('login_attempt', 'login_failure')
-                      AND created_at > %s
-                    ''',
-                    (email, hour_ago)
-                )
-                hour_count = cur.fetchone()[0]
-                
-                if hour_count >= 20:
-                    return True, 3600  # Wait 1 hour
-            
-            # Per-IP limits: 10 per minute
-            if ip:
-                cur.execute(
-                    '''
-                    SELECT COUNT(*) as count
-                    FROM public.auth_events
-                    WHERE ip = %s 
-                      AND event_type IN ('login_attempt', 'login_failure')
-                      AND created_at > %s
-                    ''',
-                    (ip, minute_ago)
-                )
-                minute_count = cur.fetchone()[0]
-                
-                if minute_count >= 10:
-                    return True, 60  # Wait 1 minute
-    
+    if email:
+        email_key = email.lower()
+        if EMAIL_MINUTE_LIMIT.exceeded(email_key):
+            return True, 60  # Wait 1 minute
+        if EMAIL_HOUR_LIMIT.exceeded(email_key):
+            return True, 3600  # Wait 1 hour
+
+    if ip and IP_MINUTE_LIMIT.exceeded(ip):
+        return True, 60  # Wait 1 minute
+
     return False, None
 
+
+def flush_auth_events() -> int:
+    """Write buffered events to auth_events. Returns number of events written."""
+    with _events_lock:
+        pending = list(_pending_events)
+        _pending_events.clear()
+    if not pending:
+        return 0
+
+    try:
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                '''
+                INSERT INTO public.auth_events (user_id, event_type, email, ip, user_agent, created_at)
+                SELECT * FROM unnest(%s::uuid[], %s::text[], %s::text[], %s::text[], %s::text[], %s::timestamptz[])
+                ''',
+                tuple(list(column) for column in zip(*pending)),
+            )
+            conn.commit()
+    except Exception:
+        # Keep the events for the next run, ahead of newer ones
+        with _events_lock:
+            room = _pending_events.maxlen - len(_pending_events)
+            _pending_events.extendleft(reversed(pending[-room:] if room else []))
+            _stats['dropped'] += len(pending) - min(room, len(pending))
+        raise
+    with _events_lock:
+        _stats['written'] += len(pending)
+    return len(pending)
+
+
+def get_auth_event_stats() -> dict:
+    with _events_lock:
+        return {**_stats, 'pending': len(_pending_events)}
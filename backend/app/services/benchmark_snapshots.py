@@ -0,0 +1,316 @@
+"""
+Category benchmark snapshots.
+
+The benchmarks service compares an organization with the verified
+organizations of its category. Instead of aggregating reviews of every peer
+on each request, this module keeps the per-organization review metrics of
+all verified organizations in memory and derives one snapshot per category:
+- sums for the category averages
+- sorted metric distributions, so a percentile is a binary search
+
+The store is loaded in full every benchmark_snapshot_refresh_seconds. In
+between, organizations whose reviews, organization row or profile changed
+since the last sync (by updated_at) are re-read every
+benchmark_snapshot_sync_seconds, and only the snapshots of categories they
+belong to are rebuilt. Rounding follows the numeric casts of the SQL this
+replaces.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Iterable, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+
+settings = get_settings()
+
+# updated_at is set when a transaction starts; re-read rows this far back
+# so changes committed late are not missed
+SYNC_OVERLAP = timedelta(minutes=5)
+METRICS = ('rating', 'reviews', 'response_rate')
+
+_VECTORS_QUERY = '''
+    SELECT
+        o.id::text as organization_id,
+        p.category,
+        p.tags,
+        COUNT(r.id) as total_reviews,
+        AVG(r.rating) as rating,
+        AVG(r.rating)::numeric(3,2) as avg_rating,
+        COUNT(r.id) FILTER (WHERE r.response IS NOT NULL) as reviews_with_response,
+        AVG(
+            CASE WHEN r.response_at IS NOT NULL AND r.created_at IS NOT NULL
+            THEN EXTRACT(EPOCH FROM (r.response_at - r.created_at)) / 3600
+            END
+        )::numeric(10,2) as avg_response_time_hours
+    FROM organizations o
+    LEFT JOIN organization_profiles p ON p.organization_id = o.id
+    LEFT JOIN reviews r ON r.organization_id = o.id AND r.status = 'approved'
+    WHERE o.verification_status = 'verified' {scope}
+    GROUP BY o.id, p.category, p.tags
+'''
+
+_CHANGED_QUERY = '''
+    SELECT now() as synced_at, ARRAY(
+        SELECT organization_id::text FROM reviews WHERE updated_at > %(since)s
+        UNION SELECT id::text FROM organizations WHERE updated_at > %(since)s
+        UNION SELECT organization_id::text FROM organization_profiles WHERE updated_at > %(since)s
+    ) as organization_ids
+'''
+
+
+def _quantize(value: Optional[Decimal], places: str) -> Optional[Decimal]:
+    """numeric(p, s) cast: round half away from zero"""
+    if value is None:
+        return None
+    return value.quantize(Decimal(places), rounding=ROUND_HALF_UP)
+
+
+def _float(value) -> Optional[float]:
+    # Matches the callers' `float(x) if x else None`
+    return float(value) if value else None
+
+
+@dataclass(frozen=True)
+class OrgVector:
+    """Review metrics of one organization over all approved reviews"""
+    category: Optional[str]
+    tags: Optional[str]
+    total_reviews: int
+    rating: Optional[Decimal]  # exact average, used for percentiles
+    avg_rating: Optional[Decimal]  # numeric(3,2), used for averages
+    reviews_with_response: int
+    avg_response_time_hours: Optional[Decimal]
+
+    @classmethod
+    def from_row(cls, row: dict) -> 'OrgVector':
+        return cls(
+            category=row['category'],
+            tags=row['tags'],
+            total_reviews=row['total_reviews'] or 0,
+            rating=row['rating'],
+            avg_rating=row['avg_rating'],
+            reviews_with_response=row['reviews_with_response'] or 0,
+            avg_response_time_hours=row['avg_response_time_hours'],
+        )
+
+    @property
+    def response_rate(self) -> float:
+        if not self.total_reviews:
+            return 0.0
+        return self.reviews_with_response / self.total_reviews * 100
+
+    def metric(self, metric: str):
+        if metric == 'rating':
+            return self.rating
+        if metric == 'reviews':
+            return self.total_reviews
+        return self.response_rate
+
+    def in_category(self, category: Optional[str]) -> bool:
+        """ILIKE '%category%' on category or tags; no category means everyone"""
+        if not category:
+            return True
+        needle = category.lower()
+        return needle in (self.category or '').lower() or needle in (self.tags or '').lower()
+
+    def as_metrics(self) -> dict[str, Any]:
+        """Same shape as benchmarks._calculate_org_metrics()"""
+        return {
+            'total_reviews': self.total_reviews,
+            'avg_rating': _float(self.avg_rating),
+            'response_rate': self.response_rate,
+            'avg_response_time_hours': _float(self.avg_response_time_hours),
+        }
+
+
+class CategorySnapshot:
+    """Aggregates and sorted distributions over the organizations of a category"""
+
+    def __init__(self, vectors: dict[str, OrgVector]):
+        self.vectors = vectors
+        reviewed = [v for v in vectors.values() if v.total_reviews > 0]
+        self.reviewed = len(reviewed)
+        self.distributions = {
+            metric: sorted(v.metric(metric) for v in reviewed) for metric in METRICS
+        }
+        self.rating_sum = sum((v.avg_rating for v in reviewed), Decimal(0))
+        self.reviews_sum = sum(v.total_reviews for v in reviewed)
+        self.response_rate_sum = sum(v.response_rate for v in reviewed)
+        timed = [v.avg_response_time_hours for v in reviewed if v.avg_response_time_hours is not None]
+        self.response_time_sum = sum(timed, Decimal(0))
+        self.response_time_count = len(timed)
+
+    def peers(self, exclude: str) -> int:
+        return len(self.vectors) - (exclude in self.vectors)
+
+    def _own(self, exclude: str) -> Optional[OrgVector]:
+        """The excluded organization's vector if it counts in the aggregates"""
+        own = self.vectors.get(exclude)
+        return own if own is not None and own.total_reviews > 0 else None
+
+    def averages(self, exclude: str) -> dict[str, Any]:
+        """Same shape as the per-request category aggregation, without `exclude`"""
+        own = self._own(exclude)
+        count = self.reviewed - (own is not None)
+        if count == 0:
+            return {
+                'avg_rating': None,
+                'avg_reviews': None,
+                'avg_response_rate': None,
+                'avg_response_time_hours': None,
+                'total_reviews': 0,
+            }
+
+        rating_sum, reviews_sum = self.rating_sum, self.reviews_sum
+        response_rate_sum = self.response_rate_sum
+        time_sum, time_count = self.response_time_sum, self.response_time_count
+        if own is not None:
+            rating_sum -= own.avg_rating
+            reviews_sum -= own.total_reviews
+            response_rate_sum -= own.response_rate
+            if own.avg_response_time_hours is not None:
+                time_sum -= own.avg_response_time_hours
+                time_count -= 1
+
+        return {
+            'avg_rating': _float(_quantize(rating_sum / count, '0.01')),
+            'avg_reviews': _float(_quantize(Decimal(reviews_sum) / count, '0.01')),
+            'avg_response_rate': _float(_quantize(Decimal(response_rate_sum / count), '0.01')),
+            'avg_response_time_hours': (
+                _float(_quantize(time_sum / time_count, '0.01')) if time_count else None
+            ),
+            'total_reviews': reviews_sum,
+        }
+
+    def percentile(self, metric: str, value, exclude: str) -> Optional[int]:
+        """Share of peers with a lower value; peers without reviews count as not below"""
+        peers = self.peers(exclude)
+        if value is None or peers == 0:
+            return None
+        below = bisect_left(self.distributions[metric], value)
+        own = self._own(exclude)
+        if own is not None and own.metric(metric) < value:
+            below -= 1
+        return min(100, max(0, int(below / peers * 100)))
+
+
+class BenchmarkStore:
+    """Review metrics of verified organizations and per-category snapshots"""
+
+    def __init__(self, refresh_seconds: float, sync_seconds: float, max_categories: int):
+        self.refresh_seconds = refresh_seconds
+        self.sync_seconds = sync_seconds
+        self.max_categories = max_categories
+        self._lock = threading.Lock()
+        self._vectors: dict[str, OrgVector] = {}
+        self._snapshots: OrderedDict[Optional[str], CategorySnapshot] = OrderedDict()
+        self._loaded_at: Optional[float] = None
+        self._synced_at: float = 0.0
+        self._watermark = None  # database time of the last load or sync
+        self._stats = {'full_loads': 0, 'syncs': 0, 'synced_organizations': 0,
+                       'snapshot_builds': 0, 'snapshot_hits': 0}
+
+    # Loading
+
+    def _load(self, cur, organization_ids: Optional[list[str]] = None) -> dict[str, OrgVector]:
+        if organization_ids is None:
+            cur.execute(_VECTORS_QUERY.format(scope=''))
+        else:
+            cur.execute(_VECTORS_QUERY.format(scope='AND o.id = ANY(%s::uuid[])'), (organization_ids,))
+        return {row['organization_id']: OrgVector.from_row(row) for row in cur.fetchall()}
+
+    def _full_load(self) -> None:
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute('SELECT now() as loaded_at')
+            watermark = cur.fetchone()['loaded_at']
+            vectors = self._load(cur)
+        self._vectors = vectors
+        self._snapshots.clear()
+        self._watermark = watermark
+        self._loaded_at = self._synced_at = time.monotonic()
+        self._stats['full_loads'] += 1
+
+    def _sync(self) -> None:
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_CHANGED_QUERY, {'since': self._watermark - SYNC_OVERLAP})
+            row = cur.fetchone()
+            changed = row['organization_ids'] or []
+            fresh = self._load(cur, changed) if changed else {}
+        self.apply_changes(changed, fresh)
+        self._watermark = row['synced_at']
+        self._synced_at = time.monotonic()
+        self._stats['syncs'] += 1
+
+    def apply_changes(self, organization_ids: Iterable[str], fresh: dict[str, OrgVector]) -> None:
+        """Replace vectors of changed organizations and drop the snapshots they touch"""
+        for organization_id in organization_ids:
+            old = self._vectors.pop(organization_id, None)
+            new = fresh.get(organization_id)
+            if old == new:
+                if new is not None:
+                    self._vectors[organization_id] = new
+                continue
+            if new is not None:
+                self._vectors[organization_id] = new
+            self._stats['synced_organizations'] += 1
+            for category in list(self._snapshots):
+                if any(v is not None and v.in_category(category) for v in (old, new)):
+                    del self._snapshots[category]
+
+    def ensure_fresh(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at >= self.refresh_seconds:
+                self._full_load()
+            elif now - self._synced_at >= self.sync_seconds:
+                self._sync()
+
+    # Reading
+
+    def vector(self, organization_id: str) -> Optional[OrgVector]:
+        return self._vectors.get(organization_id)
+
+    def snapshot(self, category: Optional[str]) -> CategorySnapshot:
+        category = category or None
+        with self._lock:
+            snapshot = self._snapshots.get(category)
+            if snapshot is not None:
+                self._snapshots.move_to_end(category)
+                self._stats['snapshot_hits'] += 1
+                return snapshot
+            snapshot = CategorySnapshot({
+                organization_id: vector
+                for organization_id, vector in self._vectors.items()
+                if vector.in_category(category)
+            })
+            self._snapshots[category] = snapshot
+            while len(self._snapshots) > self.max_categories:
+                self._snapshots.popitem(last=False)
+            self._stats['snapshot_builds'] += 1
+            return snapshot
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'organizations': len(self._vectors),
+                    'categories': len(self._snapshots)}
+
+
+store = BenchmarkStore(
+    refresh_seconds=settings.benchmark_snapshot_refresh_seconds,
+    sync_seconds=settings.benchmark_snapshot_sync_seconds,
+    max_categories=settings.benchmark_snapshot_max_categories,
+)
+
+
+def get_benchmark_snapshot_stats() -> dict:
+    return store.get_stats()
@@ -7,6 +7,10 @@ This service calculates:
 - Response rate (% of reviews with owner response)
 - Percentile rankings
 - Trend analysis (current vs previous period)
+
+Category averages and percentiles come from the in-memory category snapshots
+in app.services.benchmark_snapshots; only membership, organization info and
+the organization's own trend need queries per request.
 """
 from __future__ import annotations
 
@@ -18,6 +22,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.services.benchmark_snapshots import store
 from app.schemas.benchmarks import (
     BenchmarkMetrics,
     BenchmarkResponse,
@@ -63,34 +68,6 @@ def _get_organization_info(cur, organization_id: str) -> dict[str, Any]:
     return dict(row)
 
 
-def _get_category_organizations(cur, category: str | None, exclude_org_id: str) -> list[str]:
-    """Get list of organization IDs in the same category."""
-    if not category:
-        # If no category, compare against all verified organizations
-        cur.execute(
-            '''
-            SELECT o.id FROM organizations o
-            WHERE o.verification_status = 'verified'
-              AND o.id != %s
-            ''',
-            (exclude_org_id,),
-        )
-    else:
-        # Find organizations with matching category or tags
-        cur.execute(
-            '''
-            SELECT o.id FROM organizations o
-            LEFT JOIN organization_profiles p ON p.organization_id = o.id
-            WHERE o.verification_status = 'verified'
-              AND o.id != %s
-              AND (p.category ILIKE %s OR p.tags ILIKE %s)
-            ''',
-            (exclude_org_id, f'%{category}%', f'%{category}%'),
-        )
-
-    return [row['id'] for row in cur.fetchall()]
-
-
 def _calculate_org_metrics(
     cur,
     organization_id: str,
@@ -136,131 +113,51 @@ def _calculate_org_metrics(
     }
 
 
-def _calculate_category_metrics(
+def _calculate_period_metrics(
     cur,
-    org_ids: list[str],
-) -> dict[str, Any]:
-    """Calculate aggregate metrics for category organizations."""
-    if not org_ids:
-        return {
-            'avg_rating': None,
-            'avg_reviews': None,
-            'avg_response_rate': None,
-            'avg_response_time_hours': None,
-            'total_reviews': 0,
-        }
-
-    placeholders = ','.join(['%s'] * len(org_ids))
-
+    organization_id: str,
+    previous_start: datetime,
+    current_start: datetime,
+    end_date: datetime,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Metrics for the current and previous trend periods in one pass."""
     cur.execute(
-        f'''
-        WITH org_stats AS (
-            SELECT
-                r.organization_id,
-                COUNT(*) as total_reviews,
-                AVG(r.rating)::numeric(3,2) as avg_rating,
-                COUNT(*) FILTER (WHERE r.response IS NOT NULL) as reviews_with_response,
-                AVG(
-                    CASE WHEN r.response_at IS NOT NULL AND r.created_at IS NOT NULL
-                    THEN EXTRACT(EPOCH FROM (r.response_at - r.created_at)) / 3600
-                    END
-                )::numeric(10,2) as avg_response_time_hours
-            FROM reviews r
-            WHERE r.organization_id IN ({placeholders})
-              AND r.status = 'approved'
-            GROUP BY r.organization_id
-        )
+        '''
         SELECT
-            AVG(avg_rating)::numeric(3,2) as category_avg_rating,
-            AVG(total_reviews)::numeric(10,2) as category_avg_reviews,
-            AVG(
-                CASE WHEN total_reviews > 0
-                THEN (reviews_with_response::float / total_reviews * 100)
-                ELSE 0
-                END
-            )::numeric(5,2) as category_avg_response_rate,
-            AVG(avg_response_time_hours)::numeric(10,2) as category_avg_response_time,
-            SUM(total_reviews) as total_reviews
-        FROM org_stats
+            COUNT(*) FILTER (WHERE r.created_at BETWEEN %(current_start)s AND %(end_date)s) as current_reviews,
+            (AVG(r.rating) FILTER (WHERE r.created_at BETWEEN %(current_start)s AND %(end_date)s))::numeric(3,2) as current_rating,
+            COUNT(*) FILTER (
+                WHERE r.created_at BETWEEN %(current_start)s AND %(end_date)s AND r.response IS NOT NULL
+            ) as current_with_response,
+            COUNT(*) FILTER (WHERE r.created_at BETWEEN %(previous_start)s AND %(current_start)s) as previous_reviews,
+            (AVG(r.rating) FILTER (WHERE r.created_at BETWEEN %(previous_start)s AND %(current_start)s))::numeric(3,2) as previous_rating,
+            COUNT(*) FILTER (
+                WHERE r.created_at BETWEEN %(previous_start)s AND %(current_start)s AND r.response IS NOT NULL
+            ) as previous_with_response
+        FROM reviews r
+        WHERE r.organization_id = %(organization_id)s
+          AND r.status = 'approved'
+          AND r.created_at BETWEEN %(previous_start)s AND %(end_date)s
         ''',
-        org_ids,
+        {
+            'organization_id': organization_id,
+            'previous_start': previous_start,
+            'current_start': current_start,
+            'end_date': end_date,
+        },
     )
     row = cur.fetchone()
 
-    return {
-        'avg_rating': float(row['category_avg_rating']) if row['category_avg_rating'] else None,
-        'avg_reviews': float(row['category_avg_reviews']) if row['category_avg_reviews'] else None,
-        'avg_response_rate': float(row['category_avg_response_rate']) if row['category_avg_response_rate'] else None,
-        'avg_response_time_hours': float(row['category_avg_response_time']) if row['category_avg_response_time'] else None,
-        'total_reviews': row['total_reviews'] or 0,
-    }
-
-
-def _calculate_percentile(
-    cur,
-    org_value: float | None,
-    org_ids: list[str],
-    metric: str,
-) -> int | None:
-    """Calculate percentile ranking for a metric."""
-    if org_value is None or not org_ids:
-        return None
-
-    placeholders = ','.join(['%s'] * len(org_ids))
-
-    if metric == 'rating':
-        query = f'''
-            SELECT COUNT(*) as below_count
-            FROM (
-                SELECT AVG(r.rating) as org_rating
-                FROM reviews r
-                WHERE r.organization_id IN ({placeholders})
-                  AND r.status = 'approved'
-                GROUP BY r.organization_id
-            ) sub
-            WHERE org_rating < %s
-        '''
-    elif metric == 'reviews':
-        query = f'''
-            SELECT COUNT(*) as below_count
-            FROM (
-                SELECT COUNT(*) as org_reviews
-                FROM reviews r
-                WHERE r.organization_id IN ({placeholders})
-                  AND r.status = 'approved'
-                GROUP BY r.organization_id
-            ) sub
-            WHERE org_reviews < %s
-        '''
-    elif metric == 'response_rate':
-        query = f'''
-            SELECT COUNT(*) as below_count
-            FROM (
-                SELECT
-                    CASE WHEN COUNT(*) > 0
-                    THEN (COUNT(*) FILTER (WHERE r.response IS NOT NULL)::float / COUNT(*) * 100)
-                    ELSE 0
-                    END as org_response_rate
-                FROM reviews r
-                WHERE r.organization_id IN ({placeholders})
-                  AND r.status = 'approved'
-                GROUP BY r.organization_id
-            ) sub
-            WHERE org_response_rate < %s
-        '''
-    else:
-        return None
-
-    cur.execute(query, org_ids + [org_value])
-    below_count = cur.fetchone()['below_count']
-
-    total_orgs = len(org_ids)
-    if total_orgs == 0:
-        return None
+    def _period(prefix: str) -> dict[str, Any]:
+        total_reviews = row[f'{prefix}_reviews'] or 0
+        with_response = row[f'{prefix}_with_response'] or 0
+        return {
+            'total_reviews': total_reviews,
+            'avg_rating': float(row[f'{prefix}_rating']) if row[f'{prefix}_rating'] else None,
+            'response_rate': (with_response / total_reviews * 100) if total_reviews > 0 else 0.0,
+        }
 
-    # Percentile = (number of orgs below / total orgs) * 100
-    percentile = int((below_count / total_orgs) * 100)
-    return min(100, max(0, percentile))
+    return _period('current'), _period('previous')
 
 
 def _calculate_diff_percent(value: float | None, category_avg: float | None) -> float | None:
@@ -330,6 +227,9 @@ def get_organization_benchmarks(
     current_period_start = now - timedelta(days=period_days)
     previous_period_start = current_period_start - timedelta(days=period_days)
 
+    # Reload or sync the category snapshots first, on their own connection
+    store.ensure_fresh()
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         # Verify access
         _ensure_member(cur, organization_id, user_id)
@@ -338,24 +238,26 @@ def get_organization_benchmarks(
         org_info = _get_organization_info(cur, organization_id)
         category = org_info.get('category')
 
-        # Get category peers
-        category_org_ids = _get_category_organizations(cur, category, organization_id)
-
-        # Calculate organization's overall metrics
-        org_metrics = _calculate_org_metrics(cur, organization_id)
+        # Category averages and distributions, rebuilt from memory when stale
+        snapshot = store.snapshot(category)
 
-        # Calculate category averages
-        category_metrics = _calculate_category_metrics(cur, category_org_ids)
+        # Organization's overall metrics; unverified organizations are not in the snapshot
+        own_vector = store.vector(organization_id)
+        org_metrics = (
+            own_vector.as_metrics() if own_vector is not None
+            else _calculate_org_metrics(cur, organization_id)
+        )
 
-        # Calculate percentiles
-        rating_percentile = _calculate_percentile(
-            cur, org_metrics['avg_rating'], category_org_ids, 'rating'
+        # Category averages and percentiles, excluding the organization itself
+        category_metrics = snapshot.averages(exclude=organization_id)
+        rating_percentile = snapshot.percentile(
+            'rating', org_metrics['avg_rating'], organization_id
         )
-        reviews_percentile = _calculate_percentile(
-            cur, float(org_metrics['total_reviews']), category_org_ids, 'reviews'
+        reviews_percentile = snapshot.percentile(
+            'reviews', float(org_metrics['total_reviews']), organization_id
         )
-        response_rate_percentile = _calculate_percentile(
-            cur, org_metrics['response_rate'], category_org_ids, 'response_rate'
+        response_rate_percentile = snapshot.percentile(
+            'response_rate', org_metrics['response_rate'], organization_id
         )
 
         # Build metrics comparison
@@ -399,11 +301,8 @@ def get_organization_benchmarks(
         )
 
         # Calculate trends (current period vs previous period)
-        current_metrics = _calculate_org_metrics(
-            cur, organization_id, current_period_start, now
-        )
-        previous_metrics = _calculate_org_metrics(
-            cur, organization_id, previous_period_start, current_period_start
+        current_metrics, previous_metrics = _calculate_period_metrics(
+            cur, organization_id, previous_period_start, current_period_start, now
         )
 
         trends = BenchmarkTrends(
@@ -424,7 +323,7 @@ def get_organization_benchmarks(
         # Build category info
         category_info = CategoryInfo(
             name=category,
-            total_organizations=len(category_org_ids) + 1,  # +1 for the org itself
+            total_organizations=snapshot.peers(organization_id) + 1,  # +1 for the org itself
             total_reviews=category_metrics['total_reviews'] + org_metrics['total_reviews'],
         )
 
@@ -9,7 +9,8 @@ Verifies GOST, ISO, and organic certificates against official registries:
 Includes:
 - Automated verification workflows
 - Auto-expiry detection and alerting
-- Rate limiting and retry logic
+- Token bucket rate limiting per registry and retry logic
+- Pooled HTTP client shared by adapters and a TTL cache of registry answers
 - Failure handling and fallbacks
 - "Verified by Registry" badge system
 """
@@ -17,18 +18,25 @@ Includes:
 import asyncio
 import hashlib
 import logging
+import math
+import time
 from datetime import date, datetime, timedelta
 from enum import Enum
 from typing import Optional, Dict, Any, List
 from xml.etree import ElementTree as ET
 
 import httpx
+from psycopg.rows import dict_row
 from pydantic import BaseModel, Field
 
-from ..core.supabase import get_supabase_client
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.db import get_async_connection
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 
 # =============================================================================
 # Configuration & Constants
@@ -65,16 +73,19 @@ REGISTRY_ENDPOINTS = {
     RegistryType.ROSACCREDITATION: {
         "base_url": "https://pub.fsa.gov.ru/rss/certificate",
         "rate_limit": 60,  # requests per minute
+        "burst": 5,  # requests allowed back to back
         "timeout": 30,
     },
     RegistryType.IAF_CERTSEARCH: {
         "base_url": "https://www.iafcertsearch.org/api",
         "rate_limit": 100,  # requests per minute
+        "burst": 10,
         "timeout": 30,
     },
     RegistryType.ROSKACHESTVO: {
         "base_url": "https://api.roskachestvo.gov.ru",  # Placeholder
         "rate_limit": 60,
+        "burst": 5,
         "timeout": 30,
     },
 }
@@ -86,6 +97,18 @@ RATE_LIMIT_WINDOW = 60
 MAX_RETRIES = 3
 RETRY_BACKOFF_BASE = 2  # exponential backoff: 2^retry seconds
 
+# Cached registry answer for certificates the registry does not know.
+# Only real answers are cached: adapters raise on transport and parse
+# errors, which are reported as ERROR and retried on the next lookup.
+NOT_FOUND = "not_found"
+
+# Registry answers by registry and certificate number
+_registry_responses = TTLCache(
+    "registry_responses",
+    ttl_seconds=settings.cert_registry_cache_ttl_seconds,
+    max_entries=settings.cert_registry_cache_max_entries,
+)
+
 
 # =============================================================================
 # Data Models
@@ -142,11 +165,55 @@ class ExpiryAlert(BaseModel):
 # Rate Limiter
 # =============================================================================
 
+class TokenBucket:
+    """
+    Token bucket refilled at rate_per_minute, holding at most `capacity` tokens.
+
+    Requests up to the capacity go out back to back; after that they are
+    spaced at the sustained rate.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / RATE_LIMIT_WINDOW  # tokens per second
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
 class RateLimiter:
-    """Token bucket rate limiter with Redis-like in-memory storage."""
+    """Token bucket per registry, sized from REGISTRY_ENDPOINTS."""
 
     def __init__(self):
-        self._buckets: Dict[str, List[datetime]] = {}
+        self._buckets: Dict[RegistryType, TokenBucket] = {}
+
+    def _bucket(self, registry_type: RegistryType) -> Optional[TokenBucket]:
+        config = REGISTRY_ENDPOINTS.get(registry_type)
+        if not config:
+            return None
+        bucket = self._buckets.get(registry_type)
+        if bucket is None:
+            bucket = self._buckets[registry_type] = TokenBucket(
+                config["rate_limit"], config.get("burst", 1)
+            )
+        return bucket
 
     async def check_rate_limit(
         self,
@@ -158,36 +225,49 @@ class RateLimiter:
         Returns:
             (allowed, retry_after_seconds)
         """
-        config = REGISTRY_ENDPOINTS.get(registry_type)
-        if not config:
+        bucket = self._bucket(registry_type)
+        if not bucket:
             return True, None
 
-        limit = config["rate_limit"]
-        now = datetime.utcnow()
-        window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-
-        # Get or create bucket
-        key = f"rate_limit:{registry_type.value}"
-        if key not in self._buckets:
-            self._buckets[key] = []
-
-        # Remove expired timestamps
-        self._buckets[key] = [
-            ts for ts in self._buckets[key]
-            if ts > window_start
-        ]
-
-        # Check limit
-        if len(self._buckets[key]) >= limit:
-            # Calculate when the oldest request expires
-            oldest = min(self._buckets[key])
-            retry_after = int((oldest + timedelta(seconds=RATE_LIMIT_WINDOW) - now).total_seconds())
-            return False, retry_after
-
-        # Add current timestamp
-        self._buckets[key].append(now)
+        wait = bucket.try_acquire()
+        if wait:
+            return False, math.ceil(wait)
         return True, None
 
+    async def acquire(self, registry_type: RegistryType) -> None:
+        """Wait until a request to the registry is allowed."""
+        bucket = self._bucket(registry_type)
+        if bucket:
+            await bucket.acquire()
+
+
+# =============================================================================
+# Pooled HTTP Client
+# =============================================================================
+
+_registry_client: Optional[httpx.AsyncClient] = None
+
+
+def get_registry_client() -> httpx.AsyncClient:
+    """Connection-pooled client shared by all registry adapters."""
+    global _registry_client
+    if _registry_client is None or _registry_client.is_closed:
+        _registry_client = httpx.AsyncClient(
+            headers={"User-Agent": "chestno.ru/1.0 CertificationBot"},
+            limits=httpx.Limits(
+                max_connections=settings.cert_registry_max_connections,
+                max_keepalive_connections=settings.cert_registry_max_connections,
+            ),
+        )
+    return _registry_client
+
+
+async def close_registry_client() -> None:
+    global _registry_client
+    if _registry_client is not None:
+        await _registry_client.aclose()
+        _registry_client = None
+
 
 # =============================================================================
 # Registry Adapters
@@ -267,10 +347,10 @@ class RosaccreditationAdapter:
 
         except httpx.HTTPError as e:
             logger.error(f"Rosaccreditation API error: {e}")
-            return None
+            raise
         except ET.ParseError as e:
             logger.error(f"Failed to parse Rosaccreditation XML: {e}")
-            return None
+            raise
 
     def _extract_field(self, description: str, field_name: str) -> Optional[str]:
         """Extract field value from RSS description."""
@@ -341,7 +421,7 @@ class IAFCertSearchAdapter:
 
         except httpx.HTTPError as e:
             logger.error(f"IAF CertSearch API error: {e}")
-            return None
+            raise
 
 
 class OrganicRussiaAdapter:
@@ -374,37 +454,38 @@ class CertificationVerificationService:
     """Main service for automated certificate verification."""
 
     def __init__(self):
-        self.supabase = get_supabase_client()
         self.rate_limiter = RateLimiter()
         self._client: Optional[httpx.AsyncClient] = None
+        self._adapters: Dict[RegistryType, Any] = {}
 
     async def __aenter__(self):
         """Async context manager entry."""
-        self._client = httpx.AsyncClient(
-            headers={"User-Agent": "chestno.ru/1.0 CertificationBot"}
-        )
+        client = get_registry_client()
+        if client is not self._client:
+            self._client = client
+            self._adapters = {}
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit."""
-        if self._client:
-            await self._client.aclose()
+        """Async context manager exit; the pooled client stays open for reuse."""
 
     async def verify_certificate(
         self,
         certification_id: str,
         request: VerificationRequest,
+        wait_for_rate_limit: bool = False,
     ) -> VerificationResponse:
         """
         Verify a certificate against appropriate registry.
 
         Workflow:
         1. Determine registry type from certification_type_code
-        2. Check rate limits
-        3. Query registry API
-        4. Parse response
-        5. Update database
-        6. Return verification result
+        2. Reuse a cached registry answer for the certificate number, or
+           check rate limits (waiting for a token if wait_for_rate_limit)
+           and query the registry API
+        3. Parse response
+        4. Update database
+        5. Return verification result
         """
         # Generate unique verification ID
         verification_id = hashlib.sha256(
@@ -422,20 +503,29 @@ class CertificationVerificationService:
                     verification_id=verification_id,
                 )
 
-            # Check rate limit
-            allowed, retry_after = await self.rate_limiter.check_rate_limit(registry_type)
-            if not allowed:
-                logger.warning(f"Rate limit exceeded for {registry_type}. Retry after {retry_after}s")
-                return VerificationResponse(
-                    result=VerificationResult.RATE_LIMITED,
-                    registry_type=registry_type,
-                    badge_level=BadgeLevel.DOCUMENT_ONLY,
-                    retry_after=retry_after,
-                    verification_id=verification_id,
-                )
-
-            # Perform verification with retries
-            match = await self._verify_with_retry(registry_type, request)
+            cache_key = f"{registry_type.value}:{request.certificate_number}"
+            cached = _registry_responses.get(cache_key)
+            if cached is not None:
+                match = None if cached == NOT_FOUND else cached
+            else:
+                # Check rate limit
+                if wait_for_rate_limit:
+                    await self.rate_limiter.acquire(registry_type)
+                else:
+                    allowed, retry_after = await self.rate_limiter.check_rate_limit(registry_type)
+                    if not allowed:
+                        logger.warning(f"Rate limit exceeded for {registry_type}. Retry after {retry_after}s")
+                        return VerificationResponse(
+                            result=VerificationResult.RATE_LIMITED,
+                            registry_type=registry_type,
+                            badge_level=BadgeLevel.DOCUMENT_ONLY,
+                            retry_after=retry_after,
+                            verification_id=verification_id,
+                        )
+
+                # Perform verification with retries
+                match = await self._verify_with_retry(registry_type, request)
+                _registry_responses.set(cache_key, match or NOT_FOUND)
 
             if match:
                 # Success: Certificate found in registry
@@ -473,6 +563,15 @@ class CertificationVerificationService:
                 )
 
         except Exception as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                logger.warning(f"Registry rate limit hit verifying {certification_id}")
+                return VerificationResponse(
+                    result=VerificationResult.RATE_LIMITED,
+                    registry_type=registry_type,
+                    badge_level=BadgeLevel.DOCUMENT_ONLY,
+                    error_message=str(e),
+                    verification_id=verification_id,
+                )
             logger.exception(f"Verification failed for {certification_id}: {e}")
             return VerificationResponse(
                 result=VerificationResult.ERROR,
@@ -546,12 +645,13 @@ class CertificationVerificationService:
         if not self._client:
             return None
 
-        adapters = {
-            RegistryType.ROSACCREDITATION: RosaccreditationAdapter(self._client),
-            RegistryType.IAF_CERTSEARCH: IAFCertSearchAdapter(self._client),
-            RegistryType.ORGANIC_RU: OrganicRussiaAdapter(),
-        }
-        return adapters.get(registry_type)
+        if not self._adapters:
+            self._adapters = {
+                RegistryType.ROSACCREDITATION: RosaccreditationAdapter(self._client),
+                RegistryType.IAF_CERTSEARCH: IAFCertSearchAdapter(self._client),
+                RegistryType.ORGANIC_RU: OrganicRussiaAdapter(),
+            }
+        return self._adapters.get(registry_type)
 
     async def _update_certification_verification(
         self,
@@ -560,30 +660,38 @@ class CertificationVerificationService:
         verification_id: str,
     ):
         """Update certification record with verification result."""
-        update_data = {
-            "verification_status": "auto_verified",
-            "external_verification_id": registry_match.registry_id,
-            "last_auto_check_at": datetime.utcnow().isoformat(),
-            "verified_at": registry_match.verified_at.isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
-        }
-
-        # If registry provided expiry date, update it
-        if registry_match.expiry_date:
-            update_data["expiry_date"] = registry_match.expiry_date.isoformat()
-
-        self.supabase.table("producer_certifications").update(update_data).eq(
-            "id", certification_id
-        ).execute()
+        async with get_async_connection() as conn, conn.cursor() as cur:
+            # If registry provided expiry date, update it
+            await cur.execute(
+                """
+                UPDATE producer_certifications
+                SET verification_status = 'auto_verified',
+                    external_verification_id = %s,
+                    last_auto_check_at = now(),
+                    verified_at = %s,
+                    expiry_date = COALESCE(%s, expiry_date),
+                    updated_at = now()
+                WHERE id = %s
+                """,
+                (
+                    registry_match.registry_id,
+                    registry_match.verified_at,
+                    registry_match.expiry_date,
+                    certification_id,
+                ),
+            )
 
-        # Log verification
-        self.supabase.table("certification_verification_log").insert({
-            "certification_id": certification_id,
-            "action": "auto_check_passed",
-            "previous_status": "pending",
-            "new_status": "auto_verified",
-            "notes": f"Verified via registry. ID: {verification_id}",
-        }).execute()
+            # Log verification
+            await cur.execute(
+                """
+                INSERT INTO certification_verification_log (
+                    certification_id, action, previous_status, new_status, notes
+                )
+                VALUES (%s, 'auto_check_passed', 'pending', 'auto_verified', %s)
+                """,
+                (certification_id, f"Verified via registry. ID: {verification_id}"),
+            )
+            await conn.commit()
 
     # =========================================================================
     # Auto-Expiry Detection
@@ -598,37 +706,29 @@ class CertificationVerificationService:
         Returns:
             Number of certifications marked as expired.
         """
-        today = date.today().isoformat()
-
-        # Find verified certifications past expiry
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("id, organization_id, certificate_number")
-            .lt("expiry_date", today)
-            .in_("verification_status", ["verified", "auto_verified"])
-            .execute()
-        )
-
-        expired_count = 0
-        for cert in result.data:
-            # Update status to expired
-            self.supabase.table("producer_certifications").update({
-                "verification_status": "expired",
-                "updated_at": datetime.utcnow().isoformat(),
-            }).eq("id", cert["id"]).execute()
-
-            # Log expiry
-            self.supabase.table("certification_verification_log").insert({
-                "certification_id": cert["id"],
-                "action": "expired",
-                "previous_status": "verified",
-                "new_status": "expired",
-                "notes": "Automatically marked as expired based on expiry_date",
-            }).execute()
-
-            expired_count += 1
-            logger.info(f"Marked certification {cert['id']} as expired")
+        async with get_async_connection() as conn, conn.cursor() as cur:
+            # Mark verified certifications past expiry and log each one
+            await cur.execute(
+                """
+                WITH expired AS (
+                    UPDATE producer_certifications
+                    SET verification_status = 'expired', updated_at = now()
+                    WHERE expiry_date < CURRENT_DATE
+                      AND verification_status IN ('verified', 'auto_verified')
+                    RETURNING id
+                )
+                INSERT INTO certification_verification_log (
+                    certification_id, action, previous_status, new_status, notes
+                )
+                SELECT id, 'expired', 'verified', 'expired',
+                       'Automatically marked as expired based on expiry_date'
+                FROM expired
+                """
+            )
+            expired_count = cur.rowcount
+            await conn.commit()
 
+        logger.info(f"Marked {expired_count} certifications as expired")
         return expired_count
 
     async def get_expiring_certifications(
@@ -641,28 +741,32 @@ class CertificationVerificationService:
         Used for proactive alerts to producers.
         """
         today = date.today()
-        cutoff = (today + timedelta(days=days_ahead)).isoformat()
-
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("id, organization_id, certificate_number, expiry_date, certification_types(name_ru)")
-            .gte("expiry_date", today.isoformat())
-            .lte("expiry_date", cutoff)
-            .in_("verification_status", ["verified", "auto_verified"])
-            .execute()
-        )
+        cutoff = today + timedelta(days=days_ahead)
+
+        async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                """
+                SELECT pc.id::text, pc.organization_id::text, pc.certificate_number,
+                       pc.expiry_date, ct.name_ru
+                FROM producer_certifications pc
+                LEFT JOIN certification_types ct ON ct.id = pc.certification_type_id
+                WHERE pc.expiry_date BETWEEN %s AND %s
+                  AND pc.verification_status IN ('verified', 'auto_verified')
+                """,
+                (today, cutoff),
+            )
+            rows = await cur.fetchall()
 
         alerts = []
-        for cert in result.data:
-            expiry_date = date.fromisoformat(cert["expiry_date"])
+        for cert in rows:
+            expiry_date = cert["expiry_date"]
             days_until = (expiry_date - today).days
 
-            cert_type = cert.get("certification_types", {})
             alerts.append(ExpiryAlert(
                 certification_id=cert["id"],
                 organization_id=cert["organization_id"],
                 certificate_number=cert["certificate_number"],
-                certification_type_name=cert_type.get("name_ru", ""),
+                certification_type_name=cert["name_ru"] or "",
                 expiry_date=expiry_date,
                 days_until_expiry=days_until,
             ))
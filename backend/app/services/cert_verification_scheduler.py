@@ -0,0 +1,77 @@
+"""
+Concurrent certificate verification across registries.
+
+Cron jobs hand the scheduler a batch of certifications. Each registry
+(Rosaccreditation, IAF CertSearch, organic registry, ...) gets its own pool of
+workers, so a slow registry does not hold up the others. Within a registry
+the workers share that registry's token bucket, so requests go out at the
+registry's rate_limit instead of one at a time with fixed sleeps. Registry
+answers are cached by certificate number in the verification service, so a
+number checked recently (by the API or an earlier cron run) costs no request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import get_settings
+from app.services.cert_verification_api import (
+    CertificationVerificationService,
+    VerificationRequest,
+    VerificationResponse,
+    get_verification_service,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@dataclass
+class VerificationJob:
+    certification_id: str
+    request: VerificationRequest
+
+
+class VerificationScheduler:
+    """Runs verification jobs concurrently, per registry."""
+
+    def __init__(
+        self,
+        service: Optional[CertificationVerificationService] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.service = service or get_verification_service()
+        self.concurrency = concurrency or settings.cert_verification_concurrency
+
+    async def run(self, jobs: list[VerificationJob]) -> list[tuple[VerificationJob, VerificationResponse]]:
+        """Verify all jobs; results come back in job order."""
+        queues: dict = defaultdict(deque)
+        for index, job in enumerate(jobs):
+            registry = self.service._get_registry_type(job.request.certification_type_code)
+            queues[registry].append(index)
+
+        results: list[Optional[VerificationResponse]] = [None] * len(jobs)
+
+        async def worker(queue: deque) -> None:
+            while queue:
+                index = queue.popleft()
+                job = jobs[index]
+                results[index] = await self.service.verify_certificate(
+                    certification_id=job.certification_id,
+                    request=job.request,
+                    wait_for_rate_limit=True,
+                )
+
+        async with self.service:
+            await asyncio.gather(*(
+                worker(queue)
+                for queue in queues.values()
+                for _ in range(min(self.concurrency, len(queue)))
+            ))
+
+        return list(zip(jobs, results))
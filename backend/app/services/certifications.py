@@ -7,13 +7,21 @@ Handles all certification-related business logic including:
 - Expiry tracking and alerts
 - External verification API integration
 - Consumer verification portal
+
+Data access goes through the async connection pool, so certification
+lookups never block the event loop. Rows are read as JSON objects (the shape
+PostgREST returned) and mapped by the helpers at the bottom of the class.
+Concurrent product certification lookups are coalesced into one query.
 """
 import asyncio
+import logging
 from datetime import date, datetime, timedelta
-from typing import Optional
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
 from uuid import UUID
 
-from ..core.supabase import get_supabase_client
+from psycopg.rows import dict_row
+
+from ..core.db import get_async_connection
 from ..schemas.certifications import (
     CertificationCategory,
     VerificationStatus,
@@ -34,13 +42,124 @@ from ..schemas.certifications import (
     CertificationAdminStats,
     PendingVerificationItem,
 )
+from .image_downloader import upload_to_supabase
+
+logger = logging.getLogger(__name__)
+
+VALID_STATUSES = [VerificationStatus.VERIFIED.value, VerificationStatus.AUTO_VERIFIED.value]
+
+# A producer certification joined with its type, as one JSON object
+CERTIFICATION_ROW = """
+    to_jsonb(pc) || jsonb_build_object('certification_types', to_jsonb(ct)) AS row
+"""
+CERTIFICATION_FROM = """
+    producer_certifications pc
+    LEFT JOIN certification_types ct ON ct.id = pc.certification_type_id
+"""
+
+# A certification applies to product p when it is mapped to it explicitly,
+# lists it in product_ids, or lists no products at all
+APPLIES_TO_PRODUCT = """
+    (
+        pc.product_ids IS NULL
+        OR cardinality(pc.product_ids) = 0
+        OR p.id = ANY(pc.product_ids)
+        OR EXISTS (
+            SELECT 1 FROM product_certifications m
+            WHERE m.product_id = p.id AND m.certification_id = pc.id
+        )
+    )
+"""
+
+
+class BatchLoader:
+    """
+    Coalesces concurrent lookups into batched loads.
+
+    Keys requested during the same event loop iteration are loaded with one
+    call of load_many(keys) -> {key: value}; callers asking for the same key
+    share the result. Keys missing from the returned mapping get `default`.
+    """
+
+    def __init__(
+        self,
+        load_many: Callable[[list], Awaitable[dict]],
+        max_batch_size: int = 100,
+        default: Callable[[], Any] = lambda: None,
+    ):
+        self._load_many = load_many
+        self.max_batch_size = max_batch_size
+        self._default = default
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Any:
+        return (await self.load_many([key]))[key]
+
+    async def load_many(self, keys: Iterable[Hashable]) -> dict:
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for key in keys:
+            future = self._pending.get(key)
+            if future is None:
+                if not self._pending:
+                    loop.call_soon(self._dispatch)
+                future = self._pending[key] = loop.create_future()
+            futures[key] = future
+        # Shielded so a cancelled caller does not cancel the shared lookup
+        values = await asyncio.gather(*(asyncio.shield(f) for f in futures.values()))
+        return dict(zip(futures, values))
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict) -> None:
+        try:
+            values = await self._load_many(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values[key] if key in values else self._default())
+
+
+async def _fetch_rows(query: str, params: Any = None) -> list[dict]:
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(query, params)
+        return await cur.fetchall()
+
+
+async def _fetch_one(query: str, params: Any = None) -> Optional[dict]:
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(query, params)
+        row = await cur.fetchone()
+        await conn.commit()
+        return row
+
+
+async def _execute(query: str, params: Any = None) -> int:
+    async with get_async_connection() as conn, conn.cursor() as cur:
+        await cur.execute(query, params)
+        await conn.commit()
+        return cur.rowcount
 
 
 class CertificationService:
     """Service for managing certifications."""
 
     def __init__(self):
-        self.supabase = get_supabase_client()
+        self._product_certifications = BatchLoader(
+            self._load_product_certifications, default=list
+        )
 
     # =========================================================================
     # Certification Types (Reference Data)
@@ -52,42 +171,46 @@ class CertificationService:
         active_only: bool = True,
     ) -> list[CertificationType]:
         """List available certification types."""
-        query = self.supabase.table("certification_types").select("*")
+        conditions = []
+        params: list = []
 
         if active_only:
-            query = query.eq("is_active", True)
+            conditions.append("ct.is_active")
 
         if category:
-            query = query.eq("category", category.value)
-
-        query = query.order("display_order").order("name_ru")
-        result = query.execute()
+            conditions.append("ct.category = %s")
+            params.append(category.value)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = await _fetch_rows(
+            f"""
+            SELECT to_jsonb(ct) AS row
+            FROM certification_types ct
+            {where}
+            ORDER BY ct.display_order, ct.name_ru
+            """,
+            params,
+        )
 
-        return [CertificationType(**row) for row in result.data]
+        return [CertificationType(**r["row"]) for r in rows]
 
     async def get_certification_type(self, type_id: str) -> Optional[CertificationType]:
         """Get a specific certification type."""
-        result = (
-            self.supabase.table("certification_types")
-            .select("*")
-            .eq("id", type_id)
-            .single()
-            .execute()
+        row = await _fetch_one(
+            "SELECT to_jsonb(ct) AS row FROM certification_types ct WHERE ct.id = %s",
+            (type_id,),
         )
-        return CertificationType(**result.data) if result.data else None
+        return CertificationType(**row["row"]) if row else None
 
     async def get_certification_type_by_code(
         self, code: str
     ) -> Optional[CertificationType]:
         """Get certification type by code."""
-        result = (
-            self.supabase.table("certification_types")
-            .select("*")
-            .eq("code", code)
-            .single()
-            .execute()
+        row = await _fetch_one(
+            "SELECT to_jsonb(ct) AS row FROM certification_types ct WHERE ct.code = %s",
+            (code,),
         )
-        return CertificationType(**result.data) if result.data else None
+        return CertificationType(**row["row"]) if row else None
 
     # =========================================================================
     # Producer Certifications CRUD
@@ -100,26 +223,30 @@ class CertificationService:
         user_id: str,
     ) -> ProducerCertification:
         """Create a new certification for an organization."""
-        insert_data = {
-            "organization_id": organization_id,
-            "certification_type_id": data.certification_type_id,
-            "certificate_number": data.certificate_number,
-            "issued_by": data.issued_by,
-            "issued_date": data.issued_date.isoformat() if data.issued_date else None,
-            "expiry_date": data.expiry_date.isoformat() if data.expiry_date else None,
-            "scope_description": data.scope_description,
-            "product_ids": data.product_ids,
-            "is_public": data.is_public,
-            "display_on_products": data.display_on_products,
-            "verification_status": VerificationStatus.PENDING.value,
-        }
-
-        result = (
-            self.supabase.table("producer_certifications")
-            .insert(insert_data)
-            .execute()
+        certification = await _fetch_one(
+            """
+            INSERT INTO producer_certifications (
+                organization_id, certification_type_id, certificate_number,
+                issued_by, issued_date, expiry_date, scope_description,
+                product_ids, is_public, display_on_products, verification_status
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s::uuid[], %s, %s, %s)
+            RETURNING id::text
+            """,
+            (
+                organization_id,
+                data.certification_type_id,
+                data.certificate_number,
+                data.issued_by,
+                data.issued_date,
+                data.expiry_date,
+                data.scope_description,
+                data.product_ids,
+                data.is_public,
+                data.display_on_products,
+                VerificationStatus.PENDING.value,
+            ),
         )
-        certification = result.data[0]
 
         # Log the submission
         await self._log_verification_action(
@@ -144,18 +271,15 @@ class CertificationService:
         self, certification_id: str
     ) -> Optional[ProducerCertification]:
         """Get a certification by ID with type info."""
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .eq("id", certification_id)
-            .single()
-            .execute()
+        row = await _fetch_one(
+            f"SELECT {CERTIFICATION_ROW} FROM {CERTIFICATION_FROM} WHERE pc.id = %s",
+            (certification_id,),
         )
 
-        if not result.data:
+        if not row:
             return None
 
-        return self._map_certification(result.data)
+        return self._map_certification(row["row"])
 
     async def list_organization_certifications(
         self,
@@ -164,24 +288,28 @@ class CertificationService:
         status_filter: Optional[list[VerificationStatus]] = None,
     ) -> list[ProducerCertification]:
         """List all certifications for an organization."""
-        query = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .eq("organization_id", organization_id)
-        )
+        conditions = ["pc.organization_id = %s"]
+        params: list = [organization_id]
 
         if not include_expired:
-            query = query.neq("verification_status", VerificationStatus.EXPIRED.value)
+            conditions.append("pc.verification_status <> %s")
+            params.append(VerificationStatus.EXPIRED.value)
 
         if status_filter:
-            query = query.in_(
-                "verification_status", [s.value for s in status_filter]
-            )
-
-        query = query.order("created_at", desc=True)
-        result = query.execute()
+            conditions.append("pc.verification_status = ANY(%s)")
+            params.append([s.value for s in status_filter])
+
+        rows = await _fetch_rows(
+            f"""
+            SELECT {CERTIFICATION_ROW}
+            FROM {CERTIFICATION_FROM}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY pc.created_at DESC
+            """,
+            params,
+        )
 
-        return [self._map_certification(row) for row in result.data]
+        return [self._map_certification(r["row"]) for r in rows]
 
     async def update_certification(
         self,
@@ -190,30 +318,26 @@ class CertificationService:
         user_id: str,
     ) -> ProducerCertification:
         """Update a certification."""
-        update_data = {}
-
-        if data.certificate_number is not None:
-            update_data["certificate_number"] = data.certificate_number
-        if data.issued_by is not None:
-            update_data["issued_by"] = data.issued_by
-        if data.issued_date is not None:
-            update_data["issued_date"] = data.issued_date.isoformat()
-        if data.expiry_date is not None:
-            update_data["expiry_date"] = data.expiry_date.isoformat()
-        if data.scope_description is not None:
-            update_data["scope_description"] = data.scope_description
-        if data.product_ids is not None:
-            update_data["product_ids"] = data.product_ids
-        if data.is_public is not None:
-            update_data["is_public"] = data.is_public
-        if data.display_on_products is not None:
-            update_data["display_on_products"] = data.display_on_products
-
-        update_data["updated_at"] = datetime.utcnow().isoformat()
-
-        self.supabase.table("producer_certifications").update(update_data).eq(
-            "id", certification_id
-        ).execute()
+        set_clauses = []
+        params: list = []
+
+        for field, value in data.model_dump(exclude_none=True).items():
+            set_clauses.append(
+                f"{field} = %s::uuid[]" if field == "product_ids" else f"{field} = %s"
+            )
+            params.append(value)
+
+        set_clauses.append("updated_at = now()")
+        params.append(certification_id)
+
+        await _execute(
+            f"""
+            UPDATE producer_certifications
+            SET {', '.join(set_clauses)}
+            WHERE id = %s
+            """,
+            params,
+        )
 
         return await self.get_certification(certification_id)
 
@@ -221,9 +345,10 @@ class CertificationService:
         self, certification_id: str, user_id: str
     ) -> bool:
         """Delete a certification."""
-        self.supabase.table("producer_certifications").delete().eq(
-            "id", certification_id
-        ).execute()
+        await _execute(
+            "DELETE FROM producer_certifications WHERE id = %s",
+            (certification_id,),
+        )
         return True
 
     # =========================================================================
@@ -244,24 +369,24 @@ class CertificationService:
         storage_path = f"certifications/{certification_id}/{timestamp}_{file_name}"
 
         # Upload to Supabase Storage
-        self.supabase.storage.from_("documents").upload(
-            storage_path, file_content, {"content-type": content_type}
-        )
-
-        # Get public URL
-        document_url = self.supabase.storage.from_("documents").get_public_url(
-            storage_path
+        document_url = await upload_to_supabase(
+            file_content, "documents", storage_path, content_type
         )
+        if not document_url:
+            raise ValueError("Document upload failed")
 
         # Update certification record
-        self.supabase.table("producer_certifications").update(
-            {
-                "document_url": document_url,
-                "document_original_name": file_name,
-                "document_uploaded_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-            }
-        ).eq("id", certification_id).execute()
+        await _execute(
+            """
+            UPDATE producer_certifications
+            SET document_url = %s,
+                document_original_name = %s,
+                document_uploaded_at = now(),
+                updated_at = now()
+            WHERE id = %s
+            """,
+            (document_url, file_name, certification_id),
+        )
 
         return document_url
 
@@ -357,17 +482,18 @@ class CertificationService:
             raise ValueError(f"Invalid action: {action}")
 
         # Update certification
-        update_data = {
-            "verification_status": new_status.value,
-            "verification_notes": notes,
-            "verified_by": admin_user_id,
-            "verified_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
-        }
-
-        self.supabase.table("producer_certifications").update(update_data).eq(
-            "id", certification_id
-        ).execute()
+        await _execute(
+            """
+            UPDATE producer_certifications
+            SET verification_status = %s,
+                verification_notes = %s,
+                verified_by = %s,
+                verified_at = now(),
+                updated_at = now()
+            WHERE id = %s
+            """,
+            (new_status.value, notes, admin_user_id, certification_id),
+        )
 
         # Log the action
         await self._log_verification_action(
@@ -385,15 +511,17 @@ class CertificationService:
         self, certification_id: str
     ) -> list[VerificationLogEntry]:
         """Get verification history for a certification."""
-        result = (
-            self.supabase.table("certification_verification_log")
-            .select("*")
-            .eq("certification_id", certification_id)
-            .order("performed_at", desc=True)
-            .execute()
+        rows = await _fetch_rows(
+            """
+            SELECT to_jsonb(l) AS row
+            FROM certification_verification_log l
+            WHERE l.certification_id = %s
+            ORDER BY l.performed_at DESC
+            """,
+            (certification_id,),
         )
 
-        return [VerificationLogEntry(**row) for row in result.data]
+        return [VerificationLogEntry(**r["row"]) for r in rows]
 
     async def _log_verification_action(
         self,
@@ -405,60 +533,99 @@ class CertificationService:
         performed_by: Optional[str] = None,
     ):
         """Log a verification action."""
-        self.supabase.table("certification_verification_log").insert(
-            {
-                "certification_id": certification_id,
-                "action": action,
-                "previous_status": previous_status,
-                "new_status": new_status,
-                "notes": notes,
-                "performed_by": performed_by,
-            }
-        ).execute()
+        await _execute(
+            """
+            INSERT INTO certification_verification_log (
+                certification_id, action, previous_status, new_status, notes, performed_by
+            )
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            (certification_id, action, previous_status, new_status, notes, performed_by),
+        )
 
     # =========================================================================
     # Expiry Tracking & Alerts
     # =========================================================================
 
+    async def run_expiry_check(self):
+        """Mark expired certifications and schedule upcoming expiry alerts."""
+        await _fetch_one("SELECT check_certification_expiry()")
+        await _fetch_one("SELECT schedule_expiry_alerts()")
+
     async def check_expiring_certifications(
         self, days_ahead: int = 30
     ) -> list[ProducerCertification]:
         """Get certifications expiring within N days."""
-        cutoff_date = (date.today() + timedelta(days=days_ahead)).isoformat()
-
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .lte("expiry_date", cutoff_date)
-            .gte("expiry_date", date.today().isoformat())
-            .in_("verification_status", ["verified", "auto_verified"])
-            .order("expiry_date")
-            .execute()
+        cutoff_date = date.today() + timedelta(days=days_ahead)
+
+        rows = await _fetch_rows(
+            f"""
+            SELECT {CERTIFICATION_ROW}
+            FROM {CERTIFICATION_FROM}
+            WHERE pc.expiry_date BETWEEN %s AND %s
+              AND pc.verification_status = ANY(%s)
+            ORDER BY pc.expiry_date
+            """,
+            (date.today(), cutoff_date, VALID_STATUSES),
         )
 
-        return [self._map_certification(row) for row in result.data]
+        return [self._map_certification(r["row"]) for r in rows]
+
+    async def list_due_for_auto_check(self, limit: int = 50) -> list[dict]:
+        """Certifications of auto-verifiable types whose next check is due."""
+        rows = await _fetch_rows(
+            f"""
+            SELECT {CERTIFICATION_ROW}
+            FROM producer_certifications pc
+            JOIN certification_types ct ON ct.id = pc.certification_type_id
+            WHERE ct.auto_verify_enabled
+              AND pc.verification_status IN ('pending', 'verified', 'auto_verified')
+              AND (pc.next_auto_check_at IS NULL OR pc.next_auto_check_at <= now())
+            ORDER BY pc.next_auto_check_at NULLS FIRST
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        return [r["row"] for r in rows]
+
+    async def mark_auto_checked(self, certification_id: str, next_check_in: timedelta):
+        """Record an automated check and schedule the next one."""
+        await _execute(
+            """
+            UPDATE producer_certifications
+            SET last_auto_check_at = now(),
+                next_auto_check_at = now() + %s
+            WHERE id = %s
+            """,
+            (next_check_in, certification_id),
+        )
 
     async def get_pending_expiry_alerts(
         self, organization_id: Optional[str] = None
     ) -> list[ExpiryAlert]:
         """Get pending expiry alerts."""
-        query = (
-            self.supabase.table("certification_expiry_alerts")
-            .select("*, producer_certifications!inner(*, certification_types(*))")
-            .is_("sent_at", "null")
-            .lte("scheduled_at", datetime.utcnow().isoformat())
+        organization_filter = "AND a.organization_id = %s" if organization_id else ""
+        rows = await _fetch_rows(
+            f"""
+            SELECT to_jsonb(a) || jsonb_build_object(
+                'producer_certifications',
+                to_jsonb(pc) || jsonb_build_object('certification_types', to_jsonb(ct))
+            ) AS row
+            FROM certification_expiry_alerts a
+            JOIN producer_certifications pc ON pc.id = a.certification_id
+            LEFT JOIN certification_types ct ON ct.id = pc.certification_type_id
+            WHERE a.sent_at IS NULL
+              AND a.scheduled_at <= now()
+              {organization_filter}
+            ORDER BY a.scheduled_at
+            """,
+            (organization_id,) if organization_id else None,
         )
 
-        if organization_id:
-            query = query.eq("organization_id", organization_id)
-
-        query = query.order("scheduled_at")
-        result = query.execute()
-
         alerts = []
-        for row in result.data:
-            cert = row.get("producer_certifications", {})
-            cert_type = cert.get("certification_types", {})
+        for row in (r["row"] for r in rows):
+            cert = row.get("producer_certifications") or {}
+            cert_type = cert.get("certification_types") or {}
             alerts.append(
                 ExpiryAlert(
                     id=row["id"],
@@ -478,15 +645,17 @@ class CertificationService:
 
     async def mark_alert_sent(self, alert_id: str):
         """Mark an expiry alert as sent."""
-        self.supabase.table("certification_expiry_alerts").update(
-            {"sent_at": datetime.utcnow().isoformat()}
-        ).eq("id", alert_id).execute()
+        await _execute(
+            "UPDATE certification_expiry_alerts SET sent_at = now() WHERE id = %s",
+            (alert_id,),
+        )
 
     async def acknowledge_alert(self, alert_id: str, user_id: str):
         """Acknowledge an expiry alert."""
-        self.supabase.table("certification_expiry_alerts").update(
-            {"acknowledged_at": datetime.utcnow().isoformat()}
-        ).eq("id", alert_id).execute()
+        await _execute(
+            "UPDATE certification_expiry_alerts SET acknowledged_at = now() WHERE id = %s",
+            (alert_id,),
+        )
 
     async def _schedule_expiry_alerts(
         self,
@@ -496,21 +665,20 @@ class CertificationService:
     ):
         """Schedule expiry alerts for a certification."""
         alert_days = [90, 60, 30, 14, 7, 1]
-
-        for days in alert_days:
-            scheduled_at = expiry_date - timedelta(days=days)
-            if scheduled_at > date.today():
-                self.supabase.table("certification_expiry_alerts").insert(
-                    {
-                        "certification_id": certification_id,
-                        "organization_id": organization_id,
-                        "alert_days_before": days,
-                        "alert_type": "both",
-                        "scheduled_at": datetime.combine(
-                            scheduled_at, datetime.min.time()
-                        ).isoformat(),
-                    }
-                ).execute()
+        days = [d for d in alert_days if expiry_date - timedelta(days=d) > date.today()]
+        if not days:
+            return
+
+        await _execute(
+            """
+            INSERT INTO certification_expiry_alerts (
+                certification_id, organization_id, alert_days_before, alert_type, scheduled_at
+            )
+            SELECT %s, %s, d, 'both', (%s::date - d)::timestamptz
+            FROM unnest(%s::int[]) AS d
+            """,
+            (certification_id, organization_id, expiry_date, days),
+        )
 
     # =========================================================================
     # Consumer Verification Portal
@@ -520,71 +688,62 @@ class CertificationService:
         self, organization_id: str
     ) -> list[ProducerCertificationPublic]:
         """Get public certifications for consumer view."""
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .eq("organization_id", organization_id)
-            .eq("is_public", True)
-            .in_("verification_status", ["verified", "auto_verified"])
-            .execute()
+        rows = await _fetch_rows(
+            f"""
+            SELECT {CERTIFICATION_ROW}
+            FROM {CERTIFICATION_FROM}
+            WHERE pc.organization_id = %s
+              AND pc.is_public
+              AND pc.verification_status = ANY(%s)
+            """,
+            (organization_id, VALID_STATUSES),
         )
 
-        return [self._map_certification_public(row) for row in result.data]
+        return [self._map_certification_public(r["row"]) for r in rows]
 
     async def get_product_certifications(
         self, product_id: str
     ) -> list[ProducerCertificationPublic]:
-        """Get certifications for a specific product."""
-        # First get explicit product-certification mappings
-        mappings = (
-            self.supabase.table("product_certifications")
-            .select("certification_id")
-            .eq("product_id", product_id)
-            .execute()
-        )
-        cert_ids = [m["certification_id"] for m in mappings.data]
-
-        # Get the product's organization
-        product = (
-            self.supabase.table("products")
-            .select("organization_id")
-            .eq("id", product_id)
-            .single()
-            .execute()
-        )
-
-        if not product.data:
-            return []
-
-        org_id = product.data["organization_id"]
-
-        # Get all verified org certifications that apply to products
-        result = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .eq("organization_id", org_id)
-            .eq("is_public", True)
-            .eq("display_on_products", True)
-            .in_("verification_status", ["verified", "auto_verified"])
-            .execute()
-        )
-
-        # Filter to those that either:
-        # 1. Are in the explicit mapping
-        # 2. Have no product_ids (apply to all products)
-        # 3. Include this product in product_ids
-        certifications = []
-        for row in result.data:
-            cert_id = row["id"]
-            product_ids = row.get("product_ids") or []
-
-            if (
-                cert_id in cert_ids
-                or len(product_ids) == 0
-                or product_id in product_ids
-            ):
-                certifications.append(self._map_certification_public(row))
+        """
+        Get certifications for a specific product.
+
+        Concurrent calls are answered by one batched query.
+        """
+        return await self._product_certifications.load(product_id)
+
+    async def get_products_certifications(
+        self, product_ids: list[str]
+    ) -> dict[str, list[ProducerCertificationPublic]]:
+        """Get certifications for several products, keyed by product id."""
+        return await self._product_certifications.load_many(product_ids)
+
+    async def _load_product_certifications(
+        self, product_ids: list[str]
+    ) -> dict[str, list[ProducerCertificationPublic]]:
+        """Verified, public certifications of each product's organization that apply to it."""
+        rows = await _fetch_rows(
+            f"""
+            SELECT p.id::text AS product_id, {CERTIFICATION_ROW}
+            FROM products p
+            JOIN producer_certifications pc ON pc.organization_id = p.organization_id
+            LEFT JOIN certification_types ct ON ct.id = pc.certification_type_id
+            WHERE p.id = ANY(%s::uuid[])
+              AND pc.is_public
+              AND pc.display_on_products
+              AND pc.verification_status = ANY(%s)
+              AND {APPLIES_TO_PRODUCT}
+            ORDER BY pc.created_at
+            """,
+            (product_ids, VALID_STATUSES),
+        )
 
+        certifications: dict[str, list[ProducerCertificationPublic]] = {
+            product_id: [] for product_id in product_ids
+        }
+        for r in rows:
+            certifications.setdefault(r["product_id"], []).append(
+                self._map_certification_public(r["row"])
+            )
         return certifications
 
     async def search_by_certification(
@@ -593,30 +752,69 @@ class CertificationService:
         page: int = 1,
         page_size: int = 20,
     ) -> CertificationSearchResponse:
-        """Search products by certification type."""
-        # Build query for products with certifications
-        query = self.supabase.rpc(
-            "search_products_by_certification",
-            {
-                "cert_types": filters.certification_types,
-                "categories": [c.value for c in filters.categories]
-                if filters.categories
-                else None,
-                "verified_only": filters.verified_only,
-                "include_expired": filters.include_expired,
-                "page_num": page,
-                "page_size": page_size,
-            },
-        )
-
-        # Note: This would require a custom Postgres function
-        # Placeholder implementation
+        """Search published products by certification type."""
+        conditions = ["pc.is_public", "pc.display_on_products", APPLIES_TO_PRODUCT]
+        params: list = []
+
+        if filters.certification_types:
+            conditions.append("ct.code = ANY(%s)")
+            params.append(filters.certification_types)
+        if filters.categories:
+            conditions.append("ct.category = ANY(%s)")
+            params.append([c.value for c in filters.categories])
+        if filters.verified_only:
+            conditions.append("pc.verification_status = ANY(%s)")
+            params.append(VALID_STATUSES)
+        if not filters.include_expired:
+            conditions.append(
+                "pc.verification_status <> 'expired'"
+                " AND (pc.expiry_date IS NULL OR pc.expiry_date >= CURRENT_DATE)"
+            )
+
+        matches = f"""
+            FROM products p
+            JOIN organizations o ON o.id = p.organization_id
+            WHERE p.status = 'published'
+              AND EXISTS (
+                  SELECT 1
+                  FROM producer_certifications pc
+                  JOIN certification_types ct ON ct.id = pc.certification_type_id
+                  WHERE pc.organization_id = p.organization_id
+                    AND {' AND '.join(conditions)}
+              )
+        """
+        async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(f"SELECT count(*) AS total {matches}", params)
+            total = (await cur.fetchone())["total"]
+            await cur.execute(
+                f"""
+                SELECT p.id::text AS product_id, p.name AS product_name,
+                       o.id::text AS organization_id, o.name AS organization_name
+                {matches}
+                ORDER BY p.name, p.id
+                LIMIT %s OFFSET %s
+                """,
+                [*params, page_size, (page - 1) * page_size],
+            )
+            products = await cur.fetchall()
+
+        # Certifications for the whole page in one batch, shared with
+        # concurrent product page lookups
+        certifications = await self.get_products_certifications(
+            [p["product_id"] for p in products]
+        )
+
         return CertificationSearchResponse(
-            results=[],
-            total=0,
+            results=[
+                CertificationSearchResult(
+                    **p, certifications=certifications[p["product_id"]]
+                )
+                for p in products
+            ],
+            total=total,
             page=page,
             page_size=page_size,
-            has_more=False,
+            has_more=page * page_size < total,
         )
 
     async def submit_verification_request(
@@ -628,22 +826,19 @@ class CertificationService:
         ip_address: Optional[str],
     ) -> str:
         """Submit a consumer verification request."""
-        result = (
-            self.supabase.table("certification_verification_requests")
-            .insert(
-                {
-                    "certification_id": certification_id,
-                    "requester_user_id": user_id,
-                    "requester_ip": ip_address,
-                    "requester_reason": reason,
-                    "request_type": request_type,
-                    "status": "open",
-                }
+        row = await _fetch_one(
+            """
+            INSERT INTO certification_verification_requests (
+                certification_id, requester_user_id, requester_ip,
+                requester_reason, request_type, status
             )
-            .execute()
+            VALUES (%s, %s, %s, %s, %s, 'open')
+            RETURNING id::text
+            """,
+            (certification_id, user_id, ip_address, reason, request_type),
         )
 
-        return result.data[0]["id"]
+        return row["id"]
 
     # =========================================================================
     # Organization Summary
@@ -719,13 +914,9 @@ class CertificationService:
         week_ahead = today + timedelta(days=7)
 
         # Get all certifications
-        all_certs = (
-            self.supabase.table("producer_certifications")
-            .select("*, certification_types(*)")
-            .execute()
-        )
+        rows = await _fetch_rows(f"SELECT {CERTIFICATION_ROW} FROM {CERTIFICATION_FROM}")
 
-        certifications = [self._map_certification(row) for row in all_certs.data]
+        certifications = [self._map_certification(r["row"]) for r in rows]
 
         # Calculate stats
         by_status: dict[str, int] = {}
@@ -771,14 +962,14 @@ class CertificationService:
                 by_category[cat] = by_category.get(cat, 0) + 1
 
         # Get open disputes
-        disputes = (
-            self.supabase.table("certification_verification_requests")
-            .select("id", count="exact")
-            .eq("request_type", "dispute")
-            .eq("status", "open")
-            .execute()
+        disputes = await _fetch_one(
+            """
+            SELECT count(*) AS open_disputes
+            FROM certification_verification_requests
+            WHERE request_type = 'dispute' AND status = 'open'
+            """
         )
-        open_disputes = disputes.count or 0
+        open_disputes = disputes["open_disputes"] if disputes else 0
 
         # Recent submissions (last 10)
         recent = sorted(
@@ -804,36 +995,47 @@ class CertificationService:
         """Get queue of certifications pending verification."""
         offset = (page - 1) * page_size
 
-        result = (
-            self.supabase.table("producer_certifications")
-            .select(
-                "*, certification_types(*), organizations!inner(name)",
-                count="exact",
-            )
-            .eq("verification_status", VerificationStatus.PENDING.value)
-            .order("created_at")
-            .range(offset, offset + page_size - 1)
-            .execute()
+        rows = await _fetch_rows(
+            f"""
+            SELECT {CERTIFICATION_ROW},
+                   o.name AS organization_name,
+                   count(*) OVER () AS total
+            FROM {CERTIFICATION_FROM}
+            JOIN organizations o ON o.id = pc.organization_id
+            WHERE pc.verification_status = %s
+            ORDER BY pc.created_at
+            LIMIT %s OFFSET %s
+            """,
+            (VerificationStatus.PENDING.value, page_size, offset),
         )
 
         items = []
-        for row in result.data:
+        for r in rows:
+            row = r["row"]
             cert = self._map_certification(row)
-            org_name = row.get("organizations", {}).get("name", "Unknown")
             created = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
             days_pending = (datetime.utcnow() - created.replace(tzinfo=None)).days
 
             items.append(
                 PendingVerificationItem(
                     certification=cert,
-                    organization_name=org_name,
+                    organization_name=r["organization_name"] or "Unknown",
                     submitted_at=row["created_at"],
                     days_pending=days_pending,
                     document_available=bool(row.get("document_url")),
                 )
             )
 
-        return items, result.count or 0
+        total = rows[0]["total"] if rows else await self._count_pending()
+        return items, total
+
+    async def _count_pending(self) -> int:
+        row = await _fetch_one(
+            "SELECT count(*) AS total FROM producer_certifications WHERE verification_status = %s",
+            (VerificationStatus.PENDING.value,),
+        )
+        return row["total"] if row else 0
+
 
     # =========================================================================
     # Helper Methods
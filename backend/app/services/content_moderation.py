@@ -6,14 +6,17 @@ from __future__ import annotations
 
 import json
 import logging
-import re
+import threading
 from datetime import datetime
+from time import monotonic
 from typing import Optional
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.cache import invalidate_tags, organization_tag
+from app.core.config import get_settings
 from app.core.db import get_connection
 from app.schemas.content_moderation import (
     ModerationQueueItem,
@@ -34,9 +37,12 @@ from app.schemas.content_moderation import (
     ImageAnalysisResult,
 )
 from app.services.admin_guard import assert_platform_admin, assert_moderator
+from app.services.moderation_patterns import CompiledPatternSet
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 
 # =============================================================================
 # AI AUTO-MODERATION
@@ -46,8 +52,10 @@ class AIContentModerator:
     """AI-powered content analysis and flagging."""
     
     def __init__(self):
-        self._patterns_cache = None
-        self._patterns_loaded_at = None
+        self._patterns_cache: Optional[CompiledPatternSet] = None
+        # monotonic time of the last pattern version check
+        self._patterns_loaded_at: Optional[float] = None
+        self._patterns_lock = threading.Lock()
     
     def _load_patterns(self) -> list[dict]:
         """Load active moderation patterns from database."""
@@ -61,51 +69,74 @@ class AIContentModerator:
                 ''')
                 return cur.fetchall()
     
+    def _load_patterns_version(self) -> tuple:
+        """
+        Cheap fingerprint of ai_moderation_patterns; changes on any insert, update or delete.
+        The hash sum moves when any row's updated_at changes, even if MAX(updated_at) does not
+        (an edit committed after a later-stamped one). updated_at is set on every pattern edit
+        by update_pattern() and by trg_ai_moderation_patterns_updated_at.
+        """
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('''
+                    SELECT COUNT(*), MAX(updated_at),
+                           COALESCE(SUM(hashtext(id::text || updated_at::text)::bigint), 0)
+                    FROM ai_moderation_patterns
+                ''')
+                return tuple(cur.fetchone())
+    
+    def get_compiled_patterns(self) -> CompiledPatternSet:
+        """
+        Return the compiled pattern set, rebuilding it only when the table changed.
+        The version is checked at most every MODERATION_PATTERNS_CHECK_INTERVAL_SECONDS.
+        """
+        now = monotonic()
+        interval = settings.moderation_patterns_check_interval_seconds
+        cached = self._patterns_cache
+        if cached is not None and self._patterns_loaded_at is not None and now - self._patterns_loaded_at < interval:
+            return cached
+        
+        with self._patterns_lock:
+            if self._patterns_cache is not None and self._patterns_loaded_at is not None \
+                    and now - self._patterns_loaded_at < interval:
+                return self._patterns_cache
+            version = self._load_patterns_version()
+            if self._patterns_cache is None or self._patterns_cache.fingerprint != version:
+                self._patterns_cache = CompiledPatternSet.compile(self._load_patterns(), fingerprint=version)
+                logger.info(f'Compiled {len(self._patterns_cache.patterns)} moderation patterns')
+            self._patterns_loaded_at = now
+            return self._patterns_cache
+    
+    def invalidate_patterns(self) -> None:
+        """Drop the compiled set so the next analysis reloads it (after pattern writes)."""
+        with self._patterns_lock:
+            self._patterns_cache = None
+            self._patterns_loaded_at = None
+    
     def analyze_text(self, text: str, content_type: str) -> AIFlagResult:
         """Analyze text content for policy violations."""
-        patterns = self._load_patterns()
+        return self._analyze_compiled(self.get_compiled_patterns(), text)
+    
+    def analyze_texts(self, texts: list[str], content_type: str) -> list[AIFlagResult]:
+        """Analyze many texts against one pattern snapshot (bulk moderation of backlogs)."""
+        compiled = self.get_compiled_patterns()
+        return [self._analyze_compiled(compiled, text) for text in texts]
+    
+    @staticmethod
+    def _analyze_compiled(compiled: CompiledPatternSet, text: str) -> AIFlagResult:
         flags = []
         max_confidence = 0.0
         priority_boost = 0
         
-        for pattern in patterns:
-            if pattern['pattern_type'] not in ('text_keywords', 'text_regex'):
-                continue
-                
-            pattern_data = pattern['pattern_data']
-            matched = False
-            
-            if pattern['pattern_type'] == 'text_keywords':
-                keywords = pattern_data.get('keywords', [])
-                case_insensitive = pattern_data.get('case_insensitive', True)
-                check_text = text.lower() if case_insensitive else text
-                
-                for keyword in keywords:
-                    check_keyword = keyword.lower() if case_insensitive else keyword
-                    if check_keyword in check_text:
-                        matched = True
-                        break
-            
-            elif pattern['pattern_type'] == 'text_regex':
-                regex = pattern_data.get('regex', '')
-                regex_flags = pattern_data.get('flags', '')
-                flags_int = re.IGNORECASE if 'i' in regex_flags else 0
-                
-                try:
-                    if re.search(regex, text, flags_int):
-                        matched = True
-                except re.error:
-                    logger.warning(f"Invalid regex pattern: {regex}")
-            
-            if matched:
-                flags.append({
-                    'pattern_id': str(pattern['id']),
-                    'pattern_name': pattern['name'],
-                    'detects': pattern['detects'],
-                    'action': pattern['action_on_match'],
-                })
-                max_confidence = max(max_confidence, float(pattern['confidence_weight']))
-                priority_boost = max(priority_boost, pattern['priority_boost'])
+        for pattern in compiled.match_text(text):
+            flags.append({
+                'pattern_id': str(pattern['id']),
+                'pattern_name': pattern['name'],
+                'detects': pattern['detects'],
+                'action': pattern['action_on_match'],
+            })
+            max_confidence = max(max_confidence, float(pattern['confidence_weight']))
+            priority_boost = max(priority_boost, pattern['priority_boost'])
         
         return AIFlagResult(
             flags=flags,
@@ -122,7 +153,7 @@ class AIContentModerator:
         For production, integrate with external image moderation APIs
         (e.g., AWS Rekognition, Google Vision, Azure Content Moderator).
         """
-        patterns = self._load_patterns()
+        patterns = self.get_compiled_patterns().patterns_of_type('image_hash')
         flags = []
         max_confidence = 0.0
         detected_objects = []
@@ -472,7 +503,7 @@ def make_decision(user_id: str, item_id: str, decision: ModerationDecision) -> M
             ))
             
             # Apply action to actual content
-            _apply_content_action(cur, item, decision)
+            affected_org_id = _apply_content_action(cur, item, decision)
             
             # Log the action
             cur.execute('''
@@ -492,11 +523,24 @@ def make_decision(user_id: str, item_id: str, decision: ModerationDecision) -> M
             
             conn.commit()
     
+    if affected_org_id:
+        invalidate_tags(organization_tag(affected_org_id))
     return get_queue_item(user_id, item_id)
 
 
-def _apply_content_action(cur, item: dict, decision: ModerationDecision):
-    """Apply moderation decision to the actual content."""
+def _content_organization_id(cur, content_type: str, content_id) -> Optional[str]:
+    """Organization whose public data changes with the content, if any."""
+    if content_type == 'organization':
+        return str(content_id)
+    if content_type == 'review':
+        cur.execute('SELECT organization_id::text FROM reviews WHERE id = %s', (content_id,))
+        row = cur.fetchone()
+        return row['organization_id'] if row else None
+    return None
+
+
+def _apply_content_action(cur, item: dict, decision: ModerationDecision) -> Optional[str]:
+    """Apply moderation decision to the actual content. Returns the affected organization."""
     content_type = item['content_type']
     content_id = item['content_id']
     
@@ -549,6 +593,8 @@ def _apply_content_action(cur, item: dict, decision: ModerationDecision):
                 UPDATE posts SET status = 'deleted', updated_at = now() WHERE id = %s
             ''', (content_id,))
 
+    return _content_organization_id(cur, content_type, content_id)
+
 
 def _record_violation(cur, item: dict, decision: ModerationDecision, moderator_id: str):
     """Record a violation in the history."""
@@ -869,8 +915,13 @@ def decide_appeal(
                         SET verification_status = 'pending', updated_at = now() 
                         WHERE id = %s
                     ''', (content_id,))
+                affected_org_id = _content_organization_id(cur, content_type, content_id)
+            else:
+                affected_org_id = None
             
             conn.commit()
+            if affected_org_id:
+                invalidate_tags(organization_tag(affected_org_id))
             
             return ModerationAppeal(
                 id=str(row['id']),
@@ -1075,6 +1126,7 @@ def create_pattern(user_id: str, pattern: AIModerationPatternCreate) -> AIModera
             ))
             row = cur.fetchone()
             conn.commit()
+            ai_moderator.invalidate_patterns()
 
             return AIModerationPattern(
                 id=str(row['id']),
@@ -1153,6 +1205,7 @@ def update_pattern(
                 raise HTTPException(status_code=404, detail='Pattern not found')
 
             conn.commit()
+            ai_moderator.invalidate_patterns()
 
             return AIModerationPattern(
                 id=str(row['id']),
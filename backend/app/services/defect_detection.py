@@ -7,7 +7,9 @@ when issues spike.
 from __future__ import annotations
 
 import logging
+import multiprocessing
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta, date
 from typing import List, Optional, Tuple
 
@@ -15,6 +17,7 @@ from psycopg.rows import dict_row
 
 from app.core.db import get_connection
 from app.schemas.notifications import NotificationEmitRequest
+from app.services.moderation_patterns import KeywordAutomaton
 from app.services.notifications import emit_notification
 
 logger = logging.getLogger(__name__)
@@ -22,6 +25,8 @@ logger = logging.getLogger(__name__)
 # Default spike threshold (3x normal rate)
 DEFAULT_SPIKE_THRESHOLD = 3.0
 DEFAULT_BASELINE_DAYS = 30
+# Reviews per server-side cursor fetch / classification write
+CLASSIFY_CHUNK_SIZE = 2000
 
 
 def get_complaint_topics() -> List[dict]:
@@ -38,6 +43,66 @@ def get_complaint_topics() -> List[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
+class TopicClassifier:
+    """
+    Matches review text against all complaint topic keywords in one pass.
+
+    Keywords of every topic go into one Aho-Corasick automaton; a match
+    reports the same (topic, matched keywords) pairs as checking each
+    keyword with `in` against the lower-cased text.
+    """
+
+    def __init__(self, topics: List[dict]):
+        # One entry per (topic, keyword) in topic/keyword order
+        self._entries: List[Tuple[str, str]] = []
+        index: dict[str, set[int]] = {}
+        for topic in topics:
+            for keyword in topic['keywords'] or []:
+                index.setdefault(keyword.lower(), set()).add(len(self._entries))
+                self._entries.append((str(topic['id']), keyword))
+        self._automaton = KeywordAutomaton(index)
+
+    def classify(self, review_text: str) -> dict[str, List[str]]:
+        """Return topic_id -> matched keywords for already lower-cased text."""
+        matches: dict[str, List[str]] = {}
+        for entry in sorted(self._automaton.find(review_text)):
+            topic_id, keyword = self._entries[entry]
+            matches.setdefault(topic_id, []).append(keyword)
+        return matches
+
+
+def _review_text(review: dict) -> str:
+    return f"{review['title'] or ''} {review['body'] or ''}".lower()
+
+
+def _write_classifications(cur, rows: List[Tuple[str, str, List[str]]]) -> None:
+    """Upsert a chunk of classifications through a COPY-loaded staging table."""
+    if not rows:
+        return
+    cur.execute(
+        '''
+        CREATE TEMP TABLE IF NOT EXISTS review_topic_classifications_stage (
+            review_id UUID,
+            topic_id UUID,
+            matched_keywords TEXT[]
+        ) ON COMMIT DELETE ROWS
+        '''
+    )
+    with cur.copy(
+        'COPY review_topic_classifications_stage (review_id, topic_id, matched_keywords) FROM STDIN'
+    ) as copy:
+        for row in rows:
+            copy.write_row(row)
+    cur.execute(
+        '''
+        INSERT INTO review_topic_classifications (review_id, topic_id, matched_keywords)
+        SELECT review_id, topic_id, matched_keywords FROM review_topic_classifications_stage
+        ON CONFLICT (review_id, topic_id) DO UPDATE SET
+            matched_keywords = EXCLUDED.matched_keywords
+        '''
+    )
+
+
 def classify_review(review_id: str) -> int:
     """
     Classify a review by matching it against complaint topics.
@@ -54,58 +119,64 @@ def classify_review(review_id: str) -> int:
         if not review:
             return 0
 
-        review_text = f"{review['title'] or ''} {review['body'] or ''}".lower()
+        review_text = _review_text(review)
         if not review_text.strip():
             return 0
 
-        # Get all topics
-        cur.execute('SELECT id, keywords FROM complaint_topics WHERE is_active = true')
-        topics = cur.fetchall()
-
-        matched_count = 0
-        for topic in topics:
-            matched_keywords = []
-            for keyword in topic['keywords']:
-                if keyword.lower() in review_text:
-                    matched_keywords.append(keyword)
-
-            if matched_keywords:
-                cur.execute(
-                    '''
-                    INSERT INTO review_topic_classifications (review_id, topic_id, matched_keywords)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (review_id, topic_id) DO UPDATE SET
-                        matched_keywords = EXCLUDED.matched_keywords
-                    ''',
-                    (review_id, topic['id'], matched_keywords)
-                )
-                matched_count += 1
-
+        matches = TopicClassifier(get_complaint_topics()).classify(review_text)
+        _write_classifications(cur, [(review_id, topic_id, kws) for topic_id, kws in matches.items()])
         conn.commit()
-        return matched_count
+        return len(matches)
 
 
-def classify_all_organization_reviews(organization_id: str, days: int = 30) -> int:
-    """Classify all recent reviews for an organization."""
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            '''
-            SELECT id FROM reviews
-            WHERE organization_id = %s
-            AND status = 'approved'
-            AND created_at >= now() - %s * INTERVAL '1 day'
-            ''',
-            (organization_id, days)
-        )
-        review_ids = [row['id'] for row in cur.fetchall()]
+def classify_all_organization_reviews(
+    organization_id: str,
+    days: int = 30,
+    classifier: Optional[TopicClassifier] = None,
+) -> int:
+    """
+    Classify all recent reviews for an organization.
 
+    Topics are loaded once, reviews are streamed with a server-side cursor
+    and classifications are written with one COPY + upsert per chunk of
+    CLASSIFY_CHUNK_SIZE reviews. Returns the number of reviews processed.
+    """
+    classifier = classifier or TopicClassifier(get_complaint_topics())
     classified = 0
-    for review_id in review_ids:
-        try:
-            classify_review(str(review_id))
-            classified += 1
-        except Exception as e:
-            logger.warning(f"Failed to classify review {review_id}: {e}")
+
+    with get_connection() as read_conn, get_connection() as write_conn:
+        with read_conn.cursor(name='defect_classify_reviews', row_factory=dict_row) as reviews, \
+                write_conn.cursor() as cur:
+            reviews.itersize = CLASSIFY_CHUNK_SIZE
+            reviews.execute(
+                '''
+                SELECT id, title, body FROM reviews
+                WHERE organization_id = %s
+                AND status = 'approved'
+                AND created_at >= now() - %s * INTERVAL '1 day'
+                ''',
+                (organization_id, days)
+            )
+
+            while True:
+                chunk = reviews.fetchmany(CLASSIFY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                rows = []
+                for review in chunk:
+                    review_text = _review_text(review)
+                    if not review_text.strip():
+                        continue
+                    for topic_id, keywords in classifier.classify(review_text).items():
+                        rows.append((review['id'], topic_id, keywords))
+                try:
+                    _write_classifications(cur, rows)
+                    write_conn.commit()
+                    classified += len(chunk)
+                except Exception as e:
+                    write_conn.rollback()
+                    logger.warning(f"Failed to classify review chunk for {organization_id}: {e}")
+        read_conn.commit()
 
     return classified
 
@@ -450,16 +521,17 @@ def get_topic_trends(organization_id: str, days: int = 30) -> List[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
-def run_daily_detection(organization_id: str) -> dict:
+def run_daily_detection(organization_id: str, classifier: Optional[TopicClassifier] = None) -> dict:
     """
     Run the full daily detection pipeline for an organization.
 
-    This should be called by a cron job for each active organization.
+    This should be called by a cron job for each active organization
+    (see run_daily_detection_all).
     """
     yesterday = date.today() - timedelta(days=1)
 
     # 1. Classify any unclassified reviews
-    classified = classify_all_organization_reviews(organization_id, days=2)
+    classified = classify_all_organization_reviews(organization_id, days=2, classifier=classifier)
 
     # 2. Aggregate daily stats
     stats = aggregate_daily_stats(organization_id, yesterday)
@@ -486,3 +558,58 @@ def run_daily_detection(organization_id: str) -> dict:
 
     logger.info(f"[defect] Daily detection for {organization_id}: {result}")
     return result
+
+
+# Per-process classifier for run_daily_detection_all workers
+_worker_classifier: Optional[TopicClassifier] = None
+
+
+def _init_detection_worker() -> None:
+    global _worker_classifier
+    _worker_classifier = TopicClassifier(get_complaint_topics())
+
+
+def _run_detection_worker(organization_id: str) -> dict:
+    try:
+        return run_daily_detection(organization_id, classifier=_worker_classifier)
+    except Exception as e:
+        logger.error(f"[defect] Daily detection failed for {organization_id}: {e}")
+        return {'organization_id': organization_id, 'error': str(e)}
+
+
+def get_organizations_with_recent_reviews(days: int = 2) -> List[str]:
+    """Organizations that have approved reviews in the last `days` days."""
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            SELECT DISTINCT organization_id FROM reviews
+            WHERE status = 'approved'
+            AND created_at >= now() - %s * INTERVAL '1 day'
+            ''',
+            (days,)
+        )
+        return [str(row['organization_id']) for row in cur.fetchall()]
+
+
+def run_daily_detection_all(processes: Optional[int] = None) -> List[dict]:
+    """
+    Run daily detection for every organization with recent reviews.
+
+    Organizations are spread over `processes` worker processes (default: CPU
+    count). Workers are spawned, not forked, so each opens its own
+    connection pool; each loads complaint topics once.
+    """
+    organization_ids = get_organizations_with_recent_reviews(days=2)
+    if not organization_ids:
+        return []
+
+    if processes == 1:
+        _init_detection_worker()
+        return [_run_detection_worker(org_id) for org_id in organization_ids]
+
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_detection_worker,
+    ) as executor:
+        return list(executor.map(_run_detection_worker, organization_ids))
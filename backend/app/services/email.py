@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -7,36 +10,80 @@ from email.mime.multipart import MIMEMultipart
 from app.core.config import get_settings
 
 
-async def send_email(to_email: str, subject: str, body_text: str, body_html: str | None = None) -> bool:
+def smtp_configured() -> bool:
+    settings = get_settings()
+    return bool(settings.smtp_host and settings.smtp_user and settings.smtp_password)
+
+
+@asynccontextmanager
+async def smtp_connection() -> AsyncIterator[aiosmtplib.SMTP]:
+    """
+    Открывает одно SMTP-соединение для отправки пачки писем.
+    """
+    settings = get_settings()
+    smtp = aiosmtplib.SMTP(
+        hostname=settings.smtp_host,
+        port=settings.smtp_port,
+        username=settings.smtp_user,
+        password=settings.smtp_password,
+        use_tls=settings.smtp_use_tls,
+    )
+    await smtp.connect()
+    try:
+        yield smtp
+    finally:
+        try:
+            await smtp.quit()
+        except Exception:
+            pass
+
+
+def _build_message(to_email: str, subject: str, body_text: str, body_html: str | None) -> MIMEMultipart:
+    settings = get_settings()
+    message = MIMEMultipart('alternative')
+    message['From'] = f'{settings.smtp_from_name} <{settings.smtp_from_email or settings.smtp_user}>'
+    message['To'] = to_email
+    message['Subject'] = subject
+    
+    message.attach(MIMEText(body_text, 'plain', 'utf-8'))
+    if body_html:
+        message.attach(MIMEText(body_html, 'html', 'utf-8'))
+    return message
+
+
+async def send_email(
+    to_email: str,
+    subject: str,
+    body_text: str,
+    body_html: str | None = None,
+    smtp: aiosmtplib.SMTP | None = None,
+) -> bool:
     """
     Отправляет email через SMTP.
+    Если передан smtp, используется уже открытое соединение.
     Возвращает True при успехе, False при ошибке.
     """
     settings = get_settings()
     
-    if not settings.smtp_host or not settings.smtp_user or not settings.smtp_password:
+    if not smtp_configured():
         # SMTP не настроен, пропускаем отправку
         print(f'[Email] SMTP not configured, skipping email to {to_email}')
         return False
     
     try:
-        message = MIMEMultipart('alternative')
-        message['From'] = f'{settings.smtp_from_name} <{settings.smtp_from_email or settings.smtp_user}>'
-        message['To'] = to_email
-        message['Subject'] = subject
-        
-        message.attach(MIMEText(body_text, 'plain', 'utf-8'))
-        if body_html:
-            message.attach(MIMEText(body_html, 'html', 'utf-8'))
+        message = _build_message(to_email, subject, body_text, body_html)
         
-        await aiosmtplib.send(
-            message,
-            hostname=settings.smtp_host,
-            port=settings.smtp_port,
-            username=settings.smtp_user,
-            password=settings.smtp_password,
-            use_tls=settings.smtp_use_tls,
-        )
+        if smtp is not None:
+            await smtp.send_message(message)
+        else:
+            await aiosmtplib.send(
+                message,
+                hostname=settings.smtp_host,
+                port=settings.smtp_port,
+                username=settings.smtp_user,
+                password=settings.smtp_password,
+                use_tls=settings.smtp_use_tls,
+            )
         return True
     except Exception as e:
         print(f'[Email] Failed to send email to {to_email}: {e}')
@@ -18,6 +18,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.services.leaderboards import PERIODS, scan_leaderboard, scan_scores
 
 logger = logging.getLogger(__name__)
 
@@ -168,6 +169,7 @@ def record_scan(
 
         # Fetch the updated profile
         profile = get_scanner_profile(user_id)
+        scan_leaderboard.set_scores(str(user_id), scan_scores(profile))
 
         # Fetch details of new achievements
         new_achievements = []
@@ -521,100 +523,88 @@ def _generate_claim_data(reward: dict, user_id: str, cur) -> dict:
 # LEADERBOARDS
 # =============================================================================
 
+def _leaderboard_details(cur, user_ids: list[str]) -> dict[str, dict]:
+    """Display fields of the given leaderboard users."""
+    if not user_ids:
+        return {}
+    cur.execute(
+        """
+        SELECT
+            qsp.user_id::text as user_id,
+            COALESCE(p.display_name, u.email) as display_name,
+            p.avatar_url,
+            qsp.total_scans,
+            qsp.current_tier as tier,
+            qsp.unique_organizations_scanned as unique_organizations
+        FROM qr_scanner_profiles qsp
+        JOIN auth.users u ON u.id = qsp.user_id
+        LEFT JOIN profiles p ON p.id = qsp.user_id
+        WHERE qsp.user_id = ANY(%s::uuid[])
+        """,
+        (user_ids,)
+    )
+    return {row["user_id"]: row for row in cur.fetchall()}
+
+
+def _leaderboard_entry(details: dict, score: int, rank: int) -> dict:
+    return {
+        "user_id": details["user_id"],
+        "display_name": details["display_name"],
+        "avatar_url": details["avatar_url"],
+        "total_scans": details["total_scans"],
+        "scans_this_period": score,
+        "tier": details["tier"],
+        "unique_organizations": details["unique_organizations"],
+        "rank": rank,
+    }
+
+
 def get_leaderboard(
     period: str = "monthly",
     limit: int = 20,
     current_user_id: Optional[str] = None,
+    offset: int = 0,
 ) -> dict:
     """
     Get the QR scanning leaderboard.
 
+    Ranks come from the in-memory scan leaderboard; only the returned page
+    and the current user are read from the database.
+
     Args:
         period: "all_time", "monthly", or "weekly"
         limit: Number of entries to return
         current_user_id: Optional user to find their rank
+        offset: Number of leading ranks to skip
 
     Returns:
         Dict with entries, user_entry, total_participants, period, period_label
     """
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Build query based on period
-        if period == "weekly":
-            score_column = "scans_this_month"  # Simplified for now
-            date_filter = "AND qsp.last_scan_date > CURRENT_DATE - 7"
-        elif period == "monthly":
-            score_column = "scans_this_month"
-            date_filter = "AND qsp.month_start = date_trunc('month', CURRENT_DATE)::DATE"
-        else:
-            score_column = "total_scans"
-            date_filter = ""
-
-        # Get leaderboard
-        cur.execute(
-            f"""
-            WITH ranked AS (
-                SELECT
-                    qsp.user_id,
-                    COALESCE(p.display_name, u.email) as display_name,
-                    p.avatar_url,
-                    qsp.total_scans,
-                    qsp.{score_column} as scans_this_period,
-                    qsp.current_tier as tier,
-                    qsp.unique_organizations_scanned as unique_organizations,
-                    ROW_NUMBER() OVER (ORDER BY qsp.{score_column} DESC, qsp.total_scans DESC) as rank
-                FROM qr_scanner_profiles qsp
-                JOIN auth.users u ON u.id = qsp.user_id
-                LEFT JOIN profiles p ON p.id = qsp.user_id
-                WHERE qsp.{score_column} > 0
-                {date_filter}
-            )
-            SELECT * FROM ranked
-            ORDER BY rank
-            LIMIT %s
-            """,
-            (limit,)
-        )
-        entries = [dict(r) for r in cur.fetchall()]
+    board = period if period in PERIODS else "all_time"
+    ranked = scan_leaderboard.page(board, offset, limit)
+    total = scan_leaderboard.total(board)
+    user_rank = scan_leaderboard.rank(board, current_user_id) if current_user_id else None
 
-        # Get total count
-        cur.execute(
-            f"""
-            SELECT COUNT(*) as count
-            FROM qr_scanner_profiles qsp
-            WHERE qsp.{score_column} > 0
-            {date_filter}
-            """
-        )
-        total = cur.fetchone()["count"]
+    user_ids = [user_id for _, user_id, _ in ranked]
+    if user_rank is not None:
+        user_ids.append(current_user_id)
 
-        # Get current user's entry if provided
-        user_entry = None
-        if current_user_id:
-            cur.execute(
-                f"""
-                WITH ranked AS (
-                    SELECT
-                        qsp.user_id,
-                        COALESCE(p.display_name, u.email) as display_name,
-                        p.avatar_url,
-                        qsp.total_scans,
-                        qsp.{score_column} as scans_this_period,
-                        qsp.current_tier as tier,
-                        qsp.unique_organizations_scanned as unique_organizations,
-                        ROW_NUMBER() OVER (ORDER BY qsp.{score_column} DESC, qsp.total_scans DESC) as rank
-                    FROM qr_scanner_profiles qsp
-                    JOIN auth.users u ON u.id = qsp.user_id
-                    LEFT JOIN profiles p ON p.id = qsp.user_id
-                    WHERE qsp.{score_column} > 0
-                    {date_filter}
-                )
-                SELECT * FROM ranked WHERE user_id = %s
-                """,
-                (current_user_id,)
-            )
-            user_row = cur.fetchone()
-            if user_row:
-                user_entry = dict(user_row)
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        details = _leaderboard_details(cur, user_ids)
+
+    entries = [
+        _leaderboard_entry(details[user_id], score, rank)
+        for rank, user_id, score in ranked
+        if user_id in details
+    ]
+
+    user_entry = None
+    if user_rank is not None and current_user_id in details:
+        user_entry = _leaderboard_entry(
+            details[current_user_id],
+            scan_leaderboard.score(board, current_user_id),
+            user_rank,
+        )
 
     period_labels = {
         "all_time": "Все время",
@@ -635,18 +625,51 @@ def archive_monthly_leaderboard(year: int, month: int) -> int:
     """
     Archive the monthly leaderboard for historical records.
 
-    Call this at the end of each month (e.g., via cron job).
+    Call this at the end of each month (e.g., via cron job). The current
+    month is archived from a freshly loaded scan leaderboard; past months
+    fall back to the archive_monthly_leaderboard() database function.
 
     Returns number of entries archived.
     """
+    if date.today().replace(day=1) != date(year, month, 1):
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                "SELECT archive_monthly_leaderboard(%s, %s) as count",
+                (year, month)
+            )
+            result = cur.fetchone()
+            conn.commit()
+            return result["count"]
+
+    scan_leaderboard.refresh(force=True)
+    top = scan_leaderboard.page("monthly", 0, 100)
+    if not top:
+        return 0
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
-            "SELECT archive_monthly_leaderboard(%s, %s) as count",
-            (year, month)
+            """
+            INSERT INTO qr_monthly_leaderboards
+                (year, month, user_id, rank, scans_count, unique_products, unique_organizations)
+            SELECT %s, %s, s.user_id, s.rank, s.scans_count,
+                   qsp.unique_products_scanned, qsp.unique_organizations_scanned
+            FROM unnest(%s::uuid[], %s::int[], %s::int[]) AS s(user_id, rank, scans_count)
+            JOIN qr_scanner_profiles qsp ON qsp.user_id = s.user_id
+            ON CONFLICT (year, month, user_id) DO UPDATE SET
+                rank = EXCLUDED.rank,
+                scans_count = EXCLUDED.scans_count
+            """,
+            (
+                year,
+                month,
+                [user_id for _, user_id, _ in top],
+                [rank for rank, _, _ in top],
+                [score for _, _, score in top],
+            )
         )
-        result = cur.fetchone()
+        count = cur.rowcount
         conn.commit()
-        return result["count"]
+        return count
 
 
 # =============================================================================
@@ -27,6 +27,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.services.region_index import region_indexes
 
 logger = logging.getLogger(__name__)
 
@@ -195,6 +196,7 @@ def add_authorized_region(
             )
             row = cur.fetchone()
             conn.commit()
+            region_indexes.invalidate(organization_id)
 
             logger.info(f"[geo_anomaly] Added authorized region {region_code} for org {organization_id}")
             return dict(row)
@@ -301,6 +303,7 @@ def update_authorized_region(
             if not row:
                 raise HTTPException(status_code=404, detail="Region not found")
 
+            region_indexes.invalidate(organization_id)
             logger.info(f"[geo_anomaly] Updated authorized region {region_id}")
             return dict(row)
 
@@ -342,6 +345,7 @@ def delete_authorized_region(
             conn.commit()
 
             if deleted:
+                region_indexes.invalidate(organization_id)
                 logger.info(f"[geo_anomaly] Deleted authorized region {region_id}")
 
             return deleted
@@ -367,6 +371,9 @@ def check_scan_location(
     """
     Check if a scan location is within authorized regions.
 
+    Answered from the cached region index of the organization (see
+    app.services.region_index); results match check_scan_in_authorized_region().
+
     Args:
         organization_id: Organization UUID
         product_id: Product UUID (optional)
@@ -382,31 +389,7 @@ def check_scan_location(
         - severity: str ('none', 'low', 'medium', 'high', 'critical')
     """
     try:
-        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-            cur.execute(
-                '''
-                SELECT * FROM public.check_scan_in_authorized_region(
-                    %s::uuid,
-                    %s::uuid,
-                    %s::numeric,
-                    %s::numeric
-                )
-                ''',
-                (organization_id, product_id, scan_lat, scan_lng)
-            )
-            row = cur.fetchone()
-
-            if row:
-                return dict(row)
-
-            # Fallback if function returns nothing
-            return {
-                'is_authorized': True,
-                'nearest_region_code': 'UNKNOWN',
-                'nearest_region_name': 'Unknown',
-                'distance_km': 0,
-                'severity': 'none'
-            }
+        return region_indexes.check(organization_id, product_id, scan_lat, scan_lng)
 
     except Exception as e:
         logger.error(f"[geo_anomaly] Error checking scan location: {e}")
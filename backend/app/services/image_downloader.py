@@ -4,12 +4,9 @@ Downloads images from URLs and uploads them to Supabase storage.
 """
 
 import asyncio
-import hashlib
 import io
 import logging
 import uuid
-from typing import Optional
-from urllib.parse import urlparse
 
 import httpx
 from PIL import Image
@@ -26,10 +23,35 @@ MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
 
 
+def create_image_client(
+    timeout: float = 30.0,
+    max_connections: int = 20,
+) -> httpx.AsyncClient:
+    """Connection-pooled client for source image downloads only."""
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        follow_redirects=True,
+        verify=False,  # Some marketplaces have SSL issues
+    )
+
+
+def create_storage_client(
+    timeout: float = 30.0,
+    max_connections: int = 20,
+) -> httpx.AsyncClient:
+    """Connection-pooled client for storage uploads; verifies TLS (sends the service key)."""
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
 async def download_image(
     source_url: str,
     timeout: float = 30.0,
     retries: int = MAX_RETRIES,
+    client: httpx.AsyncClient | None = None,
 ) -> bytes | None:
     """
     Download image from URL with retries.
@@ -38,32 +60,32 @@ async def download_image(
         source_url: URL to download from
         timeout: Request timeout in seconds
         retries: Number of retry attempts
+        client: Shared client; a temporary one is created when omitted
 
     Returns:
         Image bytes or None if download fails
     """
+    if client is None:
+        async with create_image_client(timeout=timeout) as client:
+            return await download_image(source_url, timeout, retries, client)
+
     for attempt in range(retries):
         try:
-            async with httpx.AsyncClient(
-                timeout=timeout,
-                follow_redirects=True,
-                verify=False,  # Some marketplaces have SSL issues
-            ) as client:
-                response = await client.get(source_url)
-                response.raise_for_status()
-
-                # Check content type
-                content_type = response.headers.get('content-type', '').lower()
-                if not any(fmt in content_type for fmt in ['image/', 'octet-stream']):
-                    logger.warning(f"Invalid content type for {source_url}: {content_type}")
-                    return None
-
-                # Check size
-                if len(response.content) > MAX_IMAGE_SIZE:
-                    logger.warning(f"Image too large from {source_url}: {len(response.content)} bytes")
-                    return None
-
-                return response.content
+            response = await client.get(source_url)
+            response.raise_for_status()
+
+            # Check content type
+            content_type = response.headers.get('content-type', '').lower()
+            if not any(fmt in content_type for fmt in ['image/', 'octet-stream']):
+                logger.warning(f"Invalid content type for {source_url}: {content_type}")
+                return None
+
+            # Check size
+            if len(response.content) > MAX_IMAGE_SIZE:
+                logger.warning(f"Image too large from {source_url}: {len(response.content)} bytes")
+                return None
+
+            return response.content
 
         except httpx.HTTPStatusError as e:
             logger.warning(f"HTTP error downloading {source_url}: {e.response.status_code}")
@@ -188,6 +210,7 @@ async def upload_to_supabase(
     bucket: str,
     path: str,
     content_type: str = 'image/webp',
+    client: httpx.AsyncClient | None = None,
 ) -> str | None:
     """
     Upload file to Supabase Storage.
@@ -197,33 +220,37 @@ async def upload_to_supabase(
         bucket: Storage bucket name
         path: File path within bucket
         content_type: MIME type
+        client: Shared client; a temporary one is created when omitted
 
     Returns:
         Public URL or None if upload fails
     """
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await upload_to_supabase(file_data, bucket, path, content_type, client)
+
     settings = get_settings()
 
     try:
         url = f"{settings.supabase_url}/storage/v1/object/{bucket}/{path}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                content=file_data,
-                headers={
-                    'Authorization': f'Bearer {settings.supabase_service_role_key}',
-                    'Content-Type': content_type,
-                    'x-upsert': 'true',
-                },
-            )
-
-            if response.status_code in (200, 201):
-                # Return public URL
-                public_url = f"{settings.supabase_url}/storage/v1/object/public/{bucket}/{path}"
-                return public_url
-            else:
-                logger.error(f"Upload failed: {response.status_code} - {response.text}")
-                return None
+        response = await client.post(
+            url,
+            content=file_data,
+            headers={
+                'Authorization': f'Bearer {settings.supabase_service_role_key}',
+                'Content-Type': content_type,
+                'x-upsert': 'true',
+            },
+        )
+
+        if response.status_code in (200, 201):
+            # Return public URL
+            public_url = f"{settings.supabase_url}/storage/v1/object/public/{bucket}/{path}"
+            return public_url
+        else:
+            logger.error(f"Upload failed: {response.status_code} - {response.text}")
+            return None
 
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
@@ -261,6 +288,8 @@ async def download_and_upload_image(
     product_id: str,
     image_type: str = 'main',
     create_thumb: bool = True,
+    client: httpx.AsyncClient | None = None,
+    storage_client: httpx.AsyncClient | None = None,
 ) -> tuple[str | None, str | None]:
     """
     Download image from URL and upload to Supabase storage.
@@ -271,12 +300,14 @@ async def download_and_upload_image(
         product_id: Product UUID
         image_type: 'main' or 'gallery'
         create_thumb: Whether to create and upload thumbnail
+        client: Shared client for the download
+        storage_client: Shared client for the uploads
 
     Returns:
         Tuple of (image_url, thumbnail_url)
     """
     # Download
-    image_data = await download_image(source_url)
+    image_data = await download_image(source_url, client=client)
     if not image_data:
         logger.warning(f"Failed to download image: {source_url}")
         return None, None
@@ -292,7 +323,7 @@ async def download_and_upload_image(
 
     # Upload main image
     path = generate_storage_path(organization_id, product_id, image_type)
-    image_url = await upload_to_supabase(processed, 'org-media', path)
+    image_url = await upload_to_supabase(processed, 'org-media', path, client=storage_client)
 
     if not image_url:
         return None, None
@@ -302,7 +333,7 @@ async def download_and_upload_image(
     if create_thumb:
         thumbnail = create_thumbnail(image_data)
         thumb_path = generate_storage_path(organization_id, product_id, 'thumbnails')
-        thumb_url = await upload_to_supabase(thumbnail, 'org-media', thumb_path)
+        thumb_url = await upload_to_supabase(thumbnail, 'org-media', thumb_path, client=storage_client)
 
     return image_url, thumb_url
 
@@ -314,6 +345,8 @@ async def process_image_queue_item(
     source_url: str,
     target_type: str,
     organization_id: str,
+    client: httpx.AsyncClient | None = None,
+    storage_client: httpx.AsyncClient | None = None,
 ) -> dict:
     """
     Process a single image queue item.
@@ -325,6 +358,8 @@ async def process_image_queue_item(
         source_url: Image source URL
         target_type: 'main' or 'gallery'
         organization_id: Organization UUID
+        client: Shared client for the download
+        storage_client: Shared client for the uploads
 
     Returns:
         Result dictionary with status and URLs
@@ -336,6 +371,8 @@ async def process_image_queue_item(
             product_id=product_id,
             image_type=target_type,
             create_thumb=True,
+            client=client,
+            storage_client=storage_client,
         )
 
         if image_url:
@@ -381,16 +418,21 @@ async def process_image_batch(
     """
     semaphore = asyncio.Semaphore(concurrency)
 
-    async def process_with_semaphore(item: dict) -> dict:
-        async with semaphore:
-            return await process_image_queue_item(
-                job_id=item['job_id'],
-                item_id=item['id'],
-                product_id=item['product_id'],
-                source_url=item['source_url'],
-                target_type=item['target_type'],
-                organization_id=organization_id,
-            )
-
-    tasks = [process_with_semaphore(item) for item in items]
-    return await asyncio.gather(*tasks)
+    async with create_image_client(max_connections=concurrency) as client, \
+            create_storage_client(max_connections=concurrency) as storage_client:
+
+        async def process_with_semaphore(item: dict) -> dict:
+            async with semaphore:
+                return await process_image_queue_item(
+                    job_id=item['job_id'],
+                    item_id=item['id'],
+                    product_id=item['product_id'],
+                    source_url=item['source_url'],
+                    target_type=item['target_type'],
+                    organization_id=organization_id,
+                    client=client,
+                    storage_client=storage_client,
+                )
+
+        tasks = [process_with_semaphore(item) for item in items]
+        return await asyncio.gather(*tasks)
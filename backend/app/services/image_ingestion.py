@@ -0,0 +1,439 @@
+"""
+Image ingestion worker for import_image_queue.
+
+- rows are claimed in batches with FOR UPDATE SKIP LOCKED so several
+  workers can drain the queue; rows left in 'downloading' longer than the
+  claim timeout are reclaimed
+- one connection-pooled client is shared by all downloads, with a
+  per-host concurrency limit so a single marketplace CDN is not flooded;
+  storage uploads go through a second, TLS-verifying pooled client
+- identical source URLs are downloaded once (within a batch and via
+  image_source_urls), and identical content is stored once per sha256
+  (image_assets), across products and jobs
+- resizing and thumbnails run in a process pool
+- transient failures are retried with backoff up to image_ingest_max_retries
+
+Run with `python -m app.cron.image_ingestion_worker`.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from time import monotonic
+from typing import Optional, Union
+from urllib.parse import urlparse
+
+import httpx
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_async_connection
+from app.services.image_downloader import (
+    MAX_IMAGE_SIZE,
+    create_image_client,
+    create_storage_client,
+    create_thumbnail,
+    process_image,
+    upload_to_supabase,
+    validate_image,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STORAGE_BUCKET = 'org-media'
+
+
+@dataclass
+class IngestionStats:
+    started_at: float = field(default_factory=monotonic)
+    claimed: int = 0
+    completed: int = 0
+    retried: int = 0
+    failed: int = 0
+    downloads: int = 0
+    bytes_downloaded: int = 0
+    url_dedupe_hits: int = 0
+    content_dedupe_hits: int = 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        elapsed = max(monotonic() - data.pop('started_at'), 1e-9)
+        data['images_per_second'] = round(self.completed / elapsed, 2)
+        return data
+
+
+_stats = IngestionStats()
+
+
+def get_ingestion_stats() -> dict:
+    return _stats.as_dict()
+
+
+@dataclass(frozen=True)
+class Asset:
+    content_hash: str
+    image_url: str
+    thumbnail_url: Optional[str]
+
+
+class FetchError(Exception):
+    """Download/processing failure; retryable ones go back to the queue."""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class HostLimiter:
+    """Per-host concurrency limit."""
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ''
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self._limit)
+        return semaphore
+
+
+def render_image(image_data: bytes) -> tuple[bytes, bytes]:
+    """Validate, resize and thumbnail an image. Runs in a worker process."""
+    is_valid, _, error = validate_image(image_data)
+    if not is_valid:
+        raise ValueError(error)
+    return process_image(image_data), create_thumbnail(image_data)
+
+
+def storage_path(content_hash: str, suffix: str = '') -> str:
+    return f"imports/{content_hash[:2]}/{content_hash}{suffix}.webp"
+
+
+async def fetch_image(client: httpx.AsyncClient, url: str, limiter: HostLimiter) -> bytes:
+    """Stream an image, enforcing content type and MAX_IMAGE_SIZE."""
+    async with limiter(url):
+        try:
+            async with client.stream('GET', url) as response:
+                if response.status_code >= 400:
+                    retryable = response.status_code >= 500 or response.status_code in (408, 429)
+                    raise FetchError(f'HTTP {response.status_code}', retryable)
+
+                content_type = response.headers.get('content-type', '').lower()
+                if not any(fmt in content_type for fmt in ('image/', 'octet-stream')):
+                    raise FetchError(f'Invalid content type: {content_type}', retryable=False)
+
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_IMAGE_SIZE:
+                        raise FetchError('Image too large', retryable=False)
+                    chunks.append(chunk)
+        except httpx.RequestError as e:
+            raise FetchError(f'Request error: {e}', retryable=True) from e
+
+    _stats.downloads += 1
+    _stats.bytes_downloaded += size
+    return b''.join(chunks)
+
+
+# Queue and asset storage
+
+async def claim_items(limit: int) -> list[dict]:
+    """Claim pending (or abandoned) queue rows for this worker."""
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                WITH claimable AS (
+                    SELECT id
+                    FROM import_image_queue
+                    WHERE (status = 'pending' AND (next_attempt_at IS NULL OR next_attempt_at <= now()))
+                       OR (status = 'downloading' AND claimed_at < now() - make_interval(secs => %s))
+                    ORDER BY created_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE import_image_queue q
+                SET status = 'downloading', claimed_at = now(), updated_at = now()
+                FROM claimable c
+                WHERE q.id = c.id
+                RETURNING q.id, q.product_id, q.source_url, q.target_type, q.display_order, q.retry_count
+                ''',
+                (settings.image_ingest_claim_timeout_seconds, limit),
+            )
+            rows = await cur.fetchall()
+            await conn.commit()
+    return rows
+
+
+async def lookup_source_urls(urls: list[str]) -> dict[str, Asset]:
+    if not urls:
+        return {}
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                SELECT s.source_url, a.content_hash, a.image_url, a.thumbnail_url
+                FROM image_source_urls s
+                JOIN image_assets a ON a.content_hash = s.content_hash
+                WHERE s.source_url = ANY(%s)
+                ''',
+                (urls,),
+            )
+            rows = await cur.fetchall()
+    return {r['source_url']: Asset(r['content_hash'], r['image_url'], r['thumbnail_url']) for r in rows}
+
+
+async def lookup_asset(content_hash: str) -> Optional[Asset]:
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                'SELECT content_hash, image_url, thumbnail_url FROM image_assets WHERE content_hash = %s',
+                (content_hash,),
+            )
+            row = await cur.fetchone()
+    return Asset(row['content_hash'], row['image_url'], row['thumbnail_url']) if row else None
+
+
+async def save_asset(asset: Asset, source_url: str, byte_size: int) -> None:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                INSERT INTO image_assets (content_hash, image_url, thumbnail_url, byte_size)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (content_hash) DO NOTHING
+                ''',
+                (asset.content_hash, asset.image_url, asset.thumbnail_url, byte_size),
+            )
+            await cur.execute(
+                '''
+                INSERT INTO image_source_urls (source_url, content_hash)
+                VALUES (%s, %s)
+                ON CONFLICT (source_url) DO NOTHING
+                ''',
+                (source_url, asset.content_hash),
+            )
+            await conn.commit()
+
+
+@dataclass
+class ItemResult:
+    item: dict
+    status: str  # completed | pending (retry) | failed
+    asset: Optional[Asset] = None
+    error_message: Optional[str] = None
+    retry_delay: Optional[float] = None
+
+
+def resolve_item(item: dict, outcome: Union[Asset, BaseException]) -> ItemResult:
+    """Turn the outcome for an item's source URL into its queue update."""
+    if isinstance(outcome, Asset):
+        return ItemResult(item, 'completed', asset=outcome)
+
+    retryable = outcome.retryable if isinstance(outcome, FetchError) else True
+    retry_count = item.get('retry_count') or 0
+    if retryable and retry_count < settings.image_ingest_max_retries:
+        delay = settings.image_ingest_retry_delay_seconds * 2 ** retry_count
+        return ItemResult(item, 'pending', error_message=str(outcome), retry_delay=delay)
+    return ItemResult(item, 'failed', error_message=str(outcome))
+
+
+async def write_results(results: list[ItemResult]) -> None:
+    """Update queue rows and attach completed images to products in one transaction."""
+    if not results:
+        return
+
+    main_images: dict[str, str] = {}
+    gallery = []
+    for r in results:
+        if r.status != 'completed' or not r.item.get('product_id'):
+            continue
+        if r.item['target_type'] == 'main':
+            main_images[r.item['product_id']] = r.asset.image_url
+        else:
+            gallery.append((r.item['product_id'], r.asset.image_url, r.item.get('display_order') or 0))
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                UPDATE import_image_queue q
+                SET status = r.status,
+                    result_url = r.result_url,
+                    thumbnail_url = r.thumbnail_url,
+                    content_hash = r.content_hash,
+                    error_message = r.error_message,
+                    retry_count = q.retry_count + CASE WHEN r.retry_delay IS NULL THEN 0 ELSE 1 END,
+                    next_attempt_at = CASE
+                        WHEN r.retry_delay IS NULL THEN NULL
+                        ELSE now() + make_interval(secs => r.retry_delay)
+                    END,
+                    claimed_at = NULL,
+                    updated_at = now()
+                FROM unnest(
+                    %s::uuid[], %s::text[], %s::text[], %s::text[], %s::text[], %s::text[], %s::float8[]
+                ) AS r(id, status, result_url, thumbnail_url, content_hash, error_message, retry_delay)
+                WHERE q.id = r.id
+                ''',
+                (
+                    [r.item['id'] for r in results],
+                    [r.status for r in results],
+                    [r.asset.image_url if r.asset else None for r in results],
+                    [r.asset.thumbnail_url if r.asset else None for r in results],
+                    [r.asset.content_hash if r.asset else None for r in results],
+                    [r.error_message for r in results],
+                    [r.retry_delay for r in results],
+                ),
+            )
+            if main_images:
+                await cur.execute(
+                    '''
+                    UPDATE products p
+                    SET main_image_url = r.url, updated_at = now()
+                    FROM unnest(%s::uuid[], %s::text[]) AS r(product_id, url)
+                    WHERE p.id = r.product_id
+                    ''',
+                    (list(main_images), list(main_images.values())),
+                )
+            if gallery:
+                await cur.execute(
+                    '''
+                    UPDATE products p
+                    SET gallery = COALESCE(p.gallery, '[]'::jsonb) || g.items, updated_at = now()
+                    FROM (
+                        SELECT r.product_id,
+                               jsonb_agg(jsonb_build_object('url', r.url) ORDER BY r.display_order) AS items
+                        FROM unnest(%s::uuid[], %s::text[], %s::int[]) AS r(product_id, url, display_order)
+                        GROUP BY r.product_id
+                    ) g
+                    WHERE p.id = g.product_id
+                    ''',
+                    ([g[0] for g in gallery], [g[1] for g in gallery], [g[2] for g in gallery]),
+                )
+            await conn.commit()
+
+
+# Worker
+
+async def ingest_url(
+    client: httpx.AsyncClient,
+    limiter: HostLimiter,
+    executor: Optional[Executor],
+    source_url: str,
+    storage_client: Optional[httpx.AsyncClient] = None,
+) -> Asset:
+    """Download one source URL and store it unless its content is already stored."""
+    image_data = await fetch_image(client, source_url, limiter)
+    content_hash = hashlib.sha256(image_data).hexdigest()
+
+    asset = await lookup_asset(content_hash)
+    if asset is not None:
+        _stats.content_dedupe_hits += 1
+    else:
+        try:
+            processed, thumbnail = await asyncio.get_running_loop().run_in_executor(
+                executor, render_image, image_data
+            )
+        except Exception as e:
+            raise FetchError(f'Invalid image: {e}', retryable=False) from e
+
+        image_url = await upload_to_supabase(processed, STORAGE_BUCKET, storage_path(content_hash), client=storage_client)
+        if not image_url:
+            raise FetchError('Upload failed', retryable=True)
+        thumbnail_url = await upload_to_supabase(
+            thumbnail, STORAGE_BUCKET, storage_path(content_hash, '_thumb'), client=storage_client
+        )
+        asset = Asset(content_hash, image_url, thumbnail_url)
+
+    await save_asset(asset, source_url, len(image_data))
+    return asset
+
+
+async def ingest_batch(
+    client: httpx.AsyncClient,
+    limiter: HostLimiter,
+    executor: Optional[Executor],
+    storage_client: Optional[httpx.AsyncClient] = None,
+) -> int:
+    """Claim and process one batch. Returns the number of claimed rows."""
+    items = await claim_items(settings.image_ingest_batch_size)
+    if not items:
+        return 0
+    _stats.claimed += len(items)
+
+    by_url: dict[str, list[dict]] = {}
+    for item in items:
+        by_url.setdefault(item['source_url'], []).append(item)
+    known = await lookup_source_urls(list(by_url))
+    # Every item beyond one download per unseen URL is served without downloading
+    _stats.url_dedupe_hits += len(items) - sum(1 for url in by_url if url not in known)
+
+    semaphore = asyncio.Semaphore(settings.image_ingest_concurrency)
+
+    async def resolve(url: str) -> Asset:
+        if url in known:
+            return known[url]
+        async with semaphore:
+            return await ingest_url(client, limiter, executor, url, storage_client)
+
+    outcomes = await asyncio.gather(*(resolve(url) for url in by_url), return_exceptions=True)
+
+    results = [
+        resolve_item(item, outcome)
+        for (url, group), outcome in zip(by_url.items(), outcomes)
+        for item in group
+    ]
+    for r in results:
+        if r.status == 'completed':
+            _stats.completed += 1
+        elif r.status == 'pending':
+            _stats.retried += 1
+        else:
+            _stats.failed += 1
+            logger.warning(f"Image {r.item['source_url']} failed: {r.error_message}")
+
+    await write_results(results)
+    return len(items)
+
+
+async def run_worker(forever: bool = False, idle_seconds: float = 5.0) -> dict:
+    """
+    Drain import_image_queue; with forever=True keep polling when it is empty.
+
+    Returns the ingestion counters.
+    """
+    processes = settings.image_ingest_processes
+    executor = (
+        ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        if processes > 1 else None  # None runs rendering in the default thread pool
+    )
+    limiter = HostLimiter(settings.image_ingest_per_host_limit)
+    try:
+        async with create_image_client(
+            timeout=settings.image_ingest_timeout_seconds,
+            max_connections=settings.image_ingest_concurrency,
+        ) as client, create_storage_client(
+            timeout=settings.image_ingest_timeout_seconds,
+            max_connections=settings.image_ingest_concurrency,
+        ) as storage_client:
+            while True:
+                claimed = await ingest_batch(client, limiter, executor, storage_client)
+                if claimed:
+                    logger.info(f'Image ingestion: {get_ingestion_stats()}')
+                    continue
+                if not forever:
+                    break
+                await asyncio.sleep(idle_seconds)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return get_ingestion_stats()
@@ -0,0 +1,569 @@
+"""
+Streaming bulk import pipeline.
+
+Import files are processed in chunks of `import_chunk_size` rows:
+- rows are mapped and validated in a process pool while the parent keeps
+  parsing (mapping and validation are pure functions)
+- each chunk is written in one transaction: COPY into a temp staging table,
+  set-based duplicate handling and INSERT into products, COPY of image
+  download rows into import_image_queue, then the job counters together
+  with last_committed_row
+- jobs run in a background thread and hold a lease (heartbeat_at); a job
+  interrupted mid-file is picked up by resume_imports() and continues after
+  its last committed chunk
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from psycopg.rows import dict_row
+from slugify import slugify
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+from app.services.import_parsers import get_parser
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Temp directory for uploaded files
+UPLOAD_DIR = tempfile.gettempdir()
+
+MAX_GALLERY_IMAGES = 10
+
+STAGE_COLUMNS = (
+    'id', 'row_number', 'slug', 'name', 'short_description', 'long_description',
+    'category', 'tags', 'price_cents', 'currency', 'external_url', 'sku', 'barcode',
+    'stock_quantity',
+)
+
+_running: set[str] = set()
+_running_lock = threading.Lock()
+
+
+def import_file_path(job_id: str, source_filename: Optional[str]) -> str:
+    ext = os.path.splitext(source_filename or '')[1].lower()
+    return os.path.join(UPLOAD_DIR, f"import_{job_id}{ext}")
+
+
+# Row preparation (runs in worker processes)
+
+def apply_mapping(raw_row: dict[str, Any], mapping: dict[str, str]) -> dict[str, Any]:
+    """Apply field mapping to a raw row."""
+    mapped = {}
+    for source_col, target_field in mapping.items():
+        if source_col in raw_row:
+            mapped[target_field] = raw_row[source_col]
+    return mapped
+
+
+def validate_row(mapped: dict[str, Any], row_number: int) -> list[str]:
+    """Validate a mapped row and return error messages."""
+    errors = []
+
+    if not mapped.get('name'):
+        errors.append('Название товара обязательно')
+
+    price = mapped.get('price')
+    if price is not None:
+        try:
+            price_val = parse_price(price)
+            if price_val is not None and price_val < 0:
+                errors.append('Цена не может быть отрицательной')
+        except (ValueError, TypeError):
+            errors.append('Некорректное значение цены')
+
+    return errors
+
+
+def parse_price(value: Any) -> int | None:
+    """Parse price value to cents."""
+    if value is None:
+        return None
+
+    try:
+        if isinstance(value, str):
+            clean = value.replace(' ', '').replace('\xa0', '')
+            clean = clean.replace('₽', '').replace('руб', '').replace('р', '')
+            clean = clean.replace(',', '.')
+            value = float(clean)
+        return int(float(value) * 100)
+    except (ValueError, TypeError):
+        return None
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or value == '':
+        return None
+    return str(value)
+
+
+def _image_rows(mapped: dict[str, Any]) -> list[tuple[str, str, int]]:
+    images = []
+    main_url = mapped.get('main_image_url')
+    if main_url:
+        images.append((main_url, 'main', 0))
+
+    gallery_urls = mapped.get('gallery_urls') or []
+    if isinstance(gallery_urls, str):
+        gallery_urls = [u.strip() for u in gallery_urls.split(';') if u.strip()]
+    for i, url in enumerate(gallery_urls[:MAX_GALLERY_IMAGES]):
+        images.append((url, 'gallery', i))
+    return images
+
+
+@dataclass
+class PreparedRow:
+    """A validated row ready for staging. None means "not provided"."""
+    row_number: int
+    slug: str
+    name: str
+    short_description: Optional[str] = None
+    long_description: Optional[str] = None
+    category: Optional[str] = None
+    tags: Optional[str] = None
+    price_cents: Optional[int] = None
+    currency: Optional[str] = None
+    external_url: Optional[str] = None
+    sku: Optional[str] = None
+    barcode: Optional[str] = None
+    stock_quantity: Optional[int] = None
+    images: list[tuple[str, str, int]] = field(default_factory=list)
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    def stage_row(self) -> tuple:
+        return tuple(getattr(self, column) for column in STAGE_COLUMNS)
+
+    def merge(self, other: 'PreparedRow') -> None:
+        """Apply a later row for the same slug on top of this one."""
+        for column in STAGE_COLUMNS[3:]:
+            value = getattr(other, column)
+            if value is not None:
+                setattr(self, column, value)
+        self.images.extend(other.images)
+
+
+def prepare_rows(
+    rows: list[tuple[int, dict[str, Any]]],
+    mapping: dict[str, str],
+    download_images: bool,
+) -> tuple[list[PreparedRow], int]:
+    """Map and validate (row_number, raw_row) pairs. Returns (prepared, invalid_count)."""
+    prepared: list[PreparedRow] = []
+    invalid = 0
+    for row_number, raw_row in rows:
+        try:
+            mapped = apply_mapping(raw_row, mapping)
+            name = str(mapped.get('name') or '').strip()
+            if validate_row(mapped, row_number) or not name:
+                invalid += 1
+                continue
+
+            stock = mapped.get('stock_quantity')
+            prepared.append(PreparedRow(
+                row_number=row_number,
+                slug=mapped.get('slug') or slugify(name, lowercase=True),
+                name=name,
+                short_description=_text(mapped.get('short_description')),
+                long_description=_text(mapped.get('long_description')),
+                category=_text(mapped.get('category')),
+                tags=_text(mapped.get('tags')),
+                price_cents=parse_price(mapped.get('price')),
+                currency=_text(mapped.get('currency')),
+                external_url=_text(mapped.get('external_url')),
+                sku=_text(mapped.get('sku')),
+                barcode=_text(mapped.get('barcode')),
+                stock_quantity=int(stock) if stock not in (None, '') else None,
+                images=_image_rows(mapped) if download_images else [],
+            ))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Import row {row_number} rejected: {e}")
+            invalid += 1
+    return prepared, invalid
+
+
+def _iter_chunks(
+    rows: Iterable[dict[str, Any]],
+    size: int,
+    skip_until: int = 0,
+) -> Iterator[list[tuple[int, dict[str, Any]]]]:
+    numbered = ((n, row) for n, row in enumerate(rows, start=1) if n > skip_until)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _prepare_chunks(
+    chunks: Iterable[list[tuple[int, dict[str, Any]]]],
+    mapping: dict[str, str],
+    download_images: bool,
+    workers: int,
+) -> Iterator[tuple[int, list[PreparedRow], int]]:
+    """
+    Yield (last_row_number, prepared_rows, invalid_count) per chunk, in order.
+
+    With workers > 1 chunks are prepared in a spawned process pool with up
+    to 2 * workers chunks in flight.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield (chunk[-1][0], *prepare_rows(chunk, mapping, download_images))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+    ) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append((chunk[-1][0], executor.submit(prepare_rows, chunk, mapping, download_images)))
+            if len(pending) >= workers * 2:
+                last_row, future = pending.popleft()
+                yield (last_row, *future.result())
+        while pending:
+            last_row, future = pending.popleft()
+            yield (last_row, *future.result())
+
+
+# Chunk writes
+
+@dataclass
+class ChunkResult:
+    successful: int = 0
+    failed: int = 0
+    images: int = 0
+
+
+def _dedupe_rows(
+    rows: list[PreparedRow],
+    skip_duplicates: bool,
+    update_existing: bool,
+) -> tuple[list[PreparedRow], int, int]:
+    """
+    Resolve slug collisions inside a chunk the way sequential inserts would:
+    later rows update the first one, are skipped, or get a suffixed slug.
+
+    Returns (unique_rows, merged_count, skipped_count).
+    """
+    by_slug: dict[str, PreparedRow] = {}
+    merged = skipped = 0
+    for row in rows:
+        first = by_slug.get(row.slug)
+        if first is None:
+            by_slug[row.slug] = row
+        elif update_existing:
+            first.merge(row)
+            merged += 1
+        elif skip_duplicates:
+            skipped += 1
+        else:
+            row.slug = f"{row.slug}-{uuid.uuid4().hex[:6]}"
+            by_slug[row.slug] = row
+    return list(by_slug.values()), merged, skipped
+
+
+def write_chunk(cur, job: dict, rows: list[PreparedRow]) -> ChunkResult:
+    """
+    Upsert one chunk of prepared rows and queue their images.
+
+    Must run inside the caller's transaction; existing products (by
+    organization_id, slug) are updated when update_existing is set, skipped
+    when skip_duplicates is set, otherwise inserted under a suffixed slug.
+    """
+    organization_id = job['organization_id']
+    user_id = job['created_by']
+    update_existing = bool(job.get('update_existing', False))
+    skip_duplicates = bool(job.get('skip_duplicates', True))
+
+    rows, merged, skipped = _dedupe_rows(rows, skip_duplicates, update_existing)
+    result = ChunkResult(successful=merged, failed=skipped)
+    if not rows:
+        return result
+
+    cur.execute(
+        '''
+        CREATE TEMP TABLE IF NOT EXISTS import_products_stage (
+            id uuid PRIMARY KEY,
+            row_number integer NOT NULL,
+            slug text NOT NULL,
+            name text NOT NULL,
+            short_description text,
+            long_description text,
+            category text,
+            tags text,
+            price_cents integer,
+            currency text,
+            external_url text,
+            sku text,
+            barcode text,
+            stock_quantity integer
+        ) ON COMMIT DELETE ROWS
+        '''
+    )
+    with cur.copy(f"COPY import_products_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row.stage_row())
+
+    by_row_number = {row.row_number: row for row in rows}
+    by_id = {row.id: row for row in rows}
+    written: list[tuple[str, PreparedRow]] = []
+    staged = len(rows)
+
+    if update_existing:
+        cur.execute(
+            '''
+            UPDATE products p
+            SET name = s.name,
+                short_description = COALESCE(s.short_description, p.short_description),
+                long_description = COALESCE(s.long_description, p.long_description),
+                price_cents = COALESCE(s.price_cents, p.price_cents),
+                stock_quantity = COALESCE(s.stock_quantity, p.stock_quantity),
+                sku = COALESCE(s.sku, p.sku),
+                barcode = COALESCE(s.barcode, p.barcode),
+                updated_by = %s,
+                updated_at = now()
+            FROM import_products_stage s
+            WHERE p.organization_id = %s AND p.slug = s.slug
+            RETURNING p.id, s.row_number
+            ''',
+            (user_id, organization_id),
+        )
+        written.extend((str(r['id']), by_row_number[r['row_number']]) for r in cur.fetchall())
+        cur.execute(
+            '''
+            DELETE FROM import_products_stage s
+            USING products p
+            WHERE p.organization_id = %s AND p.slug = s.slug
+            ''',
+            (organization_id,),
+        )
+        staged -= cur.rowcount
+    elif skip_duplicates:
+        cur.execute(
+            '''
+            DELETE FROM import_products_stage s
+            USING products p
+            WHERE p.organization_id = %s AND p.slug = s.slug
+            ''',
+            (organization_id,),
+        )
+        staged -= cur.rowcount
+        result.failed += cur.rowcount
+    else:
+        cur.execute(
+            '''
+            UPDATE import_products_stage s
+            SET slug = s.slug || '-' || substr(md5(s.id::text), 1, 6)
+            FROM products p
+            WHERE p.organization_id = %s AND p.slug = s.slug
+            ''',
+            (organization_id,),
+        )
+
+    cur.execute(
+        '''
+        INSERT INTO products (
+            id, organization_id, slug, name, short_description, long_description,
+            category, tags, price_cents, currency, status, is_featured,
+            external_url, sku, barcode, stock_quantity, created_by, updated_by
+        )
+        SELECT
+            s.id, %s, s.slug, s.name, s.short_description, s.long_description,
+            s.category, s.tags, s.price_cents, COALESCE(s.currency, 'RUB'), 'draft', false,
+            s.external_url, s.sku, s.barcode, COALESCE(s.stock_quantity, 0), %s, %s
+        FROM import_products_stage s
+        ON CONFLICT (organization_id, slug) DO NOTHING
+        RETURNING id
+        ''',
+        (organization_id, user_id, user_id),
+    )
+    inserted = [str(r['id']) for r in cur.fetchall()]
+    written.extend((product_id, by_id[product_id]) for product_id in inserted)
+
+    result.successful += len(written)
+    result.failed += staged - len(inserted)  # lost a slug race to a concurrent insert
+
+    images = [
+        (job['id'], product_id, url, target_type, display_order)
+        for product_id, row in written
+        for url, target_type, display_order in row.images
+    ]
+    if images:
+        with cur.copy(
+            'COPY import_image_queue (job_id, product_id, source_url, target_type, display_order) FROM STDIN'
+        ) as copy:
+            for image in images:
+                copy.write_row(image)
+    result.images = len(images)
+    return result
+
+
+# Job execution
+
+def _claim_job(job_id: str) -> Optional[dict]:
+    """Take the lease on a processing job; None if another worker holds it."""
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            UPDATE import_jobs
+            SET heartbeat_at = now(), updated_at = now()
+            WHERE id = %s
+              AND status = 'processing'
+              AND (heartbeat_at IS NULL OR heartbeat_at < now() - make_interval(secs => %s))
+            RETURNING *
+            ''',
+            (job_id, settings.import_lease_seconds),
+        )
+        job = cur.fetchone()
+        conn.commit()
+        return job
+
+
+def _save_progress(cur, job_id: str, last_row: int, successful: int, failed: int) -> bool:
+    """Record a committed chunk. False when the job is no longer processing (cancelled)."""
+    cur.execute(
+        '''
+        UPDATE import_jobs
+        SET processed_rows = %s,
+            successful_rows = %s,
+            failed_rows = %s,
+            last_committed_row = %s,
+            heartbeat_at = now(),
+            updated_at = now()
+        WHERE id = %s AND status = 'processing'
+        RETURNING id
+        ''',
+        (last_row, successful, failed, last_row, job_id),
+    )
+    return cur.fetchone() is not None
+
+
+def _finish_job(job_id: str, status: str, error_message: Optional[str] = None) -> Optional[dict]:
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            UPDATE import_jobs
+            SET status = %s,
+                error_message = COALESCE(%s, error_message),
+                completed_at = now(),
+                heartbeat_at = NULL,
+                updated_at = now()
+            WHERE id = %s AND status = 'processing'
+            RETURNING *
+            ''',
+            (status, error_message, job_id),
+        )
+        job = cur.fetchone()
+        conn.commit()
+        return job
+
+
+def run_import(job_id: str) -> Optional[dict]:
+    """
+    Process a claimed import job chunk by chunk.
+
+    Returns the final job row, or None when the job is leased elsewhere or
+    was cancelled while running.
+    """
+    job = _claim_job(job_id)
+    if job is None:
+        return None
+
+    temp_path = import_file_path(job_id, job['source_filename'])
+    if not os.path.exists(temp_path):
+        return _finish_job(job_id, 'failed', 'Файл не найден')
+
+    parser = get_parser(job['source_type'])
+    mapping = job.get('field_mapping') or {}
+    resume_after = job.get('last_committed_row') or 0
+    successful = (job.get('successful_rows') or 0) if resume_after else 0
+    failed = (job.get('failed_rows') or 0) if resume_after else 0
+    if resume_after:
+        logger.info(f"Resuming import {job_id} after row {resume_after}")
+
+    chunk_size = max(1, settings.import_chunk_size)
+    workers = settings.import_validation_workers
+    if (job.get('total_rows') or 0) - resume_after <= chunk_size:
+        workers = 1  # not worth spawning a pool for a single chunk
+
+    try:
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            chunks = _iter_chunks(parser.iter_rows(temp_path), chunk_size, resume_after)
+            for last_row, prepared, invalid in _prepare_chunks(chunks, mapping, job['download_images'], workers):
+                chunk = write_chunk(cur, job, prepared)
+                successful += chunk.successful
+                failed += invalid + chunk.failed
+                if not _save_progress(cur, job_id, last_row, successful, failed):
+                    conn.rollback()
+                    logger.info(f"Import {job_id} stopped: no longer processing")
+                    return None
+                conn.commit()
+    except Exception as e:
+        logger.exception(f"Import {job_id} failed")
+        return _finish_job(job_id, 'failed', str(e))
+
+    job = _finish_job(job_id, 'completed')
+    try:
+        os.unlink(temp_path)
+    except Exception:
+        pass
+    return job
+
+
+def _run_import_thread(job_id: str) -> None:
+    try:
+        run_import(job_id)
+    except Exception:
+        logger.exception(f"Import {job_id} crashed")
+    finally:
+        with _running_lock:
+            _running.discard(job_id)
+
+
+def start_import(job_id: str) -> bool:
+    """Run an import in a background thread; False if it is already running here."""
+    with _running_lock:
+        if job_id in _running:
+            return False
+        _running.add(job_id)
+    threading.Thread(
+        target=_run_import_thread,
+        args=(job_id,),
+        name=f'import-{job_id[:8]}',
+        daemon=True,
+    ).start()
+    return True
+
+
+def resume_imports() -> int:
+    """Start processing jobs whose lease has expired (worker restarted or crashed)."""
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            SELECT id FROM import_jobs
+            WHERE status = 'processing'
+              AND (heartbeat_at IS NULL OR heartbeat_at < now() - make_interval(secs => %s))
+            ORDER BY started_at
+            LIMIT 10
+            ''',
+            (settings.import_lease_seconds,),
+        )
+        job_ids = [str(r['id']) for r in cur.fetchall()]
+    return sum(1 for job_id in job_ids if start_import(job_id))
+
+
+def get_import_stats() -> dict:
+    with _running_lock:
+        return {'running': len(_running)}
@@ -0,0 +1,370 @@
+"""
+In-memory leaderboards with rank lookups.
+
+The scan (gamification) and points (loyalty) leaderboards used to rank every
+profile with a window function on each request and then rank everyone again
+to find the current user. Here each leaderboard keeps one RankedScores per
+period (weekly, monthly, all_time):
+- scores are loaded from the database every leaderboard_reload_seconds and
+  whenever the date changes (period membership is date based); only the
+  first load blocks a request, later reloads run in a background thread
+  while the previous boards keep serving until the swap
+- record_scan and award_points update the scores of the affected user in
+  place, so the user sees their new rank immediately on this worker;
+  updates arriving during a load are queued and replayed onto the new boards
+- rank lookups and pages are O(log n) plus the page length
+
+Other workers pick up a change at their next reload.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Callable, Iterable, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PERIODS = ('weekly', 'monthly', 'all_time')
+
+# (user_id, score, tiebreak); higher score ranks first, then higher tiebreak
+ScoreEntry = tuple[str, int, int]
+
+
+class RankedScores:
+    """
+    Members ordered by (score desc, tiebreak desc, member).
+
+    Keys live in sorted blocks; a Fenwick tree over block lengths turns a
+    rank into a block position and back in O(log n). Members with a score
+    of zero or less are not ranked.
+    """
+
+    BLOCK_SIZE = 256
+
+    def __init__(self, entries: Iterable[ScoreEntry] = ()):
+        self._keys: dict[str, tuple[int, int, str]] = {}
+        for member, score, tiebreak in entries:
+            if score > 0:
+                self._keys[member] = (-score, -tiebreak, member)
+        ordered = sorted(self._keys.values())
+        self._blocks = [ordered[i:i + self.BLOCK_SIZE] for i in range(0, len(ordered), self.BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._rebuild_index()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._keys
+
+    # Fenwick tree over block lengths
+
+    def _rebuild_index(self) -> None:
+        size = len(self._blocks)
+        tree = [0] * (size + 1)
+        for i, block in enumerate(self._blocks, start=1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _index_add(self, block: int, delta: int) -> None:
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, block: int) -> int:
+        total, i = 0, block
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> tuple[int, int]:
+        """Block and offset of the 0-based position"""
+        block, remaining = 0, position
+        step = 1 << (len(self._blocks).bit_length() - 1) if self._blocks else 0
+        while step:
+            nxt = block + step
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                block = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return block, remaining
+
+    # Sorted blocks
+
+    def _insert(self, key: tuple) -> None:
+        if not self._blocks:
+            self._blocks, self._maxes = [[key]], [key]
+            self._rebuild_index()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = len(block) // 2
+            self._blocks[i:i + 1] = [block[:half], block[half:]]
+            self._maxes[i:i + 1] = [block[half - 1], block[-1]]
+            self._rebuild_index()
+        else:
+            self._index_add(i, 1)
+
+    def _remove(self, key: tuple) -> None:
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+            self._index_add(i, -1)
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+            self._rebuild_index()
+
+    # Public API
+
+    def set(self, member: str, score: int, tiebreak: int = 0) -> None:
+        old = self._keys.pop(member, None)
+        if old is not None:
+            self._remove(old)
+        if score > 0:
+            key = (-score, -tiebreak, member)
+            self._keys[member] = key
+            self._insert(key)
+
+    def score(self, member: str) -> Optional[tuple[int, int]]:
+        key = self._keys.get(member)
+        return (-key[0], -key[1]) if key is not None else None
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based rank, None if not ranked"""
+        key = self._keys.get(member)
+        if key is None:
+            return None
+        i = bisect_left(self._maxes, key)
+        return self._count_before(i) + bisect_left(self._blocks[i], key) + 1
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, str, int]]:
+        """(rank, member, score) for ranks offset+1 .. offset+limit"""
+        if offset >= len(self._keys) or limit <= 0:
+            return []
+        block, index = self._locate(offset)
+        result = []
+        rank = offset + 1
+        while block < len(self._blocks) and len(result) < limit:
+            for neg_score, _, member in self._blocks[block][index:index + limit - len(result)]:
+                result.append((rank, member, -neg_score))
+                rank += 1
+            block, index = block + 1, 0
+        return result
+
+
+class Leaderboard:
+    """RankedScores per period, reloaded periodically and updated per user"""
+
+    def __init__(self, name: str, loader: Callable[[], dict[str, list[ScoreEntry]]], reload_seconds: float):
+        self.name = name
+        self._loader = loader
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._boards: Optional[dict[str, RankedScores]] = None
+        self._loaded_at = 0.0
+        self._loaded_on: Optional[date] = None
+        self._pending: Optional[list[Callable[[dict[str, RankedScores]], None]]] = None
+        self._refreshing = False
+        self._stats = {'loads': 0, 'updates': 0, 'rank_lookups': 0, 'pages': 0}
+
+    def _stale(self) -> bool:
+        return (
+            self._boards is None
+            or time.monotonic() - self._loaded_at >= self.reload_seconds
+            or date.today() != self._loaded_on
+        )
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload from the database; updates arriving meanwhile are replayed"""
+        with self._reload_lock:
+            if not force and not self._stale():
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                loaded = self._loader()
+                boards = {period: RankedScores(loaded.get(period, ())) for period in PERIODS}
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for update in self._pending:
+                    update(boards)
+                self._pending = None
+                self._boards = boards
+                self._loaded_at = time.monotonic()
+                self._loaded_on = date.today()
+                self._stats['loads'] += 1
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f'Leaderboard {self.name} reload failed: {e}')
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f'leaderboard-{self.name}', daemon=True).start()
+
+    def _boards_for_read(self) -> dict[str, RankedScores]:
+        boards = self._boards
+        if boards is None:
+            self.refresh()
+            return self._boards
+        if self._stale():
+            self._refresh_in_background()
+        return boards
+
+    def _apply(self, update: Callable[[dict[str, RankedScores]], None]) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(update)  # replayed onto the boards being loaded
+            if self._boards is None:
+                return  # no load running yet: the first load reads the database
+            update(self._boards)
+            self._stats['updates'] += 1
+
+    def set_scores(self, user_id: str, scores: dict[str, tuple[int, int]]) -> None:
+        """Replace the user's (score, tiebreak) for the given periods"""
+        def update(boards):
+            for period, (score, tiebreak) in scores.items():
+                boards[period].set(user_id, score, tiebreak)
+        self._apply(update)
+
+    def add_scores(self, user_id: str, deltas: dict[str, int], tiebreak: int) -> None:
+        """Add to the user's scores for the given periods"""
+        def update(boards):
+            for period, delta in deltas.items():
+                current = boards[period].score(user_id)
+                boards[period].set(user_id, (current[0] if current else 0) + delta, tiebreak)
+        self._apply(update)
+
+    def page(self, period: str, offset: int, limit: int) -> list[tuple[int, str, int]]:
+        boards = self._boards_for_read()
+        with self._lock:
+            self._stats['pages'] += 1
+            return boards[period].page(offset, limit)
+
+    def rank(self, period: str, user_id: str) -> Optional[int]:
+        boards = self._boards_for_read()
+        with self._lock:
+            self._stats['rank_lookups'] += 1
+            return boards[period].rank(user_id)
+
+    def score(self, period: str, user_id: str) -> Optional[int]:
+        boards = self._boards_for_read()
+        with self._lock:
+            entry = boards[period].score(user_id)
+            return entry[0] if entry is not None else None
+
+    def total(self, period: str) -> int:
+        boards = self._boards_for_read()
+        with self._lock:
+            return len(boards[period])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            sizes = {period: len(board) for period, board in (self._boards or {}).items()}
+            return {**self._stats, 'participants': sizes}
+
+
+def scan_scores(profile: dict, today: Optional[date] = None) -> dict[str, tuple[int, int]]:
+    """Scan leaderboard scores of a qr_scanner_profiles row (ties broken by total scans)"""
+    today = today or date.today()
+    total = profile['total_scans'] or 0
+    this_month = profile['month_start'] == today.replace(day=1)
+    last_scan = profile['last_scan_date']
+    this_week = last_scan is not None and (today - last_scan).days < 7
+    monthly = profile['scans_this_month'] or 0
+    return {
+        'all_time': (total, total),
+        'monthly': (monthly if this_month else 0, total),
+        # Weekly ranks this month's scans of users active in the last 7 days
+        'weekly': (monthly if this_week else 0, total),
+    }
+
+
+def _load_scan_scores() -> dict[str, list[ScoreEntry]]:
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            SELECT qsp.user_id::text as user_id, qsp.total_scans, qsp.scans_this_month,
+                   qsp.month_start, qsp.last_scan_date, CURRENT_DATE as today
+            FROM qr_scanner_profiles qsp
+            JOIN auth.users u ON u.id = qsp.user_id
+            WHERE qsp.total_scans > 0
+            '''
+        )
+        rows = cur.fetchall()
+    boards: dict[str, list[ScoreEntry]] = {period: [] for period in PERIODS}
+    for row in rows:
+        for period, (score, tiebreak) in scan_scores(row, row['today']).items():
+            boards[period].append((row['user_id'], score, tiebreak))
+    return boards
+
+
+def _load_points_scores() -> dict[str, list[ScoreEntry]]:
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            SELECT
+                lp.user_id::text as user_id,
+                lp.lifetime_points,
+                COALESCE(SUM(pt.points) FILTER (WHERE pt.created_at > now() - interval '7 days'), 0) as weekly_points,
+                COALESCE(SUM(pt.points), 0) as monthly_points
+            FROM user_loyalty_profiles lp
+            JOIN auth.users u ON u.id = lp.user_id
+            JOIN profiles p ON p.id = lp.user_id
+            LEFT JOIN points_transactions pt
+                ON pt.user_id = lp.user_id
+               AND pt.points > 0
+               AND pt.created_at > now() - interval '30 days'
+            GROUP BY lp.user_id, lp.lifetime_points
+            '''
+        )
+        rows = cur.fetchall()
+    return {
+        'weekly': [(r['user_id'], int(r['weekly_points']), r['lifetime_points']) for r in rows],
+        'monthly': [(r['user_id'], int(r['monthly_points']), r['lifetime_points']) for r in rows],
+        'all_time': [(r['user_id'], r['lifetime_points'], r['lifetime_points']) for r in rows],
+    }
+
+
+scan_leaderboard = Leaderboard('scans', _load_scan_scores, settings.leaderboard_reload_seconds)
+points_leaderboard = Leaderboard('points', _load_points_scores, settings.leaderboard_reload_seconds)
+
+
+def get_leaderboard_stats() -> dict:
+    return {
+        'scans': scan_leaderboard.get_stats(),
+        'points': points_leaderboard.get_stats(),
+    }
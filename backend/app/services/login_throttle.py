@@ -1,14 +1,21 @@
+"""
+Per-email login throttling with exponential backoff.
+
+Failed attempts and the lockout are kept in the rate limit backend
+(app.core.rate_limit), in memory or in a store shared by workers, so login
+checks cost no database round trip. Failures are forgotten
+FAILURE_MEMORY_SECONDS after the first one, or on a successful login.
+"""
 from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
-from psycopg.rows import dict_row
-
-from app.core.db import get_connection
+from app.core.rate_limit import get_backend
 
 BASE_DELAY_SECONDS = 5
 MAX_DELAY_SECONDS = 15 * 60  # 15 minutes
+FAILURE_MEMORY_SECONDS = 24 * 3600
 
 
 @dataclass
@@ -26,73 +33,33 @@ class ThrottleState:
         return max(int(delta.total_seconds()), 0)
 
 
+def _keys(email: str) -> tuple[str, str]:
+    email = email.lower()
+    return f'throttle:failures:{email}', f'throttle:locked:{email}'
+
+
 def get_state(email: str) -> ThrottleState | None:
-    with get_connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
-            cur.execute('SELECT email, failed_attempts, locked_until FROM login_throttle WHERE email = %s', (email,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            return ThrottleState(
-                email=row['email'],
-                failed_attempts=row['failed_attempts'],
-                locked_until=row['locked_until'],
-            )
+    failures_key, locked_key = _keys(email)
+    backend = get_backend()
+    failed_attempts = backend.get_many([failures_key])[0]
+    if not failed_attempts:
+        return None
+    return ThrottleState(
+        email=email,
+        failed_attempts=failed_attempts,
+        locked_until=backend.get(locked_key),
+    )
 
 
 def register_failure(email: str) -> int:
-    now = datetime.now(timezone.utc)
-    with get_connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
-            cur.execute(
-                'SELECT failed_attempts FROM login_throttle WHERE email = %s FOR UPDATE',
-                (email,),
-            )
-            row = cur.fetchone()
-            if row:
-                failed_attempts = row['failed_attempts'] + 1
-            else:
-                failed_attempts = 1
-            delay = min(BASE_DELAY_SECONDS * (2 ** (failed_attempts - 1)), MAX_DELAY_SECONDS)
-            locked_until = now + timedelta(seconds=delay)
-            if row:
-                cur.execute(
-                    '''
-                    UPDATE login_throttle
-                    SET failed_attempts = %s,
-                        last_failed_at = %s,
-                        locked_until = %s,
-                        updated_at = %s
-                    WHERE email = %s
-                    ''',
-                    (failed_attempts, now, locked_until, now, email),
-                )
-            else:
-                cur.execute(
-                    '''
-                    INSERT INTO login_throttle (email, failed_attempts, last_failed_at, locked_until, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ''',
-                    (email, failed_attempts, now, locked_until, now, now),
-                )
-            conn.commit()
-            return delay
+    failures_key, locked_key = _keys(email)
+    backend = get_backend()
+    failed_attempts = backend.incr(failures_key, ttl_seconds=FAILURE_MEMORY_SECONDS)
+    delay = min(BASE_DELAY_SECONDS * (2 ** (failed_attempts - 1)), MAX_DELAY_SECONDS)
+    locked_until = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    backend.set(locked_key, locked_until, ttl_seconds=delay)
+    return delay
 
 
 def reset(email: str) -> None:
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                '''
-                INSERT INTO login_throttle (email, failed_attempts, last_failed_at, locked_until, created_at, updated_at)
-                VALUES (%s, 0, NULL, NULL, now(), now())
-                ON CONFLICT (email) DO UPDATE SET
-                    failed_attempts = 0,
-                    last_failed_at = NULL,
-                    locked_until = NULL,
-                    updated_at = now()
-                ''',
-                (email,),
-            )
-            conn.commit()
-
+    get_backend().delete(*_keys(email))
@@ -18,6 +18,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
 from app.core.db import get_connection
+from app.services.leaderboards import PERIODS, points_leaderboard
 from app.schemas.loyalty import (
     POINTS_CONFIG,
     TIER_BENEFITS,
@@ -334,6 +335,12 @@ def award_points(
         tx = cur.fetchone()
         conn.commit()
 
+    if points > 0:
+        points_leaderboard.set_scores(str(user_id), {"all_time": (new_lifetime, new_lifetime)})
+        points_leaderboard.add_scores(
+            str(user_id), {"weekly": points, "monthly": points}, tiebreak=new_lifetime
+        )
+
     logger.info(f"Awarded {points} points to user {user_id} for {action_type.value}")
 
     return PointsTransaction(
@@ -609,111 +616,60 @@ def get_leaderboard(
     period: str = "all_time",
     limit: int = 20,
     current_user_id: Optional[str] = None,
+    offset: int = 0,
 ) -> LeaderboardResponse:
     """
     Get the points leaderboard.
 
+    Ranks come from the in-memory points leaderboard; weekly and monthly
+    count points earned in the last 7 and 30 days.
+
     Args:
         period: "all_time", "monthly", or "weekly"
         limit: Number of entries to return
         current_user_id: Optional user to find their rank
+        offset: Number of leading ranks to skip
 
     Returns:
         LeaderboardResponse with ranked entries
     """
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Build query based on period
-        if period == "weekly":
-            # Points earned in last 7 days
-            points_query = """
-                SELECT user_id, COALESCE(SUM(points), 0) as period_points
-                FROM points_transactions
-                WHERE created_at > now() - interval '7 days' AND points > 0
-                GROUP BY user_id
-            """
-        elif period == "monthly":
-            # Points earned in last 30 days
-            points_query = """
-                SELECT user_id, COALESCE(SUM(points), 0) as period_points
-                FROM points_transactions
-                WHERE created_at > now() - interval '30 days' AND points > 0
-                GROUP BY user_id
-            """
-        else:
-            # All-time uses lifetime_points
-            points_query = """
-                SELECT user_id, lifetime_points as period_points
-                FROM user_loyalty_profiles
-            """
-
-        # Get leaderboard
-        cur.execute(
-            f"""
-            WITH ranked AS (
+    board = period if period in PERIODS else "all_time"
+    ranked = points_leaderboard.page(board, offset, limit)
+    total = points_leaderboard.total(board)
+    user_rank = points_leaderboard.rank(board, current_user_id) if current_user_id else None
+
+    rows = {}
+    if ranked:
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
                 SELECT
-                    p.user_id,
+                    lp.user_id::text as user_id,
                     COALESCE(u.raw_user_meta_data->>'name', u.email) as display_name,
                     u.raw_user_meta_data->>'avatar_url' as avatar_url,
                     lp.lifetime_points as total_points,
                     lp.current_tier as tier,
-                    lp.review_count,
-                    pts.period_points,
-                    ROW_NUMBER() OVER (ORDER BY pts.period_points DESC, lp.lifetime_points DESC) as rank
-                FROM ({points_query}) pts
-                JOIN user_loyalty_profiles lp ON lp.user_id = pts.user_id
-                JOIN auth.users u ON u.id = pts.user_id
-                JOIN profiles p ON p.id = pts.user_id
-                WHERE pts.period_points > 0
-            )
-            SELECT * FROM ranked
-            ORDER BY rank
-            LIMIT %s
-            """,
-            (limit,)
-        )
-        rows = cur.fetchall()
-
-        # Get total count
-        cur.execute(
-            f"""
-            SELECT COUNT(DISTINCT user_id) as count
-            FROM ({points_query}) pts
-            WHERE pts.period_points > 0
-            """
-        )
-        total = cur.fetchone()["count"]
-
-        # Get current user's rank if provided
-        user_rank = None
-        if current_user_id:
-            cur.execute(
-                f"""
-                WITH ranked AS (
-                    SELECT
-                        user_id,
-                        ROW_NUMBER() OVER (ORDER BY period_points DESC) as rank
-                    FROM ({points_query}) pts
-                    WHERE pts.period_points > 0
-                )
-                SELECT rank FROM ranked WHERE user_id = %s
+                    lp.review_count
+                FROM user_loyalty_profiles lp
+                JOIN auth.users u ON u.id = lp.user_id
+                WHERE lp.user_id = ANY(%s::uuid[])
                 """,
-                (current_user_id,)
+                ([user_id for _, user_id, _ in ranked],)
             )
-            rank_row = cur.fetchone()
-            if rank_row:
-                user_rank = rank_row["rank"]
+            rows = {r["user_id"]: r for r in cur.fetchall()}
 
     entries = [
         LeaderboardEntry(
-            rank=r["rank"],
-            user_id=str(r["user_id"]),
-            display_name=r["display_name"] or "Anonymous",
-            avatar_url=r["avatar_url"],
-            total_points=r["total_points"],
-            tier=LoyaltyTier(r["tier"]),
-            review_count=r["review_count"],
+            rank=rank,
+            user_id=user_id,
+            display_name=rows[user_id]["display_name"] or "Anonymous",
+            avatar_url=rows[user_id]["avatar_url"],
+            total_points=rows[user_id]["total_points"],
+            tier=LoyaltyTier(rows[user_id]["tier"]),
+            review_count=rows[user_id]["review_count"],
         )
-        for r in rows
+        for rank, user_id, _ in ranked
+        if user_id in rows
     ]
 
     return LeaderboardResponse(
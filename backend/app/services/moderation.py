@@ -5,6 +5,7 @@ import logging
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.cache import invalidate_tags, organization_tag
 from app.core.db import get_connection
 from app.schemas.moderation import ModerationAction, ModerationOrganization
 
@@ -103,6 +104,7 @@ def verify_organization(org_id: str, user_id: str, action: ModerationAction) ->
             if not row:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Организация не найдена')
             conn.commit()
+            invalidate_tags(organization_tag(org_id))
             # Convert UUID to string for Pydantic
             return ModerationOrganization(**{**row, 'id': str(row['id'])})
 
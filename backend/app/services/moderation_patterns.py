@@ -0,0 +1,145 @@
+"""
+Compiled moderation pattern set.
+
+Active ai_moderation_patterns are compiled once into:
+- one Aho-Corasick automaton per case mode for all text_keywords keywords,
+  so a text is scanned once regardless of how many keywords exist
+- precompiled regexes for text_regex patterns
+
+Uses pyahocorasick when installed and falls back to a pure-Python automaton
+otherwise. Matching semantics are the same as the previous per-keyword
+substring check (`keyword in text`, lower-cased when case_insensitive).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordAutomaton:
+    """Multi-keyword substring matcher returning the values of matched keywords."""
+
+    def __init__(self, keywords: dict[str, set[int]]):
+        # Empty keywords match every text (same as `'' in text`)
+        self._always: frozenset[int] = frozenset(keywords.pop('', set()))
+        self._native = None
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[frozenset[int]] = [frozenset()]
+        if not keywords:
+            return
+        if AHOCORASICK_AVAILABLE:
+            self._native = ahocorasick.Automaton()
+            for word, values in keywords.items():
+                self._native.add_word(word, frozenset(values))
+            self._native.make_automaton()
+        else:
+            self._build(keywords)
+
+    def _build(self, keywords: dict[str, set[int]]) -> None:
+        out: list[set[int]] = [set()]
+        for word, values in keywords.items():
+            state = 0
+            for ch in word:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    out.append(set())
+                state = nxt
+            out[state].update(values)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                out[nxt] |= out[self._fail[nxt]]
+        self._out = [frozenset(values) for values in out]
+
+    def find(self, text: str) -> set[int]:
+        found = set(self._always)
+        if self._native is not None:
+            for _, values in self._native.iter(text):
+                found |= values
+            return found
+        goto, fail, out = self._goto, self._fail, self._out
+        if len(goto) == 1:
+            return found
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+@dataclass
+class CompiledPatternSet:
+    """All active moderation patterns, compiled for matching."""
+    patterns: list[dict] = field(default_factory=list)
+    keywords_ci: Optional[KeywordAutomaton] = None
+    keywords_cs: Optional[KeywordAutomaton] = None
+    regexes: list[tuple[int, re.Pattern]] = field(default_factory=list)
+    fingerprint: Optional[tuple] = None
+
+    @classmethod
+    def compile(cls, patterns: Iterable[dict], fingerprint: Optional[tuple] = None) -> 'CompiledPatternSet':
+        patterns = list(patterns)
+        keywords_ci: dict[str, set[int]] = {}
+        keywords_cs: dict[str, set[int]] = {}
+        regexes: list[tuple[int, re.Pattern]] = []
+
+        for index, pattern in enumerate(patterns):
+            pattern_data = pattern['pattern_data'] or {}
+            if pattern['pattern_type'] == 'text_keywords':
+                case_insensitive = pattern_data.get('case_insensitive', True)
+                target = keywords_ci if case_insensitive else keywords_cs
+                for keyword in pattern_data.get('keywords', []):
+                    word = keyword.lower() if case_insensitive else keyword
+                    target.setdefault(word, set()).add(index)
+            elif pattern['pattern_type'] == 'text_regex':
+                regex = pattern_data.get('regex', '')
+                flags_int = re.IGNORECASE if 'i' in pattern_data.get('flags', '') else 0
+                try:
+                    regexes.append((index, re.compile(regex, flags_int)))
+                except re.error:
+                    logger.warning(f"Invalid regex pattern: {regex}")
+
+        return cls(
+            patterns=patterns,
+            keywords_ci=KeywordAutomaton(keywords_ci),
+            keywords_cs=KeywordAutomaton(keywords_cs),
+            regexes=regexes,
+            fingerprint=fingerprint,
+        )
+
+    def match_text(self, text: str) -> list[dict]:
+        """Return matched text patterns in load order."""
+        matched = self.keywords_ci.find(text.lower()) | self.keywords_cs.find(text)
+        for index, regex in self.regexes:
+            if index not in matched and regex.search(text):
+                matched.add(index)
+        return [self.patterns[index] for index in sorted(matched)]
+
+    def patterns_of_type(self, pattern_type: str) -> list[dict]:
+        return [p for p in self.patterns if p['pattern_type'] == pattern_type]
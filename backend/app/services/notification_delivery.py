@@ -0,0 +1,250 @@
+"""
+Notification delivery engine for the email, telegram and push channels.
+
+Each run claims a batch of pending notification_deliveries rows with
+FOR UPDATE SKIP LOCKED (status -> 'sending'), so several scheduler instances
+and processes can drain the queue in parallel without sending twice. Rows
+left in 'sending' by a crashed worker are reclaimed after
+NOTIFICATION_CLAIM_TIMEOUT_SECONDS.
+
+Per batch:
+- recipients (emails / push subscriptions) are prefetched in one query
+- sends run concurrently under a per-channel semaphore
+- one SMTP connection / httpx client / requests session is shared
+- statuses are written back with a single bulk UPDATE
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_async_connection
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+CHANNELS = ('email', 'telegram', 'push')
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one delivery attempt."""
+    id: str
+    status: str  # 'sent' | 'failed'
+    error_message: Optional[str] = None
+    sent_at: Optional[datetime] = None
+
+    @classmethod
+    def sent(cls, delivery_id: Any) -> 'DeliveryResult':
+        return cls(id=str(delivery_id), status='sent', sent_at=datetime.now(timezone.utc))
+
+    @classmethod
+    def failed(cls, delivery_id: Any, error: str) -> 'DeliveryResult':
+        return cls(id=str(delivery_id), status='failed', error_message=error[:200])
+
+
+_stats: dict[str, dict[str, Any]] = {
+    channel: {
+        'runs': 0,
+        'batches': 0,
+        'claimed': 0,
+        'sent': 0,
+        'failed': 0,
+        'errors': 0,
+        'last_batch_size': 0,
+        'last_batch_ms': 0.0,
+        'last_throughput_per_s': 0.0,
+        'last_lag_seconds': 0.0,
+        'max_lag_seconds': 0.0,
+    }
+    for channel in CHANNELS
+}
+
+
+def get_delivery_stats() -> dict:
+    """Per-channel throughput and lag counters."""
+    return {channel: dict(stats) for channel, stats in _stats.items()}
+
+
+# ============================================================
+# CLAIM / WRITE BACK
+# ============================================================
+
+async def claim_deliveries(channel: str, limit: int) -> list[dict]:
+    """
+    Claim up to `limit` pending deliveries for a channel.
+
+    Claimed rows are moved to 'sending' and committed immediately, so no
+    database connection is held while messages are sent.
+    """
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                WITH claimed AS (
+                    SELECT d.id
+                    FROM notification_deliveries d
+                    WHERE d.channel = %s
+                      AND (
+                          d.status = 'pending'
+                          OR (d.status = 'sending' AND d.claimed_at < now() - make_interval(secs => %s))
+                      )
+                    ORDER BY d.created_at ASC
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE notification_deliveries d
+                SET status = 'sending', claimed_at = now()
+                FROM claimed, notifications n
+                WHERE d.id = claimed.id AND n.id = d.notification_id
+                RETURNING d.id, d.notification_id, d.user_id, d.created_at,
+                          n.title, n.body, n.payload, n.severity, n.category
+                ''',
+                (channel, settings.notification_claim_timeout_seconds, limit),
+            )
+            rows = await cur.fetchall()
+            await conn.commit()
+    rows.sort(key=lambda r: r['created_at'])
+    return rows
+
+
+async def write_results(results: list[DeliveryResult]) -> None:
+    """Write delivery outcomes back in one UPDATE."""
+    if not results:
+        return
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                UPDATE notification_deliveries d
+                SET status = r.status,
+                    sent_at = COALESCE(r.sent_at, d.sent_at),
+                    error_message = r.error_message
+                FROM unnest(%s::uuid[], %s::text[], %s::text[], %s::timestamptz[])
+                     AS r(id, status, error_message, sent_at)
+                WHERE d.id = r.id
+                ''',
+                (
+                    [r.id for r in results],
+                    [r.status for r in results],
+                    [r.error_message for r in results],
+                    [r.sent_at for r in results],
+                ),
+            )
+            await conn.commit()
+
+
+async def fetch_user_emails(user_ids: list[Any]) -> dict[str, str]:
+    """Map user id -> email for a batch of recipients."""
+    if not user_ids:
+        return {}
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                'SELECT id, email FROM app_users WHERE id = ANY(%s::uuid[])',
+                (list({str(u) for u in user_ids}),),
+            )
+            return {str(row['id']): row['email'] for row in await cur.fetchall() if row['email']}
+
+
+async def fetch_push_subscriptions(user_ids: list[Any]) -> dict[str, list[dict]]:
+    """Map user id -> push subscriptions for a batch of recipients."""
+    if not user_ids:
+        return {}
+    subscriptions: dict[str, list[dict]] = {}
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                SELECT user_id, endpoint, p256dh, auth
+                FROM user_push_subscriptions
+                WHERE user_id = ANY(%s::uuid[])
+                ''',
+                (list({str(u) for u in user_ids}),),
+            )
+            for row in await cur.fetchall():
+                subscriptions.setdefault(str(row['user_id']), []).append(row)
+    return subscriptions
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+async def send_concurrently(
+    deliveries: list[dict],
+    send_one: Callable[[dict], Awaitable[DeliveryResult]],
+    concurrency: int,
+) -> list[DeliveryResult]:
+    """Run send_one for every delivery with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def guarded(delivery: dict) -> DeliveryResult:
+        async with semaphore:
+            try:
+                return await send_one(delivery)
+            except Exception as e:
+                logger.error(f'Error processing delivery {delivery["id"]}: {e}')
+                return DeliveryResult.failed(delivery['id'], str(e))
+
+    return await asyncio.gather(*(guarded(d) for d in deliveries))
+
+
+async def run_channel(
+    channel: str,
+    send_batch: Callable[[list[dict]], Awaitable[list[DeliveryResult]]],
+) -> dict[str, int]:
+    """
+    Drain a channel: claim, send and write back batches until the queue is
+    empty or NOTIFICATION_DELIVERY_MAX_BATCHES_PER_RUN is reached.
+    """
+    stats = _stats[channel]
+    stats['runs'] += 1
+    batch_size = settings.notification_delivery_batch_size
+    processed = sent = failed = 0
+
+    for _ in range(settings.notification_delivery_max_batches_per_run):
+        deliveries = await claim_deliveries(channel, batch_size)
+        if not deliveries:
+            break
+
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        lag = max((now - d['created_at']).total_seconds() for d in deliveries)
+        try:
+            results = await send_batch(deliveries)
+        except Exception as e:
+            # Whole-batch failure (e.g. SMTP connect); mark every row failed
+            logger.error(f'{channel} delivery batch failed: {e}')
+            stats['errors'] += 1
+            results = [DeliveryResult.failed(d['id'], str(e)) for d in deliveries]
+        await write_results(results)
+
+        elapsed = time.perf_counter() - started
+        batch_sent = sum(1 for r in results if r.status == 'sent')
+        processed += len(results)
+        sent += batch_sent
+        failed += len(results) - batch_sent
+
+        stats['batches'] += 1
+        stats['claimed'] += len(deliveries)
+        stats['sent'] += batch_sent
+        stats['failed'] += len(results) - batch_sent
+        stats['last_batch_size'] = len(deliveries)
+        stats['last_batch_ms'] = round(elapsed * 1000, 2)
+        stats['last_throughput_per_s'] = round(len(results) / elapsed, 2) if elapsed > 0 else 0.0
+        stats['last_lag_seconds'] = round(lag, 3)
+        stats['max_lag_seconds'] = max(stats['max_lag_seconds'], round(lag, 3))
+
+        if len(deliveries) < batch_size:
+            break
+
+    return {'processed': processed, 'sent': sent, 'failed': failed}
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
 from typing import Any, Iterable, Optional
 
+import httpx
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.config import get_settings
 from app.core.db import get_connection
 from app.schemas.notifications import (
     NotificationDelivery,
@@ -17,7 +18,11 @@ from app.schemas.notifications import (
     NotificationType,
 )
 from app.services import email as email_service
+from app.services import notification_delivery
 from app.services import telegram as telegram_service
+from app.services.notification_delivery import DeliveryResult
+
+settings = get_settings()
 
 
 def list_notifications(user_id: str, cursor: Optional[int], limit: int) -> NotificationListResponse:
@@ -482,154 +487,72 @@ def resolve_recipients_in_transaction(cur, request: NotificationEmitRequest) ->
 async def process_email_deliveries() -> dict[str, int]:
     """
     Обрабатывает pending email deliveries и отправляет их через SMTP.
+    Строки захватываются через FOR UPDATE SKIP LOCKED, письма пачки идут
+    через одно SMTP-соединение.
     Возвращает статистику: сколько обработано, сколько успешно отправлено.
     """
-    processed_count = 0
-    sent_count = 0
-    
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Находим pending email deliveries
-        cur.execute(
-            '''
-            SELECT d.id, d.notification_id, d.user_id, d.channel,
-                   n.title, n.body, n.severity, n.category
-            FROM notification_deliveries d
-            JOIN notifications n ON n.id = d.notification_id
-            WHERE d.channel = 'email'
-              AND d.status = 'pending'
-            ORDER BY d.created_at ASC
-            LIMIT 50
-            ''',
-        )
-        deliveries = cur.fetchall()
-        
-        # Получаем email адреса пользователей
-        for delivery in deliveries:
-            try:
-                cur.execute('SELECT email FROM app_users WHERE id = %s', (delivery['user_id'],))
-                user_row = cur.fetchone()
-                if not user_row or not user_row['email']:
-                    # Пользователь не найден или нет email, помечаем как failed
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', 'User email not found', delivery['id']),
-                    )
-                    processed_count += 1
-                    continue
-                
-                to_email = user_row['email']
+    async def send_batch(deliveries: list[dict]) -> list[DeliveryResult]:
+        # Получаем email адреса всех получателей пачки одним запросом
+        emails = await notification_delivery.fetch_user_emails([d['user_id'] for d in deliveries])
+        results = [
+            DeliveryResult.failed(d['id'], 'User email not found')
+            for d in deliveries
+            if str(d['user_id']) not in emails
+        ]
+        to_send = [d for d in deliveries if str(d['user_id']) in emails]
+        if not to_send:
+            return results
+        if not email_service.smtp_configured():
+            print('[Email] SMTP not configured, skipping email deliveries')
+            return results + [DeliveryResult.failed(d['id'], 'SMTP send failed') for d in to_send]
+
+        async with email_service.smtp_connection() as smtp:
+            async def send_one(delivery: dict) -> DeliveryResult:
                 subject = delivery['title']
-                body = delivery['body']
-                
-                # Форматируем email
-                text, html = email_service.format_notification_email(subject, body)
-                
-                # Отправляем email
-                success = await email_service.send_email(to_email, subject, text, html)
-                
-                if success:
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, sent_at = %s WHERE id = %s',
-                        ('sent', datetime.now(timezone.utc), delivery['id']),
-                    )
-                    sent_count += 1
-                else:
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', 'SMTP send failed', delivery['id']),
-                    )
-                
-                processed_count += 1
-            except Exception as e:
-                # Логируем ошибку и помечаем как failed
-                print(f'[Email Worker] Error processing delivery {delivery["id"]}: {e}')
-                cur.execute(
-                    'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                    ('failed', str(e)[:200], delivery['id']),
+                text, html = email_service.format_notification_email(subject, delivery['body'])
+                success = await email_service.send_email(
+                    emails[str(delivery['user_id'])], subject, text, html, smtp=smtp,
                 )
-                processed_count += 1
-        
-        conn.commit()
-    
-    return {'processed': processed_count, 'sent': sent_count}
+                if success:
+                    return DeliveryResult.sent(delivery['id'])
+                return DeliveryResult.failed(delivery['id'], 'SMTP send failed')
+
+            results += await notification_delivery.send_concurrently(
+                to_send, send_one, settings.notification_email_concurrency,
+            )
+        return results
+
+    result = await notification_delivery.run_channel('email', send_batch)
+    return {'processed': result['processed'], 'sent': result['sent']}
 
 
 async def process_telegram_deliveries() -> dict[str, int]:
     """
     Обрабатывает pending telegram deliveries и отправляет их через Telegram Bot API.
+    Строки захватываются через FOR UPDATE SKIP LOCKED, сообщения пачки идут
+    параллельно через один httpx-клиент.
     Возвращает статистику: сколько обработано, сколько успешно отправлено.
     """
-    processed_count = 0
-    sent_count = 0
-    
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Находим pending telegram deliveries
-        cur.execute(
-            '''
-            SELECT d.id, d.notification_id, d.user_id, d.channel,
-                   n.title, n.body, n.severity, n.category
-            FROM notification_deliveries d
-            JOIN notifications n ON n.id = d.notification_id
-            WHERE d.channel = 'telegram'
-              AND d.status = 'pending'
-            ORDER BY d.created_at ASC
-            LIMIT 50
-            ''',
-        )
-        deliveries = cur.fetchall()
-        
-        # Получаем Telegram chat_id пользователей (нужно будет добавить в user_notification_settings или отдельную таблицу)
-        for delivery in deliveries:
-            try:
-                # Пока используем дефолтный chat_id из настроек, если есть
-                # В будущем можно добавить поле telegram_chat_id в user_notification_settings
-                from app.core.config import get_settings
-                settings = get_settings()
-                chat_id = settings.telegram_default_chat_id
-                
-                if not chat_id:
-                    # Нет настроенного chat_id, помечаем как failed
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', 'Telegram chat_id not configured', delivery['id']),
-                    )
-                    processed_count += 1
-                    continue
-                
-                subject = delivery['title']
-                body = delivery['body']
-                
-                # Форматируем для Telegram
-                text = telegram_service.format_notification_telegram(subject, body)
-                
-                # Отправляем в Telegram
-                success = await telegram_service.send_telegram_message(chat_id, text)
-                
-                if success:
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, sent_at = %s WHERE id = %s',
-                        ('sent', datetime.now(timezone.utc), delivery['id']),
-                    )
-                    sent_count += 1
-                else:
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', 'Telegram send failed', delivery['id']),
-                    )
-                
-                processed_count += 1
-            except Exception as e:
-                # Логируем ошибку и помечаем как failed
-                print(f'[Telegram Worker] Error processing delivery {delivery["id"]}: {e}')
-                cur.execute(
-                    'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                    ('failed', str(e)[:200], delivery['id']),
-                )
-                processed_count += 1
-        
-        conn.commit()
-    
-    return {'processed': processed_count, 'sent': sent_count}
+    async def send_batch(deliveries: list[dict]) -> list[DeliveryResult]:
+        # Пока используем дефолтный chat_id из настроек, если есть
+        # В будущем можно добавить поле telegram_chat_id в user_notification_settings
+        chat_id = settings.telegram_default_chat_id
+        if not chat_id:
+            return [DeliveryResult.failed(d['id'], 'Telegram chat_id not configured') for d in deliveries]
+
+        async with httpx.AsyncClient() as client:
+            async def send_one(delivery: dict) -> DeliveryResult:
+                text = telegram_service.format_notification_telegram(delivery['title'], delivery['body'])
+                if await telegram_service.send_telegram_message(chat_id, text, client=client):
+                    return DeliveryResult.sent(delivery['id'])
+                return DeliveryResult.failed(delivery['id'], 'Telegram send failed')
+
+            return await notification_delivery.send_concurrently(
+                deliveries, send_one, settings.notification_telegram_concurrency,
+            )
+
+    result = await notification_delivery.run_channel('telegram', send_batch)
+    return {'processed': result['processed'], 'sent': result['sent']}
 
 
 async def process_push_deliveries() -> dict[str, int]:
@@ -7,7 +7,10 @@ from typing import Any, Dict, List, Tuple
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, invalidate_tags, organization_tag, product_tag
+from app.core.config import get_settings
 from app.core.db import get_connection
+from app.core.pagination import decode_cursor, keyset_condition, keyset_order, page_rows
 from app.schemas.auth import OrganizationProfile, OrganizationProfileUpdate, PublicOrganizationProfile, GalleryItem, CertificationItem, BuyLinkItem
 from app.schemas.public import (
     PublicOrganizationSummary,
@@ -17,6 +20,16 @@ from app.schemas.public import (
 )
 from app.schemas.products import PublicProduct
 
+settings = get_settings()
+
+# Public organization pages, tagged with the organization and its products
+_public_cache = TTLCache('public_organizations', ttl_seconds=60)
+# Search result totals by filter set; a short TTL instead of invalidation
+_search_totals = TTLCache('organization_search_totals', settings.organization_search_totals_ttl_seconds)
+
+# Search order: verified first, then newest; id makes the order total
+SEARCH_ORDERING = ('o.is_verified', 'o.created_at', 'o.id')
+
 EDIT_ROLES = {'owner', 'admin', 'manager', 'editor'}
 VIEW_ROLES = EDIT_ROLES | {'analyst', 'viewer'}
 
@@ -141,6 +154,7 @@ def upsert_organization_profile(
             row['buy_links'] = _deserialize_list(row.get('buy_links'))
             row['social_links'] = _deserialize_list(row.get('social_links'))
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
             return OrganizationProfile(**row)
 
 
@@ -172,7 +186,8 @@ def search_public_organizations(
     limit: int,
     offset: int,
     include_non_public: bool = False,  # For admin use
-) -> Tuple[List[PublicOrganizationSummary], int]:
+    cursor: str | None = None,
+) -> Tuple[List[PublicOrganizationSummary], int, str | None]:
     import logging
     logger = logging.getLogger(__name__)
     
@@ -211,24 +226,40 @@ def search_public_organizations(
         
         logger.info(f"Search query: WHERE {where_sql}, params: {params}, limit: {limit}, offset: {offset}")
         
+        totals_key = json.dumps([q, country, category, verified_only, include_non_public])
         with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-            count_query = f'SELECT COUNT(*) {base_query} WHERE {where_sql}'
-            logger.debug(f"Count query: {count_query}")
-            cur.execute(count_query, params)
-            total = cur.fetchone()['count']
+            total = _search_totals.get(totals_key)
+            if total is None:
+                count_query = f'SELECT COUNT(*) {base_query} WHERE {where_sql}'
+                logger.debug(f"Count query: {count_query}")
+                cur.execute(count_query, params)
+                total = cur.fetchone()['count']
+                _search_totals.set(totals_key, total)
+
+            page_params = list(params)
+            if cursor:
+                where_sql += f' AND {keyset_condition(SEARCH_ORDERING)}'
+                page_params.extend(decode_cursor(cursor, 'organizations', len(SEARCH_ORDERING)))
+                offset = 0
 
             select_query = f'''
                 SELECT o.id, o.name, o.slug, o.country, o.city, 
                        NULL as primary_category,
-                       o.is_verified, o.verification_status, p.short_description, p.gallery
+                       o.is_verified, o.verification_status, o.created_at,
+                       p.short_description, p.gallery
                 {base_query}
                 WHERE {where_sql}
-                ORDER BY o.is_verified DESC, o.created_at DESC
+                ORDER BY {keyset_order(SEARCH_ORDERING)}
                 LIMIT %s OFFSET %s
             '''
             logger.debug(f"Select query: {select_query}")
-            cur.execute(select_query, params + [limit, offset])
-            rows = cur.fetchall()
+            cur.execute(select_query, page_params + [limit + 1, offset])
+            rows, next_cursor = page_rows(
+                cur.fetchall(),
+                limit,
+                'organizations',
+                lambda row: [row[column.split('.')[-1]] for column in SEARCH_ORDERING],
+            )
 
         summaries: List[PublicOrganizationSummary] = []
         for row in rows:
@@ -259,7 +290,7 @@ def search_public_organizations(
                 continue
         
         logger.info(f"Found {total} organizations, returning {len(summaries)} items")
-        return summaries, total
+        return summaries, total, next_cursor
     except Exception as e:
         logger.error(f"Error in search_public_organizations: {e}", exc_info=True)
         import traceback
@@ -269,6 +300,11 @@ def search_public_organizations(
 
 def get_public_organization_details_by_id(organization_id: str) -> PublicOrganizationDetails:
     """Получить детали организации по ID (публичный API)."""
+    cache_key = f"public_org:id:{organization_id}"
+    cached = _public_cache.get(cache_key)
+    if cached:
+        return cached
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
             '''
@@ -310,7 +346,7 @@ def get_public_organization_details_by_id(organization_id: str) -> PublicOrganiz
         )
         products = [PublicProduct(**row) for row in cur.fetchall()]
 
-    return PublicOrganizationDetails(
+    details = PublicOrganizationDetails(
         name=org['name'],
         slug=org['slug'],
         country=org['country'],
@@ -343,9 +379,20 @@ def get_public_organization_details_by_id(organization_id: str) -> PublicOrganiz
         contact_whatsapp=org.get('contact_whatsapp'),
         social_links=social_links,
     )
+    _public_cache.set(
+        cache_key,
+        details,
+        tags=[organization_tag(org_id), *(product_tag(product.id) for product in products)],
+    )
+    return details
 
 
 def get_public_organization_details_by_slug(slug: str) -> PublicOrganizationDetails:
+    cache_key = f"public_org:slug:{slug}"
+    cached = _public_cache.get(cache_key)
+    if cached:
+        return cached
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
             '''
@@ -388,7 +435,7 @@ def get_public_organization_details_by_slug(slug: str) -> PublicOrganizationDeta
         )
         products = [PublicProduct(**row) for row in cur.fetchall()]
 
-    return PublicOrganizationDetails(
+    details = PublicOrganizationDetails(
         name=org['name'],
         slug=org['slug'],
         country=org['country'],
@@ -421,4 +468,10 @@ def get_public_organization_details_by_slug(slug: str) -> PublicOrganizationDeta
         contact_whatsapp=org.get('contact_whatsapp'),
         social_links=social_links,
     )
+    _public_cache.set(
+        cache_key,
+        details,
+        tags=[organization_tag(org_id), *(product_tag(product.id) for product in products)],
+    )
+    return details
 
@@ -4,7 +4,10 @@ from uuid import UUID
 
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, organization_tag
+from app.core.config import get_settings
 from app.core.db import get_connection
+from app.core.pagination import decode_cursor, keyset_condition, keyset_order, page_rows
 from app.schemas.posts import (
     OrganizationPost,
     OrganizationPostCreate,
@@ -13,6 +16,13 @@ from app.schemas.posts import (
 )
 from app.services.organization_profiles import _require_role
 
+settings = get_settings()
+
+# Ключ публичного списка: закрепленные первыми, затем по дате публикации
+PUBLIC_POST_ORDERING = ('is_pinned', 'published_at', 'id')
+
+_public_post_totals = TTLCache('public_post_totals', settings.pagination_totals_ttl_seconds)
+
 
 def _serialize_gallery(gallery: Any) -> list[Dict[str, Any]]:
     """Сериализует gallery из БД в список словарей."""
@@ -194,6 +204,7 @@ def create_organization_post(
             )
             row = cur.fetchone()
             conn.commit()
+            _public_post_totals.invalidate(organization_tag(organization_id))
 
             return OrganizationPost(
                 id=str(row['id']),
@@ -300,6 +311,7 @@ def update_organization_post(
             cur.execute(query, params)
             row = cur.fetchone()
             conn.commit()
+            _public_post_totals.invalidate(organization_tag(organization_id))
 
             return OrganizationPost(
                 id=str(row['id']),
@@ -320,11 +332,72 @@ def update_organization_post(
             )
 
 
+def _public_posts_page(
+    cur,
+    organization_id,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+) -> tuple[list[PublicOrganizationPost], int, str | None]:
+    """Страница опубликованных постов: по курсору (keyset) или по offset."""
+    total = _public_post_totals.get(str(organization_id))
+    if total is None:
+        cur.execute(
+            '''
+            SELECT COUNT(*) as total
+            FROM organization_posts
+            WHERE organization_id = %s AND status = 'published'
+            ''',
+            (organization_id,),
+        )
+        total = cur.fetchone()['total']
+        _public_post_totals.set(str(organization_id), total, tags=[organization_tag(organization_id)])
+
+    query = '''
+        SELECT id, slug, title, excerpt, body, main_image_url, gallery,
+               video_url, published_at, is_pinned
+        FROM organization_posts
+        WHERE organization_id = %s AND status = 'published'
+    '''
+    params: list[Any] = [organization_id]
+
+    if cursor:
+        query += f' AND {keyset_condition(PUBLIC_POST_ORDERING)}'
+        params.extend(decode_cursor(cursor, 'posts', len(PUBLIC_POST_ORDERING)))
+        offset = 0
+
+    query += f' ORDER BY {keyset_order(PUBLIC_POST_ORDERING)} LIMIT %s OFFSET %s'
+    params.extend([limit + 1, offset])
+
+    cur.execute(query, params)
+    rows, next_cursor = page_rows(
+        cur.fetchall(), limit, 'posts', lambda row: [row[column] for column in PUBLIC_POST_ORDERING],
+    )
+
+    posts = []
+    for row in rows:
+        posts.append(PublicOrganizationPost(
+            id=str(row['id']),
+            slug=row['slug'],
+            title=row['title'],
+            excerpt=row['excerpt'],
+            body=row['body'],
+            main_image_url=row['main_image_url'],
+            gallery=_serialize_gallery(row['gallery']),
+            video_url=row['video_url'],
+            published_at=row['published_at'],
+            is_pinned=row['is_pinned'],
+        ))
+
+    return posts, total, next_cursor
+
+
 def list_public_organization_posts_by_id(
     organization_id: str,
     limit: int = 20,
     offset: int = 0,
-) -> tuple[list[PublicOrganizationPost], int]:
+    cursor: str | None = None,
+) -> tuple[list[PublicOrganizationPost], int, str | None]:
     """Список опубликованных постов организации по ID (публичный API)."""
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
@@ -338,56 +411,17 @@ def list_public_organization_posts_by_id(
             )
             org = cur.fetchone()
             if not org:
-                return [], 0
-
-            # Подсчет
-            cur.execute(
-                '''
-                SELECT COUNT(*) as total
-                FROM organization_posts
-                WHERE organization_id = %s AND status = 'published'
-                ''',
-                (organization_id,),
-            )
-            total = cur.fetchone()['total']
+                return [], 0, None
 
-            # Получение постов
-            cur.execute(
-                '''
-                SELECT id, slug, title, excerpt, body, main_image_url, gallery,
-                       video_url, published_at, is_pinned
-                FROM organization_posts
-                WHERE organization_id = %s AND status = 'published'
-                ORDER BY is_pinned DESC, published_at DESC
-                LIMIT %s OFFSET %s
-                ''',
-                (organization_id, limit, offset),
-            )
-            rows = cur.fetchall()
-
-            posts = []
-            for row in rows:
-                posts.append(PublicOrganizationPost(
-                    id=str(row['id']),
-                    slug=row['slug'],
-                    title=row['title'],
-                    excerpt=row['excerpt'],
-                    body=row['body'],
-                    main_image_url=row['main_image_url'],
-                    gallery=_serialize_gallery(row['gallery']),
-                    video_url=row['video_url'],
-                    published_at=row['published_at'],
-                    is_pinned=row['is_pinned'],
-                ))
-
-            return posts, total
+            return _public_posts_page(cur, org['id'], limit, offset, cursor)
 
 
 def list_public_organization_posts(
     organization_slug: str,
     limit: int = 20,
     offset: int = 0,
-) -> tuple[list[PublicOrganizationPost], int]:
+    cursor: str | None = None,
+) -> tuple[list[PublicOrganizationPost], int, str | None]:
     """Список опубликованных постов организации (публичный API)."""
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
@@ -401,51 +435,9 @@ def list_public_organization_posts(
             )
             org = cur.fetchone()
             if not org:
-                return [], 0
-
-            organization_id = org['id']
-
-            # Подсчет
-            cur.execute(
-                '''
-                SELECT COUNT(*) as total
-                FROM organization_posts
-                WHERE organization_id = %s AND status = 'published'
-                ''',
-                (organization_id,),
-            )
-            total = cur.fetchone()['total']
+                return [], 0, None
 
-            # Получение постов
-            cur.execute(
-                '''
-                SELECT id, slug, title, excerpt, body, main_image_url, gallery,
-                       video_url, published_at, is_pinned
-                FROM organization_posts
-                WHERE organization_id = %s AND status = 'published'
-                ORDER BY is_pinned DESC, published_at DESC
-                LIMIT %s OFFSET %s
-                ''',
-                (organization_id, limit, offset),
-            )
-            rows = cur.fetchall()
-
-            posts = []
-            for row in rows:
-                posts.append(PublicOrganizationPost(
-                    id=str(row['id']),
-                    slug=row['slug'],
-                    title=row['title'],
-                    excerpt=row['excerpt'],
-                    body=row['body'],
-                    main_image_url=row['main_image_url'],
-                    gallery=_serialize_gallery(row['gallery']),
-                    video_url=row['video_url'],
-                    published_at=row['published_at'],
-                    is_pinned=row['is_pinned'],
-                ))
-
-            return posts, total
+            return _public_posts_page(cur, org['id'], limit, offset, cursor)
 
 
 def get_public_organization_post(organization_slug: str, post_slug: str) -> PublicOrganizationPost | None:
@@ -505,5 +497,6 @@ def delete_organization_post(
                 (post_id, organization_id),
             )
             conn.commit()
+            _public_post_totals.invalidate(organization_tag(organization_id))
 
             return True
@@ -10,7 +10,8 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 from psycopg.types.json import Jsonb
 
-from app.core.db import get_connection
+from app.core.cache import TTLCache, invalidate_tags, organization_tag, product_tag
+from app.core.db import get_async_connection, get_connection
 from app.schemas.product_journey import (
     GeoLocation,
     JourneyStep,
@@ -23,6 +24,9 @@ from app.schemas.product_journey import (
 
 PRODUCER_ROLES = ('owner', 'admin', 'manager', 'editor')
 
+# Public product pages, tagged with the product and its organization
+_page_cache = TTLCache('public_product_pages', ttl_seconds=60)
+
 
 def _require_producer_role(cur, organization_id: str, user_id: str) -> str:
     """Verify user has producer role for the organization."""
@@ -42,10 +46,15 @@ def _require_producer_role(cur, organization_id: str, user_id: str) -> str:
     return row['role']
 
 
-def get_public_product_page(slug: str) -> PublicProductPage:
+async def get_public_product_page(slug: str) -> PublicProductPage:
     """Get full public product page data by slug."""
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
+    cache_key = f'product_page:{slug}'
+    cached = _page_cache.get(cache_key)
+    if cached:
+        return cached
+
+    async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(
             '''
             SELECT
                 p.*,
@@ -62,14 +71,14 @@ def get_public_product_page(slug: str) -> PublicProductPage:
             ''',
             (slug,)
         )
-        row = cur.fetchone()
+        row = await cur.fetchone()
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Product not found'
             )
 
-        return PublicProductPage(
+        page = PublicProductPage(
             id=row['id'],
             organization_id=row['organization_id'],
             organization_name=row['organization_name'],
@@ -96,6 +105,13 @@ def get_public_product_page(slug: str) -> PublicProductPage:
             updated_at=row['updated_at'],
         )
 
+    _page_cache.set(
+        cache_key,
+        page,
+        tags=[product_tag(row['id']), organization_tag(row['organization_id'])],
+    )
+    return page
+
 
 def get_product_journey(product_id: str) -> ProductJourney:
     """Get the complete journey for a product."""
@@ -215,6 +231,7 @@ def create_journey_step(
         )
         row = cur.fetchone()
         conn.commit()
+        invalidate_tags(product_tag(product_id))
 
         return _row_to_step(row)
 
@@ -313,6 +330,7 @@ def update_journey_step(
                 detail='Journey step not found'
             )
         conn.commit()
+        invalidate_tags(product_tag(product_id))
 
         return _row_to_step(row)
 
@@ -344,6 +362,7 @@ def delete_journey_step(product_id: str, step_id: str, user_id: str) -> None:
                 detail='Journey step not found'
             )
         conn.commit()
+        invalidate_tags(product_tag(product_id))
 
 
 def _map_step_type(step_type: str) -> str:
@@ -20,47 +20,29 @@ Database tables:
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Literal, Optional
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, invalidate_tags, product_tag, story_tag
 from app.core.db import get_connection
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache with expiration
-_cache: dict[str, tuple[any, datetime]] = {}
-CACHE_TTL_SECONDS = 60
+# Published/draft stories per product, tagged with the product and story
+_cache = TTLCache('product_stories', ttl_seconds=60)
 
 
 # ============================================================
 # CACHE UTILITIES
 # ============================================================
 
-def _get_cached(key: str) -> Optional[any]:
-    """Get value from cache if not expired"""
-    if key in _cache:
-        value, expires_at = _cache[key]
-        if datetime.utcnow() < expires_at:
-            return value
-        del _cache[key]
-    return None
-
-
-def _set_cache(key: str, value: any, ttl_seconds: int = CACHE_TTL_SECONDS) -> None:
-    """Set value in cache with expiration"""
-    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-    _cache[key] = (value, expires_at)
-
-
-def _invalidate_cache(pattern: str) -> None:
-    """Invalidate all cache entries matching pattern"""
-    keys_to_delete = [k for k in _cache.keys() if pattern in k]
-    for key in keys_to_delete:
-        del _cache[key]
+def _invalidate_cache(*tags: str) -> None:
+    """Invalidate all cache entries carrying any of the tags"""
+    invalidate_tags(*tags)
 
 
 # ============================================================
@@ -79,7 +61,7 @@ def get_story_for_product(product_id: str, include_drafts: bool = False) -> Opti
         Story record with chapters, or None if not found
     """
     cache_key = f"story:product:{product_id}:{include_drafts}"
-    cached = _get_cached(cache_key)
+    cached = _cache.get(cache_key)
     if cached:
         return cached
 
@@ -159,7 +141,7 @@ def get_story_for_product(product_id: str, include_drafts: bool = False) -> Opti
             chapters = cur.fetchall()
             story_dict['chapters'] = [dict(ch) for ch in chapters]
 
-            _set_cache(cache_key, story_dict)
+            _cache.set(cache_key, story_dict, tags=[product_tag(product_id), story_tag(story_dict['id'])])
             return story_dict
 
     except Exception as e:
@@ -431,7 +413,7 @@ def create_story(
 
             conn.commit()
 
-            _invalidate_cache(f"story:product:{product_id}")
+            _invalidate_cache(product_tag(product_id))
 
             logger.info(f"[product_stories] Created story {story['id']} for product {product_id}")
 
@@ -517,8 +499,8 @@ def update_story(
 
             conn.commit()
 
-            _invalidate_cache(f"story:product:{result['product_id']}")
-            _invalidate_cache(f"story:{story_id}")
+            _invalidate_cache(product_tag(result['product_id']))
+            _invalidate_cache(story_tag(story_id))
 
             logger.info(f"[product_stories] Updated story {story_id}")
 
@@ -562,8 +544,8 @@ def delete_story(story_id: str) -> bool:
             cur.execute('DELETE FROM public.product_stories WHERE id = %s', (story_id,))
             conn.commit()
 
-            _invalidate_cache(f"story:product:{product_id}")
-            _invalidate_cache(f"story:{story_id}")
+            _invalidate_cache(product_tag(product_id))
+            _invalidate_cache(story_tag(story_id))
 
             logger.info(f"[product_stories] Deleted story {story_id}")
 
@@ -686,7 +668,7 @@ def create_chapter(
                 result = execute(conn)
                 conn.commit()
 
-                _invalidate_cache(f"story:{story_id}")
+                _invalidate_cache(story_tag(story_id))
 
                 logger.info(f"[product_stories] Created chapter for story {story_id}")
 
@@ -782,7 +764,7 @@ def update_chapter(
             result_dict = dict(result)
             conn.commit()
 
-            _invalidate_cache(f"story:{result_dict['story_id']}")
+            _invalidate_cache(story_tag(result_dict['story_id']))
 
             logger.info(f"[product_stories] Updated chapter {chapter_id}")
 
@@ -824,7 +806,7 @@ def delete_chapter(chapter_id: str) -> bool:
             cur.execute('DELETE FROM public.story_chapters WHERE id = %s', (chapter_id,))
             conn.commit()
 
-            _invalidate_cache(f"story:{story_id}")
+            _invalidate_cache(story_tag(story_id))
 
             logger.info(f"[product_stories] Deleted chapter {chapter_id}")
 
@@ -863,7 +845,7 @@ def reorder_chapters(story_id: str, chapter_ids: list[str]) -> list[dict]:
 
             conn.commit()
 
-            _invalidate_cache(f"story:{story_id}")
+            _invalidate_cache(story_tag(story_id))
 
             # Return updated chapters
             cur.execute(
@@ -6,6 +6,7 @@ from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 from slugify import slugify
 
+from app.core.cache import TTLCache, invalidate_tags, organization_tag, product_tag
 from app.core.db import get_connection
 from app.schemas.products import (
     Product,
@@ -25,6 +26,9 @@ from app.services import subscriptions as subscription_service
 EDITOR_ROLES = ('owner', 'admin', 'manager', 'editor')
 VIEWER_ROLES = EDITOR_ROLES + ('analyst', 'viewer')
 
+# Public product listings and pages, tagged with the organization and products
+_public_cache = TTLCache('public_products', ttl_seconds=60)
+
 
 def _require_role(cur, organization_id: str, user_id: str, allowed_roles) -> str:
     cur.execute(
@@ -107,6 +111,7 @@ def create_product(organization_id: str, user_id: str, payload: ProductCreate) -
         if not row:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Не удалось создать товар')
         conn.commit()
+        invalidate_tags(organization_tag(organization_id))
         return Product(**row)
 
 
@@ -149,6 +154,7 @@ def update_product(organization_id: str, product_id: str, user_id: str, payload:
         if not row:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Товар не найден')
         conn.commit()
+        invalidate_tags(organization_tag(organization_id), product_tag(product_id))
         return Product(**row)
 
 
@@ -162,6 +168,11 @@ def archive_product(organization_id: str, product_id: str, user_id: str) -> Prod
 
 
 def list_public_products_by_org_slug(slug: str) -> list[PublicProduct]:
+    cache_key = f'public_products:org:{slug}'
+    cached = _public_cache.get(cache_key)
+    if cached:
+        return cached
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
             '''
@@ -174,10 +185,24 @@ def list_public_products_by_org_slug(slug: str) -> list[PublicProduct]:
             (slug,),
         )
         rows = cur.fetchall()
-        return [PublicProduct(**row) for row in rows]
+        products = [PublicProduct(**row) for row in rows]
+
+    # An empty list has no organization to tag, so it is not cached
+    if products:
+        _public_cache.set(
+            cache_key,
+            products,
+            tags=[organization_tag(products[0].organization_id), *(product_tag(p.id) for p in products)],
+        )
+    return products
 
 
 def get_public_product_by_slug(product_slug: str) -> PublicProduct:
+    cache_key = f'public_products:slug:{product_slug}'
+    cached = _public_cache.get(cache_key)
+    if cached:
+        return cached
+
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
             '''
@@ -189,7 +214,10 @@ def get_public_product_by_slug(product_slug: str) -> PublicProduct:
         row = cur.fetchone()
         if not row:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Товар не найден')
-        return PublicProduct(**row)
+        product = PublicProduct(**row)
+
+    _public_cache.set(cache_key, product, tags=[organization_tag(product.organization_id), product_tag(product.id)])
+    return product
 
 
 # =====================
@@ -323,6 +351,7 @@ def create_variant(
             )
 
         conn.commit()
+        invalidate_tags(organization_tag(organization_id))
         return Product(**variant)
 
 
@@ -413,6 +442,7 @@ def create_bulk_variants(
             created_variants.append(Product(**variant))
 
         conn.commit()
+        invalidate_tags(organization_tag(organization_id))
         return created_variants
 
 
@@ -480,6 +510,7 @@ def delete_variant(
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Вариант не найден')
 
         conn.commit()
+        invalidate_tags(organization_tag(organization_id), product_tag(variant_id))
 
 
 # =====================
@@ -3,14 +3,17 @@ from __future__ import annotations
 
 import json
 import logging
-from datetime import datetime, timezone
 from typing import Optional
 
+import requests
+from fastapi.concurrency import run_in_threadpool
 from psycopg.rows import dict_row
 from pywebpush import webpush, WebPushException
 
 from app.core.config import get_settings
 from app.core.db import get_connection
+from app.services import notification_delivery
+from app.services.notification_delivery import DeliveryResult
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -69,8 +72,8 @@ def get_user_push_subscriptions(user_id: str) -> list[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
-def _send_web_push(subscription_info: dict, payload: dict) -> bool:
-    """Send a single web push notification."""
+def _send_web_push(subscription_info: dict, payload: dict, session: Optional[requests.Session] = None) -> bool:
+    """Send a single web push notification (optionally over a shared HTTP session)."""
     if not settings.vapid_private_key or not settings.vapid_public_key:
         logger.warning('VAPID keys not configured, skipping push notification')
         return False
@@ -83,6 +86,7 @@ def _send_web_push(subscription_info: dict, payload: dict) -> bool:
             vapid_claims={
                 'sub': settings.vapid_subject,
             },
+            requests_session=session,
         )
         return True
     except WebPushException as e:
@@ -97,71 +101,44 @@ def _send_web_push(subscription_info: dict, payload: dict) -> bool:
         return False
 
 
-async def process_push_deliveries() -> dict:
-    """Process pending push deliveries and send them via Web Push."""
-    processed_count = 0
-    sent_count = 0
-    failed_count = 0
+def _build_push_payload(delivery: dict) -> dict:
+    return {
+        'title': delivery['title'],
+        'body': delivery['body'],
+        'icon': '/icon-192.png',  # Default icon
+        'badge': '/badge-72.png',  # Default badge
+        'data': {
+            'notification_id': str(delivery['notification_id']),
+            'delivery_id': str(delivery['id']),
+            'category': delivery['category'],
+            'severity': delivery['severity'],
+            **(delivery['payload'] or {}),
+        },
+    }
 
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Find pending push deliveries
-        cur.execute(
-            '''
-            SELECT d.id, d.notification_id, d.user_id, d.channel,
-                   n.title, n.body, n.payload, n.severity, n.category
-            FROM notification_deliveries d
-            JOIN notifications n ON n.id = d.notification_id
-            WHERE d.channel = 'push'
-              AND d.status = 'pending'
-            ORDER BY d.created_at ASC
-            LIMIT 50
-            ''',
+
+async def process_push_deliveries() -> dict:
+    """
+    Process pending push deliveries and send them via Web Push.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED; subscriptions for the whole
+    batch are loaded in one query and pushes share one HTTP session.
+    """
+    async def send_batch(deliveries: list[dict]) -> list[DeliveryResult]:
+        subscriptions = await notification_delivery.fetch_push_subscriptions(
+            [d['user_id'] for d in deliveries]
         )
-        deliveries = cur.fetchall()
-
-        for delivery in deliveries:
-            try:
-                # Get user's push subscriptions
-                cur.execute(
-                    '''
-                    SELECT endpoint, p256dh, auth
-                    FROM user_push_subscriptions
-                    WHERE user_id = %s
-                    ''',
-                    (delivery['user_id'],),
-                )
-                subscriptions = cur.fetchall()
-
-                if not subscriptions:
-                    # No push subscriptions for this user
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', 'No push subscriptions found for user', delivery['id']),
-                    )
-                    processed_count += 1
-                    failed_count += 1
-                    continue
-
-                # Prepare push payload
-                push_payload = {
-                    'title': delivery['title'],
-                    'body': delivery['body'],
-                    'icon': '/icon-192.png',  # Default icon
-                    'badge': '/badge-72.png',  # Default badge
-                    'data': {
-                        'notification_id': str(delivery['notification_id']),
-                        'delivery_id': str(delivery['id']),
-                        'category': delivery['category'],
-                        'severity': delivery['severity'],
-                        **(delivery['payload'] or {}),
-                    },
-                }
-
-                # Send to all subscriptions
+
+        with requests.Session() as session:
+            async def send_one(delivery: dict) -> DeliveryResult:
+                user_subscriptions = subscriptions.get(str(delivery['user_id']))
+                if not user_subscriptions:
+                    return DeliveryResult.failed(delivery['id'], 'No push subscriptions found for user')
+
+                push_payload = _build_push_payload(delivery)
                 success_count = 0
                 failed_endpoints = []
-
-                for sub in subscriptions:
+                for sub in user_subscriptions:
                     subscription_info = {
                         'endpoint': sub['endpoint'],
                         'keys': {
@@ -169,38 +146,18 @@ async def process_push_deliveries() -> dict:
                             'auth': sub['auth'],
                         },
                     }
-
-                    if _send_web_push(subscription_info, push_payload):
+                    # pywebpush is blocking
+                    if await run_in_threadpool(_send_web_push, subscription_info, push_payload, session):
                         success_count += 1
                     else:
                         failed_endpoints.append(sub['endpoint'][:50])
 
-                # Update delivery status
                 if success_count > 0:
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, sent_at = %s WHERE id = %s',
-                        ('sent', datetime.now(timezone.utc), delivery['id']),
-                    )
-                    sent_count += 1
-                else:
-                    error_msg = f'Failed to send to {len(failed_endpoints)} endpoints'
-                    cur.execute(
-                        'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                        ('failed', error_msg[:200], delivery['id']),
-                    )
-                    failed_count += 1
-
-                processed_count += 1
-
-            except Exception as e:
-                logger.error(f'Error processing push delivery {delivery["id"]}: {e}')
-                cur.execute(
-                    'UPDATE notification_deliveries SET status = %s, error_message = %s WHERE id = %s',
-                    ('failed', str(e)[:200], delivery['id']),
-                )
-                processed_count += 1
-                failed_count += 1
+                    return DeliveryResult.sent(delivery['id'])
+                return DeliveryResult.failed(delivery['id'], f'Failed to send to {len(failed_endpoints)} endpoints')
 
-        conn.commit()
+            return await notification_delivery.send_concurrently(
+                deliveries, send_one, settings.notification_push_concurrency,
+            )
 
-    return {'processed': processed_count, 'sent': sent_count, 'failed': failed_count}
+    return await notification_delivery.run_channel('push', send_batch)
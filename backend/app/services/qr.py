@@ -21,8 +21,9 @@ from app.schemas.qr import (
     QRCustomizationSettings,
     QRCustomizationUpdate,
 )
-from app.services import subscriptions as subscription_service
-from app.utils.geoip import lookup_ip, parse_utm_params
+from app.services import qr_render_cache, qr_resolution, scan_ingestion, subscriptions as subscription_service
+from app.services.qr_rollups import scan_aggregate
+from app.utils.geoip import parse_utm_params
 
 settings = get_settings()
 
@@ -119,7 +120,7 @@ def get_qr_stats(organization_id: str, qr_code_id: str, user_id: str) -> QRCodeS
             )
 
 
-def log_event_and_get_redirect(code: str, client_ip: str | None, user_agent: str | None, referer: str | None, raw_query: str | None) -> str:
+async def log_event_and_get_redirect(code: str, client_ip: str | None, user_agent: str | None, referer: str | None, raw_query: str | None) -> str:
     """
     Log QR scan event and return redirect URL.
 
@@ -128,112 +129,66 @@ def log_event_and_get_redirect(code: str, client_ip: str | None, user_agent: str
     2. Active campaign (highest priority wins)
     3. Default URL version
     4. Legacy behavior (from qr_codes table)
-    """
-    with get_connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
-            cur.execute(
-                '''
-                SELECT qc.id, qc.organization_id, qc.target_slug, qc.is_active, o.slug AS organization_slug
-                FROM qr_codes qc
-                JOIN organizations o ON o.id = qc.organization_id
-                WHERE qc.code = %s
-                ''',
-                (code,),
-            )
-            row = cur.fetchone()
-            if not row or not row['is_active']:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='QR-код не найден')
-
-            qr_code_id = row['id']
-
-            # Calculate IP hash for geo lookup and consistent A/B test assignment
-            ip_hash = None
-            geo = None
-            if client_ip:
-                sha = hashlib.sha256()
-                sha.update(f'{settings.qr_ip_hash_salt}:{client_ip}'.encode('utf-8'))
-                ip_hash = sha.hexdigest()
-                # Lookup geographic location
-                geo = lookup_ip(client_ip)
-
-            # Parse UTM parameters from query string
-            utm = parse_utm_params(raw_query)
-
-            # Resolve dynamic URL (A/B test > Campaign > Default > Legacy)
-            url_version_id = None
-            campaign_id = None
-            ab_test_id = None
-            ab_variant_id = None
-            redirect_url = None
-
-            # Try dynamic URL resolution
-            cur.execute(
-                'SELECT * FROM get_active_qr_url(%s, %s)',
-                (qr_code_id, ip_hash)
-            )
-            dynamic_url = cur.fetchone()
-
-            if dynamic_url and dynamic_url['target_url']:
-                target_url = dynamic_url['target_url']
-                url_version_id = dynamic_url['url_version_id']
-                campaign_id = dynamic_url['campaign_id']
-                ab_test_id = dynamic_url['ab_test_id']
-                ab_variant_id = dynamic_url['ab_variant_id']
-
-                # Build full URL
-                if target_url.startswith('http://') or target_url.startswith('https://'):
-                    redirect_url = target_url
-                else:
-                    redirect_url = f'{settings.frontend_base}{target_url}'
-            else:
-                # Fallback to legacy behavior
-                target_slug = row['target_slug'] or row['organization_slug']
-                redirect_url = f'{settings.frontend_base}/org/{target_slug}'
-
-            # Log event with enhanced tracking
-            cur.execute(
-                '''
-                INSERT INTO qr_events (
-                    qr_code_id, ip_hash, user_agent, referer, raw_query,
-                    country, city, utm_source, utm_medium, utm_campaign,
-                    url_version_id, campaign_id, ab_test_id, ab_variant_id
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                ''',
-                (
-                    qr_code_id, ip_hash, user_agent, referer, raw_query,
-                    geo.country if geo else None,
-                    geo.city if geo else None,
-                    utm['utm_source'],
-                    utm['utm_medium'],
-                    utm['utm_campaign'],
-                    url_version_id,
-                    campaign_id,
-                    ab_test_id,
-                    ab_variant_id,
-                ),
-            )
-            event_row = cur.fetchone()
-            scan_event_id = event_row['id'] if event_row else None
-            conn.commit()
-
-            # Trigger real-time scan notification (async, non-blocking)
-            try:
-                from app.services import scan_notifications
-                if scan_notifications.check_notifications_enabled(str(row['organization_id'])):
-                    scan_notifications.send_scan_notification(
-                        organization_id=str(row['organization_id']),
-                        scan_event_id=str(scan_event_id) if scan_event_id else None,
-                        country=geo.country if geo else None,
-                        city=geo.city if geo else None,
-                    )
-            except Exception as notif_err:
-                # Log but don't fail the scan
-                import logging
-                logging.getLogger(__name__).warning(f"Failed to send scan notification: {notif_err}")
 
-            return redirect_url
+    Resolution is served from the in-process qr_resolution cache and the
+    event is handed to the scan_ingestion buffer, so the common path does
+    not touch the database.
+    """
+    resolution = await qr_resolution.get_resolution(code)
+    if not resolution or not resolution.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='QR-код не найден')
+
+    qr_code_id = resolution.qr_code_id
+
+    # Calculate IP hash for consistent A/B test assignment; the geo lookup
+    # happens in batch when the ingestion buffer writes the event
+    ip_hash = None
+    if client_ip:
+        sha = hashlib.sha256()
+        sha.update(f'{settings.qr_ip_hash_salt}:{client_ip}'.encode('utf-8'))
+        ip_hash = sha.hexdigest()
+
+    # Parse UTM parameters from query string
+    utm = parse_utm_params(raw_query)
+
+    # Resolve dynamic URL in-process (A/B test > Campaign > Default > Legacy)
+    resolved = qr_resolution.resolve(resolution, ip_hash)
+    url_version_id = resolved.url_version_id
+    campaign_id = resolved.campaign_id
+    ab_test_id = resolved.ab_test_id
+    ab_variant_id = resolved.ab_variant_id
+
+    if resolved.target_url:
+        target_url = resolved.target_url
+        # Build full URL
+        if target_url.startswith('http://') or target_url.startswith('https://'):
+            redirect_url = target_url
+        else:
+            redirect_url = f'{settings.frontend_base}{target_url}'
+    else:
+        # Fallback to legacy behavior
+        redirect_url = f'{settings.frontend_base}/org/{resolution.legacy_slug}'
+
+    # Queue the scan; the ingestion flusher writes qr_events in batches
+    # and dispatches scan notifications after each flush.
+    await scan_ingestion.enqueue_scan(scan_ingestion.ScanEvent(
+        qr_code_id=qr_code_id,
+        organization_id=resolution.organization_id,
+        ip_hash=ip_hash,
+        user_agent=user_agent,
+        referer=referer,
+        raw_query=raw_query,
+        client_ip=client_ip,
+        utm_source=utm['utm_source'],
+        utm_medium=utm['utm_medium'],
+        utm_campaign=utm['utm_campaign'],
+        url_version_id=url_version_id,
+        campaign_id=campaign_id,
+        ab_test_id=ab_test_id,
+        ab_variant_id=ab_variant_id,
+    ))
+
+    return redirect_url
 
 
 def get_qr_detailed_stats(organization_id: str, qr_code_id: str, user_id: str) -> QRCodeDetailedStats:
@@ -250,50 +205,33 @@ def get_qr_detailed_stats(organization_id: str, qr_code_id: str, user_id: str) -
             last30 = now - timedelta(days=30)
 
             # Basic counts
-            cur.execute(
-                '''
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (WHERE occurred_at >= %s) AS last_7_days,
-                    COUNT(*) FILTER (WHERE occurred_at >= %s) AS last_30_days
-                FROM qr_events
-                WHERE qr_code_id = %s
-                ''',
-                (last7, last30, qr_code_id),
-            )
-            counts = cur.fetchone()
+            total = scan_aggregate(cur, qr_code_id=qr_code_id)[0]['count']
+            last_7_days = scan_aggregate(cur, qr_code_id=qr_code_id, since=last7)[0]['count']
+            last_30_days = scan_aggregate(cur, qr_code_id=qr_code_id, since=last30)[0]['count']
 
             # Geo breakdown (top 20)
-            cur.execute(
-                '''
-                SELECT country, city, COUNT(*) as count
-                FROM qr_events
-                WHERE qr_code_id = %s AND country IS NOT NULL
-                GROUP BY country, city
-                ORDER BY count DESC
-                LIMIT 20
-                ''',
-                (qr_code_id,),
+            geo_rows = scan_aggregate(
+                cur,
+                qr_code_id=qr_code_id,
+                group_by=['country', 'city'],
+                where='country IS NOT NULL',
+                order_by='count DESC',
+                limit=20,
             )
-            geo_rows = cur.fetchall()
             geo_breakdown = [
                 GeoBreakdownItem(country=r['country'], city=r['city'], count=r['count'])
                 for r in geo_rows
             ]
 
             # UTM breakdown (top 20)
-            cur.execute(
-                '''
-                SELECT utm_source, utm_medium, utm_campaign, COUNT(*) as count
-                FROM qr_events
-                WHERE qr_code_id = %s AND (utm_source IS NOT NULL OR utm_medium IS NOT NULL OR utm_campaign IS NOT NULL)
-                GROUP BY utm_source, utm_medium, utm_campaign
-                ORDER BY count DESC
-                LIMIT 20
-                ''',
-                (qr_code_id,),
+            utm_rows = scan_aggregate(
+                cur,
+                qr_code_id=qr_code_id,
+                group_by=['utm_source', 'utm_medium', 'utm_campaign'],
+                where='utm_source IS NOT NULL OR utm_medium IS NOT NULL OR utm_campaign IS NOT NULL',
+                order_by='count DESC',
+                limit=20,
             )
-            utm_rows = cur.fetchall()
             utm_breakdown = [
                 UTMBreakdownItem(
                     utm_source=r['utm_source'],
@@ -305,9 +243,9 @@ def get_qr_detailed_stats(organization_id: str, qr_code_id: str, user_id: str) -
             ]
 
             return QRCodeDetailedStats(
-                total=counts['total'] or 0,
-                last_7_days=counts['last_7_days'] or 0,
-                last_30_days=counts['last_30_days'] or 0,
+                total=total,
+                last_7_days=last_7_days,
+                last_30_days=last_30_days,
                 geo_breakdown=geo_breakdown,
                 utm_breakdown=utm_breakdown,
             )
@@ -356,25 +294,11 @@ def get_qr_timeline(organization_id: str, qr_code_id: str, user_id: str, period:
             now = datetime.now(timezone.utc)
             start_date = now - timedelta(days=days)
 
-            # Query aggregated by date
-            # Using DATE(occurred_at) to aggregate by calendar day
-            cur.execute(
-                '''
-                SELECT
-                    DATE(occurred_at) as scan_date,
-                    COUNT(*) as count
-                FROM qr_events
-                WHERE qr_code_id = %s
-                  AND occurred_at >= %s
-                GROUP BY DATE(occurred_at)
-                ORDER BY scan_date ASC
-                ''',
-                (qr_code_id, start_date)
-            )
-            rows = cur.fetchall()
+            # Query aggregated by UTC calendar day
+            rows = scan_aggregate(cur, qr_code_id=qr_code_id, since=start_date, by_day=True)
 
             # Build lookup dict for existing data
-            data_by_date = {row['scan_date'].isoformat(): row['count'] for row in rows}
+            data_by_date = {row['day'].astimezone(timezone.utc).date().isoformat(): row['count'] for row in rows}
 
             # Fill in gaps with zero counts
             data_points = []
@@ -477,6 +401,24 @@ def get_qr_customization(organization_id: str, qr_code_id: str, user_id: str) ->
             return None
 
 
+def get_qr_customizations(qr_code_ids: list[str]) -> dict[str, QRCustomizationSettings]:
+    """
+    Customization settings for several QR codes, keyed by QR code id.
+
+    Does not check access: callers pass ids already validated for the user
+    (e.g. from get_multiple_qr_codes).
+    """
+    if not qr_code_ids:
+        return {}
+    with get_connection() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                'SELECT * FROM qr_customization_settings WHERE qr_code_id = ANY(%s::uuid[])',
+                (qr_code_ids,)
+            )
+            return {str(row['qr_code_id']): QRCustomizationSettings(**row) for row in cur.fetchall()}
+
+
 def update_qr_customization(
     organization_id: str,
     qr_code_id: str,
@@ -507,6 +449,11 @@ def update_qr_customization(
             fg_color = payload.foreground_color or (existing['foreground_color'] if existing else '#000000')
             bg_color = payload.background_color or (existing['background_color'] if existing else '#FFFFFF')
             logo_url = payload.logo_url if payload.logo_url is not None else (existing['logo_url'] if existing else None)
+            if payload.logo_url and not qr_render_cache.is_allowed_logo_url(payload.logo_url):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Логотип должен быть загружен в хранилище медиа организации',
+                )
             logo_size = payload.logo_size_percent or (existing['logo_size_percent'] if existing else 20)
             style = payload.style or (existing['style'] if existing else 'squares')
 
@@ -636,8 +583,8 @@ def get_multiple_qr_codes(organization_id: str, user_id: str, qr_code_ids: list[
     if not qr_code_ids:
         return []
 
-    if len(qr_code_ids) > 100:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Максимум 100 QR-кодов за раз')
+    if len(qr_code_ids) > 500:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Максимум 500 QR-кодов за раз')
 
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
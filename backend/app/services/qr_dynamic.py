@@ -6,6 +6,9 @@ Handles:
 - Campaign scheduling
 - A/B test execution
 - Redirect resolution with priority handling
+
+Every write that can change redirect resolution invalidates the
+qr_resolution cache entry for the QR code.
 """
 
 from __future__ import annotations
@@ -19,6 +22,7 @@ from psycopg.rows import dict_row
 
 from app.core.config import get_settings
 from app.core.db import get_connection
+from app.services import qr_resolution
 from app.schemas.qr_dynamic import (
     QRUrlVersion,
     QRUrlVersionCreate,
@@ -199,6 +203,7 @@ def create_url_version(qr_code_id: str, user_id: str, payload: QRUrlVersionCreat
 
             _log_version_history(cur, row['id'], 'created', user_id)
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRUrlVersion(**row, total_clicks=0)
 
@@ -259,6 +264,7 @@ def update_url_version(
 
             _log_version_history(cur, version_id, action, user_id, changes)
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRUrlVersion(**row, total_clicks=0)
 
@@ -308,6 +314,7 @@ def archive_url_version(qr_code_id: str, version_id: str, user_id: str) -> None:
 
             _log_version_history(cur, version_id, 'archived', user_id)
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
 
 def get_version_history(
@@ -434,6 +441,7 @@ def create_campaign(qr_code_id: str, user_id: str, payload: QRCampaignCreate) ->
             )
             row = cur.fetchone()
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRCampaign(**row)
 
@@ -485,6 +493,7 @@ def update_campaign(
             )
             row = cur.fetchone()
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRCampaign(**row)
 
@@ -503,6 +512,7 @@ def delete_campaign(qr_code_id: str, campaign_id: str, user_id: str) -> None:
             if cur.rowcount == 0:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Campaign not found')
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
 
 # ============================================================================
@@ -635,6 +645,7 @@ def create_ab_test(qr_code_id: str, user_id: str, payload: QRABTestCreate) -> QR
                 variants.append(cur.fetchone())
 
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRABTestWithVariants(
                 **test,
@@ -702,6 +713,7 @@ def start_ab_test(qr_code_id: str, test_id: str, user_id: str) -> QRABTestWithVa
             variants = cur.fetchall()
 
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRABTestWithVariants(
                 **test,
@@ -740,6 +752,7 @@ def pause_ab_test(qr_code_id: str, test_id: str, user_id: str) -> QRABTestWithVa
             variants = cur.fetchall()
 
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRABTestWithVariants(
                 **test,
@@ -829,6 +842,7 @@ def conclude_ab_test(
             variants = cur.fetchall()
 
             conn.commit()
+            qr_resolution.invalidate_qr_code(qr_code_id)
 
             return QRABTestWithVariants(
                 **test,
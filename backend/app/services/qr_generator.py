@@ -1,14 +1,154 @@
 """
 QR Code Image Generation Service
 
-Uses the segno library for fast, dependency-free QR code generation.
+Uses the segno library to encode the module matrix and Pillow to rasterize it.
 Supports both PNG and SVG formats with on-the-fly generation (no storage).
+
+PNG output is exactly size x size pixels. The module matrix is built once as
+a one-pixel-per-module palette image and scaled with nearest-neighbour
+sampling (module widths differ by at most one pixel). Without a logo only
+the distinct module rows are scaled and packed; the 1-bit PNG is assembled
+by repeating them and compressing once. Colors and a centered logo come
+from qr_customization_settings; the `style` setting is not rendered yet.
 """
 import hashlib
+import json
+import struct
+import zlib
 from io import BytesIO
-from typing import Literal
+from typing import Literal, Optional
 
 import segno
+from PIL import Image
+
+MIN_SIZE = 100
+MAX_SIZE = 2000  # image endpoints
+MAX_PRINT_SIZE = 8000  # print/packaging exports
+BORDER = 1  # quiet zone, in modules
+
+DEFAULT_FOREGROUND = '#000000'
+DEFAULT_BACKGROUND = '#FFFFFF'
+
+
+def _rgb(color: str) -> tuple[int, int, int]:
+    value = color.lstrip('#')
+    if len(value) != 6:
+        raise ValueError("Colors must be in hex format (#RRGGBB)")
+    try:
+        return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+    except ValueError:
+        raise ValueError("Colors must be in hex format (#RRGGBB)") from None
+
+
+def _module_image(qr: segno.QRCode, foreground: str, background: str) -> Image.Image:
+    """One pixel per module, palette index 1 = dark"""
+    matrix = qr.matrix
+    width = len(matrix) + 2 * BORDER
+    quiet_row = bytes(width)
+    pad = bytes(BORDER)
+    rows = [quiet_row] * BORDER
+    rows.extend(pad + bytes(row) + pad for row in matrix)
+    rows.extend([quiet_row] * BORDER)
+    image = Image.frombytes('P', (width, width), b''.join(rows))
+    image.putpalette(_rgb(background) + _rgb(foreground))
+    return image
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def _encode_two_color_png(modules: Image.Image, size: int, palette: bytes) -> bytes:
+    """
+    Encode the module image scaled to size x size as a 1-bit palette PNG.
+
+    Every output row is a copy of one of the few module rows, so each module
+    row is scaled and bit-packed once (in C) and the image data is built by
+    repetition, matching Image.resize(..., NEAREST) pixel for pixel.
+    """
+    width = modules.width
+    stride = (size + 7) // 8
+    packed = modules.resize((size, width), Image.NEAREST).tobytes('raw', 'P;1')
+    # Leading 0 is the PNG "no filter" byte
+    rows = [b'\x00' + packed[i * stride:(i + 1) * stride] for i in range(width)]
+    data = b''.join([rows[(2 * y + 1) * width // (2 * size)] for y in range(size)])
+    header = struct.pack('>IIBBBBB', size, size, 1, 3, 0, 0, 0)  # 1-bit, palette
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'PLTE', palette),
+        _png_chunk(b'IDAT', zlib.compress(data, 6)),
+        _png_chunk(b'IEND', b''),
+    ))
+
+
+def _overlay_logo(image: Image.Image, logo: bytes, size_percent: int, background: str) -> Image.Image:
+    """Paste the logo centered on a background-colored pad"""
+    try:
+        mark = Image.open(BytesIO(logo))
+        mark.load()
+    except Exception as e:
+        raise ValueError(f"Invalid logo image: {e}") from None
+
+    size = image.width
+    box = max(1, size * size_percent // 100)
+    mark = mark.convert('RGBA')
+    mark.thumbnail((box, box), Image.LANCZOS)
+
+    image = image.convert('RGB')
+    margin = max(1, box // 20)
+    pad = Image.new('RGB', (mark.width + 2 * margin, mark.height + 2 * margin), _rgb(background))
+    image.paste(pad, ((size - pad.width) // 2, (size - pad.height) // 2))
+    image.paste(mark, ((size - mark.width) // 2, (size - mark.height) // 2), mark)
+    return image
+
+
+def render_png(
+    url: str,
+    size: int = 300,
+    error_correction: Literal["L", "M", "Q", "H"] = "M",
+    foreground_color: str = DEFAULT_FOREGROUND,
+    background_color: str = DEFAULT_BACKGROUND,
+    logo: Optional[bytes] = None,
+    logo_size_percent: int = 20,
+) -> bytes:
+    """
+    Render a QR code as a PNG of exactly size x size pixels.
+
+    Args:
+        url: Target URL to encode in QR code
+        size: Pixel size (100-8000)
+        error_correction: Error correction level (L, M, Q, H)
+        foreground_color: Dark module color (#RRGGBB)
+        background_color: Light module and quiet zone color (#RRGGBB)
+        logo: Optional logo image bytes, drawn over the center
+        logo_size_percent: Logo box size as a percentage of the image width
+
+    Returns:
+        bytes: PNG image data
+
+    Raises:
+        ValueError: Invalid parameters
+    """
+    if not url:
+        raise ValueError("URL cannot be empty")
+
+    if size < MIN_SIZE or size > MAX_PRINT_SIZE:
+        raise ValueError(f"Size must be between {MIN_SIZE} and {MAX_PRINT_SIZE} pixels")
+
+    if error_correction not in ("L", "M", "Q", "H"):
+        raise ValueError("Error correction must be L, M, Q, or H")
+
+    qr = segno.make_qr(url, error=error_correction.lower())
+    modules = _module_image(qr, foreground_color, background_color)
+
+    if not logo:
+        return _encode_two_color_png(modules, size, bytes(_rgb(background_color) + _rgb(foreground_color)))
+
+    image = _overlay_logo(modules.resize((size, size), Image.NEAREST), logo, logo_size_percent, background_color)
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', compress_level=6)
+    return buffer.getvalue()
 
 
 def generate_qr_image(
@@ -16,6 +156,10 @@ def generate_qr_image(
     format: Literal["png", "svg"] = "png",
     size: int = 300,
     error_correction: Literal["L", "M", "Q", "H"] = "M",
+    foreground_color: str = DEFAULT_FOREGROUND,
+    background_color: str = DEFAULT_BACKGROUND,
+    logo: Optional[bytes] = None,
+    logo_size_percent: int = 20,
 ) -> bytes:
     """
     Generate QR code image.
@@ -23,12 +167,16 @@ def generate_qr_image(
     Args:
         url: Target URL to encode in QR code
         format: Output format - "png" or "svg"
-        size: Pixel size for PNG (100-2000), ignored for SVG
+        size: Exact pixel size for PNG (100-2000), ignored for SVG
         error_correction: Error correction level
             - "L" (Low - 7%): Smallest codes, minimal damage tolerance
             - "M" (Medium - 15%): Default, balanced size and reliability
             - "Q" (Quartile - 25%): High reliability, recommended for print
             - "H" (High - 30%): Maximum reliability, outdoor/weathered materials
+        foreground_color: Dark module color (#RRGGBB)
+        background_color: Light module color (#RRGGBB)
+        logo: Optional logo image bytes (PNG only)
+        logo_size_percent: Logo box size as a percentage of the image width
 
     Returns:
         bytes: Image data (PNG bytes or SVG string encoded as UTF-8)
@@ -39,8 +187,8 @@ def generate_qr_image(
     if not url:
         raise ValueError("URL cannot be empty")
 
-    if size < 100 or size > 2000:
-        raise ValueError("Size must be between 100 and 2000 pixels")
+    if size < MIN_SIZE or size > MAX_SIZE:
+        raise ValueError(f"Size must be between {MIN_SIZE} and {MAX_SIZE} pixels")
 
     if format not in ("png", "svg"):
         raise ValueError("Format must be 'png' or 'svg'")
@@ -48,23 +196,22 @@ def generate_qr_image(
     if error_correction not in ("L", "M", "Q", "H"):
         raise ValueError("Error correction must be L, M, Q, or H")
 
-    # Create QR code with segno
+    if format == "png":
+        return render_png(
+            url, size, error_correction, foreground_color, background_color, logo, logo_size_percent
+        )
+
+    # SVG is scalable, so size parameter is informative but not strictly enforced.
+    # The default background stays transparent; logos are not embedded.
+    for color in (foreground_color, background_color):
+        _rgb(color)
+    light = None if background_color.upper() == DEFAULT_BACKGROUND else background_color
     qr = segno.make_qr(url, error=error_correction.lower())
-
-    # Generate image
     buffer = BytesIO()
-
-    if format == "png":
-        # Calculate scale factor for PNG
-        # Segno uses module size (individual squares in QR)
-        # QR codes typically have 21-177 modules depending on data volume
-        # Use a reasonable scale to approximate the target size
-        scale = max(1, size // 30)  # Assume ~30 modules as average QR size
-        qr.save(buffer, kind="png", scale=scale, border=1)
-    else:  # svg
-        # SVG is scalable, so size parameter is informative but not strictly enforced
-        qr.save(buffer, kind="svg", border=1, xmldecl=False, svgclass=None)
-
+    qr.save(
+        buffer, kind="svg", border=BORDER, xmldecl=False, svgclass=None,
+        dark=foreground_color, light=light,
+    )
     return buffer.getvalue()
 
 
@@ -72,7 +219,8 @@ def generate_etag(
     code: str,
     format: str,
     size: int,
-    error_correction: str
+    error_correction: str,
+    customization: Optional[dict] = None,
 ) -> str:
     """
     Generate ETag for QR code image caching.
@@ -82,10 +230,13 @@ def generate_etag(
         format: Image format (png/svg)
         size: Image size in pixels
         error_correction: Error correction level
+        customization: Render options (colors, logo); None for the default look
 
     Returns:
         ETag string with quotes (e.g., "a1b2c3d4")
     """
     tag_input = f"{code}:{format}:{size}:{error_correction}"
+    if customization:
+        tag_input += ':' + json.dumps(customization, sort_keys=True, separators=(',', ':'))
     hash_val = hashlib.sha256(tag_input.encode()).hexdigest()[:16]
     return f'"{hash_val}"'
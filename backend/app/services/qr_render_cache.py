@@ -0,0 +1,474 @@
+"""
+Content-addressed cache for rendered QR code images.
+
+Renders are keyed by a hash of (url, format, size, error level,
+customization), so an entry never goes stale: changing any input produces a
+different key. Two tiers:
+- memory: per-process LRU bounded by total bytes
+- disk: shared by all worker processes and bounded by the size of the
+  directory: each process re-scans it when its own tally goes over the
+  budget (or the scan is older than DISK_RESCAN_SECONDS) and evicts the
+  least recently used files down to DISK_LOW_WATER of the budget. Recency
+  is the file mtime, set explicitly to a strictly increasing nanosecond
+  stamp on every write and read, so it does not depend on the timestamp
+  granularity of the filesystem
+
+Bulk work (pre-rendering after bulk creation, ZIP exports) renders cache
+misses in a process pool with a bounded number of renders in flight, so
+large exports are produced in parallel and streamed without being held in
+memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic, time_ns
+from typing import AsyncIterator, Iterable, Optional, Union
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import get_settings
+from app.services.qr_generator import (
+    DEFAULT_BACKGROUND,
+    DEFAULT_FOREGROUND,
+    generate_qr_image,
+    render_png,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Variants requested right after creation: the image endpoint default and the export
+PRERENDER_VARIANTS = (('png', 300, 'M'), ('png', 500, 'M'))
+LOGO_TIMEOUT_SECONDS = 10
+LOGO_MAX_BYTES = 2 * 1024 * 1024
+# Writes by other processes are seen at the latest after this long
+DISK_RESCAN_SECONDS = 60
+# Eviction after a re-scan leaves headroom so a full cache is not re-scanned on every write
+DISK_LOW_WATER = 0.9
+
+_stamp_lock = threading.Lock()
+_last_stamp = 0
+
+
+def _touch(path: str) -> None:
+    """Mark a disk entry as most recently used"""
+    global _last_stamp
+    with _stamp_lock:
+        _last_stamp = max(time_ns(), _last_stamp + 1)
+        stamp = _last_stamp
+    os.utime(path, ns=(stamp, stamp))
+
+
+@dataclass(frozen=True)
+class RenderSpec:
+    url: str
+    format: str = 'png'
+    size: int = 300
+    error_correction: str = 'M'
+    customization: Optional[dict] = None
+
+    @property
+    def key(self) -> str:
+        return render_key(self.url, self.format, self.size, self.error_correction, self.customization)
+
+
+def render_key(
+    url: str,
+    format: str,
+    size: int,
+    error_correction: str,
+    customization: Optional[dict] = None,
+) -> str:
+    """Content address of a render; customization is hashed in canonical JSON form"""
+    custom_hash = ''
+    if customization:
+        canonical = json.dumps(customization, sort_keys=True, separators=(',', ':'), default=str)
+        custom_hash = hashlib.sha256(canonical.encode()).hexdigest()
+    material = '\x1f'.join((url, format, str(size), error_correction, custom_hash))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def customization_options(customization) -> Optional[dict]:
+    """Render-relevant fields of QRCustomizationSettings; None for the default look"""
+    if customization is None:
+        return None
+    options = {
+        'foreground_color': customization.foreground_color.upper(),
+        'background_color': customization.background_color.upper(),
+    }
+    if customization.logo_url:
+        options['logo_url'] = customization.logo_url
+        options['logo_size_percent'] = customization.logo_size_percent
+    if options == {'foreground_color': DEFAULT_FOREGROUND, 'background_color': DEFAULT_BACKGROUND}:
+        return None
+    return options
+
+
+def is_allowed_logo_url(url: str) -> bool:
+    """Logos are only fetched from our own storage host, over https"""
+    parsed = urlparse(url)
+    storage_host = urlparse(settings.supabase_url).hostname
+    return parsed.scheme == 'https' and parsed.hostname is not None and parsed.hostname == storage_host
+
+
+@lru_cache(maxsize=32)
+def _fetch_logo(url: str) -> bytes:
+    if not is_allowed_logo_url(url):
+        raise ValueError("Logo must be stored in the organization media storage")
+    chunks = []
+    received = 0
+    try:
+        # No redirects: every fetched URL has passed the host check
+        with httpx.stream('GET', url, timeout=LOGO_TIMEOUT_SECONDS, follow_redirects=False) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                received += len(chunk)
+                if received > LOGO_MAX_BYTES:
+                    raise ValueError("Logo is too large")
+                chunks.append(chunk)
+    except httpx.HTTPError as e:
+        raise ValueError(f"Logo could not be loaded: {e}") from None
+    return b''.join(chunks)
+
+
+def render(spec: RenderSpec) -> bytes:
+    """Render one spec; runs in worker processes"""
+    options = dict(spec.customization or {})
+    logo_url = options.pop('logo_url', None)
+    if logo_url and spec.format == 'png':
+        options['logo'] = _fetch_logo(logo_url)
+    else:
+        options.pop('logo_size_percent', None)
+    if spec.format == 'png':
+        # Print sizes above the image endpoint limit are allowed here
+        return render_png(spec.url, spec.size, spec.error_correction, **options)
+    return generate_qr_image(spec.url, spec.format, spec.size, spec.error_correction, **options)
+
+
+class QRRenderCache:
+    """Two-tier (memory LRU + disk) store for rendered images"""
+
+    def __init__(self, memory_max_bytes: int, disk_dir: Optional[str], disk_max_bytes: int):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Optional[OrderedDict[str, int]] = None  # key -> size, oldest first
+        self._disk_bytes = 0
+        self._disk_scanned_at = 0.0
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'renders': 0, 'disk_evictions': 0}
+
+    # Memory tier
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # Disk tier
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        """Scan the directory into the index on first use, oldest entries first"""
+        if self._disk is None:
+            entries = []
+            if os.path.isdir(self.disk_dir):
+                for root, _, files in os.walk(self.disk_dir):
+                    for name in files:
+                        if name.endswith('.tmp'):
+                            continue
+                        try:
+                            stat = os.stat(os.path.join(root, name))
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime_ns, name, stat.st_size))
+            entries.sort()
+            self._disk = OrderedDict((name, size) for _, name, size in entries)
+            self._disk_bytes = sum(self._disk.values())
+            self._disk_scanned_at = monotonic()
+        return self._disk
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            _touch(path)
+        except OSError:
+            return None
+        index = self._disk_index()
+        if key in index:
+            index.move_to_end(key)
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.disk_dir or len(data) > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic publish: other processes never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            _touch(path)
+        except OSError as e:
+            logger.warning(f"QR render cache disk write failed: {e}")
+            return
+
+        index = self._disk_index()
+        self._disk_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        if self._disk_bytes <= self.disk_max_bytes and monotonic() - self._disk_scanned_at < DISK_RESCAN_SECONDS:
+            return
+        # The directory is shared: budget from what all processes have written
+        self._disk = None
+        index = self._disk_index()
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+        target = self.disk_max_bytes * DISK_LOW_WATER
+        while self._disk_bytes > target and index:
+            evicted, size = index.popitem(last=False)
+            self._disk_bytes -= size
+            self._stats['disk_evictions'] += 1
+            try:
+                os.unlink(self._path(evicted))
+            except OSError:
+                pass  # already evicted by another process
+
+    # Public API
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return data
+            data = self._read_disk(key)
+            if data is not None:
+                self._stats['disk_hits'] += 1
+                self._remember(key, data)
+                return data
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._stats['renders'] += 1
+            self._remember(key, data)
+            self._write_disk(key, data)
+
+    def get_or_render(self, spec: RenderSpec) -> bytes:
+        """Cached render; blocking, call from a thread"""
+        key = spec.key
+        data = self.get(key)
+        if data is None:
+            data = render(spec)
+            self.put(key, data)
+        return data
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk) if self._disk is not None else None,
+                'disk_bytes': self._disk_bytes if self._disk is not None else None,
+            }
+
+
+def _default_disk_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), 'chestno-qr-render-cache')
+
+
+cache = QRRenderCache(
+    memory_max_bytes=settings.qr_render_cache_memory_mb * 1024 * 1024,
+    disk_dir=settings.qr_render_cache_dir or _default_disk_dir(),
+    disk_max_bytes=settings.qr_render_cache_disk_mb * 1024 * 1024,
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _render_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared render pool, started on first bulk render; None renders in threads"""
+    global _pool
+    if settings.qr_render_processes <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.qr_render_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def render_many(
+    specs: Iterable[RenderSpec],
+    return_exceptions: bool = False,
+) -> AsyncIterator[Union[bytes, Exception]]:
+    """
+    Yield renders for specs in order.
+
+    Cache hits are served directly; misses are rendered in the pool with at
+    most qr_render_max_in_flight renders outstanding, which bounds memory
+    regardless of the number of specs. With return_exceptions a failed
+    render is yielded as its exception instead of ending the iteration.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _render_pool()
+    window = max(1, settings.qr_render_max_in_flight)
+    # (key, cached bytes or None, render future or None), in input order
+    pending: deque = deque()
+
+    async def _complete(key: str, data: Optional[bytes], future: Optional[asyncio.Future]):
+        if data is None:
+            try:
+                data = await future
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+            await loop.run_in_executor(None, cache.put, key, data)
+        return data
+
+    for spec in specs:
+        key = spec.key
+        data = await loop.run_in_executor(None, cache.get, key)
+        future = None if data is not None else loop.run_in_executor(executor, render, spec)
+        pending.append((key, data, future))
+        if len(pending) >= window:
+            yield await _complete(*pending.popleft())
+    while pending:
+        yield await _complete(*pending.popleft())
+
+
+async def prerender(urls: Iterable[str], variants=PRERENDER_VARIANTS) -> int:
+    """Render the common variants of each URL into the cache; returns the number of images"""
+    specs = [RenderSpec(url, *variant) for url in urls for variant in variants]
+    count = 0
+    async for _ in render_many(specs):
+        count += 1
+    return count
+
+
+def schedule_prerender(urls: list[str]) -> None:
+    """Fire-and-forget prerender from a request handler"""
+    async def _run():
+        try:
+            count = await prerender(urls)
+            logger.info(f"Pre-rendered {count} QR images")
+        except Exception as e:
+            logger.error(f"QR pre-render failed: {e}")
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+ZIP_ERRORS_NAME = 'errors.txt'
+
+
+class _ZipSink:
+    """Write-only, non-seekable file for zipfile; written bytes are drained per entry"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(entries: list[tuple[str, RenderSpec]]) -> AsyncIterator[bytes]:
+    """
+    Stream a ZIP archive of rendered images, one chunk per file.
+
+    Images are stored without recompression: PNG data is already deflated.
+    Duplicate file names get a numeric suffix. The response is already under
+    way when a render fails, so the entry is skipped and listed in an
+    errors.txt member instead; the archive stays valid.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED)
+    names = _unique_names([name for name, _ in entries] + [ZIP_ERRORS_NAME])
+    errors = []
+    index = 0
+    async for data in render_many((spec for _, spec in entries), return_exceptions=True):
+        name = names[index]
+        index += 1
+        if isinstance(data, Exception):
+            logger.warning(f"QR export entry {name} failed: {data}")
+            errors.append(f"{name}: {data}")
+            continue
+        archive.writestr(name, data)
+        yield sink.drain()
+    if errors:
+        archive.writestr(names[-1], '\n'.join(errors) + '\n')
+    archive.close()
+    yield sink.drain()
+
+
+def _unique_names(names: list[str]) -> list[str]:
+    seen: dict[str, int] = {}
+    result = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            stem, dot, ext = name.rpartition('.')
+            name = f"{stem}-{count + 1}.{ext}" if dot else f"{name}-{count + 1}"
+        result.append(name)
+    return result
+
+
+def get_render_cache_stats() -> dict:
+    return cache.get_stats()
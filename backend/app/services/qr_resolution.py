@@ -0,0 +1,329 @@
+"""
+In-process resolution cache for the /q/{code} redirect hot path.
+
+Holds everything needed to pick a redirect target for a QR code without a
+database round trip:
+- legacy target (qr_codes.target_slug / organization slug)
+- default URL version
+- campaign windows (evaluated against the current time on every scan)
+- running A/B test with variant weights
+
+Resolution mirrors the get_active_qr_url() SQL function, including the
+ip_hash based variant assignment, so cached and uncached scans land on the
+same variant for the same visitor.
+
+Entries are invalidated explicitly by the qr_dynamic write functions. A TTL
+bounds staleness for writes handled by other worker processes.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from time import monotonic
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_async_connection
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+CACHE_TTL_SECONDS = settings.qr_resolution_cache_ttl_seconds
+CACHE_MAX_ENTRIES = settings.qr_resolution_cache_max_entries
+
+
+@dataclass
+class CachedCampaign:
+    id: str
+    url_version_id: str
+    target_url: str
+    status: str
+    starts_at: datetime
+    ends_at: datetime | None
+    priority: int
+
+
+@dataclass
+class CachedVariant:
+    id: str
+    url_version_id: str
+    target_url: str
+    weight: int
+
+
+@dataclass
+class CachedABTest:
+    id: str
+    starts_at: datetime | None
+    ends_at: datetime | None
+    variants: list[CachedVariant] = field(default_factory=list)
+
+
+@dataclass
+class QRResolution:
+    """Cached redirect configuration for one QR code."""
+    qr_code_id: str
+    organization_id: str
+    code: str
+    is_active: bool
+    legacy_slug: str
+    default_version_id: str | None = None
+    default_target_url: str | None = None
+    campaigns: list[CachedCampaign] = field(default_factory=list)
+    ab_test: CachedABTest | None = None
+
+
+@dataclass
+class ResolvedTarget:
+    """Outcome of resolving a scan against a QRResolution."""
+    target_url: str | None
+    url_version_id: str | None = None
+    campaign_id: str | None = None
+    ab_test_id: str | None = None
+    ab_variant_id: str | None = None
+
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, tuple[QRResolution, float]] = OrderedDict()
+_code_by_id: dict[str, str] = {}
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+# ============================================================
+# CACHE ACCESS
+# ============================================================
+
+async def get_resolution(code: str) -> QRResolution | None:
+    """
+    Return the cached resolution for a code, loading it on a miss.
+
+    Returns None if the code does not exist.
+    """
+    now = monotonic()
+    with _lock:
+        cached = _entries.get(code)
+        if cached and cached[1] > now:
+            _entries.move_to_end(code)
+            _stats['hits'] += 1
+            return cached[0]
+        _stats['misses'] += 1
+
+    resolution = await _load_resolution(code)
+    if resolution is None:
+        return None
+
+    with _lock:
+        _entries[code] = (resolution, now + CACHE_TTL_SECONDS)
+        _entries.move_to_end(code)
+        _code_by_id[resolution.qr_code_id] = code
+        while len(_entries) > CACHE_MAX_ENTRIES:
+            evicted_code, (evicted, _) = _entries.popitem(last=False)
+            _code_by_id.pop(evicted.qr_code_id, None)
+    return resolution
+
+
+def invalidate_qr_code(qr_code_id: str) -> None:
+    """Drop the cached resolution for a QR code (by id)."""
+    with _lock:
+        code = _code_by_id.pop(str(qr_code_id), None)
+        if code is not None:
+            _entries.pop(code, None)
+            _stats['invalidations'] += 1
+
+
+def clear() -> None:
+    """Drop every cached resolution."""
+    with _lock:
+        _entries.clear()
+        _code_by_id.clear()
+
+
+def get_cache_stats() -> dict:
+    """Return hit/miss counters and current size."""
+    with _lock:
+        return {**_stats, 'size': len(_entries)}
+
+
+# ============================================================
+# LOADING
+# ============================================================
+
+async def _load_resolution(code: str) -> QRResolution | None:
+    """Load the full redirect configuration for a code."""
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                SELECT qc.id, qc.organization_id, qc.code, qc.target_slug, qc.is_active,
+                       o.slug AS organization_slug
+                FROM qr_codes qc
+                JOIN organizations o ON o.id = qc.organization_id
+                WHERE qc.code = %s
+                ''',
+                (code,),
+            )
+            row = await cur.fetchone()
+            if not row:
+                return None
+
+            qr_code_id = row['id']
+            resolution = QRResolution(
+                qr_code_id=str(qr_code_id),
+                organization_id=str(row['organization_id']),
+                code=row['code'],
+                is_active=row['is_active'],
+                legacy_slug=row['target_slug'] or row['organization_slug'],
+            )
+
+            await cur.execute(
+                '''
+                SELECT id, target_url FROM qr_url_versions
+                WHERE qr_code_id = %s AND is_default = true AND archived_at IS NULL
+                LIMIT 1
+                ''',
+                (qr_code_id,),
+            )
+            default = await cur.fetchone()
+            if default:
+                resolution.default_version_id = str(default['id'])
+                resolution.default_target_url = default['target_url']
+
+            # Campaigns that may still become active; the time window is
+            # checked per scan so scheduled campaigns need no invalidation.
+            await cur.execute(
+                '''
+                SELECT c.id, c.url_version_id, c.status, c.starts_at, c.ends_at, c.priority,
+                       uv.target_url
+                FROM qr_campaigns c
+                JOIN qr_url_versions uv ON uv.id = c.url_version_id
+                WHERE c.qr_code_id = %s
+                  AND c.status IN ('scheduled', 'active')
+                  AND (c.ends_at IS NULL OR c.ends_at > NOW())
+                ORDER BY c.priority DESC, c.starts_at DESC
+                ''',
+                (qr_code_id,),
+            )
+            resolution.campaigns = [
+                CachedCampaign(
+                    id=str(c['id']),
+                    url_version_id=str(c['url_version_id']),
+                    target_url=c['target_url'],
+                    status=c['status'],
+                    starts_at=c['starts_at'],
+                    ends_at=c['ends_at'],
+                    priority=c['priority'],
+                )
+                for c in await cur.fetchall()
+            ]
+
+            await cur.execute(
+                '''
+                SELECT id, starts_at, ends_at FROM qr_ab_tests
+                WHERE qr_code_id = %s AND status = 'running'
+                LIMIT 1
+                ''',
+                (qr_code_id,),
+            )
+            test = await cur.fetchone()
+            if test:
+                await cur.execute(
+                    '''
+                    SELECT atv.id, atv.url_version_id, atv.weight, uv.target_url
+                    FROM qr_ab_test_variants atv
+                    JOIN qr_url_versions uv ON uv.id = atv.url_version_id
+                    WHERE atv.ab_test_id = %s
+                    ORDER BY atv.weight DESC
+                    ''',
+                    (test['id'],),
+                )
+                resolution.ab_test = CachedABTest(
+                    id=str(test['id']),
+                    starts_at=test['starts_at'],
+                    ends_at=test['ends_at'],
+                    variants=[
+                        CachedVariant(
+                            id=str(v['id']),
+                            url_version_id=str(v['url_version_id']),
+                            target_url=v['target_url'],
+                            weight=v['weight'],
+                        )
+                        for v in await cur.fetchall()
+                    ],
+                )
+
+            return resolution
+
+
+# ============================================================
+# RESOLUTION
+# ============================================================
+
+def ab_bucket(visitor_hash: str | None) -> int:
+    """
+    Map a visitor to a 0-99 bucket.
+
+    Same rule as get_active_qr_url(): the first 8 hex digits of the hash read
+    as a signed 32-bit integer, absolute value, modulo 100.
+    """
+    if visitor_hash is None:
+        return random.randrange(100)
+    value = int(visitor_hash[:8], 16)
+    if value >= 2 ** 31:
+        value -= 2 ** 32
+    return abs(value) % 100
+
+
+def resolve(resolution: QRResolution, visitor_hash: str | None, now: datetime | None = None) -> ResolvedTarget:
+    """
+    Pick the redirect target for a scan.
+
+    Priority order:
+    1. Running A/B test (with traffic splitting)
+    2. Active campaign (highest priority wins)
+    3. Default URL version
+    4. No dynamic target (caller falls back to legacy behavior)
+    """
+    now = now or datetime.now(timezone.utc)
+
+    test = resolution.ab_test
+    if (
+        test is not None
+        and test.starts_at is not None
+        and test.starts_at <= now
+        and (test.ends_at is None or test.ends_at > now)
+    ):
+        bucket = ab_bucket(visitor_hash)
+        cumulative = 0
+        for variant in test.variants:
+            cumulative += variant.weight
+            if bucket < cumulative:
+                return ResolvedTarget(
+                    target_url=variant.target_url,
+                    url_version_id=variant.url_version_id,
+                    ab_test_id=test.id,
+                    ab_variant_id=variant.id,
+                )
+
+    # Campaigns are kept sorted by (priority DESC, starts_at DESC)
+    for campaign in resolution.campaigns:
+        if campaign.starts_at <= now and (campaign.ends_at is None or campaign.ends_at > now):
+            return ResolvedTarget(
+                target_url=campaign.target_url,
+                url_version_id=campaign.url_version_id,
+                campaign_id=campaign.id,
+            )
+
+    if resolution.default_version_id is not None:
+        return ResolvedTarget(
+            target_url=resolution.default_target_url,
+            url_version_id=resolution.default_version_id,
+        )
+
+    return ResolvedTarget(target_url=None)
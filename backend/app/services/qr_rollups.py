@@ -0,0 +1,208 @@
+"""
+Pre-aggregated QR scan counts.
+
+qr_events are folded into qr_scan_rollups_hourly / qr_scan_rollups_daily by
+roll_up_scans() (scheduler job), keyed by QR code, UTC bucket and the scan
+dimensions. The watermark in qr_scan_rollup_state is the last rolled-up
+qr_events.id and is advanced in the same transaction as the rollups.
+
+scan_aggregate() answers analytics queries exactly from:
+- daily rollups for whole days inside the window
+- hourly rollups for whole hours before the first whole day
+- raw qr_events for the partial first hour and everything after the
+  watermark (the unrolled tail)
+so its cost depends on the number of buckets, not on scan volume.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WATERMARK_NAME = 'qr_events'
+DIMENSIONS = ('country', 'city', 'utm_source', 'utm_medium', 'utm_campaign', 'ab_variant_id')
+
+_ROLLUP_SQL = '''
+    INSERT INTO {table} (
+        qr_code_id, organization_id, bucket, country, city,
+        utm_source, utm_medium, utm_campaign, ab_variant_id,
+        scans, first_scan_at, last_scan_at
+    )
+    SELECT
+        qe.qr_code_id, qc.organization_id, date_trunc(%(grain)s, qe.occurred_at, 'UTC'),
+        qe.country, qe.city, qe.utm_source, qe.utm_medium, qe.utm_campaign, qe.ab_variant_id,
+        COUNT(*), MIN(qe.occurred_at), MAX(qe.occurred_at)
+    FROM qr_events qe
+    JOIN qr_codes qc ON qc.id = qe.qr_code_id
+    WHERE qe.id > %(after)s AND qe.id <= %(upto)s
+    GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9
+    ON CONFLICT ON CONSTRAINT {table}_key DO UPDATE
+    SET scans = {table}.scans + EXCLUDED.scans,
+        first_scan_at = LEAST({table}.first_scan_at, EXCLUDED.first_scan_at),
+        last_scan_at = GREATEST({table}.last_scan_at, EXCLUDED.last_scan_at)
+'''
+
+
+def _committed_max_event_id(conn) -> int:
+    """
+    Highest qr_events.id that no in-flight transaction can undercut.
+
+    A SHARE lock waits for open INSERTs (ROW EXCLUSIVE) to finish, so every
+    id drawn so far is committed or gone once it is granted; it is released
+    immediately.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        cur.execute('LOCK TABLE qr_events IN SHARE MODE')
+        cur.execute('SELECT COALESCE(MAX(id), 0) FROM qr_events')
+        max_id = cur.fetchone()[0]
+    conn.commit()
+    return max_id
+
+
+def roll_up_scans(max_events: Optional[int] = None) -> dict:
+    """
+    Fold qr_events after the watermark into the rollup tables.
+
+    Processes at most max_events ids per call; returns the id range rolled
+    up and whether the tail is fully caught up.
+    """
+    max_events = max_events or settings.qr_rollup_max_events_per_run
+    with get_connection() as conn:
+        max_id = _committed_max_event_id(conn)
+        with conn.cursor(row_factory=dict_row) as cur:
+            # Row lock serializes concurrent rollup runs
+            cur.execute(
+                'SELECT last_event_id FROM qr_scan_rollup_state WHERE name = %s FOR UPDATE',
+                (WATERMARK_NAME,),
+            )
+            row = cur.fetchone()
+            after = row['last_event_id'] if row else 0
+            upto = min(max_id, after + max_events)
+            if upto <= after:
+                conn.rollback()
+                return {'from_id': after, 'to_id': after, 'caught_up': True}
+
+            params = {'after': after, 'upto': upto}
+            cur.execute(_ROLLUP_SQL.format(table='qr_scan_rollups_hourly'), {**params, 'grain': 'hour'})
+            cur.execute(_ROLLUP_SQL.format(table='qr_scan_rollups_daily'), {**params, 'grain': 'day'})
+            cur.execute(
+                '''
+                INSERT INTO qr_scan_rollup_state (name, last_event_id, updated_at)
+                VALUES (%s, %s, now())
+                ON CONFLICT (name) DO UPDATE
+                SET last_event_id = EXCLUDED.last_event_id, updated_at = now()
+                ''',
+                (WATERMARK_NAME, upto),
+            )
+        conn.commit()
+    return {'from_id': after, 'to_id': upto, 'caught_up': upto >= max_id}
+
+
+def _ceil(ts: datetime, unit: str) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    floored = ts.replace(minute=0, second=0, microsecond=0)
+    step = timedelta(hours=1)
+    if unit == 'day':
+        floored = floored.replace(hour=0)
+        step = timedelta(days=1)
+    return floored if floored == ts else floored + step
+
+
+def scan_aggregate(
+    cur,
+    *,
+    organization_id: Optional[str] = None,
+    qr_code_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    group_by: Iterable[str] = (),
+    by_day: bool = False,
+    where: Optional[str] = None,
+    order_by: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> list[dict]:
+    """
+    Scan counts for one QR code or a whole organization.
+
+    Rows carry the group_by dimensions (and `day` when by_day), `count`,
+    `first_scan` and `last_scan`. `where` filters on dimension columns,
+    e.g. 'country IS NOT NULL'. Without group_by/by_day one row is returned.
+    """
+    columns = list(group_by)
+    unknown = set(columns) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f'Unknown scan dimensions: {sorted(unknown)}')
+    if (qr_code_id is None) == (organization_id is None):
+        raise ValueError('Pass exactly one of qr_code_id or organization_id')
+
+    params: dict = {'scope': qr_code_id or organization_id}
+    rollup_scope = 'qr_code_id = %(scope)s' if qr_code_id else 'organization_id = %(scope)s'
+    raw_scope = (
+        'qe.qr_code_id = %(scope)s' if qr_code_id
+        else 'qe.qr_code_id IN (SELECT id FROM qr_codes WHERE organization_id = %(scope)s)'
+    )
+
+    if since is None:
+        daily_cond, hourly_cond = 'TRUE', 'FALSE'
+        raw_cond = 'qe.id > (SELECT id FROM wm)'
+    else:
+        params.update(since=since, hour_start=_ceil(since, 'hour'), day_start=_ceil(since, 'day'))
+        daily_cond = 'bucket >= %(day_start)s'
+        hourly_cond = 'bucket >= %(hour_start)s AND bucket < %(day_start)s'
+        raw_cond = (
+            'qe.occurred_at >= %(since)s'
+            ' AND (qe.id > (SELECT id FROM wm) OR qe.occurred_at < %(hour_start)s)'
+        )
+
+    rollup_select = ', '.join(
+        columns
+        + (["date_trunc('day', bucket, 'UTC') AS day"] if by_day else [])
+        + ['scans', 'first_scan_at', 'last_scan_at']
+    )
+    raw_select = ', '.join(
+        [f'qe.{c}' for c in columns]
+        + (["date_trunc('day', qe.occurred_at, 'UTC') AS day"] if by_day else [])
+        + ['1 AS scans', 'qe.occurred_at AS first_scan_at', 'qe.occurred_at AS last_scan_at']
+    )
+    keys = columns + (['day'] if by_day else [])
+    outer_select = ', '.join(
+        keys + ['COALESCE(SUM(scans), 0)::bigint AS count', 'MIN(first_scan_at) AS first_scan',
+                'MAX(last_scan_at) AS last_scan']
+    )
+
+    query = f'''
+        WITH wm AS (
+            SELECT COALESCE(
+                (SELECT last_event_id FROM qr_scan_rollup_state WHERE name = '{WATERMARK_NAME}'), 0
+            ) AS id
+        )
+        SELECT {outer_select}
+        FROM (
+            SELECT {rollup_select} FROM qr_scan_rollups_daily
+            WHERE {rollup_scope} AND {daily_cond}
+            UNION ALL
+            SELECT {rollup_select} FROM qr_scan_rollups_hourly
+            WHERE {rollup_scope} AND {hourly_cond}
+            UNION ALL
+            SELECT {raw_select} FROM qr_events qe
+            WHERE {raw_scope} AND {raw_cond}
+        ) scans
+        WHERE ({where or 'TRUE'})
+    '''
+    if keys:
+        query += f" GROUP BY {', '.join(keys)}"
+    if order_by:
+        query += f' ORDER BY {order_by}'
+    if limit:
+        query += f' LIMIT {int(limit)}'
+
+    cur.execute(query, params)
+    return cur.fetchall()
@@ -0,0 +1,320 @@
+"""
+In-memory spatial index over authorized distribution regions.
+
+check_scan_in_authorized_region() loops over every authorized_regions row of
+an organization for each scan. This module loads the rows once per
+organization and answers the same question from memory:
+- a uniform lat/lng grid of the circles for "which regions contain this point"
+- a 2-d tree of region centers for the nearest region when none contains it
+
+As in the SQL function, only the scan coordinates decide whether it is
+authorized; the geo-IP region code of the scan is not consulted.
+
+Distances use the same flat approximation as the SQL function, so results
+match it exactly. Indexes are cached per organization for
+geo_region_index_ttl_seconds and dropped immediately when regions of the
+organization are changed through geographic_anomaly.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_connection
+
+settings = get_settings()
+
+KM_PER_DEGREE = 111.0
+CELL_DEGREES = 1.0
+# Circles covering more grid cells than this are checked linearly instead
+MAX_CELLS_PER_REGION = 4096
+# Above this latitude a circle may span every longitude
+POLAR_LATITUDE = 89.0
+# Reported by the SQL function when no region has coordinates
+UNMEASURED_DISTANCE_KM = 999999
+
+
+def planar_distance_km(lat: float, lng: float, center_lat: float, center_lng: float) -> float:
+    """Distance as computed by check_scan_in_authorized_region()"""
+    return KM_PER_DEGREE * math.sqrt(
+        (center_lat - lat) ** 2 + ((center_lng - lng) * math.cos(math.radians(lat))) ** 2
+    )
+
+
+def severity_for(distance_km: float) -> str:
+    if distance_km < 50:
+        return 'low'
+    if distance_km < 200:
+        return 'medium'
+    if distance_km < 500:
+        return 'high'
+    return 'critical'
+
+
+def _to_int(distance_km: float) -> int:
+    # numeric::INTEGER rounds half away from zero
+    return int(distance_km + 0.5)
+
+
+@dataclass(frozen=True)
+class Region:
+    code: str
+    name: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    radius_km: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> 'Region':
+        def _float(value):
+            return float(value) if value is not None else None
+        return cls(
+            code=row['region_code'],
+            name=row['region_name'],
+            lat=_float(row.get('center_lat')),
+            lng=_float(row.get('center_lng')),
+            radius_km=_float(row.get('radius_km')),
+        )
+
+    @property
+    def located(self) -> bool:
+        return self.lat is not None and self.lng is not None
+
+
+def _cell(value: float) -> int:
+    return math.floor(value / CELL_DEGREES)
+
+
+class RegionIndex:
+    """Authorized regions that apply to one (organization, product) pair"""
+
+    def __init__(self, regions: Iterable[Region]):
+        self.regions = list(regions)
+        self._cover: dict[tuple[int, int], list[Region]] = {}
+        self._large: list[Region] = []
+
+        located = []
+        for region in self.regions:
+            if not region.located:
+                continue
+            located.append(region)
+            if region.radius_km is not None and region.radius_km >= 0:
+                self._add_circle(region)
+        self._centers = _build_tree(located, 0)
+
+    def _add_circle(self, region: Region) -> None:
+        """Register the circle in every cell a containing scan can fall into"""
+        lat_reach = region.radius_km / KM_PER_DEGREE
+        lat_lo, lat_hi = region.lat - lat_reach, region.lat + lat_reach
+        # Longitudes are scaled by the scan latitude, widest at the polar edge
+        widest = max(abs(lat_lo), abs(lat_hi))
+        if widest >= POLAR_LATITUDE:
+            lng_lo, lng_hi = -180.0, 180.0
+        else:
+            lng_reach = lat_reach / math.cos(math.radians(widest))
+            lng_lo, lng_hi = region.lng - lng_reach, region.lng + lng_reach
+
+        rows = range(_cell(lat_lo), _cell(lat_hi) + 1)
+        cols = range(_cell(lng_lo), _cell(lng_hi) + 1)
+        if len(rows) * len(cols) > MAX_CELLS_PER_REGION:
+            self._large.append(region)
+            return
+        for i in rows:
+            for j in cols:
+                self._cover.setdefault((i, j), []).append(region)
+
+    def _containing(self, lat: float, lng: float) -> Optional[tuple[Region, float]]:
+        best = None
+        candidates = self._cover.get((_cell(lat), _cell(lng)), [])
+        for region in (*candidates, *self._large):
+            distance = planar_distance_km(lat, lng, region.lat, region.lng)
+            if distance <= region.radius_km and (best is None or distance < best[1]):
+                best = (region, distance)
+        return best
+
+    def _nearest(self, lat: float, lng: float) -> Optional[tuple[Region, float]]:
+        """Nearest center, skipping subtrees whose bounding box is already further"""
+        # The scan latitude scales every longitude difference by the same factor
+        lng_scale = math.cos(math.radians(lat))
+
+        def _box_distance(node: _Node) -> float:
+            min_lat, max_lat, min_lng, max_lng = node[3]
+            d_lat = max(min_lat - lat, 0.0, lat - max_lat)
+            d_lng = max(min_lng - lng, 0.0, lng - max_lng) * lng_scale
+            return KM_PER_DEGREE * math.sqrt(d_lat * d_lat + d_lng * d_lng)
+
+        best: Optional[tuple[Region, float]] = None
+        stack = [(self._centers, 0.0)] if self._centers else []
+        while stack:
+            node, bound = stack.pop()
+            if best is not None and bound >= best[1]:
+                continue
+            region, below, above, _ = node
+            distance = planar_distance_km(lat, lng, region.lat, region.lng)
+            if best is None or distance < best[1]:
+                best = (region, distance)
+            children = [(child, _box_distance(child)) for child in (below, above) if child]
+            # Popped last: the closer side is searched first
+            children.sort(key=lambda item: item[1], reverse=True)
+            stack.extend(children)
+        return best
+
+    def check(self, lat: float, lng: float) -> dict:
+        """Same result shape as check_scan_in_authorized_region()"""
+        if not self.regions:
+            return {
+                'is_authorized': True,
+                'nearest_region_code': 'NONE_DEFINED',
+                'nearest_region_name': 'No regions defined',
+                'distance_km': 0,
+                'severity': 'none',
+            }
+
+        inside = self._containing(lat, lng)
+        if inside is not None:
+            region, distance = inside
+            return {
+                'is_authorized': True,
+                'nearest_region_code': region.code,
+                'nearest_region_name': region.name,
+                'distance_km': _to_int(distance),
+                'severity': 'none',
+            }
+
+        nearest = self._nearest(lat, lng)
+        if nearest is None:
+            # Only regions without coordinates: nothing to measure against
+            return {
+                'is_authorized': False,
+                'nearest_region_code': None,
+                'nearest_region_name': None,
+                'distance_km': UNMEASURED_DISTANCE_KM,
+                'severity': severity_for(UNMEASURED_DISTANCE_KM),
+            }
+        region, distance = nearest
+        return {
+            'is_authorized': False,
+            'nearest_region_code': region.code,
+            'nearest_region_name': region.name,
+            'distance_km': _to_int(distance),
+            'severity': severity_for(distance),
+        }
+
+
+# (region, below, above, (min_lat, max_lat, min_lng, max_lng) of the subtree)
+_Node = tuple
+
+
+def _build_tree(regions: list[Region], axis: int) -> Optional[_Node]:
+    """2-d tree split on the median, alternating latitude and longitude"""
+    if not regions:
+        return None
+    regions = sorted(regions, key=(lambda r: r.lat) if axis == 0 else (lambda r: r.lng))
+    middle = len(regions) // 2
+    lats = [r.lat for r in regions]
+    box = (
+        lats[0] if axis == 0 else min(lats),
+        lats[-1] if axis == 0 else max(lats),
+        regions[0].lng if axis == 1 else min(r.lng for r in regions),
+        regions[-1].lng if axis == 1 else max(r.lng for r in regions),
+    )
+    return (
+        regions[middle],
+        _build_tree(regions[:middle], 1 - axis),
+        _build_tree(regions[middle + 1:], 1 - axis),
+        box,
+    )
+
+
+@dataclass
+class _OrganizationRegions:
+    loaded_at: float
+    rows: list[tuple[Optional[str], Region]]
+    indexes: dict[Optional[str], RegionIndex]
+
+
+class RegionIndexCache:
+    """Per-organization region indexes with TTL and explicit invalidation"""
+
+    def __init__(self, ttl_seconds: float, max_organizations: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_organizations = max_organizations
+        self._lock = threading.Lock()
+        self._organizations: OrderedDict[str, _OrganizationRegions] = OrderedDict()
+        self._stats = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    def _load(self, organization_id: str) -> list[tuple[Optional[str], Region]]:
+        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                '''
+                SELECT product_id::text, region_code, region_name,
+                       center_lat, center_lng, radius_km
+                FROM public.authorized_regions
+                WHERE organization_id = %s
+                ''',
+                (organization_id,)
+            )
+            return [(row['product_id'], Region.from_row(row)) for row in cur.fetchall()]
+
+    def get(self, organization_id: str, product_id: Optional[str] = None) -> RegionIndex:
+        with self._lock:
+            entry = self._organizations.get(organization_id)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+                self._organizations.move_to_end(organization_id)
+                self._stats['hits'] += 1
+            else:
+                entry = None
+
+        if entry is None:
+            loaded_at = time.monotonic()
+            entry = _OrganizationRegions(loaded_at, self._load(organization_id), {})
+            with self._lock:
+                self._stats['loads'] += 1
+                self._organizations[organization_id] = entry
+                self._organizations.move_to_end(organization_id)
+                while len(self._organizations) > self.max_organizations:
+                    self._organizations.popitem(last=False)
+
+        index = entry.indexes.get(product_id)
+        if index is None:
+            # Product-specific regions plus organization-wide ones
+            index = RegionIndex(
+                region for owner, region in entry.rows if owner is None or owner == product_id
+            )
+            entry.indexes[product_id] = index
+        return index
+
+    def check(
+        self,
+        organization_id: str,
+        product_id: Optional[str],
+        lat: float,
+        lng: float,
+    ) -> dict:
+        return self.get(organization_id, product_id).check(lat, lng)
+
+    def invalidate(self, organization_id: str) -> None:
+        with self._lock:
+            if self._organizations.pop(organization_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'organizations': len(self._organizations)}
+
+
+region_indexes = RegionIndexCache(
+    ttl_seconds=settings.geo_region_index_ttl_seconds,
+    max_organizations=settings.geo_region_index_max_organizations,
+)
+
+
+def get_region_index_stats() -> dict:
+    return region_indexes.get_stats()
@@ -4,7 +4,10 @@ from uuid import UUID
 
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, invalidate_tags, organization_tag
+from app.core.config import get_settings
 from app.core.db import get_connection
+from app.core.pagination import decode_cursor, keyset_condition, keyset_order, page_rows
 from app.schemas.reviews import (
     Review,
     ReviewCreate,
@@ -17,6 +20,16 @@ from app.schemas.notifications import NotificationEmitRequest
 from app.services.organization_profiles import _require_role
 from app.services.notifications import emit_notification_in_transaction
 
+settings = get_settings()
+
+# Сортировки публичного списка: столбцы ключа, по убыванию, id последним
+PUBLIC_REVIEW_ORDERINGS = {
+    'newest': ('created_at', 'id'),
+    'highest_rating': ('rating', 'created_at', 'id'),
+}
+
+_public_review_totals = TTLCache('public_review_totals', settings.pagination_totals_ttl_seconds)
+
 
 def _serialize_media(media: Any) -> list[Dict[str, Any]]:
     """Сериализует media из БД в список словарей."""
@@ -292,6 +305,7 @@ def moderate_review(
             )
             row = cur.fetchone()
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
 
             return Review(
                 id=str(row['id']),
@@ -379,13 +393,98 @@ def respond_to_review(
             )
 
 
+def _public_review_totals_for(cur, organization_id, product_id) -> tuple[int, float | None]:
+    """Количество и средний рейтинг; кэшируются до изменения отзывов организации."""
+    cache_key = f'{organization_id}:{product_id or ""}'
+    cached = _public_review_totals.get(cache_key)
+    if cached is not None:
+        return cached
+
+    count_query = '''
+        SELECT COUNT(*) as total, AVG(rating)::numeric(3,2) as avg_rating
+        FROM reviews
+        WHERE organization_id = %s AND status = 'approved'
+    '''
+    count_params = [organization_id]
+    if product_id:
+        count_query += ' AND product_id = %s'
+        count_params.append(product_id)
+
+    cur.execute(count_query, count_params)
+    count_row = cur.fetchone()
+    totals = (
+        count_row['total'] or 0,
+        float(count_row['avg_rating']) if count_row['avg_rating'] else None,
+    )
+    _public_review_totals.set(cache_key, totals, tags=[organization_tag(organization_id)])
+    return totals
+
+
+def _public_reviews_page(
+    cur,
+    organization_id,
+    product_id,
+    limit: int,
+    offset: int,
+    order: str,
+    cursor: str | None,
+) -> tuple[list[PublicReview], int, float | None, str | None]:
+    """Страница опубликованных отзывов: по курсору (keyset) или по offset."""
+    columns = PUBLIC_REVIEW_ORDERINGS.get(order, PUBLIC_REVIEW_ORDERINGS['newest'])
+    ordering = f'reviews:{order}'
+    total, avg_rating = _public_review_totals_for(cur, organization_id, product_id)
+
+    query = '''
+        SELECT id, product_id, author_user_id, rating, title, body, media,
+               response, response_at, created_at
+        FROM reviews
+        WHERE organization_id = %s AND status = 'approved'
+    '''
+    params: list[Any] = [organization_id]
+
+    if product_id:
+        query += ' AND product_id = %s'
+        params.append(product_id)
+
+    if cursor:
+        query += f' AND {keyset_condition(columns)}'
+        params.extend(decode_cursor(cursor, ordering, len(columns)))
+        offset = 0
+
+    query += f' ORDER BY {keyset_order(columns)} LIMIT %s OFFSET %s'
+    params.extend([limit + 1, offset])
+
+    cur.execute(query, params)
+    rows, next_cursor = page_rows(
+        cur.fetchall(), limit, ordering, lambda row: [row[column] for column in columns],
+    )
+
+    reviews = []
+    for row in rows:
+        reviews.append(PublicReview(
+            id=str(row['id']),
+            product_id=str(row['product_id']) if row['product_id'] else None,
+            author_user_id=str(row['author_user_id']),
+            rating=row['rating'],
+            title=row['title'],
+            body=row['body'],
+            media=_serialize_media(row['media']),
+            response=row.get('response'),
+            response_at=row.get('response_at'),
+            created_at=row['created_at'],
+        ))
+
+    return reviews, total, avg_rating, next_cursor
+
+
 def list_public_organization_reviews_by_id(
     organization_id: str,
     product_id: str | None = None,
     limit: int = 20,
     offset: int = 0,
     order: str = 'newest',
-) -> tuple[list[PublicReview], int, float | None]:
+    cursor: str | None = None,
+) -> tuple[list[PublicReview], int, float | None, str | None]:
     """Список опубликованных отзывов организации по ID (публичный API)."""
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
@@ -399,66 +498,9 @@ def list_public_organization_reviews_by_id(
             )
             org = cur.fetchone()
             if not org:
-                return [], 0, None
-
-            # Подсчет и средний рейтинг
-            count_query = '''
-                SELECT COUNT(*) as total, AVG(rating)::numeric(3,2) as avg_rating
-                FROM reviews
-                WHERE organization_id = %s AND status = 'approved'
-            '''
-            count_params = [organization_id]
-
-            if product_id:
-                count_query += ' AND product_id = %s'
-                count_params.append(product_id)
-
-            cur.execute(count_query, count_params)
-            count_row = cur.fetchone()
-            total = count_row['total'] or 0
-            avg_rating = float(count_row['avg_rating']) if count_row['avg_rating'] else None
-
-            # Получение отзывов
-            query = '''
-                SELECT id, product_id, author_user_id, rating, title, body, media, 
-                       response, response_at, created_at
-                FROM reviews
-                WHERE organization_id = %s AND status = 'approved'
-            '''
-            params = [organization_id]
-
-            if product_id:
-                query += ' AND product_id = %s'
-                params.append(product_id)
-
-            # Сортировка
-            if order == 'highest_rating':
-                query += ' ORDER BY rating DESC, created_at DESC'
-            else:  # newest
-                query += ' ORDER BY created_at DESC'
+                return [], 0, None, None
 
-            query += ' LIMIT %s OFFSET %s'
-            params.extend([limit, offset])
-
-            cur.execute(query, params)
-            rows = cur.fetchall()
-
-            reviews = []
-            for row in rows:
-                reviews.append(PublicReview(
-                    id=str(row['id']),
-                    product_id=str(row['product_id']) if row['product_id'] else None,
-                    author_user_id=str(row['author_user_id']),
-                    rating=row['rating'],
-                    title=row['title'],
-                    body=row['body'],
-                    media=_serialize_media(row['media']),
-                    response=row.get('response'),
-                    response_at=row.get('response_at'),
-                    created_at=row['created_at'],
-                ))
-
-            return reviews, total, avg_rating
+            return _public_reviews_page(cur, org['id'], product_id, limit, offset, order, cursor)
 
 
 def delete_review(
@@ -514,6 +556,7 @@ def delete_review(
                 (review_id, organization_id),
             )
             conn.commit()
+            invalidate_tags(organization_tag(organization_id))
 
             return True
 
@@ -524,7 +567,8 @@ def list_public_organization_reviews(
     limit: int = 20,
     offset: int = 0,
     order: str = 'newest',
-) -> tuple[list[PublicReview], int, float | None]:
+    cursor: str | None = None,
+) -> tuple[list[PublicReview], int, float | None, str | None]:
     """Список опубликованных отзывов организации (публичный API)."""
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
@@ -538,7 +582,7 @@ def list_public_organization_reviews(
             )
             org = cur.fetchone()
             if not org:
-                return [], 0, None
+                return [], 0, None, None
 
             organization_id = org['id']
             product_id = None
@@ -549,68 +593,10 @@ def list_public_organization_reviews(
                     (product_slug, organization_id),
                 )
                 product = cur.fetchone()
-                if product:
-                    product_id = product['id']
-
-            # Подсчет и средний рейтинг
-            count_query = '''
-                SELECT COUNT(*) as total, AVG(rating)::numeric(3,2) as avg_rating
-                FROM reviews
-                WHERE organization_id = %s AND status = 'approved'
-            '''
-            count_params = [organization_id]
-
-            if product_id:
-                count_query += ' AND product_id = %s'
-                count_params.append(product_id)
-            elif product_slug:
-                # Если product_slug указан, но товар не найден, возвращаем пустой список
-                return [], 0, None
-
-            cur.execute(count_query, count_params)
-            count_row = cur.fetchone()
-            total = count_row['total'] or 0
-            avg_rating = float(count_row['avg_rating']) if count_row['avg_rating'] else None
-
-            # Получение отзывов
-            query = '''
-                SELECT id, product_id, author_user_id, rating, title, body, media, 
-                       response, response_at, created_at
-                FROM reviews
-                WHERE organization_id = %s AND status = 'approved'
-            '''
-            params = [organization_id]
-
-            if product_id:
-                query += ' AND product_id = %s'
-                params.append(product_id)
-
-            # Сортировка
-            if order == 'highest_rating':
-                query += ' ORDER BY rating DESC, created_at DESC'
-            else:  # newest
-                query += ' ORDER BY created_at DESC'
-
-            query += ' LIMIT %s OFFSET %s'
-            params.extend([limit, offset])
-
-            cur.execute(query, params)
-            rows = cur.fetchall()
-
-            reviews = []
-            for row in rows:
-                reviews.append(PublicReview(
-                    id=str(row['id']),
-                    product_id=str(row['product_id']) if row['product_id'] else None,
-                    author_user_id=str(row['author_user_id']),
-                    rating=row['rating'],
-                    title=row['title'],
-                    body=row['body'],
-                    media=_serialize_media(row['media']),
-                    response=row.get('response'),
-                    response_at=row.get('response_at'),
-                    created_at=row['created_at'],
-                ))
+                if not product:
+                    # Если product_slug указан, но товар не найден, возвращаем пустой список
+                    return [], 0, None, None
+                product_id = product['id']
 
-            return reviews, total, avg_rating
+            return _public_reviews_page(cur, organization_id, product_id, limit, offset, order, cursor)
 
@@ -0,0 +1,383 @@
+"""
+Batched scan-event ingestion for qr_events.
+
+The /q/{code} redirect only enqueues a ScanEvent; a background flusher
+started from the FastAPI lifespan writes queued events with one multi-row
+INSERT every SCAN_INGEST_FLUSH_INTERVAL_MS or as soon as
+SCAN_INGEST_BATCH_SIZE events are waiting.
+
+Country/city are resolved per batch from the client IP (utils.geoip batch
+lookup) just before writing; the raw IP is never stored.
+
+A/B variant click counters are aggregated per batch and applied as deltas
+in the same transaction (migration 0121 drops the per-row trigger that
+used to maintain them).
+
+Backpressure:
+- The queue is bounded by scan_ingest_max_queue.
+- When it is full, or the flusher is not running (scripts, tests), the
+  event is written inline by the caller instead of being dropped.
+
+Failed batches:
+- Rows the database rejects (data or integrity errors, e.g. an FK to a
+  deleted campaign) are isolated by bisecting the batch; the offending
+  event is logged and dropped so it cannot block the queue.
+- Other errors (connection loss) put the unwritten events back at the head
+  of the queue; an event is logged and dropped after
+  scan_ingest_max_attempts failed flushes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from psycopg import DataError, IntegrityError
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_async_connection
+from app.utils.geoip import lookup_ips
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_EVENT_COLUMNS = (
+    'qr_code_id', 'occurred_at', 'ip_hash', 'user_agent', 'referer', 'raw_query',
+    'country', 'city', 'utm_source', 'utm_medium', 'utm_campaign',
+    'url_version_id', 'campaign_id', 'ab_test_id', 'ab_variant_id',
+)
+
+
+@dataclass
+class ScanEvent:
+    """A single QR scan waiting to be written to qr_events."""
+    qr_code_id: str
+    organization_id: str
+    ip_hash: str | None = None
+    user_agent: str | None = None
+    referer: str | None = None
+    raw_query: str | None = None
+    country: str | None = None
+    city: str | None = None
+    utm_source: str | None = None
+    utm_medium: str | None = None
+    utm_campaign: str | None = None
+    url_version_id: str | None = None
+    campaign_id: str | None = None
+    ab_test_id: str | None = None
+    ab_variant_id: str | None = None
+    occurred_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    # Only used for the geo lookup at write time, not written to qr_events
+    client_ip: str | None = field(default=None, repr=False)
+    # Failed flushes so far, not written to qr_events
+    attempts: int = field(default=0, repr=False)
+
+    def as_row(self) -> tuple:
+        return tuple(getattr(self, column) for column in _EVENT_COLUMNS)
+
+
+# ============================================================
+# WRITING
+# ============================================================
+
+def _resolve_geo(events: list[ScanEvent]) -> None:
+    """Fill country/city from client IPs with one batch lookup, then drop the IPs."""
+    pending = [e for e in events if e.client_ip and e.country is None and e.city is None]
+    if pending:
+        locations = lookup_ips([e.client_ip for e in pending])
+        for event in pending:
+            location = locations[event.client_ip]
+            event.country, event.city = location.country, location.city
+    for event in events:
+        event.client_ip = None
+
+
+async def write_events(events: list[ScanEvent]) -> list[dict]:
+    """
+    Write a batch of scan events and apply A/B variant counter deltas.
+
+    Returns the inserted rows (id, qr_code_id, country, city).
+    """
+    if not events:
+        return []
+
+    if any(e.client_ip for e in events):
+        await run_in_threadpool(_resolve_geo, events)
+
+    placeholders = '(' + ', '.join(['%s'] * len(_EVENT_COLUMNS)) + ')'
+    values_sql = ', '.join([placeholders] * len(events))
+    params = [value for event in events for value in event.as_row()]
+
+    click_deltas = Counter(e.ab_variant_id for e in events if e.ab_variant_id)
+    visitor_pairs = {(e.ab_variant_id, e.ip_hash) for e in events if e.ab_variant_id and e.ip_hash}
+
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            # New unique visitors must be counted before the batch is inserted
+            unique_deltas: dict[str, int] = {}
+            if visitor_pairs:
+                variant_ids, ip_hashes = zip(*visitor_pairs)
+                await cur.execute(
+                    '''
+                    SELECT b.variant_id, COUNT(*) AS new_visitors
+                    FROM unnest(%s::uuid[], %s::text[]) AS b(variant_id, ip_hash)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM qr_events e
+                        WHERE e.ab_variant_id = b.variant_id AND e.ip_hash = b.ip_hash
+                    )
+                    GROUP BY b.variant_id
+                    ''',
+                    (list(variant_ids), list(ip_hashes)),
+                )
+                unique_deltas = {str(r['variant_id']): r['new_visitors'] for r in await cur.fetchall()}
+
+            await cur.execute(
+                f'''
+                INSERT INTO qr_events ({', '.join(_EVENT_COLUMNS)})
+                VALUES {values_sql}
+                RETURNING id, qr_code_id, country, city
+                ''',
+                params,
+            )
+            inserted = await cur.fetchall()
+
+            if click_deltas:
+                variant_ids = list(click_deltas.keys())
+                await cur.execute(
+                    '''
+                    UPDATE qr_ab_test_variants v
+                    SET total_clicks = v.total_clicks + d.clicks,
+                        unique_visitors = v.unique_visitors + d.visitors
+                    FROM unnest(%s::uuid[], %s::int[], %s::int[]) AS d(id, clicks, visitors)
+                    WHERE v.id = d.id
+                    ''',
+                    (
+                        variant_ids,
+                        [click_deltas[v] for v in variant_ids],
+                        [unique_deltas.get(v, 0) for v in variant_ids],
+                    ),
+                )
+            await conn.commit()
+            return inserted
+
+
+def _notify_scans(events: list[ScanEvent], inserted: list[dict]) -> None:
+    """Dispatch real-time scan notifications for a written batch."""
+    from app.services import scan_notifications
+
+    org_by_qr = {e.qr_code_id: e.organization_id for e in events}
+    enabled: dict[str, bool] = {}
+    for row in inserted:
+        organization_id = org_by_qr.get(str(row['qr_code_id']))
+        if not organization_id:
+            continue
+        try:
+            if organization_id not in enabled:
+                enabled[organization_id] = scan_notifications.check_notifications_enabled(organization_id)
+            if enabled[organization_id]:
+                scan_notifications.send_scan_notification(
+                    organization_id=organization_id,
+                    scan_event_id=str(row['id']),
+                    country=row['country'],
+                    city=row['city'],
+                )
+        except Exception as notif_err:
+            # Log but don't fail the batch
+            logger.warning(f"Failed to send scan notification: {notif_err}")
+
+
+async def _write_and_notify(events: list[ScanEvent]) -> None:
+    inserted = await write_events(events)
+    # Scan notification services are synchronous
+    await run_in_threadpool(_notify_scans, events, inserted)
+
+
+# ============================================================
+# BUFFER
+# ============================================================
+
+class ScanIngestionBuffer:
+    """Bounded in-memory queue of scan events with a background flusher."""
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_queue: int, max_attempts: int = 10):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self._queue: list[ScanEvent] = []
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'written_inline': 0,
+            'rejected_full': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'dropped': 0,
+            'discarded': 0,
+            'max_depth': 0,
+            'last_flush_ms': 0.0,
+            'last_batch_size': 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def enqueue(self, event: ScanEvent) -> None:
+        """
+        Queue a scan event for the next flush.
+
+        Falls back to writing the event inline when the flusher is not running
+        or the queue is full, so the caller absorbs the backpressure.
+        """
+        if self.running:
+            with self._lock:
+                if len(self._queue) < self.max_queue:
+                    self._queue.append(event)
+                    depth = len(self._queue)
+                    self._stats['enqueued'] += 1
+                    self._stats['max_depth'] = max(self._stats['max_depth'], depth)
+                    if depth >= self.batch_size:
+                        self._wakeup.set()
+                    return
+                self._stats['rejected_full'] += 1
+
+        await _write_and_notify([event])
+        with self._lock:
+            self._stats['written_inline'] += 1
+
+    def _take_batch(self) -> list[ScanEvent]:
+        with self._lock:
+            batch = self._queue[:self.batch_size]
+            del self._queue[:self.batch_size]
+            return batch
+
+    def _requeue(self, batch: list[ScanEvent]) -> None:
+        with self._lock:
+            room = max(self.max_queue - len(self._queue), 0)
+            self._queue[:0] = batch[:room]
+            self._stats['dropped'] += len(batch) - min(room, len(batch))
+
+    def _discard(self, events: list[ScanEvent], reason: str) -> None:
+        for event in events:
+            logger.error(
+                f'Discarding scan event for QR {event.qr_code_id} at {event.occurred_at.isoformat()} '
+                f'(campaign {event.campaign_id}, variant {event.ab_variant_id}): {reason}'
+            )
+        with self._lock:
+            self._stats['discarded'] += len(events)
+
+    def _retry_later(self, events: list[ScanEvent]) -> None:
+        """Requeue events after a failed flush, dropping those out of attempts."""
+        for event in events:
+            event.attempts += 1
+        self._discard(
+            [e for e in events if e.attempts >= self.max_attempts],
+            f'not written after {self.max_attempts} flushes',
+        )
+        self._requeue([e for e in events if e.attempts < self.max_attempts])
+
+    async def _write_batch(self, batch: list[ScanEvent]) -> tuple[int, list[ScanEvent]]:
+        """
+        Write a batch, bisecting it when the database rejects a row.
+
+        Returns (events written, events left for a later flush). A rejected
+        single event is discarded; any other error stops the batch.
+        """
+        try:
+            await _write_and_notify(batch)
+            return len(batch), []
+        except (DataError, IntegrityError) as e:
+            if len(batch) == 1:
+                self._discard(batch, f'rejected by the database: {e}')
+                return 0, []
+            logger.warning(f'Scan batch of {len(batch)} events rejected, bisecting: {e}')
+        except Exception as e:
+            logger.error(f'Scan ingestion flush failed for {len(batch)} events: {e}')
+            return 0, batch
+
+        middle = len(batch) // 2
+        written, unwritten = await self._write_batch(batch[:middle])
+        if unwritten:
+            # The rest of the batch waits along with the failed half
+            return written, unwritten + batch[middle:]
+        right_written, unwritten = await self._write_batch(batch[middle:])
+        return written + right_written, unwritten
+
+    async def flush(self) -> int:
+        """Write everything currently queued. Returns number of events written."""
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            started = time.perf_counter()
+            batch_written, unwritten = await self._write_batch(batch)
+            written += batch_written
+            with self._lock:
+                self._stats['written'] += batch_written
+                if unwritten:
+                    self._stats['flush_errors'] += 1
+                else:
+                    self._stats['flushes'] += 1
+                    self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                    self._stats['last_batch_size'] = len(batch)
+            if unwritten:
+                self._retry_later(unwritten)
+                return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info('Scan ingestion flusher started')
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        written = await self.flush()
+        logger.info(f'Scan ingestion flusher stopped, flushed {written} pending events')
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'queue_depth': len(self._queue), 'running': self.running}
+
+
+buffer = ScanIngestionBuffer(
+    batch_size=settings.scan_ingest_batch_size,
+    flush_interval_ms=settings.scan_ingest_flush_interval_ms,
+    max_queue=settings.scan_ingest_max_queue,
+    max_attempts=settings.scan_ingest_max_attempts,
+)
+
+
+async def enqueue_scan(event: ScanEvent) -> None:
+    await buffer.enqueue(event)
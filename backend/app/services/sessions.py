@@ -1,10 +1,21 @@
 """
 Session Management Service
 Handles cookie-based sessions with 24-hour expiry.
+
+Validated sessions are cached per process together with the user's profile
+(SESSION_CACHE_TTL_SECONDS), so authenticated requests usually need no
+database round trip. Entries are dropped by delete_session,
+delete_user_sessions and invalidate_user. last_used_at is written lazily:
+touches are coalesced and flushed by a scheduler job, at most once per
+session per SESSION_TOUCH_INTERVAL_SECONDS.
 """
 import hashlib
+import logging
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from time import monotonic
 from typing import Optional
 
 from fastapi import HTTPException, status
@@ -13,12 +24,23 @@ from psycopg.rows import dict_row
 from app.core.db import get_connection
 from app.core.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
 # Session cookie name
 SESSION_COOKIE_NAME = getattr(settings, 'session_cookie_name', 'session_id')
 SESSION_EXPIRY_HOURS = 24
 
+_cache_lock = threading.Lock()
+# session_id -> (session, profile or None, cache deadline)
+_session_cache: OrderedDict[str, tuple[dict, Optional[dict], float]] = OrderedDict()
+_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+_touch_lock = threading.Lock()
+_pending_touches: dict[str, datetime] = {}
+_last_touched: dict[str, float] = {}
+
 
 def hash_refresh_token(refresh_token: str) -> str:
     """Hash refresh token for storage."""
@@ -65,27 +87,168 @@ def get_session(session_id: str) -> Optional[dict]:
     Returns:
         Session dict with user_id, expires_at, etc. or None if not found/expired
     """
+    cached = _get_cached(session_id)
+    if cached is None:
+        return None
+    return dict(cached[0])
+
+
+def get_session_user(session_id: str) -> tuple[Optional[dict], Optional[dict]]:
+    """
+    Get session and the owner's profile by session ID.
+    
+    Returns:
+        (session, profile). session is None if not found/expired; profile is
+        None if the session exists but the app_profiles row does not.
+    """
+    cached = _get_cached(session_id)
+    if cached is None:
+        return None, None
+    session, profile = cached
+    return dict(session), dict(profile) if profile else None
+
+
+def _get_cached(session_id: str) -> Optional[tuple[dict, Optional[dict]]]:
+    now = monotonic()
+    with _cache_lock:
+        cached = _session_cache.get(session_id)
+        if cached and cached[2] > now and cached[0]['expires_at'] > datetime.now(timezone.utc):
+            _session_cache.move_to_end(session_id)
+            _cache_stats['hits'] += 1
+            _touch(session_id)
+            return cached[0], cached[1]
+        _session_cache.pop(session_id, None)
+        _cache_stats['misses'] += 1
+
+    loaded = _load_session(session_id)
+    if loaded is None:
+        return None
+    session, profile = loaded
+
+    with _cache_lock:
+        _session_cache[session_id] = (session, profile, now + settings.session_cache_ttl_seconds)
+        _session_cache.move_to_end(session_id)
+        while len(_session_cache) > settings.session_cache_max_entries:
+            _session_cache.popitem(last=False)
+        _touch(session_id)
+    return session, profile
+
+
+def _load_session(session_id: str) -> Optional[tuple[dict, Optional[dict]]]:
+    """Load a live session and its profile in one query."""
     with get_connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
             cur.execute(
                 '''
-                SELECT id, user_id, refresh_token_hash, expires_at, created_at, last_used_at
-                FROM public.sessions
-                WHERE id = %s AND expires_at > now()
+                SELECT s.id, s.user_id, s.refresh_token_hash, s.expires_at, s.created_at, s.last_used_at,
+                       p.id AS profile_id, p.email, p.role, p.display_name, p.avatar_url
+                FROM public.sessions s
+                LEFT JOIN public.app_profiles p ON p.id = s.user_id
+                WHERE s.id = %s AND s.expires_at > now()
                 ''',
                 (session_id,)
             )
-            session = cur.fetchone()
-            
-            if session:
-                # Update last_used_at
+            row = cur.fetchone()
+            if not row:
+                return None
+
+    session = {
+        key: row[key]
+        for key in ('id', 'user_id', 'refresh_token_hash', 'expires_at', 'created_at', 'last_used_at')
+    }
+    profile = None
+    if row['profile_id'] is not None:
+        profile = {
+            'id': row['profile_id'],
+            'email': row['email'],
+            'role': row['role'],
+            'display_name': row['display_name'],
+            'avatar_url': row['avatar_url'],
+        }
+    return session, profile
+
+
+def invalidate_session(session_id: str) -> None:
+    """Drop a cached session."""
+    with _cache_lock:
+        if _session_cache.pop(session_id, None) is not None:
+            _cache_stats['invalidations'] += 1
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop every cached session of a user (e.g. after a profile or role change)."""
+    user_id = str(user_id)
+    with _cache_lock:
+        stale = [sid for sid, (session, _, _) in _session_cache.items() if str(session['user_id']) == user_id]
+        for sid in stale:
+            del _session_cache[sid]
+        _cache_stats['invalidations'] += len(stale)
+
+
+def clear_session_cache() -> None:
+    """Drop every cached session and pending touch."""
+    with _cache_lock:
+        _session_cache.clear()
+    with _touch_lock:
+        _pending_touches.clear()
+        _last_touched.clear()
+
+
+def get_session_cache_stats() -> dict:
+    with _cache_lock:
+        stats = {**_cache_stats, 'size': len(_session_cache)}
+    with _touch_lock:
+        stats['pending_touches'] = len(_pending_touches)
+    return stats
+
+
+# ============================================================
+# LAST USED TRACKING
+# ============================================================
+
+def _touch(session_id: str) -> None:
+    """Record a session use; written at most once per touch interval."""
+    now = monotonic()
+    with _touch_lock:
+        last = _last_touched.get(session_id)
+        if last is not None and now - last < settings.session_touch_interval_seconds:
+            return
+        _last_touched[session_id] = now
+        _pending_touches[session_id] = datetime.now(timezone.utc)
+
+
+def flush_session_touches() -> int:
+    """Write coalesced last_used_at updates. Returns number of sessions updated."""
+    now = monotonic()
+    with _touch_lock:
+        pending = dict(_pending_touches)
+        _pending_touches.clear()
+        for sid, last in list(_last_touched.items()):
+            if now - last >= settings.session_touch_interval_seconds:
+                del _last_touched[sid]
+    if not pending:
+        return 0
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
                 cur.execute(
-                    'UPDATE public.sessions SET last_used_at = now() WHERE id = %s',
-                    (session_id,)
+                    '''
+                    UPDATE public.sessions s
+                    SET last_used_at = GREATEST(s.last_used_at, t.used_at)
+                    FROM unnest(%s::uuid[], %s::timestamptz[]) AS t(id, used_at)
+                    WHERE s.id = t.id
+                    ''',
+                    (list(pending.keys()), list(pending.values()))
                 )
                 conn.commit()
-            
-            return session
+    except Exception:
+        # Keep the touches for the next run; newer ones win
+        with _touch_lock:
+            for sid, used_at in pending.items():
+                _pending_touches.setdefault(sid, used_at)
+        raise
+    return len(pending)
 
 
 def delete_session(session_id: str) -> None:
@@ -94,6 +257,7 @@ def delete_session(session_id: str) -> None:
         with conn.cursor() as cur:
             cur.execute('DELETE FROM public.sessions WHERE id = %s', (session_id,))
             conn.commit()
+    invalidate_session(session_id)
 
 
 def delete_user_sessions(user_id: str) -> None:
@@ -102,6 +266,7 @@ def delete_user_sessions(user_id: str) -> None:
         with conn.cursor() as cur:
             cur.execute('DELETE FROM public.sessions WHERE user_id = %s', (user_id,))
             conn.commit()
+    invalidate_user(user_id)
 
 
 def cleanup_expired_sessions() -> int:
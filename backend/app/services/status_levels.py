@@ -33,40 +33,22 @@ from uuid import UUID
 from fastapi import HTTPException, status
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, invalidate_tags, organization_tag
 from app.core.db import get_connection
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache with expiration
-_cache: dict[str, tuple[any, datetime]] = {}
-CACHE_TTL_SECONDS = 60
+# Organization status, shared with widgets and public pages through the org tag
+_cache = TTLCache('status_levels', ttl_seconds=60)
 
 
 # ============================================================
 # CACHE UTILITIES
 # ============================================================
 
-def _get_cached(key: str) -> Optional[any]:
-    """Get value from cache if not expired"""
-    if key in _cache:
-        value, expires_at = _cache[key]
-        if datetime.utcnow() < expires_at:
-            return value
-        del _cache[key]
-    return None
-
-
-def _set_cache(key: str, value: any, ttl_seconds: int = CACHE_TTL_SECONDS) -> None:
-    """Set value in cache with expiration"""
-    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-    _cache[key] = (value, expires_at)
-
-
 def _invalidate_cache(organization_id: str) -> None:
     """Invalidate all cache entries for an organization"""
-    keys_to_delete = [k for k in _cache.keys() if organization_id in k]
-    for key in keys_to_delete:
-        del _cache[key]
+    invalidate_tags(organization_tag(organization_id))
 
 
 # ============================================================
@@ -98,7 +80,7 @@ def get_organization_status(
     cache_key = f"org_status:{organization_id}:{user_id or 'anon'}"
 
     # Check cache
-    cached = _get_cached(cache_key)
+    cached = _cache.get(cache_key)
     if cached:
         logger.debug(f"[status_levels] Cache hit for {cache_key}")
         return cached
@@ -177,7 +159,7 @@ def get_organization_status(
             }
 
             # Cache result
-            _set_cache(cache_key, result)
+            _cache.set(cache_key, result, tags=[organization_tag(organization_id)])
 
             return result
 
@@ -5,9 +5,10 @@ import httpx
 from app.core.config import get_settings
 
 
-async def send_telegram_message(chat_id: str, text: str) -> bool:
+async def send_telegram_message(chat_id: str, text: str, client: httpx.AsyncClient | None = None) -> bool:
     """
     Отправляет сообщение в Telegram через Bot API.
+    Если передан client, используется общий httpx-клиент.
     Возвращает True при успехе, False при ошибке.
     """
     settings = get_settings()
@@ -18,25 +19,31 @@ async def send_telegram_message(chat_id: str, text: str) -> bool:
     
     try:
         url = f'https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage'
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json={
-                    'chat_id': chat_id,
-                    'text': text,
-                    'parse_mode': 'HTML',
-                },
-                timeout=10.0,
-            )
-            if response.status_code == 200:
-                return True
-            print(f'[Telegram] Failed to send message: {response.status_code} - {response.text}')
-            return False
+        if client is None:
+            async with httpx.AsyncClient() as own_client:
+                return await _post_message(own_client, url, chat_id, text)
+        return await _post_message(client, url, chat_id, text)
     except Exception as e:
         print(f'[Telegram] Error sending message: {e}')
         return False
 
 
+async def _post_message(client: httpx.AsyncClient, url: str, chat_id: str, text: str) -> bool:
+    response = await client.post(
+        url,
+        json={
+            'chat_id': chat_id,
+            'text': text,
+            'parse_mode': 'HTML',
+        },
+        timeout=10.0,
+    )
+    if response.status_code == 200:
+        return True
+    print(f'[Telegram] Failed to send message: {response.status_code} - {response.text}')
+    return False
+
+
 def format_notification_telegram(title: str, body: str) -> str:
     """
     Форматирует уведомление для Telegram (HTML формат).
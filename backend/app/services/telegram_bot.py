@@ -27,10 +27,13 @@ from app.schemas.telegram import (
     BotStats,
     CompanyInfo,
     RateLimitResult,
+    TelegramBroadcast,
     TelegramLinkToken,
     TelegramSubscription,
     TelegramUser,
 )
+from app.services import telegram_broadcast
+from app.services.telegram_broadcast import NOTIFY_COLUMNS
 
 logger = logging.getLogger(__name__)
 
@@ -468,11 +471,7 @@ def get_subscribers_for_organization(
     """
     Get Telegram IDs of users subscribed to organization for specific notification type.
     """
-    notify_column = {
-        'review': 'notify_on_reviews',
-        'qr_scan': 'notify_on_qr_scans',
-        'post': 'notify_on_posts',
-    }.get(notification_type, 'notify_on_reviews')
+    notify_column = NOTIFY_COLUMNS.get(notification_type, 'notify_on_reviews')
 
     with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
@@ -592,6 +591,13 @@ def log_command(
 # Notifications
 # ---------------------------------------------------------------------------
 
+def _format_subscriber_message(title: str, body: str, url: Optional[str]) -> str:
+    message = f'<b>{_escape_html(title)}</b>\n\n{_escape_html(body)}'
+    if url:
+        message += f'\n\n<a href="{url}">Подробнее</a>'
+    return message
+
+
 async def send_notification_to_subscribers(
     organization_id: str,
     notification_type: str,
@@ -601,45 +607,45 @@ async def send_notification_to_subscribers(
 ) -> int:
     """
     Send notification to all subscribers of an organization.
+    Runs a resumable rate-limited broadcast (see telegram_broadcast) and
+    waits for it to finish.
     Returns number of messages sent.
     """
-    telegram_ids = get_subscribers_for_organization(organization_id, notification_type)
-
-    if not telegram_ids:
-        return 0
-
     settings = get_settings()
     if not settings.telegram_bot_token:
         logger.warning('Telegram bot token not configured')
         return 0
 
-    sent_count = 0
-    message = f'<b>{_escape_html(title)}</b>\n\n{_escape_html(body)}'
+    message = _format_subscriber_message(title, body, url)
+    broadcast = await telegram_broadcast.create_broadcast(organization_id, notification_type, message)
+    if broadcast.total_recipients == 0:
+        return 0
 
-    if url:
-        message += f'\n\n<a href="{url}">Подробнее</a>'
+    result = await telegram_broadcast.run_broadcast(broadcast.id)
+    return result.sent_count if result else 0
+
+
+async def start_notification_broadcast(
+    organization_id: str,
+    notification_type: str,
+    title: str,
+    body: str,
+    url: Optional[str] = None,
+) -> Optional[TelegramBroadcast]:
+    """
+    Start a subscriber broadcast in the background and return it immediately.
+    Progress can be polled with telegram_broadcast.get_broadcast().
+    """
+    settings = get_settings()
+    if not settings.telegram_bot_token:
+        logger.warning('Telegram bot token not configured')
+        return None
 
-    async with httpx.AsyncClient() as client:
-        for telegram_id in telegram_ids:
-            try:
-                response = await client.post(
-                    f'https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage',
-                    json={
-                        'chat_id': telegram_id,
-                        'text': message,
-                        'parse_mode': 'HTML',
-                        'disable_web_page_preview': False,
-                    },
-                    timeout=10.0,
-                )
-                if response.status_code == 200:
-                    sent_count += 1
-                else:
-                    logger.warning(f'Failed to send to {telegram_id}: {response.text}')
-            except Exception as e:
-                logger.error(f'Error sending to {telegram_id}: {e}')
-
-    return sent_count
+    message = _format_subscriber_message(title, body, url)
+    broadcast = await telegram_broadcast.create_broadcast(organization_id, notification_type, message)
+    if broadcast.total_recipients:
+        telegram_broadcast.start_broadcast_task(broadcast.id)
+    return broadcast
 
 
 async def send_direct_message(telegram_id: int, text: str, parse_mode: str = 'HTML') -> bool:
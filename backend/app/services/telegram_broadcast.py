@@ -0,0 +1,390 @@
+"""
+Telegram broadcast subsystem.
+
+Fans a notification out to every subscriber of an organization:
+- subscribers are read in telegram_id order, in shards of
+  TELEGRAM_BROADCAST_BATCH_SIZE
+- messages within a shard are sent concurrently, throttled by a global token
+  bucket (Telegram: ~30 msg/s per bot) and a per-chat minimum interval
+- 429 responses pause the global bucket for retry_after and are retried
+- progress (cursor, sent/failed counts) is persisted after every shard in
+  telegram_broadcasts, so counts are visible while the broadcast runs and an
+  interrupted broadcast resumes from the last completed shard
+
+Running broadcasts heartbeat on every shard; the scheduler resumes pending
+broadcasts and running ones whose heartbeat is older than
+TELEGRAM_BROADCAST_LEASE_SECONDS. Delivery is at-least-once: a crash in the
+middle of a shard resends that shard.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+import httpx
+from psycopg.rows import dict_row
+
+from app.core.config import get_settings
+from app.core.db import get_async_connection
+from app.schemas.telegram import TelegramBroadcast
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+NOTIFY_COLUMNS = {
+    'review': 'notify_on_reviews',
+    'qr_scan': 'notify_on_qr_scans',
+    'post': 'notify_on_posts',
+}
+
+_BROADCAST_COLUMNS = '''
+    id, organization_id, notification_type, message, status, total_recipients,
+    sent_count, failed_count, cursor_telegram_id, last_error, started_at,
+    completed_at, created_at
+'''
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Async token bucket.
+
+    Callers reserve a token synchronously and sleep off any debt, so waiters
+    are served in order without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        self._refill(monotonic())
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (e.g. after a 429)."""
+        self._refill(monotonic())
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class PerChatLimiter:
+    """Minimum interval between two messages to the same chat."""
+
+    def __init__(self, interval: float, max_chats: int = 100_000):
+        self.interval = interval
+        self.max_chats = max_chats
+        self._next_at: OrderedDict[int, float] = OrderedDict()
+
+    async def wait(self, chat_id: int) -> None:
+        now = monotonic()
+        slot = max(now, self._next_at.get(chat_id, 0.0))
+        self._next_at[chat_id] = slot + self.interval
+        self._next_at.move_to_end(chat_id)
+        while len(self._next_at) > self.max_chats:
+            self._next_at.popitem(last=False)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_global_bucket = TokenBucket(settings.telegram_broadcast_rate_per_second)
+_chat_limiter = PerChatLimiter(settings.telegram_broadcast_per_chat_interval_seconds)
+_running: dict[str, asyncio.Task] = {}
+_stats = {'messages_sent': 0, 'messages_failed': 0, 'retries_429': 0, 'broadcasts_completed': 0}
+
+
+def get_broadcaster_stats() -> dict:
+    return {**_stats, 'running': len(_running)}
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+def _row_to_broadcast(row: dict) -> TelegramBroadcast:
+    return TelegramBroadcast(
+        **{
+            **row,
+            'id': str(row['id']),
+            'organization_id': str(row['organization_id']),
+        }
+    )
+
+
+async def create_broadcast(organization_id: str, notification_type: str, message: str) -> TelegramBroadcast:
+    """Record a new broadcast with its recipient count."""
+    notify_column = NOTIFY_COLUMNS.get(notification_type, 'notify_on_reviews')
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                f'''
+                SELECT COUNT(*) AS total
+                FROM telegram_subscriptions ts
+                JOIN telegram_users tu ON tu.id = ts.telegram_user_id
+                WHERE ts.organization_id = %s
+                  AND ts.{notify_column} = TRUE
+                  AND tu.is_blocked = FALSE
+                ''',
+                (organization_id,),
+            )
+            total = (await cur.fetchone())['total']
+            await cur.execute(
+                f'''
+                INSERT INTO telegram_broadcasts (organization_id, notification_type, message, total_recipients, status)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING {_BROADCAST_COLUMNS}
+                ''',
+                (organization_id, notification_type, message, total, 'pending' if total else 'completed'),
+            )
+            row = await cur.fetchone()
+            await conn.commit()
+    return _row_to_broadcast(row)
+
+
+async def get_broadcast(broadcast_id: str) -> Optional[TelegramBroadcast]:
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                f'SELECT {_BROADCAST_COLUMNS} FROM telegram_broadcasts WHERE id = %s',
+                (broadcast_id,),
+            )
+            row = await cur.fetchone()
+    return _row_to_broadcast(row) if row else None
+
+
+async def _claim_broadcast(broadcast_id: str) -> Optional[dict]:
+    """Take ownership of a pending or abandoned broadcast."""
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                f'''
+                UPDATE telegram_broadcasts
+                SET status = 'running',
+                    heartbeat_at = now(),
+                    started_at = COALESCE(started_at, now()),
+                    updated_at = now()
+                WHERE id = %s
+                  AND (
+                      status = 'pending'
+                      OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %s))
+                  )
+                RETURNING {_BROADCAST_COLUMNS}
+                ''',
+                (broadcast_id, settings.telegram_broadcast_lease_seconds),
+            )
+            row = await cur.fetchone()
+            await conn.commit()
+    return row
+
+
+async def _fetch_recipients(broadcast: dict, after: Optional[int], limit: int) -> list[int]:
+    notify_column = NOTIFY_COLUMNS.get(broadcast['notification_type'], 'notify_on_reviews')
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                f'''
+                SELECT tu.telegram_id
+                FROM telegram_subscriptions ts
+                JOIN telegram_users tu ON tu.id = ts.telegram_user_id
+                WHERE ts.organization_id = %s
+                  AND ts.{notify_column} = TRUE
+                  AND tu.is_blocked = FALSE
+                  AND (%s::bigint IS NULL OR tu.telegram_id > %s::bigint)
+                ORDER BY tu.telegram_id
+                LIMIT %s
+                ''',
+                (broadcast['organization_id'], after, after, limit),
+            )
+            return [row['telegram_id'] for row in await cur.fetchall()]
+
+
+async def _save_progress(
+    broadcast_id: str,
+    cursor: Optional[int],
+    sent: int,
+    failed: int,
+    last_error: Optional[str],
+    status: str = 'running',
+) -> None:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                UPDATE telegram_broadcasts
+                SET cursor_telegram_id = %s,
+                    sent_count = sent_count + %s,
+                    failed_count = failed_count + %s,
+                    last_error = COALESCE(%s, last_error),
+                    status = %s,
+                    heartbeat_at = now(),
+                    completed_at = CASE WHEN %s IN ('completed', 'failed') THEN now() ELSE completed_at END,
+                    updated_at = now()
+                WHERE id = %s
+                ''',
+                (cursor, sent, failed, last_error, status, status, broadcast_id),
+            )
+            await conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Sending
+# ---------------------------------------------------------------------------
+
+async def send_broadcast_message(
+    client: httpx.AsyncClient,
+    chat_id: int,
+    message: str,
+    bucket: Optional[TokenBucket] = None,
+    chat_limiter: Optional[PerChatLimiter] = None,
+) -> tuple[bool, Optional[str]]:
+    """
+    Send one broadcast message, honouring rate limits and 429 retry_after.
+
+    Returns (sent, error).
+    """
+    bucket = bucket or _global_bucket
+    chat_limiter = chat_limiter or _chat_limiter
+    url = f'https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage'
+    error: Optional[str] = None
+
+    for attempt in range(settings.telegram_broadcast_max_retries + 1):
+        await bucket.acquire()
+        await chat_limiter.wait(chat_id)
+        try:
+            response = await client.post(
+                url,
+                json={
+                    'chat_id': chat_id,
+                    'text': message,
+                    'parse_mode': 'HTML',
+                    'disable_web_page_preview': False,
+                },
+                timeout=10.0,
+            )
+        except httpx.HTTPError as e:
+            error = f'{type(e).__name__}: {e}'
+            await asyncio.sleep(2 ** attempt)
+            continue
+
+        if response.status_code == 200:
+            return True, None
+
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+            except ValueError:
+                retry_after = 1.0
+            _stats['retries_429'] += 1
+            bucket.pause(retry_after)
+            error = f'429 retry_after={retry_after}'
+            await asyncio.sleep(retry_after)
+            continue
+
+        error = f'{response.status_code}: {response.text[:200]}'
+        if response.status_code >= 500:
+            await asyncio.sleep(2 ** attempt)
+            continue
+        # 400/403 (chat not found, bot blocked by user) are permanent
+        return False, error
+
+    return False, error
+
+
+async def run_broadcast(broadcast_id: str) -> Optional[TelegramBroadcast]:
+    """
+    Run (or resume) a broadcast until every recipient has been attempted.
+
+    Returns None if the broadcast is owned by another live worker.
+    """
+    broadcast = await _claim_broadcast(broadcast_id)
+    if broadcast is None:
+        return None
+
+    if not settings.telegram_bot_token:
+        logger.warning('Telegram bot token not configured')
+        await _save_progress(broadcast_id, broadcast['cursor_telegram_id'], 0, 0,
+                             'Telegram bot token not configured', status='failed')
+        return await get_broadcast(broadcast_id)
+
+    cursor = broadcast['cursor_telegram_id']
+    semaphore = asyncio.Semaphore(settings.telegram_broadcast_concurrency)
+
+    async with httpx.AsyncClient() as client:
+        async def send_one(chat_id: int) -> tuple[bool, Optional[str]]:
+            async with semaphore:
+                try:
+                    return await send_broadcast_message(client, chat_id, broadcast['message'])
+                except Exception as e:
+                    return False, str(e)
+
+        while True:
+            recipients = await _fetch_recipients(broadcast, cursor, settings.telegram_broadcast_batch_size)
+            if not recipients:
+                break
+
+            results = await asyncio.gather(*(send_one(chat_id) for chat_id in recipients))
+            sent = sum(1 for ok, _ in results if ok)
+            failed = len(results) - sent
+            last_error = next((err for ok, err in reversed(results) if not ok and err), None)
+            cursor = recipients[-1]
+            _stats['messages_sent'] += sent
+            _stats['messages_failed'] += failed
+            if failed:
+                logger.warning(f'Broadcast {broadcast_id}: {failed} of {len(results)} messages failed, last error: {last_error}')
+
+            await _save_progress(broadcast_id, cursor, sent, failed, last_error)
+
+    await _save_progress(broadcast_id, cursor, 0, 0, None, status='completed')
+    _stats['broadcasts_completed'] += 1
+    return await get_broadcast(broadcast_id)
+
+
+def start_broadcast_task(broadcast_id: str) -> None:
+    """Run a broadcast in the background of the current event loop."""
+    if broadcast_id in _running:
+        return
+    task = asyncio.get_running_loop().create_task(run_broadcast(broadcast_id))
+    _running[broadcast_id] = task
+
+    def _done(t: asyncio.Task) -> None:
+        _running.pop(broadcast_id, None)
+        if not t.cancelled() and t.exception():
+            logger.error(f'Broadcast {broadcast_id} failed: {t.exception()}')
+
+    task.add_done_callback(_done)
+
+
+async def resume_broadcasts() -> int:
+    """Start pending broadcasts and ones abandoned by a dead worker."""
+    async with get_async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                '''
+                SELECT id FROM telegram_broadcasts
+                WHERE status = 'pending'
+                   OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %s))
+                ORDER BY created_at
+                ''',
+                (settings.telegram_broadcast_lease_seconds,),
+            )
+            ids = [str(row['id']) for row in await cur.fetchall()]
+    started = 0
+    for broadcast_id in ids:
+        if broadcast_id not in _running:
+            start_broadcast_task(broadcast_id)
+            started += 1
+    return started
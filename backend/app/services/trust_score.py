@@ -3,15 +3,23 @@ Open Trust Score Service
 
 Transparent, computed trust score from multiple verifiable signals.
 Formula is public and documented.
+
+Signal inputs for any number of organizations are read with one set-based
+query (one GROUP BY per source table), so the nightly recalculation costs a
+handful of scans instead of several queries per organization. Triggers
+record organizations whose inputs changed in trust_score_dirty_organizations
+for incremental runs between the nightly full runs.
 """
 from __future__ import annotations
 
+import json
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 from uuid import UUID
 
 from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
 
 from app.core.db import get_connection
 
@@ -28,6 +36,19 @@ SIGNAL_WEIGHTS = {
     'content_freshness': 0.7,    # Days since last update (inverse)
     'verification_level': 1.0,   # Status level (A=50, B=75, C=100)
 }
+SIGNAL_CODES = tuple(SIGNAL_WEIGHTS)
+TOTAL_WEIGHT = sum(SIGNAL_WEIGHTS.values())
+
+VERIFICATION_LEVEL_SCORES = {
+    'level_c': 100,
+    'level_b': 75,
+    'level_a': 50,
+    'verified': 40,
+    'pending': 25,
+    'unverified': 25
+}
+
+GRADE_THRESHOLDS = (('A', 90), ('B', 80), ('C', 70), ('D', 60), ('F', 0))
 
 
 def get_trust_score_formula() -> dict:
@@ -117,131 +138,118 @@ def get_trust_score_formula() -> dict:
     }
 
 
-def calculate_organization_trust_score(organization_id: str) -> dict:
+# Signal inputs per organization; {where} narrows the organizations
+_SIGNAL_INPUTS_QUERY = '''
+    WITH orgs AS (
+        SELECT id, name, created_at, updated_at, verification_status
+        FROM organizations
+        WHERE {where}
+    ),
+    review_stats AS (
+        SELECT organization_id, AVG(rating) as avg_rating, COUNT(*) as total_reviews,
+               COUNT(*) FILTER (WHERE response IS NOT NULL) as with_response
+        FROM reviews
+        WHERE status = 'approved' AND organization_id IN (SELECT id FROM orgs)
+        GROUP BY organization_id
+    ),
+    challenge_stats AS (
+        SELECT organization_id,
+               COUNT(*) FILTER (WHERE status = 'responded') as responded,
+               COUNT(*) FILTER (WHERE status IN ('responded', 'expired')) as total
+        FROM verification_challenges
+        WHERE organization_id IN (SELECT id FROM orgs)
+        GROUP BY organization_id
+    ),
+    supply_chain_stats AS (
+        SELECT organization_id, COUNT(*) as total_nodes,
+               COUNT(*) FILTER (WHERE is_verified = true) as verified_nodes
+        FROM supply_chain_nodes
+        WHERE organization_id IN (SELECT id FROM orgs)
+        GROUP BY organization_id
+    )
+    SELECT
+        o.id, o.name, o.created_at, o.updated_at, o.verification_status,
+        rs.avg_rating,
+        COALESCE(rs.total_reviews, 0) as total_reviews,
+        COALESCE(rs.with_response, 0) as with_response,
+        COALESCE(cs.responded, 0) as challenge_responded,
+        COALESCE(cs.total, 0) as challenge_total,
+        COALESCE(ss.total_nodes, 0) as total_nodes,
+        COALESCE(ss.verified_nodes, 0) as verified_nodes
+    FROM orgs o
+    LEFT JOIN review_stats rs ON rs.organization_id = o.id
+    LEFT JOIN challenge_stats cs ON cs.organization_id = o.id
+    LEFT JOIN supply_chain_stats ss ON ss.organization_id = o.id
+'''
+
+_ACTIVE_ORGANIZATIONS = "verification_status NOT IN ('rejected', 'suspended')"
+
+
+def _load_signal_inputs(cur, where: str, params: tuple = ()) -> List[dict]:
+    cur.execute(_SIGNAL_INPUTS_QUERY.format(where=where), params)
+    return cur.fetchall()
+
+
+def score_signals(inputs: dict, now: datetime) -> dict:
     """
-    Calculate the trust score for an organization based on all signals.
+    Apply the public formula to one row of signal inputs.
 
-    Returns the score breakdown and final grade.
+    Returns signal code -> {'raw': points rounded to 2 places, 'weight': weight}.
     """
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        # Get organization info
-        cur.execute(
-            '''
-            SELECT id, name, created_at, updated_at, verification_status
-            FROM organizations WHERE id = %s
-            ''',
-            (organization_id,)
-        )
-        org = cur.fetchone()
-        if not org:
-            return None
+    avg_rating = float(inputs['avg_rating']) if inputs['avg_rating'] else 0
+    total_reviews = inputs['total_reviews'] or 0
+    with_response = inputs['with_response'] or 0
+    challenge_total = inputs['challenge_total'] or 0
+    challenge_responded = inputs['challenge_responded'] or 0
+    total_nodes = inputs['total_nodes'] or 0
+    verified_nodes = inputs['verified_nodes'] or 0
+
+    raw = {
+        'review_rating': min(avg_rating * 20, 100),
+        'review_count': min(total_reviews / 10, 100),
+        'response_rate': (with_response / total_reviews * 100) if total_reviews > 0 else 0,
+        # No challenges = perfect score
+        'challenge_resolution': (
+            (challenge_responded / challenge_total * 100)
+            if challenge_total > 0 else 100
+        ),
+        'supply_chain_docs': (verified_nodes / total_nodes * 100) if total_nodes > 0 else 0,
+        'platform_tenure': min((now - inputs['created_at']).days / 30 * 2, 100),
+        'content_freshness': max(100 - (now - inputs['updated_at']).days, 0),
+        'verification_level': VERIFICATION_LEVEL_SCORES.get(inputs['verification_status'], 25),
+    }
+    return {
+        code: {'raw': round(raw[code], 2), 'weight': SIGNAL_WEIGHTS[code]}
+        for code in SIGNAL_CODES
+    }
 
-        # Calculate each signal
 
-        # 1. Review rating (1-5 → 0-100)
-        cur.execute(
-            '''
-            SELECT AVG(rating) as avg_rating, COUNT(*) as total_reviews,
-                   COUNT(*) FILTER (WHERE response IS NOT NULL) as with_response
-            FROM reviews
-            WHERE organization_id = %s AND status = 'approved'
-            ''',
-            (organization_id,)
-        )
-        review_stats = cur.fetchone()
-        avg_rating = float(review_stats['avg_rating']) if review_stats['avg_rating'] else 0
-        total_reviews = review_stats['total_reviews'] or 0
-        with_response = review_stats['with_response'] or 0
+def total_score(signal_scores: dict) -> float:
+    return round(sum(s['raw'] * s['weight'] for s in signal_scores.values()) / TOTAL_WEIGHT, 2)
 
-        review_rating_score = min(avg_rating * 20, 100)
-        review_count_score = min(total_reviews / 10, 100)
-        response_rate_score = (with_response / total_reviews * 100) if total_reviews > 0 else 0
 
-        # 2. Challenge resolution
-        cur.execute(
-            '''
-            SELECT
-                COUNT(*) FILTER (WHERE status = 'responded') as responded,
-                COUNT(*) FILTER (WHERE status IN ('responded', 'expired')) as total
-            FROM verification_challenges
-            WHERE organization_id = %s
-            ''',
-            (organization_id,)
-        )
-        challenge_stats = cur.fetchone()
-        challenge_total = challenge_stats['total'] or 0
-        challenge_responded = challenge_stats['responded'] or 0
-        # No challenges = perfect score
-        challenge_resolution_score = (
-            (challenge_responded / challenge_total * 100)
-            if challenge_total > 0 else 100
-        )
+def score_grade(score: float) -> str:
+    for grade, threshold in GRADE_THRESHOLDS:
+        if score >= threshold:
+            return grade
+    return 'F'
 
-        # 3. Supply chain documentation
-        cur.execute(
-            '''
-            SELECT
-                COUNT(*) as total_nodes,
-                COUNT(*) FILTER (WHERE is_verified = true) as verified_nodes
-            FROM supply_chain_nodes
-            WHERE organization_id = %s
-            ''',
-            (organization_id,)
-        )
-        supply_chain_stats = cur.fetchone()
-        total_nodes = supply_chain_stats['total_nodes'] or 0
-        verified_nodes = supply_chain_stats['verified_nodes'] or 0
-        supply_chain_docs_score = (
-            (verified_nodes / total_nodes * 100)
-            if total_nodes > 0 else 0
-        )
 
-        # 4. Platform tenure
-        months_active = (datetime.now(timezone.utc) - org['created_at']).days / 30
-        platform_tenure_score = min(months_active * 2, 100)
-
-        # 5. Content freshness
-        days_since_update = (datetime.now(timezone.utc) - org['updated_at']).days
-        content_freshness_score = max(100 - days_since_update, 0)
-
-        # 6. Verification level
-        verification_levels = {
-            'level_c': 100,
-            'level_b': 75,
-            'level_a': 50,
-            'verified': 40,
-            'pending': 25,
-            'unverified': 25
-        }
-        verification_level_score = verification_levels.get(org['verification_status'], 25)
-
-        # Calculate weighted total
-        signal_scores = {
-            'review_rating': {'raw': round(review_rating_score, 2), 'weight': SIGNAL_WEIGHTS['review_rating']},
-            'review_count': {'raw': round(review_count_score, 2), 'weight': SIGNAL_WEIGHTS['review_count']},
-            'response_rate': {'raw': round(response_rate_score, 2), 'weight': SIGNAL_WEIGHTS['response_rate']},
-            'challenge_resolution': {'raw': round(challenge_resolution_score, 2), 'weight': SIGNAL_WEIGHTS['challenge_resolution']},
-            'supply_chain_docs': {'raw': round(supply_chain_docs_score, 2), 'weight': SIGNAL_WEIGHTS['supply_chain_docs']},
-            'platform_tenure': {'raw': round(platform_tenure_score, 2), 'weight': SIGNAL_WEIGHTS['platform_tenure']},
-            'content_freshness': {'raw': round(content_freshness_score, 2), 'weight': SIGNAL_WEIGHTS['content_freshness']},
-            'verification_level': {'raw': round(verification_level_score, 2), 'weight': SIGNAL_WEIGHTS['verification_level']},
-        }
+def calculate_organization_trust_score(organization_id: str) -> dict:
+    """
+    Calculate the trust score for an organization based on all signals.
 
-        total_weighted = sum(s['raw'] * s['weight'] for s in signal_scores.values())
-        total_weight = sum(SIGNAL_WEIGHTS.values())
-        final_score = round(total_weighted / total_weight, 2)
-
-        # Determine grade
-        if final_score >= 90:
-            grade = 'A'
-        elif final_score >= 80:
-            grade = 'B'
-        elif final_score >= 70:
-            grade = 'C'
-        elif final_score >= 60:
-            grade = 'D'
-        else:
-            grade = 'F'
+    Returns the score breakdown and final grade.
+    """
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        rows = _load_signal_inputs(cur, 'id = %s', (organization_id,))
+        if not rows:
+            return None
+        org = rows[0]
+
+        signal_scores = score_signals(org, datetime.now(timezone.utc))
+        final_score = total_score(signal_scores)
+        grade = score_grade(final_score)
 
         # Store/update the score
         cur.execute(
@@ -270,11 +278,8 @@ def calculate_organization_trust_score(organization_id: str) -> dict:
             RETURNING id
             ''',
             (
-                organization_id, final_score, grade, signal_scores,
-                round(review_rating_score, 2), round(review_count_score, 2),
-                round(response_rate_score, 2), round(challenge_resolution_score, 2),
-                round(supply_chain_docs_score, 2), round(platform_tenure_score, 2),
-                round(content_freshness_score, 2), round(verification_level_score, 2)
+                organization_id, final_score, grade, Jsonb(signal_scores),
+                *(signal_scores[code]['raw'] for code in SIGNAL_CODES)
             )
         )
 
@@ -287,7 +292,7 @@ def calculate_organization_trust_score(organization_id: str) -> dict:
                 total_score = EXCLUDED.total_score,
                 signal_scores = EXCLUDED.signal_scores
             ''',
-            (organization_id, final_score, signal_scores)
+            (organization_id, final_score, Jsonb(signal_scores))
         )
 
         conn.commit()
@@ -356,24 +361,119 @@ def get_trust_score_leaderboard(limit: int = 20) -> List[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
-def recalculate_all_trust_scores() -> int:
-    """Recalculate trust scores for all active organizations (for cron job)."""
-    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            '''
-            SELECT id FROM organizations
-            WHERE verification_status NOT IN ('rejected', 'suspended')
-            '''
+def _write_scores(cur, scored: List[tuple[str, float, str, dict]]) -> None:
+    """Upsert scores and today's history rows through a COPY-loaded staging table."""
+    cur.execute(
+        '''
+        CREATE TEMP TABLE IF NOT EXISTS trust_score_stage (
+            organization_id UUID,
+            total_score DECIMAL(5,2),
+            score_grade VARCHAR(1),
+            signal_scores JSONB,
+            review_rating_score DECIMAL(5,2),
+            review_count_score DECIMAL(5,2),
+            response_rate_score DECIMAL(5,2),
+            challenge_resolution_score DECIMAL(5,2),
+            supply_chain_docs_score DECIMAL(5,2),
+            platform_tenure_score DECIMAL(5,2),
+            content_freshness_score DECIMAL(5,2),
+            verification_level_score DECIMAL(5,2)
+        ) ON COMMIT DELETE ROWS
+        '''
+    )
+    with cur.copy(
+        '''
+        COPY trust_score_stage (
+            organization_id, total_score, score_grade, signal_scores,
+            review_rating_score, review_count_score, response_rate_score,
+            challenge_resolution_score, supply_chain_docs_score,
+            platform_tenure_score, content_freshness_score, verification_level_score
+        ) FROM STDIN
+        '''
+    ) as copy:
+        for organization_id, score, grade, signal_scores in scored:
+            copy.write_row((
+                organization_id, score, grade, json.dumps(signal_scores),
+                *(signal_scores[code]['raw'] for code in SIGNAL_CODES)
+            ))
+    cur.execute(
+        '''
+        INSERT INTO organization_trust_scores (
+            organization_id, total_score, score_grade, signal_scores,
+            review_rating_score, review_count_score, response_rate_score,
+            challenge_resolution_score, supply_chain_docs_score,
+            platform_tenure_score, content_freshness_score, verification_level_score,
+            last_calculated_at
         )
-        org_ids = [row['id'] for row in cur.fetchall()]
-
-    count = 0
-    for org_id in org_ids:
-        try:
-            calculate_organization_trust_score(str(org_id))
-            count += 1
-        except Exception as e:
-            logger.error(f"Failed to calculate trust score for {org_id}: {e}")
-
-    logger.info(f"[trust_score] Recalculated trust scores for {count} organizations")
-    return count
+        SELECT
+            organization_id, total_score, score_grade, signal_scores,
+            review_rating_score, review_count_score, response_rate_score,
+            challenge_resolution_score, supply_chain_docs_score,
+            platform_tenure_score, content_freshness_score, verification_level_score,
+            now()
+        FROM trust_score_stage
+        ON CONFLICT (organization_id) DO UPDATE SET
+            total_score = EXCLUDED.total_score,
+            score_grade = EXCLUDED.score_grade,
+            signal_scores = EXCLUDED.signal_scores,
+            review_rating_score = EXCLUDED.review_rating_score,
+            review_count_score = EXCLUDED.review_count_score,
+            response_rate_score = EXCLUDED.response_rate_score,
+            challenge_resolution_score = EXCLUDED.challenge_resolution_score,
+            supply_chain_docs_score = EXCLUDED.supply_chain_docs_score,
+            platform_tenure_score = EXCLUDED.platform_tenure_score,
+            content_freshness_score = EXCLUDED.content_freshness_score,
+            verification_level_score = EXCLUDED.verification_level_score,
+            last_calculated_at = now()
+        '''
+    )
+    cur.execute(
+        '''
+        INSERT INTO trust_score_history (organization_id, total_score, signal_scores, recorded_at)
+        SELECT organization_id, total_score, signal_scores, CURRENT_DATE
+        FROM trust_score_stage
+        ON CONFLICT (organization_id, recorded_at) DO UPDATE SET
+            total_score = EXCLUDED.total_score,
+            signal_scores = EXCLUDED.signal_scores
+        '''
+    )
+
+
+def recalculate_all_trust_scores(incremental: bool = False) -> int:
+    """
+    Recalculate trust scores for active organizations (for cron job).
+
+    A full run scores every active organization. An incremental run scores
+    only organizations marked in trust_score_dirty_organizations since the
+    previous run; time-based signals (tenure, freshness) still need the
+    nightly full run. Marks are claimed in the same transaction as the
+    writes, so a failed run leaves them for the next one.
+    """
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        # Claim marks before reading inputs: changes committed after this
+        # point are either read below or stay marked for the next run
+        cur.execute('DELETE FROM trust_score_dirty_organizations RETURNING organization_id')
+        dirty = list({row['organization_id'] for row in cur.fetchall()})
+
+        if incremental:
+            if not dirty:
+                conn.rollback()
+                return 0
+            rows = _load_signal_inputs(cur, f'{_ACTIVE_ORGANIZATIONS} AND id = ANY(%s)', (dirty,))
+        else:
+            rows = _load_signal_inputs(cur, _ACTIVE_ORGANIZATIONS)
+
+        now = datetime.now(timezone.utc)
+        scored = []
+        for row in rows:
+            signal_scores = score_signals(row, now)
+            score = total_score(signal_scores)
+            scored.append((str(row['id']), score, score_grade(score), signal_scores))
+
+        if scored:
+            _write_scores(cur, scored)
+        conn.commit()
+
+    mode = 'incremental' if incremental else 'full'
+    logger.info(f"[trust_score] Recalculated trust scores for {len(scored)} organizations ({mode})")
+    return len(scored)
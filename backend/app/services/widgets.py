@@ -9,14 +9,18 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+import threading
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import Literal, Optional, Tuple
 
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from psycopg.rows import dict_row
 
+from app.core.cache import TTLCache, organization_tag
 from app.core.config import get_settings
-from app.core.db import get_connection
+from app.core.db import get_async_connection, get_connection
 from app.schemas.widgets import (
     WidgetConfig,
     WidgetEmbedCode,
@@ -27,12 +31,37 @@ from app.schemas.widgets import (
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+# Widget data and its version token per organization slug, tagged with the
+# organization (status level, profile and review changes invalidate it)
+_cache = TTLCache('widgets', ttl_seconds=settings.widget_render_cache_ttl_seconds)
+
+# Rendered widget bodies and ETags per (kind, slug, config)
+_renders = TTLCache('widget_renders', ttl_seconds=settings.widget_render_cache_ttl_seconds)
+
+# Bump when the rendered markup changes so browsers drop their copies
+WIDGET_TEMPLATE_VERSION = '1'
+
+WidgetKind = Literal['badge', 'iframe']
+
+# (slug, kind, config key) -> requests since the last flush
+_embed_counts: Counter[tuple[str, str, str]] = Counter()
+# Distinct keys counted between flushes; further new keys wait for the next flush
+EMBED_COUNT_MAX_KEYS = 10000
+# Configurations stored per (slug, kind): colours and sizes come from the
+# embedding page, so only the most requested ones are kept for warming
+EMBED_COUNT_MAX_CONFIGS = 5
+# Counts not requested for this long are dropped; warming only looks this far back
+EMBED_COUNT_RETENTION = '30 days'
+_embed_lock = threading.Lock()
+
 
 # ============================================================
 # DATA FETCHING
 # ============================================================
 
-def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
+async def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
     """
     Fetch organization data needed for widget rendering.
 
@@ -45,10 +74,15 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
     Raises:
         HTTPException: If organization not found
     """
+    cache_key = f"widget_org:{org_slug}"
+    cached = _cache.get(cache_key)
+    if cached:
+        return cached
+
     try:
-        with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        async with get_async_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
             # Get organization basic info
-            cur.execute(
+            await cur.execute(
                 '''
                 SELECT
                     o.id::text as organization_id,
@@ -61,7 +95,7 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
                 ''',
                 (org_slug,)
             )
-            org_row = cur.fetchone()
+            org_row = await cur.fetchone()
 
             if not org_row:
                 raise HTTPException(
@@ -72,15 +106,15 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
             organization_id = org_row['organization_id']
 
             # Get current status level
-            cur.execute(
+            await cur.execute(
                 'SELECT public.get_current_status_level(%s::uuid) as current_level',
                 (organization_id,)
             )
-            level_row = cur.fetchone()
+            level_row = await cur.fetchone()
             current_level = level_row['current_level'] if level_row else '0'
 
             # Get review statistics
-            cur.execute(
+            await cur.execute(
                 '''
                 SELECT
                     COALESCE(AVG(rating), 0) as avg_rating,
@@ -91,7 +125,7 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
                 ''',
                 (organization_id,)
             )
-            review_row = cur.fetchone()
+            review_row = await cur.fetchone()
             star_rating = float(review_row['avg_rating']) if review_row and review_row['avg_rating'] else None
             review_count = int(review_row['review_count']) if review_row else 0
 
@@ -100,7 +134,7 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
             if org_row['verified_at']:
                 verified_since = org_row['verified_at'].strftime('%Y-%m-%d')
 
-            return WidgetOrganizationData(
+            data = WidgetOrganizationData(
                 organization_id=organization_id,
                 name=org_row['name'],
                 slug=org_row['slug'],
@@ -109,6 +143,10 @@ def get_organization_for_widget(org_slug: str) -> WidgetOrganizationData:
                 review_count=review_count,
                 verified_since=verified_since
             )
+            tags = [organization_tag(organization_id)]
+            _cache.set(cache_key, data, tags=tags)
+            _cache.set(f"widget_version:{org_slug}", data_version(data), tags=tags)
+            return data
 
     except HTTPException:
         raise
@@ -480,6 +518,213 @@ def generate_cache_headers(etag: str) -> dict:
     }
 
 
+def widget_config_key(config: WidgetConfig) -> str:
+    """Normalized configuration, part of the render cache key and ETag."""
+    return '|'.join([
+        config.size.value,
+        config.theme.value,
+        config.primary_color or '',
+        str(int(config.show_logo)),
+        str(int(config.show_reviews_count)),
+        str(int(config.show_rating)),
+        config.language,
+        str(config.border_radius),
+    ])
+
+
+def config_from_key(config_key: str) -> WidgetConfig:
+    """Inverse of widget_config_key()."""
+    size, theme, color, logo, reviews, rating, language, radius = config_key.split('|')
+    return WidgetConfig(
+        size=WidgetSize(size),
+        theme=WidgetTheme(theme),
+        primary_color=color or None,
+        show_logo=logo == '1',
+        show_reviews_count=reviews == '1',
+        show_rating=rating == '1',
+        language=language,
+        border_radius=int(radius),
+    )
+
+
+def data_version(org_data: WidgetOrganizationData) -> str:
+    """Version token of the widget data; equal data gives equal tokens in every worker."""
+    return calculate_etag(org_data.model_dump_json())[:16]
+
+
+def widget_etag(kind: WidgetKind, org_slug: str, config_key: str, version: str) -> str:
+    """ETag of a widget render, derived from its inputs rather than its body."""
+    return calculate_etag(f"{WIDGET_TEMPLATE_VERSION}:{kind}:{org_slug}:{config_key}:{version}")
+
+
+def cached_widget_etag(kind: WidgetKind, org_slug: str, config: WidgetConfig) -> Optional[str]:
+    """
+    ETag of the current widget from cached version tokens, without database access.
+
+    Returns None when neither the version nor the render is cached.
+    """
+    config_key = widget_config_key(config)
+    version = _cache.get(f"widget_version:{org_slug}")
+    if version is not None:
+        return widget_etag(kind, org_slug, config_key, version)
+    cached = _renders.get(f"{kind}:{org_slug}:{config_key}")
+    return cached[1] if cached else None
+
+
+async def render_widget(kind: WidgetKind, org_slug: str, config: WidgetConfig) -> Tuple[str, str]:
+    """
+    Rendered widget body and ETag, from the render cache when possible.
+
+    Raises:
+        HTTPException: If organization not found
+    """
+    config_key = widget_config_key(config)
+    render_key = f"{kind}:{org_slug}:{config_key}"
+    cached = _renders.get(render_key)
+    if cached:
+        return cached
+
+    org_data = await get_organization_for_widget(org_slug)
+    if kind == 'badge':
+        body = await run_in_threadpool(generate_widget_javascript, org_slug, org_data, config)
+    else:
+        body = await run_in_threadpool(render_iframe_html, org_data, config)
+
+    rendered = (body, widget_etag(kind, org_slug, config_key, data_version(org_data)))
+    _renders.set(render_key, rendered, tags=[organization_tag(org_data.organization_id)])
+    return rendered
+
+
+# ============================================================
+# EMBED COUNTS & WARMING
+# ============================================================
+
+def record_widget_request(kind: WidgetKind, org_slug: str, config: WidgetConfig) -> None:
+    """Count a served widget; counts are written by flush_widget_embed_counts()."""
+    key = (org_slug, kind, widget_config_key(config))
+    with _embed_lock:
+        if key in _embed_counts or len(_embed_counts) < EMBED_COUNT_MAX_KEYS:
+            _embed_counts[key] += 1
+
+
+def _most_requested_configs(counts: dict[tuple[str, str, str], int]) -> dict[tuple[str, str, str], int]:
+    """Keep the EMBED_COUNT_MAX_CONFIGS most requested configurations of each widget."""
+    by_widget: defaultdict[tuple[str, str], list] = defaultdict(list)
+    for key, requests in counts.items():
+        by_widget[key[:2]].append((requests, key))
+    return {
+        key: requests
+        for entries in by_widget.values()
+        for requests, key in sorted(entries, reverse=True)[:EMBED_COUNT_MAX_CONFIGS]
+    }
+
+
+def flush_widget_embed_counts() -> int:
+    """
+    Add the counted requests to widget_embed_counts. Returns number of rows written.
+
+    Each widget keeps at most EMBED_COUNT_MAX_CONFIGS rows, the most requested.
+    """
+    with _embed_lock:
+        counted = dict(_embed_counts)
+        _embed_counts.clear()
+    pending = _most_requested_configs(counted)
+    if not pending:
+        return 0
+
+    try:
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                '''
+                INSERT INTO widget_embed_counts (organization_slug, kind, config_key, request_count, last_requested_at)
+                SELECT t.slug, t.kind, t.config_key, t.requests, now()
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::bigint[])
+                    AS t(slug, kind, config_key, requests)
+                ON CONFLICT (organization_slug, kind, config_key) DO UPDATE SET
+                    request_count = widget_embed_counts.request_count + EXCLUDED.request_count,
+                    last_requested_at = EXCLUDED.last_requested_at
+                ''',
+                (
+                    [key[0] for key in pending],
+                    [key[1] for key in pending],
+                    [key[2] for key in pending],
+                    list(pending.values()),
+                )
+            )
+            cur.execute(
+                '''
+                DELETE FROM widget_embed_counts c
+                USING (
+                    SELECT organization_slug, kind, config_key,
+                           row_number() OVER (
+                               PARTITION BY organization_slug, kind
+                               ORDER BY request_count DESC, last_requested_at DESC
+                           ) AS position
+                    FROM widget_embed_counts
+                    WHERE organization_slug = ANY(%s::text[])
+                ) ranked
+                WHERE c.organization_slug = ranked.organization_slug
+                  AND c.kind = ranked.kind
+                  AND c.config_key = ranked.config_key
+                  AND ranked.position > %s
+                ''',
+                (sorted({key[0] for key in pending}), EMBED_COUNT_MAX_CONFIGS),
+            )
+            cur.execute(
+                'DELETE FROM widget_embed_counts WHERE last_requested_at < now() - %s::interval',
+                (EMBED_COUNT_RETENTION,),
+            )
+            conn.commit()
+    except Exception:
+        # Keep the counts for the next run
+        with _embed_lock:
+            _embed_counts.update(counted)
+        raise
+    return len(pending)
+
+
+def _most_embedded_widgets(limit: int) -> list[dict]:
+    with get_connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            '''
+            SELECT organization_slug, kind, config_key
+            FROM widget_embed_counts
+            WHERE last_requested_at > now() - %s::interval
+            ORDER BY request_count DESC
+            LIMIT %s
+            ''',
+            (EMBED_COUNT_RETENTION, limit)
+        )
+        return cur.fetchall()
+
+
+async def warm_widget_renders(limit: Optional[int] = None) -> int:
+    """
+    Render the most requested widgets into the render cache.
+
+    Returns number of widgets rendered.
+    """
+    limit = settings.widget_warm_limit if limit is None else limit
+    if limit <= 0:
+        return 0
+
+    try:
+        rows = await run_in_threadpool(_most_embedded_widgets, limit)
+    except Exception as e:
+        logger.error(f"[widgets] Could not load widgets to warm: {e}")
+        return 0
+
+    warmed = 0
+    for row in rows:
+        try:
+            await render_widget(row['kind'], row['organization_slug'], config_from_key(row['config_key']))
+            warmed += 1
+        except Exception as e:
+            logger.debug(f"[widgets] Skipped warming {row['organization_slug']}: {e}")
+    logger.info(f"[widgets] Warmed {warmed} widget renders")
+    return warmed
+
+
 # ============================================================
 # EMBED CODE GENERATION
 # ============================================================
@@ -1,9 +1,20 @@
-"""GeoIP lookup utility using MaxMind GeoLite2 database."""
+"""
+GeoIP lookup utility using MaxMind GeoLite2 database.
+
+The database is opened with maxminddb in MODE_MMAP and read as raw records
+(the geoip2 object model is not needed for country/city). Results are kept
+in a per-process LRU keyed by the network prefix MaxMind returned, so one
+database read answers every address in that network, including "not found"
+ranges such as private networks.
+"""
 from __future__ import annotations
 
+import ipaddress
 import logging
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable
 
 from app.core.config import get_settings
 
@@ -14,13 +25,16 @@ _reader = None
 _reader_initialized = False
 
 
-@dataclass
+@dataclass(frozen=True)
 class GeoLocation:
     """Geographic location data."""
     country: str | None = None
     city: str | None = None
 
 
+_EMPTY = GeoLocation()
+
+
 def _get_reader():
     """Get or initialize the GeoIP reader."""
     global _reader, _reader_initialized
@@ -36,9 +50,11 @@ def _get_reader():
         return None
 
     try:
-        import geoip2.database
-        _reader = geoip2.database.Reader(settings.geoip_db_path)
+        import maxminddb
+        _reader = maxminddb.open_database(settings.geoip_db_path, maxminddb.MODE_MMAP)
         logger.info(f'GeoIP database loaded from {settings.geoip_db_path}')
+    except ImportError:
+        logger.warning('maxminddb is not installed, geo lookup disabled')
     except FileNotFoundError:
         logger.warning(f'GeoIP database not found at {settings.geoip_db_path}')
     except Exception as e:
@@ -47,6 +63,70 @@ def _get_reader():
     return _reader
 
 
+class GeoCache:
+    """LRU of lookup results keyed by (ip version, prefix length, network bits)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, int, int], GeoLocation] = OrderedDict()
+        # Prefix lengths seen per IP version, longest first
+        self._prefix_lengths: dict[int, list[int]] = {4: [], 6: []}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: int, bits: int, value: int) -> GeoLocation | None:
+        with self._lock:
+            for prefix_len in self._prefix_lengths[version]:
+                key = (version, prefix_len, value >> (bits - prefix_len))
+                location = self._entries.get(key)
+                if location is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return location
+            self.misses += 1
+            return None
+
+    def put(self, version: int, bits: int, value: int, prefix_len: int, location: GeoLocation) -> None:
+        with self._lock:
+            lengths = self._prefix_lengths[version]
+            if prefix_len not in lengths:
+                lengths.append(prefix_len)
+                lengths.sort(reverse=True)
+            self._entries[(version, prefix_len, value >> (bits - prefix_len))] = location
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._prefix_lengths = {4: [], 6: []}
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_cache = GeoCache(get_settings().geoip_cache_max_entries)
+
+
+def _location(record: dict | None) -> GeoLocation:
+    if not record:
+        return _EMPTY
+    country = (record.get('country') or record.get('registered_country') or {}).get('iso_code')
+    city = ((record.get('city') or {}).get('names') or {}).get('en')
+    return GeoLocation(country=country, city=city)
+
+
 def lookup_ip(ip: str) -> GeoLocation:
     """
     Look up geographic location for an IP address.
@@ -55,18 +135,43 @@ def lookup_ip(ip: str) -> GeoLocation:
     """
     reader = _get_reader()
     if not reader:
-        return GeoLocation()
+        return _EMPTY
 
     try:
-        response = reader.city(ip)
-        return GeoLocation(
-            country=response.country.iso_code,
-            city=response.city.name,
-        )
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        logger.debug(f'GeoIP lookup skipped for invalid IP {ip!r}')
+        return _EMPTY
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+
+    version, bits, value = address.version, address.max_prefixlen, int(address)
+    location = _cache.get(version, bits, value)
+    if location is not None:
+        return location
+
+    try:
+        # prefix_len is relative to the address family, also in IPv6 databases
+        record, prefix_len = reader.get_with_prefix_len(address)
     except Exception as e:
-        # Common errors: AddressNotFoundError for private IPs, invalid IPs, etc.
         logger.debug(f'GeoIP lookup failed for {ip}: {e}')
-        return GeoLocation()
+        return _EMPTY
+    location = _location(record)
+    _cache.put(version, bits, value, prefix_len, location)
+    return location
+
+
+def lookup_ips(ips: Iterable[str]) -> dict[str, GeoLocation]:
+    """
+    Look up many IP addresses in one call.
+
+    Each distinct address is resolved once; returns a mapping for every input.
+    """
+    return {ip: lookup_ip(ip) for ip in dict.fromkeys(ips)}
+
+
+def get_geoip_stats() -> dict:
+    return {'enabled': _get_reader() is not None, **_cache.get_stats()}
 
 
 def parse_utm_params(query_string: str | None) -> dict[str, str | None]:
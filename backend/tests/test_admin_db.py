@@ -0,0 +1,39 @@
+"""
+Unit tests for admin table browsing
+
+Tests which orderings are paged by keyset cursor and which fall back to
+offset paging.
+"""
+
+import pytest
+
+from app.services.admin_db import _keyset_columns
+
+
+def _column(name, data_type, nullable=False):
+    return {'column_name': name, 'data_type': data_type, 'is_nullable': nullable}
+
+
+COLUMNS = [
+    _column('id', 'uuid'),
+    _column('created_at', 'timestamp with time zone'),
+    _column('title', 'text', nullable=True),
+    _column('opens_at', 'time without time zone'),
+    _column('payload', 'bytea'),
+]
+
+
+def test_keyset_is_order_column_then_primary_key():
+    assert _keyset_columns(COLUMNS, ['id'], 'created_at') == ['created_at', 'id']
+    assert _keyset_columns(COLUMNS, ['id'], 'id') == ['id']
+    assert _keyset_columns(COLUMNS, ['id'], None) == ['id']
+
+
+@pytest.mark.parametrize('order_by', ['title', 'opens_at', 'payload'])
+def test_nullable_or_unencodable_order_falls_back_to_offset(order_by):
+    assert _keyset_columns(COLUMNS, ['id'], order_by) == []
+
+
+def test_unencodable_primary_key_falls_back_to_offset():
+    assert _keyset_columns(COLUMNS, ['payload'], None) == []
+    assert _keyset_columns(COLUMNS, [], 'created_at') == []
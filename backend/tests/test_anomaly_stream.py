@@ -0,0 +1,160 @@
+"""
+Unit tests for streaming anomaly rule evaluation
+
+Tests sliding-window counters against brute-force recomputation, the
+geographic pairing rule, and edge-triggered alerting in the evaluator.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from app.services import anomaly_stream
+from app.services.anomaly_stream import (
+    AnomalyEvaluator,
+    QRState,
+    Scan,
+    SlidingWindow,
+    distance_km,
+    evaluate_rule,
+)
+
+HOUR = 3600
+
+
+def _rule(rule_type, severity='high', **params):
+    return {'id': f'rule-{rule_type}', 'rule_name': rule_type, 'rule_type': rule_type,
+            'severity': severity, 'parameters': params}
+
+
+def _state(*windows):
+    return QRState(organization_id='org-1', windows={w: SlidingWindow(w) for w in windows},
+                   synced_at=time.monotonic())
+
+
+class TestSlidingWindow:
+    """Incremental counters match a recomputation over the window"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        window = SlidingWindow(HOUR)
+        window.devices_over(2)  # threshold tracked from the start
+        scans = []
+        at = 0.0
+        for _ in range(2000):
+            at += rng.uniform(0, 30)
+            scan = Scan(at=at, device=f'd{rng.randint(0, 40)}' if rng.random() < 0.9 else None,
+                        is_vpn=rng.random() < 0.1, is_tor=rng.random() < 0.05)
+            scans.append(scan)
+            window.expire(at)
+            window.add(scan)
+
+            live = [s for s in scans if s.at >= at - HOUR]
+            devices = Counter(s.device for s in live if s.device)
+            assert window.total == len(live)
+            assert window.vpn == sum(s.is_vpn for s in live)
+            assert window.tor == sum(s.is_tor for s in live)
+            assert dict(window.devices) == dict(devices)
+            assert window.devices_over(2) == sum(1 for c in devices.values() if c > 2)
+        # A threshold seen for the first time is computed from the counters
+        assert window.devices_over(5) == sum(1 for c in devices.values() if c > 5)
+
+
+class TestGeographicSpread:
+    """Consecutive located scans are paired as in detect_geographic_impossibility()"""
+
+    def test_far_pairs_expire_with_earlier_scan(self):
+        state = _state(HOUR)
+        moscow, vladivostok = (55.75, 37.62), (43.12, 131.89)
+        state.add(Scan(at=0, latitude=moscow[0], longitude=moscow[1]))
+        state.add(Scan(at=10))  # not located: no pair
+        state.add(Scan(at=20, latitude=vladivostok[0], longitude=vladivostok[1]))
+        state.add(Scan(at=30, latitude=vladivostok[0], longitude=vladivostok[1]))
+
+        window = state.windows[HOUR]
+        details = evaluate_rule(_rule('geographic_spread', max_distance_km=500, window_hours=1), window)
+        assert details['impossible_pairs'] == 1
+        assert abs(details['max_distance_km'] - distance_km(*moscow, *vladivostok)) < 1e-6
+
+        window.expire(HOUR + 5)  # the Moscow scan left the window
+        assert evaluate_rule(_rule('geographic_spread', max_distance_km=500, window_hours=1), window) is None
+
+
+class TestEvaluateRule:
+    """Rule parameters and details mirror the SQL implementation"""
+
+    def test_rule_types(self):
+        window = SlidingWindow(24 * HOUR)
+        for n in range(12):
+            window.add(Scan(at=n, device='same', is_datacenter=n % 2 == 0))
+
+        assert evaluate_rule(_rule('velocity', max_scans=10), window) == {'scan_count': 12, 'threshold': 10}
+        assert evaluate_rule(_rule('device_diversity', unique_devices_threshold=1), window) is None
+        assert evaluate_rule(_rule('network_anomaly', threshold_percent=20), window) == {
+            'suspicious_percent': 50.0, 'vpn_count': 0, 'datacenter_count': 6, 'tor_count': 0,
+        }
+        assert evaluate_rule(_rule('device_repetition', max_scans_per_device=10), window) == {
+            'repetitive_devices': 1, 'max_scans': 12,
+        }
+        assert evaluate_rule({**_rule('velocity'), 'parameters': '{"max_scans": 20}'}, window) is None
+
+
+class TestAnomalyEvaluator:
+    """State is rebuilt once, then updated per scan; alerts fire on rising edges"""
+
+    def _evaluator(self, rules):
+        evaluator = AnomalyEvaluator(max_codes=10, rules_ttl=60, resync_seconds=300)
+        patch.object(evaluator, 'rules_for', return_value=rules).start()
+        patch.object(evaluator, '_organization_of', return_value='org-1').start()
+        return evaluator
+
+    def test_observe_counts_each_scan_once_and_alerts_once(self):
+        evaluator = self._evaluator([_rule('velocity', max_scans=2, window_hours=1)])
+        rebuilt = _state(float(HOUR))
+        with patch.object(evaluator, '_load_state', return_value=rebuilt) as load:
+            now = 1_000_000.0
+            rebuilt.add(Scan(at=now))  # first row is already committed when state is built
+            with patch('app.services.anomaly_stream.time.time', return_value=now + 5):
+                results = [evaluator.observe('qr-1', {'created_at': now + i}) for i in range(4)]
+        patch.stopall()
+
+        load.assert_called_once()
+        assert [r.anomalies_detected for r, _ in results] == [0, 0, 1, 1]
+        assert [len(new) for _, new in results] == [0, 0, 1, 0]
+        assert results[-1][0].anomalies[0]['details'] == {'scan_count': 4, 'threshold': 2}
+        assert evaluator.organization_for('qr-1') == 'org-1'
+
+    def test_new_rule_window_triggers_rebuild(self):
+        evaluator = self._evaluator([_rule('velocity', window_hours=2)])
+        evaluator._states['qr-1'] = _state(float(HOUR))
+        with patch.object(evaluator, '_load_state', return_value=_state(float(2 * HOUR))) as load:
+            evaluator.check('qr-1', 'org-1')
+        patch.stopall()
+
+        load.assert_called_once_with('qr-1', 'org-1', {2.0 * HOUR})
+
+    def test_rebuild_does_not_block_other_codes(self):
+        evaluator = self._evaluator([_rule('velocity', window_hours=1)])
+        fast = next(f'qr-{i}' for i in range(100)
+                    if evaluator._code_lock(f'qr-{i}') is not evaluator._code_lock('qr-slow'))
+        evaluator._states[fast] = _state(float(HOUR))
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_load(*args):
+            loading.set()
+            release.wait(5)
+            return _state(float(HOUR))
+
+        with patch.object(evaluator, '_load_state', side_effect=slow_load):
+            worker = threading.Thread(target=evaluator.observe, args=('qr-slow', {'created_at': 0.0}))
+            worker.start()
+            assert loading.wait(5)
+            assert evaluator.check(fast, 'org-1').rules_checked == 1
+            release.set()
+            worker.join(5)
+        patch.stopall()
+
+    def test_stats(self):
+        assert set(anomaly_stream.get_anomaly_stream_stats()) >= {'scans', 'rebuilds', 'tracked_codes'}
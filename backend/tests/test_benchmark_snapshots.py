@@ -0,0 +1,141 @@
+"""
+Unit tests for category benchmark snapshots
+
+Tests snapshot averages and percentiles against a direct computation over
+the peer organizations, category matching, and incremental syncs that only
+drop the snapshots of changed organizations.
+"""
+
+import random
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from unittest.mock import patch
+
+from app.services.benchmark_snapshots import BenchmarkStore, CategorySnapshot, OrgVector
+
+
+def _vector(ratings, responses=0, category='Молочная продукция', tags=None, response_hours=None):
+    total = len(ratings)
+    rating = Decimal(sum(ratings)) / total if total else None
+    return OrgVector(
+        category=category,
+        tags=tags,
+        total_reviews=total,
+        rating=rating,
+        avg_rating=rating.quantize(Decimal('0.01'), ROUND_HALF_UP) if rating is not None else None,
+        reviews_with_response=responses,
+        avg_response_time_hours=Decimal(response_hours) if response_hours is not None else None,
+    )
+
+
+def _reference(peers, org):
+    """What the per-request SQL computed over the peer list"""
+    reviewed = [v for v in peers if v.total_reviews]
+    q = lambda value: float(Decimal(value).quantize(Decimal('0.01'), ROUND_HALF_UP))  # noqa: E731
+    averages = {
+        'avg_rating': q(sum(v.avg_rating for v in reviewed) / len(reviewed)),
+        'avg_reviews': q(Decimal(sum(v.total_reviews for v in reviewed)) / len(reviewed)),
+        'avg_response_rate': q(sum(v.response_rate for v in reviewed) / len(reviewed)),
+        'total_reviews': sum(v.total_reviews for v in reviewed),
+    }
+    value = float(org.avg_rating)
+    percentiles = {
+        'rating': int(sum(1 for v in reviewed if v.rating < value) / len(peers) * 100),
+        'reviews': int(sum(1 for v in reviewed if v.total_reviews < org.total_reviews) / len(peers) * 100),
+        'response_rate': int(sum(1 for v in reviewed if v.response_rate < org.response_rate) / len(peers) * 100),
+    }
+    return averages, percentiles
+
+
+class TestCategorySnapshot:
+    """Averages and percentiles match the direct computation, excluding the organization"""
+
+    def test_matches_direct_computation(self):
+        rng = random.Random(3)
+        vectors = {}
+        for n in range(200):
+            ratings = [rng.randint(1, 5) for _ in range(rng.choice([0, 1, 3, 10, 40]))]
+            vectors[f'org-{n}'] = _vector(ratings, responses=rng.randint(0, len(ratings)))
+        snapshot = CategorySnapshot(vectors)
+
+        for org_id in ('org-1', 'org-2', 'org-50'):
+            org = vectors[org_id]
+            if not org.total_reviews:
+                continue
+            peers = [v for k, v in vectors.items() if k != org_id]
+            averages, percentiles = _reference(peers, org)
+
+            result = snapshot.averages(exclude=org_id)
+            assert {k: result[k] for k in averages} == averages
+            metrics = org.as_metrics()
+            assert snapshot.percentile('rating', metrics['avg_rating'], org_id) == percentiles['rating']
+            assert snapshot.percentile('reviews', float(metrics['total_reviews']), org_id) == percentiles['reviews']
+            assert snapshot.percentile('response_rate', metrics['response_rate'], org_id) == percentiles['response_rate']
+            assert snapshot.peers(org_id) == 199
+
+    def test_no_reviewed_peers(self):
+        snapshot = CategorySnapshot({'org-1': _vector([4]), 'org-2': _vector([])})
+        assert snapshot.averages(exclude='org-1')['avg_rating'] is None
+        assert snapshot.percentile('rating', 5.0, 'org-1') == 0
+        assert snapshot.percentile('rating', 5.0, 'org-3') == 50
+        assert snapshot.percentile('rating', None, 'org-1') is None
+
+    def test_response_time_average(self):
+        snapshot = CategorySnapshot({
+            'org-1': _vector([5], response_hours='2.50'),
+            'org-2': _vector([4], response_hours='3.25'),
+            'org-3': _vector([3]),
+        })
+        assert snapshot.averages(exclude='org-1')['avg_response_time_hours'] == 3.25
+        assert snapshot.averages(exclude='org-9')['avg_response_time_hours'] == 2.88
+
+
+class TestCategoryMatching:
+    """Categories match like ILIKE '%category%' on category or tags"""
+
+    def test_in_category(self):
+        vector = _vector([5], category='Молочная продукция', tags='сыр, йогурт')
+        assert vector.in_category('молочная')
+        assert vector.in_category('СЫР')
+        assert vector.in_category(None)
+        assert not vector.in_category('мясо')
+
+
+class TestBenchmarkStore:
+    """Syncs re-read changed organizations and drop only affected snapshots"""
+
+    def _store(self):
+        store = BenchmarkStore(refresh_seconds=3600, sync_seconds=60, max_categories=10)
+        store._vectors = {
+            'org-1': _vector([5], category='Мясо'),
+            'org-2': _vector([4], category='Молоко'),
+        }
+        store._loaded_at = store._synced_at = 0.0
+        store._watermark = datetime(2026, 10, 16, tzinfo=timezone.utc)
+        return store
+
+    def test_apply_changes_drops_affected_snapshots(self):
+        store = self._store()
+        for category in ('Мясо', 'Молоко', None):
+            store.snapshot(category)
+
+        store.apply_changes(['org-2'], {'org-2': _vector([1, 2], category='Молоко')})
+
+        assert set(store._snapshots) == {'Мясо'}
+        assert store.snapshot(None).reviewed == 2
+        assert store.snapshot('Молоко').distributions['reviews'] == [2]
+
+    def test_sync_removes_organizations_no_longer_verified(self):
+        store = self._store()
+        with patch('app.services.benchmark_snapshots.get_connection') as get_connection, \
+                patch('app.services.benchmark_snapshots.time.monotonic', return_value=100.0):
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            synced_at = datetime(2026, 10, 16, 0, 1, tzinfo=timezone.utc)
+            cur.fetchone.return_value = {'synced_at': synced_at, 'organization_ids': ['org-1']}
+            cur.fetchall.return_value = []
+            store.ensure_fresh()
+
+        assert store.vector('org-1') is None
+        assert store._watermark == synced_at
+        assert cur.execute.call_args_list[1].args[1] == (['org-1'],)
+        assert store.get_stats()['syncs'] == 1
@@ -0,0 +1,194 @@
+"""
+Unit tests for the streaming bulk import pipeline
+
+Tests row preparation, in-chunk duplicate handling, chunk writes and
+resuming a job after its last committed chunk.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from app.services import import_pipeline
+from app.services.import_pipeline import (
+    PreparedRow,
+    _dedupe_rows,
+    _iter_chunks,
+    _prepare_chunks,
+    prepare_rows,
+    write_chunk,
+)
+
+
+MAPPING = {
+    'Наименование': 'name',
+    'Цена': 'price',
+    'Остаток': 'stock_quantity',
+    'Фото': 'main_image_url',
+    'Галерея': 'gallery_urls',
+}
+
+
+def _raw(name, price='100,50', stock=None, **extra):
+    row = {'Наименование': name, 'Цена': price, 'Остаток': stock}
+    row.update(extra)
+    return row
+
+
+class TestPrepareRows:
+    """Mapping and validation run without database access"""
+
+    def test_valid_and_invalid_rows(self):
+        rows = [
+            (1, _raw('Мёд липовый', stock='5', Фото='https://img/1.jpg', Галерея='https://a; https://b')),
+            (2, _raw('', price='10')),
+            (3, _raw('Сыр', price='-5')),
+            (4, _raw('Квас', stock='много')),
+        ]
+        prepared, invalid = prepare_rows(rows, MAPPING, download_images=True)
+
+        assert invalid == 3
+        assert len(prepared) == 1
+        row = prepared[0]
+        assert row.row_number == 1
+        assert row.slug == 'med-lipovyi'
+        assert row.price_cents == 10050
+        assert row.stock_quantity == 5
+        assert row.images == [
+            ('https://img/1.jpg', 'main', 0),
+            ('https://a', 'gallery', 0),
+            ('https://b', 'gallery', 1),
+        ]
+
+    def test_images_skipped_when_not_downloading(self):
+        prepared, _ = prepare_rows([(1, _raw('Мёд', Фото='https://img/1.jpg'))], MAPPING, download_images=False)
+        assert prepared[0].images == []
+
+
+class TestChunking:
+    """Chunks are numbered from the file start and prepared in order"""
+
+    def test_skips_committed_rows(self):
+        rows = [{'n': i} for i in range(1, 8)]
+        chunks = list(_iter_chunks(rows, 3, skip_until=2))
+        assert [[n for n, _ in chunk] for chunk in chunks] == [[3, 4, 5], [6, 7]]
+
+    def test_process_pool_matches_inline(self):
+        rows = [_raw(f'Товар {i}', price='-1' if i % 5 == 0 else '10') for i in range(1, 41)]
+
+        def prepared(workers):
+            return [
+                (last_row, [r.slug for r in rows_], invalid)
+                for last_row, rows_, invalid in _prepare_chunks(_iter_chunks(rows, 7), MAPPING, False, workers)
+            ]
+
+        assert prepared(2) == prepared(1)
+
+
+class TestDedupeRows:
+    """Slug collisions inside a chunk follow the job duplicate settings"""
+
+    def _rows(self):
+        return [
+            PreparedRow(row_number=1, slug='med', name='Мёд', price_cents=100, images=[('u1', 'main', 0)]),
+            PreparedRow(row_number=2, slug='med', name='Мёд', stock_quantity=3, images=[('u2', 'main', 0)]),
+        ]
+
+    def test_update_existing_merges(self):
+        rows, merged, skipped = _dedupe_rows(self._rows(), skip_duplicates=True, update_existing=True)
+        assert (len(rows), merged, skipped) == (1, 1, 0)
+        assert (rows[0].price_cents, rows[0].stock_quantity) == (100, 3)
+        assert [image[0] for image in rows[0].images] == ['u1', 'u2']
+
+    def test_skip_duplicates(self):
+        rows, merged, skipped = _dedupe_rows(self._rows(), skip_duplicates=True, update_existing=False)
+        assert (len(rows), merged, skipped) == (1, 0, 1)
+
+    def test_suffixes_slug(self):
+        rows, _, _ = _dedupe_rows(self._rows(), skip_duplicates=False, update_existing=False)
+        assert rows[0].slug == 'med'
+        assert rows[1].slug.startswith('med-')
+
+
+class TestWriteChunk:
+    """Set-based upsert through the staging table"""
+
+    def test_counts_and_image_queue(self):
+        rows = [
+            PreparedRow(row_number=1, slug='a', name='A', images=[('https://a', 'main', 0)]),
+            PreparedRow(row_number=2, slug='b', name='B', images=[('https://b', 'main', 0)]),
+            PreparedRow(row_number=3, slug='c', name='C'),
+        ]
+        job = {'id': 'job-1', 'organization_id': 'org-1', 'created_by': 'user-1',
+               'skip_duplicates': True, 'update_existing': False}
+        cur = MagicMock()
+        cur.rowcount = 1  # one staged row already exists
+        cur.fetchall.return_value = [{'id': rows[0].id}]
+        copies = [MagicMock(), MagicMock()]
+        cur.copy.return_value.__enter__.side_effect = copies
+
+        result = write_chunk(cur, job, rows)
+
+        assert (result.successful, result.failed, result.images) == (1, 2, 1)
+        assert copies[0].write_row.call_count == 3
+        copies[1].write_row.assert_called_once_with(('job-1', rows[0].id, 'https://a', 'main', 0))
+
+
+class TestRunImport:
+    """Jobs resume after last_committed_row and stop when cancelled"""
+
+    def _job(self, **overrides):
+        job = {
+            'id': 'job-1',
+            'organization_id': 'org-1',
+            'created_by': 'user-1',
+            'source_type': 'generic_csv',
+            'source_filename': 'goods.csv',
+            'field_mapping': MAPPING,
+            'download_images': False,
+            'total_rows': 5,
+            'last_committed_row': 2,
+            'successful_rows': 2,
+            'failed_rows': 0,
+        }
+        job.update(overrides)
+        return job
+
+    def _run(self, job, save_progress=True):
+        parser = MagicMock()
+        parser.iter_rows.return_value = [_raw(f'Товар {i}') for i in range(1, 6)]
+        chunk = import_pipeline.ChunkResult(successful=1)
+        with patch.object(import_pipeline.settings, 'import_chunk_size', 2), \
+                patch('app.services.import_pipeline._claim_job', return_value=job), \
+                patch('app.services.import_pipeline.os.path.exists', return_value=True), \
+                patch('app.services.import_pipeline.os.unlink'), \
+                patch('app.services.import_pipeline.get_parser', return_value=parser), \
+                patch('app.services.import_pipeline.get_connection') as get_connection, \
+                patch('app.services.import_pipeline.write_chunk', return_value=chunk) as write, \
+                patch('app.services.import_pipeline._save_progress', return_value=save_progress) as save, \
+                patch('app.services.import_pipeline._finish_job', return_value={'status': 'completed'}) as finish:
+            result = import_pipeline.run_import('job-1')
+        conn = get_connection.return_value.__enter__.return_value
+        return result, write, save, finish, conn
+
+    def test_resumes_after_last_committed_row(self):
+        result, write, save, finish, conn = self._run(self._job())
+
+        assert result == {'status': 'completed'}
+        assert [[r.row_number for r in c.args[2]] for c in write.call_args_list] == [[3, 4], [5]]
+        assert [c.args[2:] for c in save.call_args_list] == [(4, 3, 0), (5, 4, 0)]
+        assert conn.commit.call_count == 2
+        finish.assert_called_once_with('job-1', 'completed')
+
+    def test_cancelled_job_stops_and_rolls_back(self):
+        result, write, save, finish, conn = self._run(self._job(last_committed_row=0), save_progress=False)
+
+        assert result is None
+        assert write.call_count == 1
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+        finish.assert_not_called()
+
+    def test_job_leased_elsewhere_is_skipped(self):
+        with patch('app.services.import_pipeline._claim_job', return_value=None), \
+                patch('app.services.import_pipeline.get_parser') as get_parser:
+            assert import_pipeline.run_import('job-1') is None
+        get_parser.assert_not_called()
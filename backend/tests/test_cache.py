@@ -0,0 +1,124 @@
+"""
+Unit tests for the shared TTL cache
+
+Tests expiry, LRU eviction, tag invalidation across caches, counters, a
+swapped-in backend, and the product story cache invalidated by story edits.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import (
+    CacheBackend,
+    MemoryBackend,
+    TTLCache,
+    configure_backend,
+    invalidate_tags,
+    organization_tag,
+    product_tag,
+    story_tag,
+)
+from app.services import product_stories
+
+
+@pytest.fixture
+def caches():
+    created = []
+
+    def make(name, ttl_seconds=60, max_entries=100):
+        created.append(name)
+        return TTLCache(name, ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    yield make
+    for name in created:
+        cache_module._caches.pop(name, None)
+
+
+class TestTTLCache:
+    """Expiry, eviction and counters"""
+
+    def test_expiry(self, caches):
+        cache = caches('test-expiry', ttl_seconds=10)
+        with patch('app.core.cache.time.monotonic', return_value=100.0):
+            cache.set('a', {'v': 1})
+        with patch('app.core.cache.time.monotonic', return_value=109.0):
+            assert cache.get('a') == {'v': 1}
+        with patch('app.core.cache.time.monotonic', return_value=110.0):
+            assert cache.get('a') is None
+        assert cache.get_stats() == {
+            'hits': 1, 'misses': 1, 'invalidations': 0,
+            'evictions': 0, 'expirations': 1, 'entries': 0, 'tags': 0,
+        }
+
+    def test_lru_eviction(self, caches):
+        cache = caches('test-lru', max_entries=3)
+        for key in 'abc':
+            cache.set(key, key, tags=[organization_tag(key)])
+        cache.get('a')
+        cache.set('d', 'd')
+
+        assert cache.get('b') is None
+        assert [cache.get(key) for key in 'acd'] == ['a', 'c', 'd']
+        stats = cache.get_stats()
+        assert (stats['evictions'], stats['entries'], stats['tags']) == (1, 3, 2)
+
+    def test_none_is_not_cached(self, caches):
+        cache = caches('test-none')
+        cache.set('a', None)
+        assert cache.get_stats()['entries'] == 0
+
+
+class TestTagInvalidation:
+    """Tags drop entries in every cache without touching others"""
+
+    def test_invalidate_across_caches(self, caches):
+        pages, widgets = caches('test-pages'), caches('test-widgets')
+        pages.set('org:1', 'page', tags=[organization_tag('1'), product_tag('p1')])
+        pages.set('org:12', 'page', tags=[organization_tag('12')])
+        widgets.set('widget:1', 'widget', tags=[organization_tag('1')])
+
+        assert invalidate_tags(organization_tag('1')) == 2
+        assert pages.get('org:1') is None and widgets.get('widget:1') is None
+        assert pages.get('org:12') == 'page'
+        # The product tag went with the entry
+        assert pages.invalidate(product_tag('p1')) == 0
+        assert pages.get_stats()['invalidations'] == 1
+
+    def test_story_edit_drops_product_story(self):
+        product_stories._cache.clear()
+        product_stories._cache.set('story:product:p1:False', {'id': 's1'},
+                                   tags=[product_tag('p1'), story_tag('s1')])
+        product_stories._invalidate_cache(story_tag('s1'))
+        assert product_stories._cache.get('story:product:p1:False') is None
+
+
+class TestBackend:
+    """A different store can be plugged in for all caches"""
+
+    def test_configure_backend(self, caches):
+        cache = caches('test-backend')
+        cache.set('a', 1)
+        created = []
+
+        def factory(name, max_entries):
+            created.append(name)
+            return MemoryBackend(max_entries)
+
+        try:
+            configure_backend(factory)
+            assert 'test-backend' in created
+            assert cache.get('a') is None
+            cache.set('a', 2)
+            assert cache.get('a') == 2
+        finally:
+            configure_backend(cache_module._memory_backend)
+
+    def test_incomplete_backend_fails_on_instantiation(self):
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return cache_module.MISSING
+
+        with pytest.raises(TypeError):
+            GetOnly()
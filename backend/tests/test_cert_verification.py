@@ -0,0 +1,136 @@
+"""
+Unit tests for certificate registry verification
+
+Tests the token bucket rate limiter, caching of registry answers (and
+not failures) by certificate number, and concurrent verification per registry in the
+scheduler.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services import cert_verification_api
+from app.services.cert_verification_api import (
+    CertificationVerificationService,
+    RateLimiter,
+    RegistryMatch,
+    RegistryType,
+    TokenBucket,
+    VerificationRequest,
+    VerificationResult,
+)
+from app.services.cert_verification_scheduler import VerificationJob, VerificationScheduler
+
+
+@pytest.fixture(autouse=True)
+def clear_registry_cache():
+    cert_verification_api._registry_responses.clear()
+    yield
+    cert_verification_api._registry_responses.clear()
+
+
+def _request(number, code='gost_r'):
+    return VerificationRequest(certificate_number=number, certification_type_code=code)
+
+
+class TestTokenBucket:
+    """Bursts up to capacity, then the sustained rate"""
+
+    def test_burst_then_rate(self):
+        with patch('app.services.cert_verification_api.time.monotonic', return_value=100.0):
+            bucket = TokenBucket(rate_per_minute=60, capacity=3)
+            assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+            assert bucket.try_acquire() == pytest.approx(1.0)
+        with patch('app.services.cert_verification_api.time.monotonic', return_value=101.5):
+            assert bucket.try_acquire() == 0
+            assert bucket.try_acquire() == pytest.approx(0.5)
+        with patch('app.services.cert_verification_api.time.monotonic', return_value=1000.0):
+            assert [bucket.try_acquire() for _ in range(4)][-1] > 0
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_sized_per_registry(self):
+        limiter = RateLimiter()
+        with patch('app.services.cert_verification_api.time.monotonic', return_value=50.0):
+            burst = cert_verification_api.REGISTRY_ENDPOINTS[RegistryType.ROSACCREDITATION]['burst']
+            for _ in range(burst):
+                assert await limiter.check_rate_limit(RegistryType.ROSACCREDITATION) == (True, None)
+            assert await limiter.check_rate_limit(RegistryType.ROSACCREDITATION) == (False, 1)
+            # Registries without configured limits are not limited
+            assert await limiter.check_rate_limit(RegistryType.ORGANIC_RU) == (True, None)
+
+
+class TestRegistryCache:
+    """Registry answers are reused by certificate number"""
+
+    @pytest.mark.asyncio
+    async def test_answers_are_cached(self):
+        service = CertificationVerificationService()
+        match = RegistryMatch(
+            registry_id='r1', certificate_number='RU-1', organization_name='Ферма',
+            status='valid', issuing_body='ФСА',
+        )
+        registry = AsyncMock(side_effect=lambda registry_type, request: match if request.certificate_number == 'RU-1' else None)
+        with patch.object(service, '_verify_with_retry', registry), \
+                patch.object(service, '_update_certification_verification', AsyncMock()) as update:
+            first = await service.verify_certificate('c1', _request('RU-1'))
+            second = await service.verify_certificate('c2', _request('RU-1'))
+            missing = await service.verify_certificate('c3', _request('RU-2'))
+            again = await service.verify_certificate('c4', _request('RU-2'))
+
+        assert registry.await_count == 2
+        assert first.result == second.result == VerificationResult.VERIFIED
+        assert [call.kwargs['certification_id'] for call in update.await_args_list] == ['c1', 'c2']
+        assert missing.result == again.result == VerificationResult.NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_registry_failures_are_not_cached(self):
+        service = CertificationVerificationService()
+        request = httpx.Request('GET', 'https://registry')
+        registry = AsyncMock(side_effect=[
+            httpx.ConnectTimeout('timed out', request=request),
+            httpx.HTTPStatusError('too many', request=request, response=httpx.Response(429, request=request)),
+            None,
+        ])
+        with patch.object(service, '_verify_with_retry', registry):
+            failed = await service.verify_certificate('c1', _request('RU-3'))
+            limited = await service.verify_certificate('c1', _request('RU-3'))
+            answered = await service.verify_certificate('c1', _request('RU-3'))
+
+        assert registry.await_count == 3
+        assert failed.result == VerificationResult.ERROR
+        assert limited.result == VerificationResult.RATE_LIMITED
+        assert answered.result == VerificationResult.NOT_FOUND
+
+
+class TestVerificationScheduler:
+    """Registries are verified concurrently with bounded workers each"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_per_registry(self):
+        service = CertificationVerificationService()
+        active: dict = {}
+        peak: dict = {}
+
+        async def verify(registry_type, request):
+            active[registry_type] = active.get(registry_type, 0) + 1
+            peak[registry_type] = max(peak.get(registry_type, 0), active[registry_type])
+            await asyncio.sleep(0.01)
+            active[registry_type] -= 1
+            return None
+
+        jobs = [VerificationJob(f'g{n}', _request(f'G-{n}')) for n in range(10)]
+        jobs += [VerificationJob(f'i{n}', _request(f'I-{n}', 'iso_9001')) for n in range(4)]
+        jobs.append(VerificationJob('x', _request('X-1', 'unknown')))
+
+        with patch.object(service, '_verify_with_retry', side_effect=verify), \
+                patch.object(service.rate_limiter, 'acquire', AsyncMock()) as acquire:
+            results = await VerificationScheduler(service, concurrency=3).run(jobs)
+
+        assert [job.certification_id for job, _ in results] == [job.certification_id for job in jobs]
+        assert peak == {RegistryType.ROSACCREDITATION: 3, RegistryType.IAF_CERTSEARCH: 3}
+        assert acquire.await_count == 14
+        assert results[-1][1].result == VerificationResult.ERROR
+        assert {r.result for _, r in results[:-1]} == {VerificationResult.NOT_FOUND}
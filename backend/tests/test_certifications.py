@@ -0,0 +1,113 @@
+"""
+Unit tests for certification data access
+
+Tests that concurrent product certification lookups are coalesced into one
+query, that load errors reach every waiting caller, and that certification
+search pages attach certifications with a single batched lookup.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.certifications import CertificationSearchFilters
+from app.services.certifications import BatchLoader, CertificationService
+
+
+def _certification_row(cert_id, expiry_date=None):
+    return {
+        'id': cert_id,
+        'certification_types': {
+            'id': 'type-1', 'code': 'organic_ru', 'name_ru': 'Органик',
+            'name_en': 'Organic', 'category': 'organic',
+        },
+        'certificate_number': f'N-{cert_id}',
+        'expiry_date': expiry_date,
+        'verification_status': 'verified',
+    }
+
+
+class TestBatchLoader:
+    """Concurrent lookups share batched loads"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_are_coalesced(self):
+        calls = []
+
+        async def load_many(keys):
+            calls.append(keys)
+            return {key: key * 2 for key in keys if key != 3}
+
+        loader = BatchLoader(load_many, max_batch_size=2, default=list)
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), loader.load(1), loader.load(3),
+        )
+
+        assert results == [2, 4, 2, []]
+        assert calls == [[1, 2], [3]]
+
+        assert await loader.load_many([4, 5]) == {4: 8, 5: 10}
+        assert calls[-1] == [4, 5]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        loader = BatchLoader(AsyncMock(side_effect=RuntimeError('db down')))
+        results = await asyncio.gather(loader.load('a'), loader.load('b'), return_exceptions=True)
+        assert [str(r) for r in results] == ['db down', 'db down']
+
+
+class TestProductCertifications:
+    """Product pages and search share one query per batch"""
+
+    @pytest.mark.asyncio
+    async def test_product_lookups_use_one_query(self):
+        rows = [
+            {'product_id': 'p1', 'row': _certification_row('c1', '2099-01-01')},
+            {'product_id': 'p2', 'row': _certification_row('c1', '2099-01-01')},
+            {'product_id': 'p2', 'row': _certification_row('c2')},
+        ]
+        with patch('app.services.certifications._fetch_rows', AsyncMock(return_value=rows)) as fetch:
+            service = CertificationService()
+            p1, p2, p3 = await asyncio.gather(
+                service.get_product_certifications('p1'),
+                service.get_product_certifications('p2'),
+                service.get_product_certifications('p3'),
+            )
+
+        fetch.assert_awaited_once()
+        assert fetch.await_args.args[1][0] == ['p1', 'p2', 'p3']
+        assert [c.id for c in p1] == ['c1'] and [c.id for c in p2] == ['c1', 'c2']
+        assert p3 == []
+        assert p1[0].is_valid and p1[0].certification_type.code == 'organic_ru'
+
+    @pytest.mark.asyncio
+    async def test_search_attaches_certifications_in_one_batch(self):
+        products = [
+            {'product_id': 'p1', 'product_name': 'Мёд', 'organization_id': 'o1', 'organization_name': 'Пасека'},
+            {'product_id': 'p2', 'product_name': 'Сыр', 'organization_id': 'o2', 'organization_name': 'Ферма'},
+        ]
+        cur = MagicMock()
+        cur.execute = AsyncMock()
+        cur.fetchone = AsyncMock(return_value={'total': 3})
+        cur.fetchall = AsyncMock(return_value=products)
+        conn = MagicMock()
+        conn.cursor.return_value.__aenter__.return_value = cur
+        connection = MagicMock()
+        connection.return_value.__aenter__.return_value = conn
+
+        certifications = {'p1': [], 'p2': []}
+        with patch('app.services.certifications.get_async_connection', connection), \
+                patch.object(CertificationService, '_load_product_certifications',
+                             AsyncMock(return_value=certifications)) as load:
+            service = CertificationService()
+            response = await service.search_by_certification(
+                CertificationSearchFilters(certification_types=['organic_ru']), page=1, page_size=2,
+            )
+
+        load.assert_awaited_once_with(['p1', 'p2'])
+        count_params = cur.execute.await_args_list[0].args[1]
+        assert count_params == [['organic_ru'], ['verified', 'auto_verified']]
+        assert cur.execute.await_args_list[1].args[1][-2:] == [2, 0]
+        assert [r.product_id for r in response.results] == ['p1', 'p2']
+        assert (response.total, response.has_more) == (3, True)
@@ -0,0 +1,83 @@
+"""
+Unit tests for the defect detection topic classifier
+
+Tests single-pass classification parity with per-keyword matching and the
+chunked classification write path.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from app.services.defect_detection import (
+    TopicClassifier,
+    _run_detection_worker,
+    classify_all_organization_reviews,
+)
+
+
+TOPICS = [
+    {'id': 't-quality', 'keywords': ['Брак', 'сломал', 'дефект']},
+    {'id': 't-taste', 'keywords': ['горьк', 'кислый', 'брак']},
+    {'id': 't-empty', 'keywords': []},
+]
+
+
+def _naive(topics, review_text):
+    matches = {}
+    for topic in topics:
+        matched = [kw for kw in topic['keywords'] if kw.lower() in review_text]
+        if matched:
+            matches[topic['id']] = matched
+    return matches
+
+
+class TestTopicClassifier:
+    """Test suite for TopicClassifier"""
+
+    def test_matches_per_keyword_loop(self):
+        classifier = TopicClassifier(TOPICS)
+        for text in [
+            'товар сломался через день, явный брак',
+            'горький и кислый вкус',
+            'всё отлично',
+            'дефектный брак, горьковато',
+            '',
+        ]:
+            assert classifier.classify(text) == _naive(TOPICS, text)
+
+    def test_keyword_shared_between_topics(self):
+        matches = TopicClassifier(TOPICS).classify('брак')
+        assert matches == {'t-quality': ['Брак'], 't-taste': ['брак']}
+
+
+class TestClassifyOrganizationReviews:
+    """Streaming classification writes one chunk at a time"""
+
+    def test_streams_and_writes_per_chunk(self):
+        reviews = [
+            {'id': 'r-1', 'title': 'Брак', 'body': None},
+            {'id': 'r-2', 'title': None, 'body': None},
+            {'id': 'r-3', 'title': 'ok', 'body': 'горький'},
+        ]
+        read_conn, write_conn = MagicMock(), MagicMock()
+        read_cur = read_conn.cursor.return_value.__enter__.return_value
+        read_cur.fetchmany.side_effect = [reviews[:2], reviews[2:], []]
+
+        connections = iter([read_conn, write_conn])
+        with patch('app.services.defect_detection.get_connection') as get_connection, \
+                patch('app.services.defect_detection._write_classifications') as write:
+            get_connection.return_value.__enter__.side_effect = lambda: next(connections)
+            classified = classify_all_organization_reviews('org-1', classifier=TopicClassifier(TOPICS))
+
+        assert classified == 3
+        assert write.call_count == 2
+        assert write.call_args_list[0].args[1] == [('r-1', 't-quality', ['Брак']), ('r-1', 't-taste', ['брак'])]
+        assert write.call_args_list[1].args[1] == [('r-3', 't-taste', ['горьк'])]
+        assert write_conn.commit.call_count == 2
+
+
+class TestDetectionWorker:
+    """Worker failures are reported per organization"""
+
+    def test_error_is_returned_not_raised(self):
+        with patch('app.services.defect_detection.run_daily_detection', side_effect=RuntimeError('db down')):
+            assert _run_detection_worker('org-1') == {'organization_id': 'org-1', 'error': 'db down'}
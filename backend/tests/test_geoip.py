@@ -0,0 +1,78 @@
+"""
+Unit tests for GeoIP lookups
+
+Tests the network-prefix LRU, address normalisation and the batch API
+against a stand-in for the MaxMind reader.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.utils import geoip
+from app.utils.geoip import GeoCache, GeoLocation, lookup_ip, lookup_ips
+
+
+MOSCOW = {'country': {'iso_code': 'RU'}, 'city': {'names': {'en': 'Moscow', 'ru': 'Москва'}}}
+
+
+@pytest.fixture
+def reader():
+    reader = MagicMock()
+    reader.get_with_prefix_len.return_value = (MOSCOW, 24)
+    with patch('app.utils.geoip._get_reader', return_value=reader), \
+            patch.object(geoip, '_cache', GeoCache(max_entries=100)):
+        yield reader
+
+
+class TestLookupIp:
+    """Lookups are answered from the prefix cache after the first read"""
+
+    def test_same_network_hits_cache(self, reader):
+        assert lookup_ip('203.0.113.7') == GeoLocation('RU', 'Moscow')
+        assert lookup_ip('203.0.113.200') == GeoLocation('RU', 'Moscow')
+        assert reader.get_with_prefix_len.call_count == 1
+
+        lookup_ip('203.0.114.1')  # outside the /24
+        assert reader.get_with_prefix_len.call_count == 2
+        stats = geoip.get_geoip_stats()
+        assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 2, 0.3333)
+
+    def test_not_found_ranges_are_cached(self, reader):
+        reader.get_with_prefix_len.return_value = (None, 8)
+        assert lookup_ip('10.1.2.3') == GeoLocation()
+        assert lookup_ip('10.200.0.1') == GeoLocation()
+        assert reader.get_with_prefix_len.call_count == 1
+
+    def test_ipv4_mapped_and_invalid_addresses(self, reader):
+        lookup_ip('::ffff:203.0.113.7')
+        assert str(reader.get_with_prefix_len.call_args.args[0]) == '203.0.113.7'
+        assert lookup_ip('not-an-ip') == GeoLocation()
+        assert reader.get_with_prefix_len.call_count == 1
+
+    def test_disabled_without_database(self):
+        with patch('app.utils.geoip._get_reader', return_value=None):
+            assert lookup_ip('203.0.113.7') == GeoLocation()
+
+
+class TestLookupIps:
+    """The batch API resolves each distinct address once"""
+
+    def test_batch(self, reader):
+        reader.get_with_prefix_len.return_value = (MOSCOW, 32)
+        result = lookup_ips(['203.0.113.7', '203.0.113.8', '203.0.113.7'])
+        assert list(result) == ['203.0.113.7', '203.0.113.8']
+        assert reader.get_with_prefix_len.call_count == 2
+
+
+class TestGeoCache:
+    """LRU bounded by entries"""
+
+    def test_evicts_least_recent(self):
+        cache = GeoCache(max_entries=2)
+        cache.put(4, 32, 1, 32, GeoLocation('A'))
+        cache.put(4, 32, 2, 32, GeoLocation('B'))
+        assert cache.get(4, 32, 1) == GeoLocation('A')
+        cache.put(4, 32, 3, 32, GeoLocation('C'))
+        assert cache.get(4, 32, 2) is None
+        assert cache.get(4, 32, 1) == GeoLocation('A')
@@ -0,0 +1,173 @@
+"""
+Unit tests for the import image ingestion worker
+
+Tests download classification, retry decisions, URL and content-hash
+deduplication and thumbnail rendering.
+"""
+
+import io
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.services import image_ingestion
+from app.services.image_ingestion import (
+    Asset,
+    FetchError,
+    HostLimiter,
+    fetch_image,
+    ingest_batch,
+    ingest_url,
+    render_image,
+    resolve_item,
+)
+
+
+def _png(size=(400, 300)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGBA', size, (200, 10, 10, 128)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+ASSET = Asset('abc123', 'https://storage/abc123.webp', 'https://storage/abc123_thumb.webp')
+
+
+class TestFetchImage:
+    """Download failures are classified as retryable or permanent"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('status_code,retryable', [(404, False), (403, False), (429, True), (503, True)])
+    async def test_http_errors(self, status_code, retryable):
+        async with _client(lambda request: httpx.Response(status_code)) as client:
+            with pytest.raises(FetchError) as error:
+                await fetch_image(client, 'https://cdn.example/1.jpg', HostLimiter(2))
+        assert error.value.retryable is retryable
+
+    @pytest.mark.asyncio
+    async def test_rejects_non_image_and_oversized(self):
+        html = lambda request: httpx.Response(200, headers={'content-type': 'text/html'}, content=b'<html>')
+        async with _client(html) as client:
+            with pytest.raises(FetchError, match='content type'):
+                await fetch_image(client, 'https://cdn.example/1.jpg', HostLimiter(2))
+
+        big = lambda request: httpx.Response(200, headers={'content-type': 'image/jpeg'}, content=b'x' * 100)
+        with patch.object(image_ingestion, 'MAX_IMAGE_SIZE', 10):
+            async with _client(big) as client:
+                with pytest.raises(FetchError, match='too large'):
+                    await fetch_image(client, 'https://cdn.example/1.jpg', HostLimiter(2))
+
+    @pytest.mark.asyncio
+    async def test_returns_body(self):
+        ok = lambda request: httpx.Response(200, headers={'content-type': 'image/png'}, content=b'png-bytes')
+        async with _client(ok) as client:
+            assert await fetch_image(client, 'https://cdn.example/1.png', HostLimiter(2)) == b'png-bytes'
+
+    def test_limiter_is_per_host(self):
+        limiter = HostLimiter(2)
+        assert limiter('https://a.example/1') is limiter('https://a.example/2')
+        assert limiter('https://a.example/1') is not limiter('https://b.example/1')
+
+
+class TestResolveItem:
+    """Retry decisions for queue rows"""
+
+    def test_completed(self):
+        result = resolve_item({'id': 'q-1'}, ASSET)
+        assert (result.status, result.asset) == ('completed', ASSET)
+
+    def test_retryable_backs_off_then_fails(self):
+        error = FetchError('HTTP 503', retryable=True)
+        with patch.object(image_ingestion.settings, 'image_ingest_max_retries', 2), \
+                patch.object(image_ingestion.settings, 'image_ingest_retry_delay_seconds', 10):
+            first = resolve_item({'id': 'q-1', 'retry_count': 0}, error)
+            second = resolve_item({'id': 'q-1', 'retry_count': 1}, error)
+            last = resolve_item({'id': 'q-1', 'retry_count': 2}, error)
+        assert (first.status, first.retry_delay) == ('pending', 10)
+        assert (second.status, second.retry_delay) == ('pending', 20)
+        assert (last.status, last.retry_delay) == ('failed', None)
+
+    def test_permanent_failure_is_not_retried(self):
+        result = resolve_item({'id': 'q-1', 'retry_count': 0}, FetchError('HTTP 404', retryable=False))
+        assert result.status == 'failed'
+
+
+class TestDeduplication:
+    """Each distinct URL is fetched once; each distinct content is stored once"""
+
+    @pytest.mark.asyncio
+    async def test_batch_downloads_each_unknown_url_once(self):
+        items = [
+            {'id': 'q-1', 'source_url': 'https://cdn/a.jpg', 'product_id': 'p-1', 'target_type': 'main'},
+            {'id': 'q-2', 'source_url': 'https://cdn/a.jpg', 'product_id': 'p-2', 'target_type': 'main'},
+            {'id': 'q-3', 'source_url': 'https://cdn/known.jpg', 'product_id': 'p-3', 'target_type': 'gallery'},
+        ]
+        with patch('app.services.image_ingestion.claim_items', AsyncMock(return_value=items)), \
+                patch('app.services.image_ingestion.lookup_source_urls',
+                      AsyncMock(return_value={'https://cdn/known.jpg': ASSET})), \
+                patch('app.services.image_ingestion.ingest_url', AsyncMock(return_value=ASSET)) as ingest, \
+                patch('app.services.image_ingestion.write_results', new_callable=AsyncMock) as write:
+            assert await ingest_batch(None, HostLimiter(2), None) == 3
+
+        ingest.assert_awaited_once()
+        assert ingest.await_args.args[3] == 'https://cdn/a.jpg'
+        results = write.await_args.args[0]
+        assert [(r.item['id'], r.status) for r in results] == [
+            ('q-1', 'completed'), ('q-2', 'completed'), ('q-3', 'completed'),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_known_content_is_not_rendered_or_uploaded(self):
+        with patch('app.services.image_ingestion.fetch_image', AsyncMock(return_value=b'same-bytes')), \
+                patch('app.services.image_ingestion.lookup_asset', AsyncMock(return_value=ASSET)), \
+                patch('app.services.image_ingestion.render_image') as render, \
+                patch('app.services.image_ingestion.upload_to_supabase', new_callable=AsyncMock) as upload, \
+                patch('app.services.image_ingestion.save_asset', new_callable=AsyncMock) as save:
+            asset = await ingest_url(None, HostLimiter(2), None, 'https://other-cdn/a.jpg')
+
+        assert asset == ASSET
+        render.assert_not_called()
+        upload.assert_not_awaited()
+        save.assert_awaited_once_with(ASSET, 'https://other-cdn/a.jpg', len(b'same-bytes'))
+
+    @pytest.mark.asyncio
+    async def test_new_content_is_stored_under_its_hash(self):
+        with patch('app.services.image_ingestion.fetch_image', AsyncMock(return_value=_png())), \
+                patch('app.services.image_ingestion.lookup_asset', AsyncMock(return_value=None)), \
+                patch('app.services.image_ingestion.upload_to_supabase',
+                      AsyncMock(side_effect=lambda data, bucket, path, client: f'https://storage/{path}')), \
+                patch('app.services.image_ingestion.save_asset', new_callable=AsyncMock):
+            asset = await ingest_url(None, HostLimiter(2), None, 'https://cdn/new.png')
+
+        assert asset.image_url.endswith(f'{asset.content_hash}.webp')
+        assert asset.thumbnail_url.endswith(f'{asset.content_hash}_thumb.webp')
+
+    @pytest.mark.asyncio
+    async def test_uploads_use_storage_client_not_download_client(self):
+        download_client, storage_client = object(), object()
+        with patch('app.services.image_ingestion.fetch_image', AsyncMock(return_value=_png())), \
+                patch('app.services.image_ingestion.lookup_asset', AsyncMock(return_value=None)), \
+                patch('app.services.image_ingestion.upload_to_supabase',
+                      AsyncMock(return_value='https://storage/x')) as upload, \
+                patch('app.services.image_ingestion.save_asset', new_callable=AsyncMock):
+            await ingest_url(download_client, HostLimiter(2), None, 'https://cdn/new.png', storage_client)
+
+        assert [call.kwargs['client'] for call in upload.await_args_list] == [storage_client, storage_client]
+
+
+class TestRenderImage:
+    """Rendering runs in worker processes and must be self-contained"""
+
+    def test_resizes_and_thumbnails(self):
+        processed, thumbnail = render_image(_png((2400, 1200)))
+        assert Image.open(io.BytesIO(processed)).size == (1920, 960)
+        assert max(Image.open(io.BytesIO(thumbnail)).size) == 200
+
+    def test_invalid_image_raises(self):
+        with pytest.raises(ValueError):
+            render_image(b'not an image')
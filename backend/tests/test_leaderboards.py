@@ -0,0 +1,167 @@
+"""
+Unit tests for in-memory leaderboards
+
+Tests rank and page lookups against a sorted list under random updates,
+scan scores per period, updates arriving during a reload, and the
+gamification and loyalty leaderboard responses built from the boards.
+"""
+
+import random
+import threading
+import time
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+from app.schemas.loyalty import PointsActionType
+from app.services import gamification, loyalty
+from app.services.leaderboards import Leaderboard, RankedScores, scan_scores
+
+
+def _ordered(scores):
+    return sorted(((-s, -t, m) for m, (s, t) in scores.items() if s > 0))
+
+
+def _board(boards):
+    board = Leaderboard('test', lambda: boards, reload_seconds=3600)
+    board.refresh()
+    return board
+
+
+class TestRankedScores:
+    """Ranks and pages match a fully sorted list"""
+
+    def test_matches_sorted_list_under_updates(self):
+        rng = random.Random(5)
+        scores = {f'user-{n}': (rng.randint(0, 50), rng.randint(0, 500)) for n in range(3000)}
+        ranked = RankedScores((m, s, t) for m, (s, t) in scores.items())
+        ranked.BLOCK_SIZE = 16  # force block splits and removals
+
+        for step in range(4000):
+            member = f'user-{rng.randrange(3500)}'
+            score = rng.choice([0, rng.randint(1, 60)])
+            tiebreak = rng.randint(0, 500)
+            scores[member] = (score, tiebreak)
+            ranked.set(member, score, tiebreak)
+
+            if step % 400 == 0:
+                ordered = _ordered(scores)
+                assert len(ranked) == len(ordered)
+                for position in rng.sample(range(len(ordered)), 50):
+                    assert ranked.rank(ordered[position][2]) == position + 1
+                offset = rng.randrange(len(ordered))
+                assert ranked.page(offset, 25) == [
+                    (offset + i + 1, m, -s) for i, (s, _, m) in enumerate(ordered[offset:offset + 25])
+                ]
+
+    def test_unranked_members(self):
+        ranked = RankedScores([('a', 3, 0), ('b', 0, 10)])
+        assert ranked.rank('b') is None
+        ranked.set('a', 0)
+        assert len(ranked) == 0
+        assert ranked.page(0, 10) == []
+        ranked.set('c', 1, 1)
+        assert ranked.page(0, 10) == [(1, 'c', 1)]
+
+
+class TestLeaderboard:
+    """Per-user updates and reloads"""
+
+    def test_scan_scores_per_period(self):
+        today = date(2026, 10, 16)
+        profile = {'total_scans': 40, 'scans_this_month': 7,
+                   'month_start': date(2026, 10, 1), 'last_scan_date': date(2026, 10, 2)}
+        assert scan_scores(profile, today) == {
+            'all_time': (40, 40), 'monthly': (7, 40), 'weekly': (0, 40),
+        }
+        profile['month_start'] = date(2026, 9, 1)
+        assert scan_scores(profile, today)['monthly'] == (0, 40)
+
+    def test_updates_during_reload_are_replayed(self):
+        board = _board({'all_time': [('a', 5, 5), ('b', 3, 3)]})
+
+        def loader():
+            # A scan recorded while the reload query runs
+            board.set_scores('b', {'all_time': (9, 9)})
+            return {'all_time': [('a', 5, 5), ('b', 3, 3)]}
+
+        board._loader = loader
+        board.refresh(force=True)
+        assert board.rank('all_time', 'b') == 1
+        assert board.get_stats()['loads'] == 2
+
+    def test_updates_during_first_load_are_replayed(self):
+        board = Leaderboard('test', lambda: None, reload_seconds=3600)
+
+        def loader():
+            board.set_scores('b', {'all_time': (9, 9)})
+            return {'all_time': [('a', 5, 5)]}
+
+        board._loader = loader
+        assert board.rank('all_time', 'b') == 1
+
+    def test_stale_boards_keep_serving_during_background_reload(self):
+        board = _board({'all_time': [('a', 5, 5)]})
+        loading, release = threading.Event(), threading.Event()
+
+        def loader():
+            loading.set()
+            release.wait(5)
+            return {'all_time': [('a', 5, 5), ('b', 9, 9)]}
+
+        board._loader = loader
+        board.reload_seconds = 0
+        assert board.rank('all_time', 'b') is None  # answered from the previous boards
+        assert loading.wait(5)
+        release.set()
+        for _ in range(100):
+            if board.get_stats()['loads'] == 2:
+                break
+            time.sleep(0.01)
+        board.reload_seconds = 3600
+        assert board.rank('all_time', 'b') == 1
+
+    def test_add_scores(self):
+        board = _board({'weekly': [('a', 10, 100)], 'all_time': [('a', 100, 100)]})
+        board.add_scores('b', {'weekly': 15, 'all_time': 15}, tiebreak=15)
+        assert board.page('weekly', 0, 10) == [(1, 'b', 15), (2, 'a', 10)]
+        assert board.rank('all_time', 'b') == 2
+        assert board.total('monthly') == 0
+
+
+class TestLeaderboardResponses:
+    """Services page from the boards and read display fields for the page only"""
+
+    def test_gamification_leaderboard(self):
+        board = _board({'monthly': [('u1', 12, 40), ('u2', 9, 90), ('u3', 4, 4)]})
+        details = [
+            {'user_id': user_id, 'display_name': user_id.upper(), 'avatar_url': None,
+             'total_scans': 50, 'tier': 'gold', 'unique_organizations': 3}
+            for user_id in ('u2', 'u3')
+        ]
+        with patch.object(gamification, 'scan_leaderboard', board), \
+                patch('app.services.gamification.get_connection') as get_connection:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            cur.fetchall.return_value = details
+            result = gamification.get_leaderboard('monthly', limit=1, current_user_id='u3', offset=1)
+
+        assert cur.execute.call_args.args[1] == (['u2', 'u3'],)
+        assert [(e['rank'], e['user_id'], e['scans_this_period']) for e in result['entries']] == [(2, 'u2', 9)]
+        assert (result['user_entry']['rank'], result['user_entry']['scans_this_period']) == (3, 4)
+        assert result['total_participants'] == 3
+        assert result['period_label'] == 'Этот месяц'
+
+    def test_award_points_updates_board(self):
+        board = _board({'all_time': [('u1', 100, 100)]})
+        with patch.object(loyalty, 'points_leaderboard', board), \
+                patch('app.services.loyalty.get_connection') as get_connection:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            cur.fetchone.side_effect = [
+                {'total_points': 95, 'lifetime_points': 95, 'current_tier': 'bronze'},
+                {'id': 'tx-1', 'user_id': 'u2', 'action_type': 'admin_adjustment', 'points': 20,
+                 'balance_after': 115, 'description': None, 'reference_id': None,
+                 'reference_type': None, 'created_at': datetime(2026, 10, 16, tzinfo=timezone.utc)},
+            ]
+            loyalty.award_points('u2', PointsActionType.ADMIN_ADJUSTMENT, custom_points=20)
+
+        assert board.page('all_time', 0, 2) == [(1, 'u2', 115), (2, 'u1', 100)]
+        assert board.rank('weekly', 'u2') == 1
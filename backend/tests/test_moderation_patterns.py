@@ -0,0 +1,138 @@
+"""
+Unit tests for the compiled moderation pattern set
+
+Tests keyword automaton parity with substring matching, regex handling and
+version-checked rebuilds in AIContentModerator, including after a pattern
+is edited through update_pattern().
+"""
+
+import random
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.schemas.content_moderation import AIModerationPatternUpdate
+from app.services import content_moderation, moderation_patterns
+from app.services.content_moderation import AIContentModerator
+from app.services.moderation_patterns import CompiledPatternSet, KeywordAutomaton
+
+
+def _pattern(n: int, pattern_type: str, pattern_data: dict, boost: int = 10, weight: float = 0.5) -> dict:
+    return {
+        'id': f'p-{n}',
+        'name': f'pattern {n}',
+        'pattern_type': pattern_type,
+        'pattern_data': pattern_data,
+        'detects': 'spam',
+        'action_on_match': 'flag_for_review',
+        'priority_boost': boost,
+        'confidence_weight': weight,
+    }
+
+
+@pytest.fixture(params=[True, False], ids=['native', 'pure-python'])
+def backend(request):
+    if request.param and not moderation_patterns.AHOCORASICK_AVAILABLE:
+        pytest.skip('pyahocorasick not installed')
+    with patch.object(moderation_patterns, 'AHOCORASICK_AVAILABLE', request.param):
+        yield
+
+
+class TestKeywordAutomaton:
+    """Automaton must agree with `keyword in text`"""
+
+    def test_overlapping_keywords(self, backend):
+        automaton = KeywordAutomaton({'he': {0}, 'she': {1}, 'his': {2}, 'hers': {3}})
+        assert automaton.find('ushers') == {0, 1, 3}
+        assert automaton.find('nothing') == set()
+
+    def test_matches_naive_substring_search(self, backend):
+        rng = random.Random(7)
+        alphabet = 'abcд '
+        keywords = {''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(200)}
+        index = {kw: {i} for i, kw in enumerate(sorted(keywords))}
+        automaton = KeywordAutomaton(dict(index))
+        for _ in range(100):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            expected = {i for kw, ids in index.items() if kw in text for i in ids}
+            assert automaton.find(text) == expected
+
+    def test_empty_keyword_always_matches(self, backend):
+        assert KeywordAutomaton({'': {5}}).find('anything') == {5}
+
+
+class TestCompiledPatternSet:
+    """Test suite for CompiledPatternSet"""
+
+    def test_case_modes_and_regex(self, backend):
+        compiled = CompiledPatternSet.compile([
+            _pattern(0, 'text_keywords', {'keywords': ['КУПИ']}),
+            _pattern(1, 'text_keywords', {'keywords': ['Exact'], 'case_insensitive': False}),
+            _pattern(2, 'text_regex', {'regex': r'\d{3}-\d{2}', 'flags': ''}),
+            _pattern(3, 'text_regex', {'regex': r'promo', 'flags': 'i'}),
+            _pattern(4, 'text_regex', {'regex': r'(unclosed', 'flags': ''}),
+            _pattern(5, 'image_hash', {'url_patterns': ['bad']}),
+        ])
+        assert [p['id'] for p in compiled.match_text('купи PROMO 123-45')] == ['p-0', 'p-2', 'p-3']
+        assert [p['id'] for p in compiled.match_text('exact')] == []
+        assert [p['id'] for p in compiled.match_text('Exact')] == ['p-1']
+        assert [p['id'] for p in compiled.patterns_of_type('image_hash')] == ['p-5']
+
+
+class TestAIContentModerator:
+    """Pattern set is rebuilt only when the table version changes"""
+
+    def test_analyze_text_result(self):
+        moderator = AIContentModerator()
+        patterns = [
+            _pattern(0, 'text_keywords', {'keywords': ['spam']}, boost=20, weight=0.4),
+            _pattern(1, 'text_regex', {'regex': 'sp.m'}, boost=5, weight=0.9),
+        ]
+        with patch.object(moderator, '_load_patterns_version', return_value=(2, 'v1')), \
+                patch.object(moderator, '_load_patterns', return_value=patterns):
+            result = moderator.analyze_text('This is SPAM', 'review')
+        assert [f['pattern_id'] for f in result.flags] == ['p-0']
+        assert result.confidence_score == 0.4
+        assert result.priority_boost == 20
+        assert result.recommended_action == 'flag_for_review'
+
+    def test_rebuild_only_on_version_change(self):
+        moderator = AIContentModerator()
+        patterns = [_pattern(0, 'text_keywords', {'keywords': ['spam']})]
+        versions = [(1, 'v1'), (1, 'v1'), (2, 'v2')]
+        with patch.object(moderator, '_load_patterns_version', side_effect=versions), \
+                patch.object(moderator, '_load_patterns', return_value=patterns) as load:
+            for _ in range(3):
+                moderator.invalidate_patterns()
+                moderator.analyze_texts(['spam', 'ham'], 'review')
+        assert load.call_count == 2
+
+    def test_version_checked_at_most_once_per_interval(self):
+        moderator = AIContentModerator()
+        with patch.object(moderator, '_load_patterns_version', return_value=(0, None)) as version, \
+                patch.object(moderator, '_load_patterns', return_value=[]):
+            for _ in range(5):
+                moderator.analyze_text('text', 'review')
+        assert version.call_count == 1
+
+    def test_update_pattern_drops_compiled_set(self):
+        moderator = AIContentModerator()
+        active = _pattern(0, 'text_keywords', {'keywords': ['spam']})
+        edited_at = datetime(2026, 10, 16, tzinfo=timezone.utc)
+        row = {**active, 'is_active': False, 'created_at': edited_at, 'updated_at': edited_at, 'created_by': None}
+        with patch.object(content_moderation, 'ai_moderator', moderator), \
+                patch('app.services.content_moderation.assert_platform_admin'), \
+                patch('app.services.content_moderation.get_connection') as get_connection, \
+                patch.object(moderator, '_load_patterns_version', return_value=(1, 'v1')), \
+                patch.object(moderator, '_load_patterns', side_effect=[[active], []]):
+            assert moderator.analyze_text('spam', 'review').flags
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            cur.fetchone.return_value = row
+            content_moderation.update_pattern('admin', 'p-0', AIModerationPatternUpdate(is_active=False))
+            # Same fingerprint as before: only the dropped set forces the reload
+            assert moderator.analyze_text('spam', 'review').flags == []
+
+        update_sql = cur.execute.call_args.args[0]
+        assert 'updated_at = now()' in update_sql
+        assert 'is_active = %s' in update_sql
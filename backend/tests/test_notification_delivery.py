@@ -0,0 +1,119 @@
+"""
+Unit tests for the notification delivery engine
+
+Tests batch draining, bounded concurrency and bulk status write-back.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services import notification_delivery
+from app.services.notification_delivery import DeliveryResult, run_channel, send_concurrently
+
+
+def _delivery(n: int, user: str = 'u-1') -> dict:
+    return {
+        'id': f'd-{n}',
+        'notification_id': f'n-{n}',
+        'user_id': user,
+        'created_at': datetime.now(timezone.utc),
+        'title': 'Title',
+        'body': 'Body',
+        'payload': None,
+        'severity': 'info',
+        'category': 'system',
+    }
+
+
+class TestSendConcurrently:
+    """Test suite for send_concurrently"""
+
+    @pytest.mark.asyncio
+    async def test_respects_concurrency_limit(self):
+        in_flight = 0
+        peak = 0
+
+        async def send_one(delivery):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return DeliveryResult.sent(delivery['id'])
+
+        results = await send_concurrently([_delivery(n) for n in range(10)], send_one, concurrency=3)
+        assert peak == 3
+        assert [r.status for r in results] == ['sent'] * 10
+
+    @pytest.mark.asyncio
+    async def test_exception_marks_delivery_failed(self):
+        async def send_one(delivery):
+            raise RuntimeError('boom')
+
+        results = await send_concurrently([_delivery(1)], send_one, concurrency=2)
+        assert results[0].status == 'failed'
+        assert results[0].error_message == 'boom'
+
+
+class TestRunChannel:
+    """Test suite for run_channel"""
+
+    @pytest.mark.asyncio
+    async def test_drains_batches_and_writes_results_once_per_batch(self):
+        batches = [[_delivery(1), _delivery(2)], [_delivery(3)]]
+
+        async def send_batch(deliveries):
+            return [DeliveryResult.sent(d['id']) for d in deliveries]
+
+        with patch.object(notification_delivery.settings, 'notification_delivery_batch_size', 2), \
+                patch('app.services.notification_delivery.claim_deliveries', AsyncMock(side_effect=batches)) as claim, \
+                patch('app.services.notification_delivery.write_results', new_callable=AsyncMock) as write:
+            result = await run_channel('telegram', send_batch)
+
+        assert result == {'processed': 3, 'sent': 3, 'failed': 0}
+        # Second batch was short, so the queue is considered drained
+        assert claim.call_count == 2
+        assert write.call_count == 2
+        assert [r.id for r in write.call_args_list[0][0][0]] == ['d-1', 'd-2']
+
+    @pytest.mark.asyncio
+    async def test_batch_error_marks_all_failed(self):
+        async def send_batch(deliveries):
+            raise ConnectionError('smtp down')
+
+        with patch('app.services.notification_delivery.claim_deliveries', AsyncMock(side_effect=[[_delivery(1)], []])), \
+                patch('app.services.notification_delivery.write_results', new_callable=AsyncMock) as write:
+            result = await run_channel('email', send_batch)
+
+        assert result == {'processed': 1, 'sent': 0, 'failed': 1}
+        assert write.call_args[0][0][0].error_message == 'smtp down'
+
+    @pytest.mark.asyncio
+    async def test_empty_queue_does_not_write(self):
+        with patch('app.services.notification_delivery.claim_deliveries', AsyncMock(return_value=[])), \
+                patch('app.services.notification_delivery.write_results', new_callable=AsyncMock) as write:
+            result = await run_channel('push', AsyncMock())
+
+        assert result == {'processed': 0, 'sent': 0, 'failed': 0}
+        write.assert_not_called()
+
+
+class TestTelegramDeliveries:
+    """Telegram channel shares one client across the batch"""
+
+    @pytest.mark.asyncio
+    async def test_missing_chat_id_fails_batch_without_sending(self):
+        from app.services import notifications
+
+        with patch.object(notifications.settings, 'telegram_default_chat_id', None), \
+                patch('app.services.notification_delivery.claim_deliveries', AsyncMock(side_effect=[[_delivery(1)], []])), \
+                patch('app.services.notification_delivery.write_results', new_callable=AsyncMock) as write, \
+                patch('app.services.telegram.send_telegram_message', new_callable=AsyncMock) as send:
+            result = await notifications.process_telegram_deliveries()
+
+        assert result == {'processed': 1, 'sent': 0}
+        send.assert_not_called()
+        assert write.call_args[0][0][0].error_message == 'Telegram chat_id not configured'
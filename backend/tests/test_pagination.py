@@ -0,0 +1,67 @@
+"""
+Unit tests for keyset pagination helpers
+
+Tests cursor round trips, rejection of foreign or malformed cursors, the
+generated SQL fragments, and trimming of a limit + 1 fetch.
+"""
+
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+    keyset_order,
+    page_rows,
+)
+
+
+def test_cursor_round_trip():
+    created = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    review_id = UUID('12345678-1234-5678-1234-567812345678')
+
+    cursor = encode_cursor('reviews:newest', [created, review_id])
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'reviews:newest', 2) == [created.isoformat(), str(review_id)]
+
+
+def test_cursor_for_other_ordering_is_rejected():
+    cursor = encode_cursor('reviews:newest', ['2026-03-01', 'a'])
+
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, 'reviews:highest_rating', 3)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '', encode_cursor('posts', [1])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, 'posts', 3)
+
+
+def test_sql_fragments():
+    columns = ('rating', 'created_at', 'id')
+
+    assert keyset_condition(columns) == '(rating, created_at, id) < (%s, %s, %s)'
+    assert keyset_condition(columns, descending=False) == '(rating, created_at, id) > (%s, %s, %s)'
+    assert keyset_order(columns) == 'rating DESC, created_at DESC, id DESC'
+
+
+def test_page_rows_returns_cursor_of_last_row_shown():
+    rows = [{'id': i} for i in (5, 4, 3)]
+
+    page, cursor = page_rows(rows, 2, 'posts', lambda row: [row['id']])
+
+    assert page == [{'id': 5}, {'id': 4}]
+    assert decode_cursor(cursor, 'posts', 1) == [4]
+
+
+def test_page_rows_last_page_has_no_cursor():
+    rows = [{'id': 2}, {'id': 1}]
+
+    assert page_rows(rows, 2, 'posts', lambda row: [row['id']]) == (rows, None)
@@ -13,6 +13,10 @@ from pathlib import Path
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import importlib.util
+from io import BytesIO
+
+import segno
+from PIL import Image
 
 # Add backend directory to sys.path
 backend_dir = Path(__file__).parent.parent
@@ -26,6 +30,15 @@ spec.loader.exec_module(qr_generator)
 
 generate_qr_image = qr_generator.generate_qr_image
 generate_etag = qr_generator.generate_etag
+render_png = qr_generator.render_png
+
+
+def segno_png(url, size, error_correction):
+    """Previous PNG path: segno's PNG writer with an approximate integer scale"""
+    qr = segno.make_qr(url, error=error_correction.lower())
+    buffer = BytesIO()
+    qr.save(buffer, kind="png", scale=max(1, size // 30), border=1)
+    return buffer.getvalue()
 
 
 class TestGenerationPerformance:
@@ -220,6 +233,66 @@ class TestScalability:
         print(f"OK Error correction impact: max {max(times)/min(times):.1f}x difference")
 
 
+class TestRasterRenderer:
+    """Exact-pixel renderer compared against segno's PNG writer"""
+
+    def _throughput(self, render, size, count=30):
+        start = time.perf_counter()
+        for i in range(count):
+            render(f"https://chestno.ru/q/bench{i:04d}", size, "M")
+        return count / (time.perf_counter() - start)
+
+    def test_output_is_exact_size(self):
+        """Test PNG dimensions match the requested size"""
+        for size in [100, 333, 500, 1999, 4000]:
+            image = Image.open(BytesIO(render_png("https://chestno.ru/q/test123", size, "M")))
+            assert image.size == (size, size)
+        print("OK Exact-pixel output for 100-4000px")
+
+    def test_modules_match_segno_matrix(self):
+        """Test every module lands on the matching pixel block"""
+        url = "https://chestno.ru/q/test123"
+        matrix = segno.make_qr(url, error="q").matrix
+        width = len(matrix) + 2
+        image = Image.open(BytesIO(render_png(url, width * 10, "Q"))).convert("L")
+        for row, modules in enumerate(matrix):
+            for col, dark in enumerate(modules):
+                assert (image.getpixel((col * 10 + 15, row * 10 + 15)) < 128) == bool(dark)
+        print(f"OK {len(matrix)}x{len(matrix)} modules match")
+
+    def test_colors_and_logo(self):
+        """Test customization colors and logo overlay"""
+        logo = render_png("https://logo.example", 200, "L", foreground_color="#FF0000")
+        data = render_png(
+            "https://chestno.ru/q/test123", 600, "H",
+            foreground_color="#112233", background_color="#FFEEDD", logo=logo, logo_size_percent=20,
+        )
+        image = Image.open(BytesIO(data)).convert("RGB")
+        assert image.size == (600, 600)
+        assert image.getpixel((0, 0)) == (0xFF, 0xEE, 0xDD)
+        assert (0xFF, 0x00, 0x00) in {color for _, color in image.getcolors(1 << 16)}
+        print(f"OK Customized 600px PNG with logo: {len(data)} bytes")
+
+    def test_throughput_vs_segno_writer(self):
+        """Benchmark: exact-pixel renderer vs segno PNG writer"""
+        for size in [300, 1000, 2000]:
+            current = self._throughput(render_png, size)
+            previous = self._throughput(segno_png, size)
+            print(f"  {size}px: {current:.0f}/s vs segno {previous:.0f}/s ({current/previous:.1f}x)")
+            if size >= 1000:
+                assert current > previous
+        print("OK Renderer throughput benchmark")
+
+    def test_print_size_generation_time(self):
+        """Test packaging print size (8000px) renders in well under a second"""
+        start = time.time()
+        image_data = render_png("https://chestno.ru/q/test123", 8000, "H")
+        duration = time.time() - start
+
+        assert duration < 1.0
+        print(f"OK Print QR (8000px, H): {duration*1000:.1f}ms ({len(image_data)/1024:.1f}KB)")
+
+
 def run_all_tests():
     """Run all performance tests"""
     print("=" * 60)
@@ -258,6 +331,15 @@ def run_all_tests():
     scalability_tests.test_generation_time_scales_linearly()
     scalability_tests.test_error_correction_impact()
 
+    # Raster renderer
+    print("\n[Raster Renderer Tests]")
+    renderer_tests = TestRasterRenderer()
+    renderer_tests.test_output_is_exact_size()
+    renderer_tests.test_modules_match_segno_matrix()
+    renderer_tests.test_colors_and_logo()
+    renderer_tests.test_throughput_vs_segno_writer()
+    renderer_tests.test_print_size_generation_time()
+
     print("\n" + "=" * 60)
     print("[OK] ALL PERFORMANCE TESTS PASSED")
     print("=" * 60)
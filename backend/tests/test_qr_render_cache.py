@@ -0,0 +1,188 @@
+"""
+Unit tests for the QR image render cache
+
+Tests content addressing, customization options, memory/disk tier
+eviction, ordered bounded rendering and the streamed ZIP export.
+"""
+
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services import qr_render_cache
+from app.services.qr_render_cache import QRRenderCache, RenderSpec, render_key, stream_zip
+
+
+class TestRenderKey:
+    """Every render input is part of the key"""
+
+    def test_inputs_change_key(self):
+        base = render_key('https://x/q/1', 'png', 300, 'M')
+        assert base == render_key('https://x/q/1', 'png', 300, 'M')
+        assert base != render_key('https://x/q/2', 'png', 300, 'M')
+        assert base != render_key('https://x/q/1', 'svg', 300, 'M')
+        assert base != render_key('https://x/q/1', 'png', 500, 'M')
+        assert base != render_key('https://x/q/1', 'png', 300, 'H')
+        assert base != render_key('https://x/q/1', 'png', 300, 'M', {'foreground_color': '#ff0000'})
+
+    def test_customization_is_order_independent(self):
+        a = render_key('u', 'png', 300, 'M', {'a': 1, 'b': 2})
+        b = render_key('u', 'png', 300, 'M', {'b': 2, 'a': 1})
+        assert a == b
+
+
+class TestCustomization:
+    """qr_customization_settings map to render options"""
+
+    def _settings(self, **overrides):
+        values = {'foreground_color': '#000000', 'background_color': '#ffffff',
+                  'logo_url': None, 'logo_size_percent': 20}
+        values.update(overrides)
+        return SimpleNamespace(**values)
+
+    def test_default_look_has_no_options(self):
+        assert qr_render_cache.customization_options(None) is None
+        assert qr_render_cache.customization_options(self._settings()) is None
+
+    def test_colors_and_logo(self):
+        options = qr_render_cache.customization_options(
+            self._settings(foreground_color='#112233', logo_url='https://storage/logo.png', logo_size_percent=25)
+        )
+        assert options == {'foreground_color': '#112233', 'background_color': '#FFFFFF',
+                           'logo_url': 'https://storage/logo.png', 'logo_size_percent': 25}
+
+    def test_render_fetches_logo_for_png_only(self):
+        logo = qr_render_cache.render(RenderSpec('https://logo', 'png', 120))
+        options = {'foreground_color': '#112233', 'background_color': '#FFFFFF',
+                   'logo_url': 'https://storage/logo.png', 'logo_size_percent': 25}
+        with patch('app.services.qr_render_cache._fetch_logo', return_value=logo) as fetch:
+            png = qr_render_cache.render(RenderSpec('https://chestno.ru/q/1', 'png', 2500, 'H', options))
+            svg = qr_render_cache.render(RenderSpec('https://chestno.ru/q/1', 'svg', 300, 'H', options))
+        fetch.assert_called_once_with('https://storage/logo.png')
+        assert png.startswith(b'\x89PNG')
+        assert b'#123' in svg
+
+    @pytest.mark.parametrize('url, allowed', [
+        ('https://proj.supabase.co/storage/v1/object/public/org-media/logo.png', True),
+        ('http://proj.supabase.co/storage/v1/object/public/org-media/logo.png', False),
+        ('https://169.254.169.254/latest/meta-data', False),
+        ('https://proj.supabase.co.evil.example/logo.png', False),
+    ])
+    def test_logo_urls_limited_to_storage_host(self, url, allowed):
+        with patch.object(qr_render_cache.settings, 'supabase_url', 'https://proj.supabase.co'):
+            assert qr_render_cache.is_allowed_logo_url(url) is allowed
+
+    def test_logo_fetch_rejects_other_hosts_without_request(self):
+        with patch.object(qr_render_cache.settings, 'supabase_url', 'https://proj.supabase.co'), \
+                patch('httpx.stream') as stream:
+            with pytest.raises(ValueError):
+                qr_render_cache._fetch_logo.__wrapped__('http://10.0.0.1/logo.png')
+        stream.assert_not_called()
+
+
+class TestQRRenderCache:
+    """Memory LRU and disk tier bounded by size"""
+
+    def test_memory_lru_evicts_by_bytes(self):
+        cache = QRRenderCache(memory_max_bytes=10, disk_dir=None, disk_max_bytes=0)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        assert cache.get('a') == b'aaaa'  # a becomes most recent
+        cache.put('c', b'cccc')
+        assert cache.get('b') is None
+        assert cache.get('a') == b'aaaa'
+        assert cache.get('c') == b'cccc'
+
+    def test_disk_tier_survives_new_process_and_evicts_least_recently_used(self, tmp_path):
+        cache = QRRenderCache(memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=12)
+        cache.put('aa1', b'12345')
+        cache.put('bb2', b'67890')
+
+        reopened = QRRenderCache(memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=12)
+        assert reopened.get('aa1') == b'12345'
+        assert reopened.get_stats()['disk_hits'] == 1
+
+        # The read in the other process counts: bb2 is now the oldest file
+        cache.put('cc3', b'abcde')
+        assert not os.path.exists(tmp_path / 'bb' / 'bb2')
+        assert cache.get('aa1') == b'12345'
+        assert cache.get_stats()['disk_evictions'] == 1
+
+    def test_disk_budget_covers_all_processes(self, tmp_path):
+        first = QRRenderCache(memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=12)
+        second = QRRenderCache(memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=12)
+        first.put('aa1', b'12345')
+        second.put('bb2', b'67890')
+
+        with patch.object(qr_render_cache, 'DISK_RESCAN_SECONDS', 0):
+            first.put('cc3', b'abcde')
+
+        files = [name for _, _, names in os.walk(tmp_path) for name in names]
+        assert sorted(files) == ['bb2', 'cc3']
+
+    def test_get_or_render_renders_once(self, tmp_path):
+        cache = QRRenderCache(memory_max_bytes=1024 * 1024, disk_dir=str(tmp_path), disk_max_bytes=1024 * 1024)
+        spec = RenderSpec('https://chestno.ru/q/abc', 'png', 300, 'M')
+        with patch('app.services.qr_render_cache.render', wraps=qr_render_cache.render) as render:
+            first = cache.get_or_render(spec)
+            second = cache.get_or_render(spec)
+        assert first == second
+        assert first.startswith(b'\x89PNG')
+        render.assert_called_once()
+
+
+class TestStreaming:
+    """Bulk renders come back in order and are streamed as a ZIP"""
+
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path):
+        cache = QRRenderCache(memory_max_bytes=1024 * 1024, disk_dir=str(tmp_path), disk_max_bytes=1024 * 1024)
+        with patch.object(qr_render_cache, 'cache', cache), \
+                patch.object(qr_render_cache.settings, 'qr_render_processes', 1), \
+                patch.object(qr_render_cache.settings, 'qr_render_max_in_flight', 2):
+            yield cache
+
+    @pytest.mark.asyncio
+    async def test_render_many_keeps_order_and_fills_cache(self, _isolated_cache):
+        specs = [RenderSpec(f'https://chestno.ru/q/{i}', 'svg') for i in range(5)]
+        rendered = [data async for data in qr_render_cache.render_many(specs)]
+
+        assert rendered == [qr_render_cache.render(spec) for spec in specs]
+        assert all(_isolated_cache.get(spec.key) for spec in specs)
+
+    @pytest.mark.asyncio
+    async def test_prerender_covers_common_variants(self, _isolated_cache):
+        assert await qr_render_cache.prerender(['https://chestno.ru/q/a']) == 2
+        for variant in qr_render_cache.PRERENDER_VARIANTS:
+            assert _isolated_cache.get(RenderSpec('https://chestno.ru/q/a', *variant).key)
+
+    @pytest.mark.asyncio
+    async def test_stream_zip(self):
+        entries = [
+            ('label.png', RenderSpec('https://chestno.ru/q/1', 'png', 200)),
+            ('label.png', RenderSpec('https://chestno.ru/q/2', 'png', 200)),
+            ('other.png', RenderSpec('https://chestno.ru/q/3', 'png', 200)),
+        ]
+        chunks = [chunk async for chunk in stream_zip(entries)]
+
+        assert len(chunks) == 4  # one per file plus the central directory
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            assert archive.namelist() == ['label.png', 'label-2.png', 'other.png']
+            assert archive.read('label-2.png') == qr_render_cache.render(entries[1][1])
+
+    @pytest.mark.asyncio
+    async def test_stream_zip_skips_failed_entries(self):
+        entries = [
+            ('ok.png', RenderSpec('https://chestno.ru/q/1', 'png', 200)),
+            ('broken.png', RenderSpec('https://chestno.ru/q/2', 'png', 200, 'M', {'logo_url': 'https://x/l.png'})),
+        ]
+        with patch('app.services.qr_render_cache._fetch_logo', side_effect=ValueError('Logo could not be loaded')):
+            chunks = [chunk async for chunk in stream_zip(entries)]
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            assert archive.namelist() == ['ok.png', 'errors.txt']
+            assert archive.read('errors.txt') == b'broken.png: Logo could not be loaded\n'
@@ -0,0 +1,162 @@
+"""
+Unit tests for the QR redirect resolution cache
+
+Tests in-process resolution priority, A/B bucketing and invalidation.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services import qr_resolution
+from app.services.qr_resolution import (
+    CachedABTest,
+    CachedCampaign,
+    CachedVariant,
+    QRResolution,
+    ab_bucket,
+    resolve,
+)
+
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _resolution(**kwargs) -> QRResolution:
+    defaults = dict(
+        qr_code_id='qr-1',
+        organization_id='org-1',
+        code='abc',
+        is_active=True,
+        legacy_slug='acme',
+    )
+    defaults.update(kwargs)
+    return QRResolution(**defaults)
+
+
+def _campaign(campaign_id: str, priority: int, starts_delta: int, ends_delta: int | None) -> CachedCampaign:
+    return CachedCampaign(
+        id=campaign_id,
+        url_version_id=f'uv-{campaign_id}',
+        target_url=f'/promo/{campaign_id}',
+        status='active',
+        starts_at=NOW + timedelta(days=starts_delta),
+        ends_at=NOW + timedelta(days=ends_delta) if ends_delta is not None else None,
+        priority=priority,
+    )
+
+
+class TestABBucket:
+    """ab_bucket must match the get_active_qr_url() SQL rule"""
+
+    def test_positive_int32(self):
+        # 0x00000065 = 101 -> 1
+        assert ab_bucket('00000065' + 'f' * 56) == 1
+
+    def test_negative_int32_uses_abs(self):
+        # 0xffffffff = -1 as signed int32 -> abs 1 -> 1
+        assert ab_bucket('ffffffff' + '0' * 56) == 1
+        # 0x80000001 = -2147483647 -> 2147483647 % 100 = 47
+        assert ab_bucket('80000001' + '0' * 56) == 47
+
+    def test_deterministic(self):
+        visitor = 'a1b2c3d4e5f6'
+        assert ab_bucket(visitor) == ab_bucket(visitor)
+
+    def test_random_without_hash(self):
+        assert 0 <= ab_bucket(None) < 100
+
+
+class TestResolve:
+    """Priority handling of resolve()"""
+
+    def test_no_dynamic_config_returns_empty_target(self):
+        result = resolve(_resolution(), 'ffffffff', now=NOW)
+        assert result.target_url is None
+
+    def test_default_version(self):
+        resolution = _resolution(default_version_id='uv-default', default_target_url='/default')
+        result = resolve(resolution, None, now=NOW)
+        assert result.target_url == '/default'
+        assert result.url_version_id == 'uv-default'
+
+    def test_active_campaign_beats_default(self):
+        resolution = _resolution(
+            default_version_id='uv-default',
+            default_target_url='/default',
+            campaigns=[_campaign('high', 10, -1, 1), _campaign('low', 1, -1, None)],
+        )
+        result = resolve(resolution, None, now=NOW)
+        assert result.campaign_id == 'high'
+        assert result.target_url == '/promo/high'
+
+    def test_campaign_outside_window_is_skipped(self):
+        resolution = _resolution(
+            default_version_id='uv-default',
+            default_target_url='/default',
+            campaigns=[_campaign('future', 10, 1, 2), _campaign('ended', 5, -3, -1)],
+        )
+        result = resolve(resolution, None, now=NOW)
+        assert result.campaign_id is None
+        assert result.target_url == '/default'
+
+    def test_ab_test_assigns_variant_by_weight(self):
+        test = CachedABTest(
+            id='test-1',
+            starts_at=NOW - timedelta(days=1),
+            ends_at=None,
+            variants=[
+                CachedVariant(id='v-a', url_version_id='uv-a', target_url='/a', weight=50),
+                CachedVariant(id='v-b', url_version_id='uv-b', target_url='/b', weight=50),
+            ],
+        )
+        resolution = _resolution(ab_test=test, campaigns=[_campaign('c', 1, -1, None)])
+
+        # bucket 1 -> first variant, bucket 47 -> first, bucket 99 -> second
+        assert resolve(resolution, '00000065', now=NOW).ab_variant_id == 'v-a'
+        assert resolve(resolution, '00000063', now=NOW).ab_variant_id == 'v-b'  # 99
+
+    def test_ab_test_with_uncovered_bucket_falls_through(self):
+        test = CachedABTest(
+            id='test-1',
+            starts_at=NOW - timedelta(days=1),
+            ends_at=None,
+            variants=[CachedVariant(id='v-a', url_version_id='uv-a', target_url='/a', weight=10)],
+        )
+        resolution = _resolution(ab_test=test, campaigns=[_campaign('c', 1, -1, None)])
+        result = resolve(resolution, '00000063', now=NOW)  # bucket 99
+        assert result.ab_test_id is None
+        assert result.campaign_id == 'c'
+
+
+class TestCache:
+    """Cache hit, miss and invalidation"""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        qr_resolution.clear()
+        yield
+        qr_resolution.clear()
+
+    @pytest.mark.asyncio
+    async def test_second_lookup_is_served_from_cache(self):
+        with patch('app.services.qr_resolution._load_resolution', AsyncMock(return_value=_resolution())) as load:
+            await qr_resolution.get_resolution('abc')
+            await qr_resolution.get_resolution('abc')
+            assert load.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_reload(self):
+        with patch('app.services.qr_resolution._load_resolution', AsyncMock(return_value=_resolution())) as load:
+            await qr_resolution.get_resolution('abc')
+            qr_resolution.invalidate_qr_code('qr-1')
+            await qr_resolution.get_resolution('abc')
+            assert load.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_code_is_not_cached(self):
+        with patch('app.services.qr_resolution._load_resolution', AsyncMock(return_value=None)) as load:
+            assert await qr_resolution.get_resolution('missing') is None
+            assert await qr_resolution.get_resolution('missing') is None
+            assert load.call_count == 2
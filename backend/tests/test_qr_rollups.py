@@ -0,0 +1,102 @@
+"""
+Unit tests for QR scan rollups
+
+Tests window alignment, query assembly over rollups plus the unrolled
+tail, and watermark advancement.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import qr_rollups
+from app.services.qr_rollups import _ceil, roll_up_scans, scan_aggregate
+
+
+class TestCeil:
+    """Window starts are rounded up to whole rollup buckets"""
+
+    def test_hour_and_day(self):
+        ts = datetime(2026, 3, 5, 13, 20, tzinfo=timezone.utc)
+        assert _ceil(ts, 'hour') == datetime(2026, 3, 5, 14, tzinfo=timezone.utc)
+        assert _ceil(ts, 'day') == datetime(2026, 3, 6, tzinfo=timezone.utc)
+
+    def test_aligned_timestamp_is_unchanged(self):
+        ts = datetime(2026, 3, 5, tzinfo=timezone.utc)
+        assert _ceil(ts, 'hour') == ts
+        assert _ceil(ts, 'day') == ts
+
+
+class TestScanAggregate:
+    """Queries read daily/hourly rollups and raw events past the watermark"""
+
+    def _query(self, **kwargs):
+        cur = MagicMock()
+        cur.fetchall.return_value = [{'count': 3}]
+        rows = scan_aggregate(cur, **kwargs)
+        query, params = cur.execute.call_args.args
+        return rows, ' '.join(query.split()), params
+
+    def test_all_time_total_uses_daily_rollups_and_tail(self):
+        rows, query, params = self._query(qr_code_id='qr-1')
+        assert rows == [{'count': 3}]
+        assert params == {'scope': 'qr-1'}
+        assert 'FROM qr_scan_rollups_daily WHERE qr_code_id = %(scope)s AND TRUE' in query
+        assert 'FROM qr_scan_rollups_hourly WHERE qr_code_id = %(scope)s AND FALSE' in query
+        assert 'qe.id > (SELECT id FROM wm)' in query
+        assert 'GROUP BY' not in query
+
+    def test_window_splits_on_bucket_boundaries(self):
+        since = datetime(2026, 3, 5, 13, 20, tzinfo=timezone.utc)
+        _, query, params = self._query(
+            organization_id='org-1',
+            since=since,
+            group_by=['country'],
+            by_day=True,
+            where='country IS NOT NULL',
+            order_by='count DESC',
+            limit=10,
+        )
+        assert params['hour_start'] == datetime(2026, 3, 5, 14, tzinfo=timezone.utc)
+        assert params['day_start'] == datetime(2026, 3, 6, tzinfo=timezone.utc)
+        assert 'organization_id = %(scope)s AND bucket >= %(day_start)s' in query
+        assert 'bucket >= %(hour_start)s AND bucket < %(day_start)s' in query
+        assert 'qe.occurred_at >= %(since)s AND (qe.id > (SELECT id FROM wm) OR qe.occurred_at < %(hour_start)s)' in query
+        assert 'WHERE (country IS NOT NULL) GROUP BY country, day ORDER BY count DESC LIMIT 10' in query
+
+    def test_rejects_unknown_dimension_and_scope(self):
+        with pytest.raises(ValueError):
+            scan_aggregate(MagicMock(), qr_code_id='qr-1', group_by=['ip_hash'])
+        with pytest.raises(ValueError):
+            scan_aggregate(MagicMock())
+
+
+class TestRollUpScans:
+    """The watermark advances with the rollups in one transaction"""
+
+    def _run(self, watermark, max_id, max_events):
+        with patch('app.services.qr_rollups.get_connection') as get_connection, \
+                patch('app.services.qr_rollups._committed_max_event_id', return_value=max_id):
+            conn = get_connection.return_value.__enter__.return_value
+            cur = conn.cursor.return_value.__enter__.return_value
+            cur.fetchone.return_value = {'last_event_id': watermark}
+            result = roll_up_scans(max_events=max_events)
+        return result, conn, cur
+
+    def test_rolls_up_bounded_range(self):
+        result, conn, cur = self._run(watermark=100, max_id=150, max_events=30)
+
+        assert result == {'from_id': 100, 'to_id': 130, 'caught_up': False}
+        statements = [' '.join(c.args[0].split()) for c in cur.execute.call_args_list]
+        assert any(s.startswith('INSERT INTO qr_scan_rollups_hourly') for s in statements)
+        assert any(s.startswith('INSERT INTO qr_scan_rollups_daily') for s in statements)
+        assert cur.execute.call_args_list[-1].args[1] == (qr_rollups.WATERMARK_NAME, 130)
+        conn.commit.assert_called_once()
+
+    def test_nothing_new(self):
+        result, conn, cur = self._run(watermark=150, max_id=150, max_events=30)
+
+        assert result == {'from_id': 150, 'to_id': 150, 'caught_up': True}
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
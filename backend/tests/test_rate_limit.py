@@ -0,0 +1,128 @@
+"""
+Unit tests for in-memory auth rate limiting
+
+Tests sliding-window counting over fixed buckets, the memory backend's expiry
+and bounds, login rate limits and throttling without database access, and
+the buffered auth_events audit write.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import MemoryBackend, RateLimitBackend, SlidingWindowLimit, configure_backend
+from app.services import auth_events, login_throttle
+
+
+@pytest.fixture(autouse=True)
+def backend():
+    previous = rate_limit.get_backend()
+    fresh = MemoryBackend(max_keys=1000)
+    configure_backend(fresh)
+    auth_events._pending_events.clear()
+    yield fresh
+    configure_backend(previous)
+    auth_events._pending_events.clear()
+
+
+class TestSlidingWindow:
+    """Approximate sliding windows from fixed buckets"""
+
+    def test_oldest_bucket_is_weighted_by_overlap(self):
+        limit = SlidingWindowLimit('test', limit=10, window_seconds=60, buckets=6)
+        with patch('app.core.rate_limit.time.time', return_value=1000.0):
+            for now in (1000.0, 1001.0, 1035.0):
+                limit.hit('k', now=now)
+            assert limit.count('k', now=1035.0) == 3
+            # At 1065 the window starts at 1005: the 1000-1010 bucket overlaps by half
+            assert limit.count('k', now=1065.0) == pytest.approx(2 * 0.5 + 1)
+            assert limit.count('k', now=1096.0) == pytest.approx(0.4)
+            assert limit.count('k', now=1101.0) == 0
+            assert limit.count('other', now=1035.0) == 0
+
+    def test_exceeded(self):
+        limit = SlidingWindowLimit('test', limit=2, window_seconds=60)
+        limit.hit('k')
+        assert not limit.exceeded('k')
+        limit.hit('k')
+        assert limit.exceeded('k')
+
+    def test_backend_expiry_and_bound(self, backend):
+        with patch('app.core.rate_limit.time.time', return_value=100.0):
+            assert backend.incr('a', ttl_seconds=10) == 1
+            assert backend.incr('a', ttl_seconds=10) == 2
+        with patch('app.core.rate_limit.time.time', return_value=110.0):
+            assert backend.get_many(['a']) == [0]
+            assert backend.incr('a', ttl_seconds=10) == 1
+
+        small = MemoryBackend(max_keys=2)
+        for key in 'abc':
+            small.incr(key, ttl_seconds=60)
+        assert small.get_many(['a', 'b', 'c']) == [0, 1, 1]
+
+    def test_incomplete_backend_fails_on_instantiation(self):
+        class CounterOnly(RateLimitBackend):
+            def incr(self, key, ttl_seconds, amount=1):
+                return amount
+
+        with pytest.raises(TypeError):
+            CounterOnly()
+
+
+class TestAuthRateLimits:
+    """Login limits are checked without querying auth_events"""
+
+    def test_email_limit(self):
+        with patch('app.services.auth_events.get_connection') as get_connection:
+            for _ in range(4):
+                auth_events.log_auth_event('login_attempt', email='user@example.com', ip=f'10.0.0.{_}')
+            assert auth_events.check_rate_limit(email='User@Example.com', ip='10.0.0.9') == (False, None)
+            auth_events.log_auth_event('login_failure', email='USER@example.com', ip='10.0.0.5')
+            assert auth_events.check_rate_limit(email='user@example.com') == (True, 60)
+            # Registrations and successes are audited but not counted
+            auth_events.log_auth_event('registration', email='new@example.com', ip='10.0.0.1')
+            assert auth_events.check_rate_limit(email='new@example.com') == (False, None)
+        get_connection.assert_not_called()
+
+    def test_ip_limit(self):
+        for n in range(10):
+            auth_events.log_auth_event('login_attempt', email=f'user{n}@example.com', ip='10.1.1.1')
+        assert auth_events.check_rate_limit(email='user0@example.com', ip='10.1.1.1') == (True, 60)
+        assert auth_events.check_rate_limit(email='user0@example.com', ip='10.1.1.2') == (False, None)
+
+    def test_login_throttle_backoff(self):
+        assert login_throttle.get_state('user@example.com') is None
+        assert login_throttle.register_failure('user@example.com') == 5
+        assert login_throttle.register_failure('USER@example.com') == 10
+        state = login_throttle.get_state('user@example.com')
+        assert state.failed_attempts == 2 and 0 < state.retry_after <= 10
+        login_throttle.reset('user@example.com')
+        assert login_throttle.get_state('user@example.com') is None
+
+
+class TestAuthEventsFlush:
+    """Events are written in one statement and kept on failure"""
+
+    def test_flush(self):
+        auth_events.log_auth_event('login_attempt', email='a@example.com', ip='10.0.0.1', user_agent='ua')
+        auth_events.log_auth_event('login_success', email='a@example.com', user_id='u1', ip='10.0.0.1')
+
+        with patch('app.services.auth_events.get_connection') as get_connection:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            assert auth_events.flush_auth_events() == 2
+            assert auth_events.flush_auth_events() == 0
+
+        user_ids, event_types, emails, ips, agents, created = cur.execute.call_args.args[1]
+        assert user_ids == [None, 'u1']
+        assert event_types == ['login_attempt', 'login_success']
+        assert agents == ['ua', 'unknown']
+        assert created[0] <= created[1]
+
+    def test_flush_failure_keeps_events(self):
+        auth_events.log_auth_event('login_attempt', email='a@example.com')
+        with patch('app.services.auth_events.get_connection', side_effect=RuntimeError('db down')):
+            with pytest.raises(RuntimeError):
+                auth_events.flush_auth_events()
+        auth_events.log_auth_event('login_failure', email='a@example.com')
+        assert [e[1] for e in auth_events._pending_events] == ['login_attempt', 'login_failure']
@@ -0,0 +1,151 @@
+"""
+Unit tests for the authorized region index
+
+Tests the index against a line-by-line port of
+check_scan_in_authorized_region(), product scoping and invalidation in the
+per-organization cache, and lookup speed for organizations with thousands of
+regions.
+"""
+
+import random
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services import geographic_anomaly, region_index
+from app.services.region_index import (
+    Region,
+    RegionIndex,
+    RegionIndexCache,
+    UNMEASURED_DISTANCE_KM,
+    planar_distance_km,
+)
+
+
+def sql_check(regions, lat, lng):
+    """The PL/pgSQL loop of check_scan_in_authorized_region()"""
+    min_distance, nearest = UNMEASURED_DISTANCE_KM, None
+    for region in regions:
+        if not region.located:
+            continue
+        distance = planar_distance_km(lat, lng, region.lat, region.lng)
+        if distance < min_distance:
+            min_distance, nearest = distance, region
+        if region.radius_km is not None and distance <= region.radius_km:
+            return {'is_authorized': True, 'nearest_region_code': region.code,
+                    'distance_km': int(distance + 0.5), 'severity': 'none'}
+    if not regions:
+        return {'is_authorized': True, 'nearest_region_code': 'NONE_DEFINED',
+                'distance_km': 0, 'severity': 'none'}
+    return {'is_authorized': False, 'nearest_region_code': nearest.code if nearest else None,
+            'distance_km': int(min_distance + 0.5), 'severity': region_index.severity_for(min_distance)}
+
+
+def random_regions(rng, count, lat_range=(41.0, 70.0), lng_range=(20.0, 180.0)):
+    return [
+        Region(code=f'R-{n}', name=f'Region {n}',
+               lat=rng.uniform(*lat_range), lng=rng.uniform(*lng_range),
+               radius_km=rng.choice([10, 50, 100, 300]))
+        for n in range(count)
+    ]
+
+
+def random_points(rng, count):
+    return [(rng.uniform(-60.0, 85.0), rng.uniform(-180.0, 180.0)) for _ in range(count)]
+
+
+class TestRegionIndex:
+    """Answers match the SQL function"""
+
+    def test_matches_sql_function(self):
+        rng = random.Random(11)
+        regions = random_regions(rng, 300)
+        regions.append(Region(code='RU-WIDE', name='Wide', lat=80.0, lng=60.0, radius_km=2500))
+        regions.append(Region(code='RU-NOCOORD', name='No coordinates'))
+        index = RegionIndex(regions)
+
+        for lat, lng in random_points(rng, 3000):
+            expected = sql_check(regions, lat, lng)
+            result = index.check(lat, lng)
+            assert result['is_authorized'] == expected['is_authorized']
+            if not expected['is_authorized']:
+                assert result['distance_km'] == expected['distance_km']
+                assert result['severity'] == expected['severity']
+
+    def test_edge_cases(self):
+        assert RegionIndex([]).check(55.0, 37.0)['nearest_region_code'] == 'NONE_DEFINED'
+
+        unlocated = RegionIndex([Region(code='RU-MOW', name='Москва')]).check(55.0, 37.0)
+        assert unlocated['is_authorized'] is False
+        assert unlocated['distance_km'] == UNMEASURED_DISTANCE_KM
+
+        moscow = RegionIndex([Region(code='RU-MOW', name='Москва', lat=55.75, lng=37.62, radius_km=50)])
+        assert moscow.check(55.76, 37.60)['is_authorized'] is True
+        far = moscow.check(59.94, 30.31)
+        assert (far['is_authorized'], far['nearest_region_code'], far['severity']) == (False, 'RU-MOW', 'critical')
+
+
+class TestRegionIndexCache:
+    """Rows are loaded once per organization and scoped per product"""
+
+    ROWS = [
+        (None, Region(code='RU-MOW', name='Москва', lat=55.75, lng=37.62, radius_km=50)),
+        ('product-1', Region(code='RU-SPE', name='Санкт-Петербург', lat=59.94, lng=30.31, radius_km=50)),
+    ]
+
+    def test_product_scope_and_invalidation(self):
+        cache = RegionIndexCache(ttl_seconds=60, max_organizations=10)
+        with patch.object(cache, '_load', return_value=self.ROWS) as load:
+            assert cache.check('org-1', 'product-1', 59.94, 30.31)['is_authorized'] is True
+            assert cache.check('org-1', 'product-2', 59.94, 30.31)['is_authorized'] is False
+            assert cache.check('org-1', None, 55.75, 37.62)['is_authorized'] is True
+            load.assert_called_once_with('org-1')
+
+            cache.invalidate('org-1')
+            cache.check('org-1', None, 55.75, 37.62)
+        assert load.call_count == 2
+        assert cache.get_stats() == {'hits': 2, 'loads': 2, 'invalidations': 1, 'organizations': 1}
+
+    def test_region_changes_invalidate(self):
+        with patch('app.services.geographic_anomaly.get_connection') as get_connection, \
+                patch.object(geographic_anomaly.region_indexes, 'invalidate') as invalidate:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            cur.fetchone.return_value = {'id': 'region-1'}
+            geographic_anomaly.add_authorized_region('org-1', 'user-1', 'RU-MOW', 'Москва')
+            geographic_anomaly.update_authorized_region('region-1', 'org-1', 'user-1', radius_km=80)
+            geographic_anomaly.delete_authorized_region('region-1', 'org-1')
+        assert invalidate.call_count == 3
+
+    def test_check_failure_does_not_block_scan(self):
+        with patch.object(geographic_anomaly.region_indexes, 'check', side_effect=RuntimeError('db down')):
+            result = geographic_anomaly.check_scan_location('org-1', None, 55.0, 37.0)
+        assert result['is_authorized'] is True
+        assert result['nearest_region_code'] == 'ERROR'
+
+
+class TestBenchmark:
+    """Per-scan checks for organizations with thousands of regions"""
+
+    @pytest.mark.parametrize('count', [1000, 5000])
+    def test_index_vs_linear_scan(self, count):
+        rng = random.Random(count)
+        regions = random_regions(rng, count)
+        points = random_points(rng, 1000)
+
+        start = time.perf_counter()
+        index = RegionIndex(regions)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        indexed = [index.check(lat, lng) for lat, lng in points]
+        index_us = (time.perf_counter() - start) / len(points) * 1e6
+
+        start = time.perf_counter()
+        linear = [sql_check(regions, lat, lng) for lat, lng in points]
+        linear_us = (time.perf_counter() - start) / len(points) * 1e6
+
+        assert [r['is_authorized'] for r in indexed] == [r['is_authorized'] for r in linear]
+        print(f"  {count} regions: build {build_ms:.0f}ms, {index_us:.1f}us/check "
+              f"vs {linear_us:.0f}us linear ({linear_us / index_us:.0f}x)")
+        assert index_us * 5 < linear_us
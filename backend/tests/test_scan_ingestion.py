@@ -0,0 +1,134 @@
+"""
+Unit tests for the batched QR scan ingestion buffer
+
+Tests enqueue/flush behaviour, backpressure fallback, shutdown flush,
+isolation of rejected rows, retry limits and batch geo resolution.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import psycopg
+import pytest
+
+from app.services.scan_ingestion import ScanEvent, ScanIngestionBuffer, _resolve_geo
+from app.utils.geoip import GeoLocation
+
+
+def _event(n: int = 0, variant: str | None = None) -> ScanEvent:
+    return ScanEvent(qr_code_id=f'qr-{n}', organization_id='org-1', ab_variant_id=variant)
+
+
+class TestScanIngestionBuffer:
+    """Test suite for ScanIngestionBuffer"""
+
+    @pytest.mark.asyncio
+    async def test_writes_inline_when_not_running(self):
+        buffer = ScanIngestionBuffer(batch_size=10, flush_interval_ms=1000, max_queue=100)
+        with patch('app.services.scan_ingestion._write_and_notify', new_callable=AsyncMock) as write:
+            await buffer.enqueue(_event())
+            write.assert_called_once()
+        assert buffer.get_stats()['written_inline'] == 1
+        assert buffer.get_stats()['queue_depth'] == 0
+
+    @pytest.mark.asyncio
+    async def test_enqueue_defers_write_until_flush(self):
+        buffer = ScanIngestionBuffer(batch_size=10, flush_interval_ms=60000, max_queue=100)
+        with patch('app.services.scan_ingestion._write_and_notify', new_callable=AsyncMock) as write:
+            buffer.start()
+            for n in range(3):
+                await buffer.enqueue(_event(n))
+            assert write.call_count == 0
+            assert buffer.get_stats()['queue_depth'] == 3
+
+            await buffer.stop()
+            write.assert_called_once()
+            assert len(write.call_args[0][0]) == 3
+        assert buffer.get_stats()['written'] == 3
+
+    @pytest.mark.asyncio
+    async def test_flush_splits_into_batches(self):
+        buffer = ScanIngestionBuffer(batch_size=2, flush_interval_ms=60000, max_queue=100)
+        with patch('app.services.scan_ingestion._write_and_notify', new_callable=AsyncMock) as write:
+            buffer.start()
+            for n in range(5):
+                await buffer.enqueue(_event(n))
+            await buffer.stop()
+        assert buffer.get_stats()['written'] == 5
+        assert [len(c[0][0]) for c in write.call_args_list] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_falls_back_to_inline_write(self):
+        buffer = ScanIngestionBuffer(batch_size=100, flush_interval_ms=60000, max_queue=2)
+        with patch('app.services.scan_ingestion._write_and_notify', new_callable=AsyncMock) as write:
+            buffer.start()
+            for n in range(3):
+                await buffer.enqueue(_event(n))
+            stats = buffer.get_stats()
+            assert stats['rejected_full'] == 1
+            assert stats['written_inline'] == 1
+            assert stats['queue_depth'] == 2
+            await buffer.stop()
+        assert write.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_events(self):
+        buffer = ScanIngestionBuffer(batch_size=10, flush_interval_ms=60000, max_queue=100)
+        with patch('app.services.scan_ingestion._write_and_notify', AsyncMock(side_effect=RuntimeError('db down'))):
+            buffer.start()
+            await buffer.enqueue(_event())
+            await buffer.enqueue(_event(1))
+            written = await buffer.flush()
+        assert written == 0
+        stats = buffer.get_stats()
+        assert stats['flush_errors'] == 1
+        assert stats['queue_depth'] == 2
+        with patch('app.services.scan_ingestion._write_and_notify', new_callable=AsyncMock):
+            await buffer.stop()
+
+
+    @pytest.mark.asyncio
+    async def test_rejected_row_is_isolated_and_discarded(self):
+        buffer = ScanIngestionBuffer(batch_size=10, flush_interval_ms=60000, max_queue=100)
+
+        async def write(events):
+            if any(e.qr_code_id == 'qr-2' for e in events):
+                raise psycopg.errors.ForeignKeyViolation('campaign does not exist')
+
+        with patch('app.services.scan_ingestion._write_and_notify', AsyncMock(side_effect=write)) as write_mock:
+            buffer.start()
+            for n in range(4):
+                await buffer.enqueue(_event(n))
+            await buffer.stop()
+
+        assert [len(c[0][0]) for c in write_mock.call_args_list] == [4, 2, 2, 1, 1]
+        stats = buffer.get_stats()
+        assert (stats['written'], stats['discarded'], stats['queue_depth']) == (3, 1, 0)
+
+    @pytest.mark.asyncio
+    async def test_events_dropped_after_max_attempts(self):
+        buffer = ScanIngestionBuffer(batch_size=10, flush_interval_ms=60000, max_queue=100, max_attempts=2)
+        with patch('app.services.scan_ingestion._write_and_notify', AsyncMock(side_effect=RuntimeError('db down'))):
+            buffer.start()
+            await buffer.enqueue(_event())
+            await buffer.flush()
+            assert buffer.get_stats()['queue_depth'] == 1
+            await buffer.stop()
+        stats = buffer.get_stats()
+        assert (stats['flush_errors'], stats['discarded'], stats['queue_depth']) == (2, 1, 0)
+
+
+class TestResolveGeo:
+    """Country/city are looked up per batch and raw IPs are dropped"""
+
+    def test_batch_lookup_fills_location(self):
+        events = [_event(1), _event(2), _event(3)]
+        events[0].client_ip = events[1].client_ip = '203.0.113.7'
+        events[2].client_ip = '198.51.100.1'
+        events[2].country = 'DE'  # already resolved
+        locations = {'203.0.113.7': GeoLocation('RU', 'Moscow')}
+        with patch('app.services.scan_ingestion.lookup_ips', return_value=locations) as lookup:
+            _resolve_geo(events)
+
+        assert lookup.call_args.args[0] == ['203.0.113.7', '203.0.113.7']
+        assert [(e.country, e.city) for e in events] == [('RU', 'Moscow'), ('RU', 'Moscow'), ('DE', None)]
+        assert all(e.client_ip is None for e in events)
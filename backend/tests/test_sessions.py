@@ -0,0 +1,108 @@
+"""
+Unit tests for the session cache
+
+Tests cached session/profile lookup, invalidation and lazy last_used_at writes.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import sessions
+
+
+def _loaded(session_id: str = 's-1', user_id: str = 'u-1', expires_in: int = 3600):
+    session = {
+        'id': session_id,
+        'user_id': user_id,
+        'refresh_token_hash': 'hash',
+        'expires_at': datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        'created_at': datetime.now(timezone.utc),
+        'last_used_at': None,
+    }
+    profile = {'id': user_id, 'email': 'a@b.c', 'role': 'user', 'display_name': None, 'avatar_url': None}
+    return session, profile
+
+
+class TestSessionCache:
+    """Cache hit, miss and invalidation"""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        sessions.clear_session_cache()
+        yield
+        sessions.clear_session_cache()
+
+    def test_second_lookup_is_served_from_cache(self):
+        with patch('app.services.sessions._load_session', return_value=_loaded()) as load:
+            session, user = sessions.get_session_user('s-1')
+            sessions.get_session_user('s-1')
+            assert load.call_count == 1
+        assert session['user_id'] == 'u-1'
+        assert user['role'] == 'user'
+
+    def test_missing_session_is_not_cached(self):
+        with patch('app.services.sessions._load_session', return_value=None) as load:
+            assert sessions.get_session_user('missing') == (None, None)
+            assert sessions.get_session('missing') is None
+            assert load.call_count == 2
+
+    def test_expired_session_is_reloaded(self):
+        with patch('app.services.sessions._load_session', return_value=_loaded(expires_in=-1)) as load:
+            sessions.get_session('s-1')
+            sessions.get_session('s-1')
+            assert load.call_count == 2
+
+    def test_invalidate_user_drops_all_user_sessions(self):
+        with patch('app.services.sessions._load_session', side_effect=lambda sid: _loaded(sid)) as load:
+            sessions.get_session('s-1')
+            sessions.get_session('s-2')
+            sessions.invalidate_user('u-1')
+            sessions.get_session('s-1')
+            sessions.get_session('s-2')
+            assert load.call_count == 4
+
+    def test_cached_copies_are_not_shared(self):
+        with patch('app.services.sessions._load_session', return_value=_loaded()):
+            _, user = sessions.get_session_user('s-1')
+            user['role'] = 'admin'
+            _, user = sessions.get_session_user('s-1')
+        assert user['role'] == 'user'
+
+
+class TestSessionTouches:
+    """Coalesced last_used_at updates"""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        sessions.clear_session_cache()
+        yield
+        sessions.clear_session_cache()
+
+    def test_repeated_use_is_touched_once(self):
+        with patch('app.services.sessions._load_session', return_value=_loaded()):
+            for _ in range(5):
+                sessions.get_session('s-1')
+        assert sessions.get_session_cache_stats()['pending_touches'] == 1
+
+    def test_flush_writes_one_batch(self):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        with patch('app.services.sessions._load_session', side_effect=lambda sid: _loaded(sid)):
+            sessions.get_session('s-1')
+            sessions.get_session('s-2')
+        with patch('app.services.sessions.get_connection') as get_connection:
+            get_connection.return_value.__enter__.return_value = conn
+            assert sessions.flush_session_touches() == 2
+            assert sessions.flush_session_touches() == 0
+        cursor.execute.assert_called_once()
+        assert sorted(cursor.execute.call_args[0][1][0]) == ['s-1', 's-2']
+
+    def test_failed_flush_keeps_touches(self):
+        with patch('app.services.sessions._load_session', return_value=_loaded()):
+            sessions.get_session('s-1')
+        with patch('app.services.sessions.get_connection', side_effect=RuntimeError('db down')):
+            with pytest.raises(RuntimeError):
+                sessions.flush_session_touches()
+        assert sessions.get_session_cache_stats()['pending_touches'] == 1
@@ -17,6 +17,7 @@ from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException
 
+from app.core.cache import organization_tag
 from app.services import status_levels
 
 
@@ -78,24 +79,24 @@ def clear_cache():
 def test_cache_utilities():
     """Test cache get/set/invalidate functions"""
     # Test set and get
-    status_levels._set_cache('test_key', {'data': 'value'}, ttl_seconds=10)
-    cached = status_levels._get_cached('test_key')
+    status_levels._cache.set('test_key', {'data': 'value'}, ttl_seconds=10)
+    cached = status_levels._cache.get('test_key')
     assert cached == {'data': 'value'}
 
     # Test expiration
-    status_levels._set_cache('expire_key', {'data': 'value'}, ttl_seconds=0)
-    expired = status_levels._get_cached('expire_key')
+    status_levels._cache.set('expire_key', {'data': 'value'}, ttl_seconds=0)
+    expired = status_levels._cache.get('expire_key')
     assert expired is None
 
-    # Test invalidation
-    status_levels._set_cache('org:123:user1', {'data': '1'})
-    status_levels._set_cache('org:123:user2', {'data': '2'})
-    status_levels._set_cache('org:456:user1', {'data': '3'})
+    # Test invalidation by organization tag
+    status_levels._cache.set('org_status:123:user1', {'data': '1'}, tags=[organization_tag('123')])
+    status_levels._cache.set('org_status:123:user2', {'data': '2'}, tags=[organization_tag('123')])
+    status_levels._cache.set('org_status:1234:user1', {'data': '3'}, tags=[organization_tag('1234')])
 
     status_levels._invalidate_cache('123')
-    assert status_levels._get_cached('org:123:user1') is None
-    assert status_levels._get_cached('org:123:user2') is None
-    assert status_levels._get_cached('org:456:user1') == {'data': '3'}
+    assert status_levels._cache.get('org_status:123:user1') is None
+    assert status_levels._cache.get('org_status:123:user2') is None
+    assert status_levels._cache.get('org_status:1234:user1') == {'data': '3'}
 
 
 # ============================================================
@@ -0,0 +1,114 @@
+"""
+Unit tests for the Telegram broadcast subsystem
+
+Tests token bucket pacing, 429 handling and resumable shard processing.
+"""
+
+from time import monotonic
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.services import telegram_broadcast
+from app.services.telegram_broadcast import PerChatLimiter, TokenBucket, send_broadcast_message
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestTokenBucket:
+    """Test suite for TokenBucket"""
+
+    @pytest.mark.asyncio
+    async def test_burst_up_to_capacity_then_paced(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+        started = monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        # 5 immediate, 5 more at 100/s
+        assert monotonic() - started >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_pause_delays_next_token(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.05)
+        started = monotonic()
+        await bucket.acquire()
+        assert monotonic() - started >= 0.04
+
+
+class TestSendBroadcastMessage:
+    """Test suite for send_broadcast_message"""
+
+    @pytest.fixture(autouse=True)
+    def fast_limits(self):
+        with patch.object(telegram_broadcast.settings, 'telegram_bot_token', 'token'):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_retries_after_429(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, json={'ok': False, 'parameters': {'retry_after': 0.01}})
+            return httpx.Response(200, json={'ok': True})
+
+        bucket = TokenBucket(rate=1000)
+        async with _client(handler) as client:
+            sent, error = await send_broadcast_message(client, 1, 'hi', bucket, PerChatLimiter(0))
+        assert sent is True
+        assert error is None
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_blocked_chat_is_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(403, json={'ok': False, 'description': 'bot was blocked by the user'})
+
+        async with _client(handler) as client:
+            sent, error = await send_broadcast_message(client, 1, 'hi', TokenBucket(rate=1000), PerChatLimiter(0))
+        assert sent is False
+        assert error.startswith('403')
+        assert len(calls) == 1
+
+
+class TestRunBroadcast:
+    """Shard processing and progress persistence"""
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_cursor_and_saves_progress_per_shard(self):
+        broadcast = {
+            'id': 'b-1',
+            'organization_id': 'org-1',
+            'notification_type': 'review',
+            'message': 'hi',
+            'cursor_telegram_id': 10,
+        }
+        shards = [[11, 12], [13], []]
+        with patch.object(telegram_broadcast.settings, 'telegram_bot_token', 'token'), \
+                patch('app.services.telegram_broadcast._claim_broadcast', AsyncMock(return_value=broadcast)), \
+                patch('app.services.telegram_broadcast._fetch_recipients', AsyncMock(side_effect=shards)) as fetch, \
+                patch('app.services.telegram_broadcast._save_progress', new_callable=AsyncMock) as save, \
+                patch('app.services.telegram_broadcast.get_broadcast', new_callable=AsyncMock), \
+                patch('app.services.telegram_broadcast.send_broadcast_message',
+                      AsyncMock(side_effect=[(True, None), (False, '403: blocked'), (True, None)])):
+            await telegram_broadcast.run_broadcast('b-1')
+
+        assert [c.args[1] for c in fetch.call_args_list] == [10, 12, 13]
+        progress = [c.args[1:4] for c in save.call_args_list]
+        assert progress == [(12, 1, 1), (13, 1, 0), (13, 0, 0)]
+        assert save.call_args_list[-1].kwargs['status'] == 'completed'
+
+    @pytest.mark.asyncio
+    async def test_broadcast_owned_elsewhere_is_skipped(self):
+        with patch('app.services.telegram_broadcast._claim_broadcast', AsyncMock(return_value=None)), \
+                patch('app.services.telegram_broadcast._fetch_recipients', new_callable=AsyncMock) as fetch:
+            assert await telegram_broadcast.run_broadcast('b-1') is None
+        fetch.assert_not_called()
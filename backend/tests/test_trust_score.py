@@ -0,0 +1,108 @@
+"""
+Unit tests for trust score calculation
+
+Tests the public formula, the set-based recalculation of all organizations
+and the incremental mode driven by trust_score_dirty_organizations.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app.services import trust_score
+from app.services.trust_score import score_grade, score_signals, total_score
+
+NOW = datetime(2026, 10, 16, tzinfo=timezone.utc)
+
+
+def _inputs(**overrides):
+    row = {
+        'id': 'org-1', 'name': 'Ферма', 'verification_status': 'level_b',
+        'created_at': NOW - timedelta(days=300), 'updated_at': NOW - timedelta(days=10),
+        'avg_rating': 4.5, 'total_reviews': 200, 'with_response': 150,
+        'challenge_responded': 3, 'challenge_total': 4,
+        'total_nodes': 5, 'verified_nodes': 2,
+    }
+    row.update(overrides)
+    return row
+
+
+class TestFormula:
+    """Signals follow get_trust_score_formula()"""
+
+    def test_signal_points(self):
+        signals = score_signals(_inputs(), NOW)
+        assert {code: s['raw'] for code, s in signals.items()} == {
+            'review_rating': 90.0,
+            'review_count': 20.0,
+            'response_rate': 75.0,
+            'challenge_resolution': 75.0,
+            'supply_chain_docs': 40.0,
+            'platform_tenure': 20.0,
+            'content_freshness': 90,
+            'verification_level': 75,
+        }
+        assert all(s['weight'] == trust_score.SIGNAL_WEIGHTS[code] for code, s in signals.items())
+
+    def test_empty_organization(self):
+        signals = score_signals(_inputs(avg_rating=None, total_reviews=0, with_response=0,
+                                        challenge_total=0, challenge_responded=0,
+                                        total_nodes=0, verified_nodes=0,
+                                        verification_status='unknown'), NOW)
+        assert signals['challenge_resolution']['raw'] == 100  # no challenges = perfect score
+        assert signals['response_rate']['raw'] == 0
+        assert signals['verification_level']['raw'] == 25
+
+    def test_total_and_grade(self):
+        signals = score_signals(_inputs(), NOW)
+        expected = round(sum(s['raw'] * s['weight'] for s in signals.values())
+                         / sum(trust_score.SIGNAL_WEIGHTS.values()), 2)
+        assert total_score(signals) == expected
+        assert [score_grade(s) for s in (95, 80, 79.99, 60, 12)] == ['A', 'B', 'C', 'D', 'F']
+
+
+class TestRecalculateAll:
+    """All organizations are scored from one inputs query and written with one COPY"""
+
+    def _run(self, dirty, rows, incremental):
+        with patch('app.services.trust_score.get_connection') as get_connection:
+            conn = get_connection.return_value.__enter__.return_value
+            cur = conn.cursor.return_value.__enter__.return_value
+            cur.fetchall.side_effect = [[{'organization_id': d} for d in dirty], rows]
+            copy = cur.copy.return_value.__enter__.return_value
+            count = trust_score.recalculate_all_trust_scores(incremental=incremental)
+        statements = [' '.join(c.args[0].split()) for c in cur.execute.call_args_list]
+        return count, conn, cur, copy, statements
+
+    def test_full_run(self):
+        rows = [_inputs(id='org-1'), _inputs(id='org-2', avg_rating=2.0)]
+        count, conn, cur, copy, statements = self._run(['org-1'], rows, incremental=False)
+
+        assert count == 2
+        assert statements[0].startswith('DELETE FROM trust_score_dirty_organizations')
+        assert "WHERE verification_status NOT IN ('rejected', 'suspended') )" in statements[1]
+        assert statements[1].count('GROUP BY organization_id') == 3
+        assert any(s.startswith('INSERT INTO organization_trust_scores') for s in statements)
+        assert any(s.startswith('INSERT INTO trust_score_history') for s in statements)
+
+        written = [c.args[0] for c in copy.write_row.call_args_list]
+        assert [row[0] for row in written] == ['org-1', 'org-2']
+        assert json.loads(written[1][3])['review_rating']['raw'] == 40.0
+        conn.commit.assert_called_once()
+
+    def test_incremental_scores_only_marked_organizations(self):
+        count, conn, cur, copy, statements = self._run(['org-2', 'org-2'], [_inputs(id='org-2')],
+                                                       incremental=True)
+
+        assert count == 1
+        assert 'AND id = ANY(%s)' in statements[1]
+        assert cur.execute.call_args_list[1].args[1] == (['org-2'],)
+        conn.commit.assert_called_once()
+
+    def test_incremental_without_marks_does_nothing(self):
+        count, conn, cur, copy, statements = self._run([], [], incremental=True)
+
+        assert count == 0
+        assert len(statements) == 1
+        conn.rollback.assert_called_once()
+        cur.copy.assert_not_called()
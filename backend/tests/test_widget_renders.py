@@ -0,0 +1,174 @@
+"""
+Unit tests for the widget render cache
+
+Tests cached renders and their ETags, 304 answers from the version token
+without database access, invalidation by organization, and the embed counts
+used to warm the cache at startup.
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.api.routes import widgets as widget_routes
+from app.core.cache import invalidate_tags, organization_tag
+from app.schemas.widgets import WidgetConfig, WidgetOrganizationData, WidgetSize, WidgetTheme
+from app.services import widgets
+
+ORG = WidgetOrganizationData(
+    organization_id='org-1', name='Ферма', slug='ferma', status_level='B',
+    star_rating=4.6, review_count=12, verified_since='2025-01-01',
+)
+CONFIG = WidgetConfig(size=WidgetSize.LARGE, theme=WidgetTheme.DARK, primary_color='#3B82F6')
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    widgets._cache.clear()
+    widgets._renders.clear()
+    widgets._embed_counts.clear()
+    yield
+    widgets._cache.clear()
+    widgets._renders.clear()
+    widgets._embed_counts.clear()
+
+
+def _request(if_none_match=None):
+    request = Mock()
+    request.headers = {'If-None-Match': f'"{if_none_match}"'} if if_none_match else {}
+    return request
+
+
+async def _badge(request):
+    return await widget_routes.get_widget_badge(
+        'ferma', request, size='large', theme='dark', color='3b82f6',
+        logo=True, reviews=True, rating=True, lang='ru', radius=8,
+    )
+
+
+class TestRenderCache:
+    """Renders are cached per kind, slug and configuration"""
+
+    @pytest.mark.asyncio
+    async def test_render_is_cached(self):
+        with patch.object(widgets, 'get_organization_for_widget', AsyncMock(return_value=ORG)) as fetch:
+            body, etag = await widgets.render_widget('badge', 'ferma', CONFIG)
+            again = await widgets.render_widget('badge', 'ferma', CONFIG)
+            iframe_body, iframe_etag = await widgets.render_widget('iframe', 'ferma', CONFIG)
+
+        assert fetch.await_count == 2
+        assert again == (body, etag)
+        assert 'Ферма' in body and '<!DOCTYPE html>' in iframe_body
+        config_key = widgets.widget_config_key(CONFIG)
+        assert etag == widgets.widget_etag('badge', 'ferma', config_key, widgets.data_version(ORG))
+        assert iframe_etag != etag
+
+    @pytest.mark.asyncio
+    async def test_organization_changes_invalidate(self):
+        with patch.object(widgets, 'get_organization_for_widget', AsyncMock(return_value=ORG)) as fetch:
+            await widgets.render_widget('badge', 'ferma', CONFIG)
+            invalidate_tags(organization_tag('org-1'))
+            await widgets.render_widget('badge', 'ferma', CONFIG)
+        assert fetch.await_count == 2
+
+    def test_config_key_round_trip(self):
+        assert widgets.config_from_key(widgets.widget_config_key(CONFIG)) == CONFIG
+        assert widgets.config_from_key(widgets.widget_config_key(WidgetConfig())) == WidgetConfig()
+
+
+class TestNotModified:
+    """If-None-Match is answered before any rendering or database access"""
+
+    @pytest.mark.asyncio
+    async def test_304_from_version_token(self):
+        widgets._cache.set('widget_version:ferma', widgets.data_version(ORG))
+        etag = widgets.widget_etag('badge', 'ferma', widgets.widget_config_key(CONFIG), widgets.data_version(ORG))
+
+        with patch.object(widget_routes, 'render_widget', AsyncMock()) as render:
+            response = await _badge(_request(etag))
+
+        assert response.status_code == 304
+        assert response.headers['ETag'] == f'"{etag}"'
+        render.assert_not_awaited()
+        assert sum(widgets._embed_counts.values()) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_etag_gets_body(self):
+        with patch.object(widgets, 'get_organization_for_widget', AsyncMock(return_value=ORG)):
+            response = await _badge(_request('outdated'))
+            etag = response.headers['ETag'].strip('"')
+            repeat = await _badge(_request(etag))
+
+        assert response.status_code == 200
+        assert response.media_type.startswith('application/javascript')
+        assert repeat.status_code == 304
+
+
+class TestEmbedCounts:
+    """Requests are counted, flushed in one statement and used for warming"""
+
+    def test_flush(self):
+        for _ in range(3):
+            widgets.record_widget_request('badge', 'ferma', CONFIG)
+        widgets.record_widget_request('iframe', 'ferma', CONFIG)
+
+        with patch('app.services.widgets.get_connection') as get_connection:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            assert widgets.flush_widget_embed_counts() == 2
+
+        slugs, kinds, keys, counts = cur.execute.call_args_list[0].args[1]
+        assert sorted(zip(kinds, counts)) == [('badge', 3), ('iframe', 1)]
+        assert 'DELETE FROM widget_embed_counts' in cur.execute.call_args.args[0]
+        assert not widgets._embed_counts
+
+    def test_distinct_keys_are_bounded(self):
+        with patch.object(widgets, 'EMBED_COUNT_MAX_KEYS', 2):
+            for radius in range(4):
+                widgets.record_widget_request('badge', 'ferma', WidgetConfig(border_radius=radius))
+            widgets.record_widget_request('badge', 'ferma', WidgetConfig(border_radius=0))
+        assert sorted(widgets._embed_counts.values()) == [1, 2]
+
+    def test_flush_keeps_most_requested_configs_per_widget(self):
+        for n in range(8):
+            for _ in range(n + 1):
+                widgets.record_widget_request('badge', 'ferma', WidgetConfig(primary_color=f'#00000{n}'))
+        widgets.record_widget_request('iframe', 'ferma', CONFIG)
+
+        with patch.object(widgets, 'EMBED_COUNT_MAX_CONFIGS', 3), \
+                patch('app.services.widgets.get_connection') as get_connection:
+            cur = get_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+            assert widgets.flush_widget_embed_counts() == 4
+
+        slugs, kinds, keys, counts = cur.execute.call_args_list[0].args[1]
+        assert sorted(zip(kinds, counts)) == [('badge', 6), ('badge', 7), ('badge', 8), ('iframe', 1)]
+        # Stored rows beyond the limit are trimmed per widget
+        assert cur.execute.call_args_list[1].args[1] == (['ferma'], 3)
+
+    def test_only_hex_colors_are_accepted(self):
+        assert widget_routes.parse_widget_config(color='3b82f6').primary_color == '#3B82F6'
+        assert widget_routes.parse_widget_config(color='#zzzzzz').primary_color is None
+        assert widget_routes.parse_widget_config(color='12345678').primary_color is None
+
+    def test_flush_failure_keeps_counts(self):
+        widgets.record_widget_request('badge', 'ferma', CONFIG)
+        with patch('app.services.widgets.get_connection', side_effect=RuntimeError('db down')):
+            with pytest.raises(RuntimeError):
+                widgets.flush_widget_embed_counts()
+        assert sum(widgets._embed_counts.values()) == 1
+
+    @pytest.mark.asyncio
+    async def test_warm(self):
+        rows = [
+            {'organization_slug': 'ferma', 'kind': 'badge', 'config_key': widgets.widget_config_key(CONFIG)},
+            {'organization_slug': 'gone', 'kind': 'iframe', 'config_key': widgets.widget_config_key(WidgetConfig())},
+        ]
+
+        async def render(kind, slug, config):
+            if slug == 'gone':
+                raise RuntimeError('not found')
+            return 'body', 'etag'
+
+        with patch.object(widgets, '_most_embedded_widgets', return_value=rows), \
+                patch.object(widgets, 'render_widget', side_effect=render) as render_mock:
+            assert await widgets.warm_widget_renders(limit=10) == 1
+        assert render_mock.call_args_list[0].args == ('badge', 'ferma', CONFIG)
@@ -0,0 +1,17 @@
+-- Migration: Batched QR scan ingestion
+-- Purpose: qr_events rows are now written in multi-row batches by the backend
+--          scan ingestion flusher, which also applies A/B variant counters
+--          as per-batch deltas.
+-- Date: 2026-10-16
+
+-- The per-row trigger would double count clicks now that the flusher
+-- updates qr_ab_test_variants itself
+DROP TRIGGER IF EXISTS trigger_update_ab_variant_stats ON qr_events;
+
+-- Supports the per-batch "new unique visitor" check
+CREATE INDEX IF NOT EXISTS idx_qr_events_variant_visitor
+ON qr_events (ab_variant_id, ip_hash)
+WHERE ab_variant_id IS NOT NULL;
+
+COMMENT ON FUNCTION update_ab_variant_stats IS
+'Unused since 0121: A/B variant counters are applied by the backend scan ingestion flusher.';
@@ -0,0 +1,21 @@
+-- Migration: Notification delivery row claiming
+-- Purpose: delivery workers claim pending rows with FOR UPDATE SKIP LOCKED
+--          and mark them 'sending' while the batch is in flight, so several
+--          workers/processes can drain the queue in parallel.
+-- Date: 2026-10-16
+
+ALTER TABLE public.notification_deliveries
+    ADD COLUMN IF NOT EXISTS claimed_at timestamptz;
+
+ALTER TABLE public.notification_deliveries DROP CONSTRAINT IF EXISTS notification_deliveries_status_check;
+ALTER TABLE public.notification_deliveries
+    ADD CONSTRAINT notification_deliveries_status_check
+    CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'read', 'dismissed', 'ready'));
+
+-- Claim query: oldest pending (or stale 'sending') rows per channel
+CREATE INDEX IF NOT EXISTS idx_notification_deliveries_claim
+ON public.notification_deliveries (channel, created_at)
+WHERE status IN ('pending', 'sending');
+
+COMMENT ON COLUMN public.notification_deliveries.claimed_at IS
+'When a delivery worker claimed the row; rows stuck in sending are reclaimed after a timeout.';
@@ -0,0 +1,36 @@
+-- Migration: Telegram broadcasts
+-- Purpose: persist fan-out progress of subscriber notifications so a
+--          broadcast can resume after a restart and report sent/failed
+--          counts while it is running.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS telegram_broadcasts (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    organization_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    notification_type TEXT NOT NULL DEFAULT 'review',
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    total_recipients INTEGER NOT NULL DEFAULT 0,
+    sent_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    -- Recipients are processed in telegram_id order; everything up to and
+    -- including the cursor has been attempted
+    cursor_telegram_id BIGINT,
+    last_error TEXT,
+    heartbeat_at TIMESTAMPTZ,
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_telegram_broadcasts_org ON telegram_broadcasts(organization_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_telegram_broadcasts_active
+ON telegram_broadcasts(heartbeat_at)
+WHERE status IN ('pending', 'running');
+
+-- Written by the backend only (service role); pending rows are sent by the resume job
+ALTER TABLE telegram_broadcasts ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE telegram_broadcasts IS 'Resumable Telegram fan-out to organization subscribers';
@@ -0,0 +1,14 @@
+-- Migration: Resumable bulk imports
+-- Purpose: imports are written in chunks; each chunk commits its rows
+--          together with last_committed_row so an interrupted job resumes
+--          after the last committed chunk. heartbeat_at is a lease that
+--          keeps a job on one worker while it is running.
+-- Date: 2026-10-16
+
+ALTER TABLE import_jobs
+    ADD COLUMN IF NOT EXISTS last_committed_row INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_processing
+    ON import_jobs(heartbeat_at)
+    WHERE status = 'processing';
@@ -0,0 +1,38 @@
+-- Migration: Image ingestion worker
+-- Purpose: import_image_queue rows are claimed with FOR UPDATE SKIP LOCKED
+--          by one or more ingestion workers and retried with backoff.
+--          Downloaded images are stored once per content hash, and source
+--          URLs already fetched are resolved without another download.
+-- Date: 2026-10-16
+
+ALTER TABLE import_image_queue
+    ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS content_hash TEXT,
+    ADD COLUMN IF NOT EXISTS thumbnail_url TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_image_queue_claimable
+    ON import_image_queue(created_at)
+    WHERE status IN ('pending', 'downloading');
+
+-- One stored copy per distinct image content
+CREATE TABLE IF NOT EXISTS image_assets (
+    content_hash TEXT PRIMARY KEY,
+    image_url TEXT NOT NULL,
+    thumbnail_url TEXT,
+    byte_size INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Source URL -> content it resolved to
+CREATE TABLE IF NOT EXISTS image_source_urls (
+    source_url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL REFERENCES image_assets(content_hash) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_image_source_urls_hash ON image_source_urls(content_hash);
+
+-- Ingestion worker only (service role): URL mappings decide which asset is reused
+ALTER TABLE image_assets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE image_source_urls ENABLE ROW LEVEL SECURITY;
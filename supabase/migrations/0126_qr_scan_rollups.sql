@@ -0,0 +1,62 @@
+-- Migration: QR scan rollups
+-- Purpose: hourly and daily pre-aggregated scan counts per QR code and
+--          dimension (geo, UTM, A/B variant). A background job folds
+--          qr_events into both tables past a watermark (the last rolled-up
+--          qr_events.id); analytics read the rollups plus the raw events
+--          after the watermark.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS qr_scan_rollups_hourly (
+    qr_code_id UUID NOT NULL REFERENCES qr_codes(id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL,
+    country TEXT,
+    city TEXT,
+    utm_source TEXT,
+    utm_medium TEXT,
+    utm_campaign TEXT,
+    ab_variant_id UUID,
+    scans BIGINT NOT NULL DEFAULT 0,
+    first_scan_at TIMESTAMPTZ NOT NULL,
+    last_scan_at TIMESTAMPTZ NOT NULL,
+    CONSTRAINT qr_scan_rollups_hourly_key UNIQUE NULLS NOT DISTINCT (
+        qr_code_id, bucket, country, city, utm_source, utm_medium, utm_campaign, ab_variant_id
+    )
+);
+
+CREATE TABLE IF NOT EXISTS qr_scan_rollups_daily (
+    qr_code_id UUID NOT NULL REFERENCES qr_codes(id) ON DELETE CASCADE,
+    organization_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL,
+    country TEXT,
+    city TEXT,
+    utm_source TEXT,
+    utm_medium TEXT,
+    utm_campaign TEXT,
+    ab_variant_id UUID,
+    scans BIGINT NOT NULL DEFAULT 0,
+    first_scan_at TIMESTAMPTZ NOT NULL,
+    last_scan_at TIMESTAMPTZ NOT NULL,
+    CONSTRAINT qr_scan_rollups_daily_key UNIQUE NULLS NOT DISTINCT (
+        qr_code_id, bucket, country, city, utm_source, utm_medium, utm_campaign, ab_variant_id
+    )
+);
+
+CREATE INDEX IF NOT EXISTS idx_qr_scan_rollups_hourly_org
+    ON qr_scan_rollups_hourly(organization_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_qr_scan_rollups_daily_org
+    ON qr_scan_rollups_daily(organization_id, bucket);
+
+CREATE TABLE IF NOT EXISTS qr_scan_rollup_state (
+    name TEXT PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Maintained and read by the backend only (service role)
+ALTER TABLE qr_scan_rollups_hourly ENABLE ROW LEVEL SECURITY;
+ALTER TABLE qr_scan_rollups_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE qr_scan_rollup_state ENABLE ROW LEVEL SECURITY;
+
+INSERT INTO qr_scan_rollup_state (name) VALUES ('qr_events')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,90 @@
+-- Migration: incremental trust score recalculation
+-- Purpose: triggers on the trust score inputs (reviews, verification
+--          challenges, supply chain nodes, organizations) append the
+--          affected organization to trust_score_dirty_organizations. The
+--          incremental job claims (deletes) the marks and rescores only
+--          those organizations; the nightly full run rescores everyone.
+--          Marks are append-only so writers never wait on the claiming job.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS trust_score_dirty_organizations (
+    id BIGSERIAL PRIMARY KEY,
+    organization_id UUID NOT NULL,
+    marked_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Filled by the triggers below and drained by the backend (service role)
+ALTER TABLE trust_score_dirty_organizations ENABLE ROW LEVEL SECURITY;
+
+-- The trigger functions run as their owner so that writes to the source
+-- tables mark organizations whatever role made them
+-- Rows carrying organization_id (reviews, challenges, supply chain nodes)
+CREATE OR REPLACE FUNCTION mark_trust_score_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO trust_score_dirty_organizations (organization_id) VALUES (OLD.organization_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.organization_id IS DISTINCT FROM OLD.organization_id) THEN
+        INSERT INTO trust_score_dirty_organizations (organization_id) VALUES (NEW.organization_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION mark_organization_trust_score_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO trust_score_dirty_organizations (organization_id) VALUES (NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+DROP TRIGGER IF EXISTS trigger_reviews_trust_score_dirty ON reviews;
+CREATE TRIGGER trigger_reviews_trust_score_dirty
+    AFTER INSERT OR DELETE ON reviews
+    FOR EACH ROW EXECUTE FUNCTION mark_trust_score_dirty();
+
+DROP TRIGGER IF EXISTS trigger_reviews_trust_score_dirty_update ON reviews;
+CREATE TRIGGER trigger_reviews_trust_score_dirty_update
+    AFTER UPDATE ON reviews
+    FOR EACH ROW
+    WHEN (OLD.rating IS DISTINCT FROM NEW.rating
+          OR OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.response IS DISTINCT FROM NEW.response
+          OR OLD.organization_id IS DISTINCT FROM NEW.organization_id)
+    EXECUTE FUNCTION mark_trust_score_dirty();
+
+DROP TRIGGER IF EXISTS trigger_challenges_trust_score_dirty ON verification_challenges;
+CREATE TRIGGER trigger_challenges_trust_score_dirty
+    AFTER INSERT OR DELETE ON verification_challenges
+    FOR EACH ROW EXECUTE FUNCTION mark_trust_score_dirty();
+
+DROP TRIGGER IF EXISTS trigger_challenges_trust_score_dirty_update ON verification_challenges;
+CREATE TRIGGER trigger_challenges_trust_score_dirty_update
+    AFTER UPDATE ON verification_challenges
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.organization_id IS DISTINCT FROM NEW.organization_id)
+    EXECUTE FUNCTION mark_trust_score_dirty();
+
+DROP TRIGGER IF EXISTS trigger_supply_chain_nodes_trust_score_dirty ON supply_chain_nodes;
+CREATE TRIGGER trigger_supply_chain_nodes_trust_score_dirty
+    AFTER INSERT OR DELETE ON supply_chain_nodes
+    FOR EACH ROW EXECUTE FUNCTION mark_trust_score_dirty();
+
+DROP TRIGGER IF EXISTS trigger_supply_chain_nodes_trust_score_dirty_update ON supply_chain_nodes;
+CREATE TRIGGER trigger_supply_chain_nodes_trust_score_dirty_update
+    AFTER UPDATE ON supply_chain_nodes
+    FOR EACH ROW
+    WHEN (OLD.is_verified IS DISTINCT FROM NEW.is_verified
+          OR OLD.organization_id IS DISTINCT FROM NEW.organization_id)
+    EXECUTE FUNCTION mark_trust_score_dirty();
+
+-- Content freshness follows organizations.updated_at, so any update counts
+DROP TRIGGER IF EXISTS trigger_organizations_trust_score_dirty ON organizations;
+CREATE TRIGGER trigger_organizations_trust_score_dirty
+    AFTER INSERT OR UPDATE ON organizations
+    FOR EACH ROW EXECUTE FUNCTION mark_organization_trust_score_dirty();
+
+COMMENT ON TABLE trust_score_dirty_organizations IS 'Organizations whose trust score inputs changed since the last recalculation';
@@ -0,0 +1,6 @@
+-- Migration: index reviews by updated_at
+-- Purpose: benchmark snapshots re-read organizations whose reviews changed
+--          since the last sync (WHERE updated_at > watermark) every minute.
+-- Date: 2026-10-16
+
+CREATE INDEX IF NOT EXISTS idx_reviews_updated_at ON public.reviews(updated_at);
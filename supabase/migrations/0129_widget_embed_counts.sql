@@ -0,0 +1,24 @@
+-- Migration: widget embed counts
+-- Purpose: widget badge/iframe requests are counted per organization slug
+--          and widget configuration in each worker and flushed here every
+--          minute. At startup the most requested widgets are rendered into
+--          the widget render cache before partner sites ask for them.
+--          Only the few most requested configurations of each widget are
+--          kept, so colours chosen by embedding pages cannot grow the table.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS public.widget_embed_counts (
+    organization_slug TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('badge', 'iframe')),
+    config_key TEXT NOT NULL,
+    request_count BIGINT NOT NULL DEFAULT 0,
+    last_requested_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (organization_slug, kind, config_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_widget_embed_counts_requests
+    ON public.widget_embed_counts(request_count DESC);
+
+ALTER TABLE public.widget_embed_counts ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE public.widget_embed_counts IS 'Widget requests per organization and configuration, used to warm the widget render cache';
@@ -0,0 +1,22 @@
+-- Migration: stamp ai_moderation_patterns.updated_at on pattern edits
+-- Purpose: moderation workers rebuild their compiled pattern set when the
+--          table fingerprint (row count and updated_at values) changes.
+--          Edits made outside update_pattern() (SQL console, admin table
+--          editor) must move updated_at too. Match statistics updates
+--          (match_count, last_match_at, ...) do not affect the compiled set
+--          and are left alone.
+-- Date: 2026-10-16
+
+DROP TRIGGER IF EXISTS trg_ai_moderation_patterns_updated_at ON ai_moderation_patterns;
+CREATE TRIGGER trg_ai_moderation_patterns_updated_at
+    BEFORE UPDATE ON ai_moderation_patterns
+    FOR EACH ROW
+    WHEN (OLD.name IS DISTINCT FROM NEW.name
+          OR OLD.pattern_type IS DISTINCT FROM NEW.pattern_type
+          OR OLD.pattern_data IS DISTINCT FROM NEW.pattern_data
+          OR OLD.detects IS DISTINCT FROM NEW.detects
+          OR OLD.action_on_match IS DISTINCT FROM NEW.action_on_match
+          OR OLD.priority_boost IS DISTINCT FROM NEW.priority_boost
+          OR OLD.confidence_weight IS DISTINCT FROM NEW.confidence_weight
+          OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+    EXECUTE FUNCTION update_updated_at_column();